@@ -103,6 +103,12 @@ def _start_backup_scheduler():  # noqa: C901
             target = target + _dt.timedelta(days=7)
         return int((target - now).total_seconds())
 
+    def _backup_stats_str() -> str:
+        stats = app.config.get("LAST_BACKUP_STATS") or {}
+        if not stats:
+            return ""
+        return f"({stats.get('duration_s')}s, {stats.get('throughput_mb_s')} MB/s, {stats.get('compression')})"
+
     def _loop():
         while True:
             try:
@@ -123,7 +129,9 @@ def _start_backup_scheduler():  # noqa: C901
                         fn = getattr(app, "perform_backup", None)
                         if callable(fn):
                             ok = bool(fn(retain_count=20, daily=True))
-                    logger.info(f"Backup diário executado: {'OK' if ok else 'FAIL'}")
+                    logger.info(
+                        f"Backup diário executado: {'OK' if ok else 'FAIL'} {_backup_stats_str() if ok else ''}"
+                    )
 
                 # Weekly on Sunday 02:00
                 if weekly_enabled:
@@ -140,7 +148,9 @@ def _start_backup_scheduler():  # noqa: C901
                         fn = getattr(app, "perform_backup", None)
                         if callable(fn):
                             ok = bool(fn(retain_count=20, daily=False))
-                    logger.info(f"Backup semanal executado: {'OK' if ok else 'FAIL'}")
+                    logger.info(
+                        f"Backup semanal executado: {'OK' if ok else 'FAIL'} {_backup_stats_str() if ok else ''}"
+                    )
             except Exception as e:
                 logger.error(f"Erro no agendador de backup: {e}")
                 time.sleep(60)
@@ -160,6 +170,7 @@ if __name__ == "__main__":
     except ImportError:
         serve = None
     if serve:
-        serve(app, host=host, port=port)
+        # Streams SSE (/api/v1/eventos) ocupam uma thread cada enquanto abertos
+        serve(app, host=host, port=port, threads=int(os.getenv("WAITRESS_THREADS", "12")))
     else:
         app.run(host=host, port=port, debug=debug)
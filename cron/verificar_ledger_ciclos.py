@@ -0,0 +1,42 @@
+"""
+Verifica o ledger de saldos dos Ciclos (CicloSaldoLedger) contra as somas brutas de Ciclo/CicloFolga.
+
+Uso:
+    python cron/verificar_ledger_ciclos.py                 # lista divergências (código de saída 1 se houver)
+    python cron/verificar_ledger_ciclos.py --reconstruir   # recria o ledger quando houver divergência
+"""
+
+import argparse
+import sys
+
+from multimax import create_app, db
+from multimax.services.ciclo_ledger_service import reconstruir, verificar
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Verifica/reconstrói o ledger de saldos dos Ciclos")
+    parser.add_argument("--reconstruir", action="store_true", help="Recria o ledger a partir dos registros")
+    parser.add_argument("--colaborador", type=int, action="append", help="Restringe ao colaborador (repetível)")
+    args = parser.parse_args(argv)
+
+    app = create_app()
+    with app.app_context():
+        divergencias = verificar(args.colaborador)
+        for d in divergencias:
+            print(
+                f"colaborador={d['collaborator_id']} setor={d['setor_id']} status={d['status_ciclo']} "
+                f"{d['campo']}: ledger={d['ledger']} bruto={d['bruto']}"
+            )
+        if not divergencias:
+            print("Ledger consistente.")
+            return 0
+        if args.reconstruir:
+            linhas = reconstruir(args.colaborador)
+            db.session.commit()
+            print(f"Ledger reconstruído: {linhas} linha(s).")
+            return 0
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,8 @@
 ﻿import os
-import shutil
 import sys
 import threading
 import time
-from typing import cast
+from typing import Optional, cast
 
 from flask import Flask
 from flask_login import LoginManager
@@ -215,28 +214,24 @@ def _setup_login_manager(app: Flask) -> None:
             return None
 
 
-def _get_version_from_git() -> str:
-    """ObtÃ©m versÃ£o do git."""
-    try:
-        import subprocess
-
-        base_dir = os.path.dirname(os.path.dirname(__file__))
-        r = subprocess.run(
-            ["git", "describe", "--tags", "--abbrev=0"], cwd=base_dir, capture_output=True, text=True, timeout=2
-        )
-        if r.returncode == 0 and r.stdout.strip():
-            return r.stdout.strip()
-    except (subprocess.TimeoutExpired, FileNotFoundError, subprocess.SubprocessError):
-        pass
-    except Exception:
-        pass
-    return ""
-
-
 def _setup_extensions(app: Flask) -> None:
     """Configura extensÃµes da aplicaÃ§Ã£o."""
     db.init_app(app)
     _setup_login_manager(app)
+    _setup_sqlite_profile(app)
+
+
+def _setup_sqlite_profile(app: Flask) -> None:
+    """Aplica o perfil de PRAGMAs (WAL, busy_timeout etc.) a cada nova conexão SQLite."""
+    try:
+        from .services.sqlite_profile_service import instalar_perfil_sqlite
+
+        with app.app_context():
+            perfil = instalar_perfil_sqlite(app, db.engine)
+        if perfil:
+            app.logger.info(f"Perfil SQLite aplicado: {perfil}")
+    except Exception as e:
+        app.logger.warning(f"Erro ao aplicar perfil SQLite: {e}")
 
 
 def _setup_context_processors(app: Flask) -> None:
@@ -244,19 +239,9 @@ def _setup_context_processors(app: Flask) -> None:
 
     @app.context_processor
     def _inject_version():
-        ver = (os.getenv("APP_VERSION") or "").strip()
-        if not ver:
-            ver = _get_version_from_git()
-        if not ver:
-            try:
-                from .models import AppSetting
+        from .services.version_service import obter_versao
 
-                s = AppSetting.query.filter_by(key="app_version").first()
-                ver = (s.value or "").strip() if s else ""
-            except Exception as e:
-                app.logger.warning(f"Erro ao obter versÃ£o do banco: {e}")
-                ver = ""
-        return {"git_version": ver or "dev"}
+        return {"git_version": obter_versao(app)}
 
 
 def _create_format_date_filter(app: Flask) -> None:
@@ -335,6 +320,16 @@ def _setup_main_routes(app: Flask) -> None:
                 except Exception:
                     pass
 
+            # Perfil de PRAGMAs ativo na conexão do pool
+            from .services.sqlite_profile_service import perfil_ativo
+
+            pragmas = perfil_ativo(db.engine)
+            pragmas_html = "".join(
+                f'<div class="stat"><span class="stat-label">{nome}</span>'
+                f'<span class="stat-value">{valor}</span></div>'
+                for nome, valor in pragmas.items()
+            )
+
             # Backups detalhados
             backup_count = 0
             backup_size_mb = 0.0
@@ -634,6 +629,17 @@ def _setup_main_routes(app: Flask) -> None:
                             </div>
                         </div>
 
+                        <!-- Card: Perfil SQLite -->
+                        <div class="card">
+                            <div class="card-header">
+                                <span class="card-icon">🎛️</span>
+                                Perfil SQLite
+                            </div>
+                            {pragmas_html if pragmas_html else
+                             '<div style="color: #94a3b8; font-size: 13px;">'
+                             'Perfil indisponível (banco não é SQLite)</div>'}
+                        </div>
+
                         <!-- Card: Backups -->
                         <div class="card">
                             <div class="card-header">
@@ -746,6 +752,7 @@ def _perform_backup(app: Flask, retain_count: int = 20, force: bool = False, dai
     - Quando daily=True, cria/atualiza o arquivo backup-24h.sqlite.
     - Caso contrário, cria arquivo com timestamp: multimax_YYYYMMDD_HHMMSS.sqlite.
     - Mantém no máximo `retain_count` backups (exceto o diário) por ordem de modificação.
+    - Com BACKUP_COMPRESSION=gzip/zstd, o arquivo recebe o sufixo .gz/.zst.
     """
     try:
         with app.app_context():
@@ -770,28 +777,25 @@ def _perform_backup(app: Flask, retain_count: int = 20, force: bool = False, dai
             ts = datetime.now().strftime("%Y%m%d_%H%M%S")
             target = os.path.join(bdir, "backup-24h.sqlite" if daily else f"multimax_{ts}.sqlite")
 
-            try:
-                import sqlite3
+            from .services.backup_service import eh_arquivo_backup, executar_backup
 
-                # Usar VACUUM INTO para backup consistente sem travas
-                conn = sqlite3.connect(db_path)
-                conn.execute(f"VACUUM INTO '{target}'")
-                conn.close()
+            try:
+                # API de backup do SQLite em passos (não bloqueia as requisições) + compressão opcional
+                stats = executar_backup(db_path, target)
             except Exception as e:
-                # Fallback: cópia direta do arquivo
-                app.logger.warning(f"VACUUM INTO falhou, aplicando cópia direta: {e}")
-                try:
-                    shutil.copy2(db_path, target)
-                except Exception as e2:
-                    app.logger.error(f"Falha ao copiar banco para backup: {e2}")
-                    return False
+                app.logger.error(f"Falha ao criar backup: {e}")
+                _registrar_backup(app, target, None, daily, erro=str(e))
+                return False
+            target = stats["path"]
+            app.config["LAST_BACKUP_STATS"] = stats
+            _registrar_backup(app, target, stats, daily)
 
             # Retenção de backups (não remove backup diário)
             try:
                 items = []
                 for name in os.listdir(bdir):
                     path = os.path.join(bdir, name)
-                    if os.path.isfile(path) and name.endswith(".sqlite") and not name.startswith("backup-24h"):
+                    if os.path.isfile(path) and eh_arquivo_backup(name) and not name.startswith("backup-24h"):
                         try:
                             mt = os.path.getmtime(path)
                         except Exception:
@@ -806,7 +810,10 @@ def _perform_backup(app: Flask, retain_count: int = 20, force: bool = False, dai
             except Exception:
                 pass
 
-            app.logger.info(f"Backup criado em: {target}")
+            app.logger.info(
+                f"Backup criado em: {target} ({stats['duration_s']}s, {stats['throughput_mb_s']} MB/s, "
+                f"compressão: {stats['compression']})"
+            )
             return True
     except Exception as e:
         try:
@@ -816,6 +823,31 @@ def _perform_backup(app: Flask, retain_count: int = 20, force: bool = False, dai
         return False
 
 
+def _registrar_backup(app: Flask, target: str, stats: Optional[dict], daily: bool, erro: str = "") -> None:
+    """Registra o backup (duração e throughput) em MaintenanceLog."""
+    try:
+        import json
+
+        from .models import MaintenanceLog
+
+        maint = MaintenanceLog()
+        maint.maintenance_type = "backup"
+        maint.description = f"Backup {'diário' if daily else 'manual/agendado'}: {os.path.basename(target)}"
+        maint.status = "completed" if stats else "failed"
+        maint.duration_seconds = stats["duration_s"] if stats else None
+        maint.items_processed = stats["pages"] if stats else None
+        maint.executed_by = "system"
+        maint.operation_details = json.dumps(stats if stats else {"error": erro})
+        db.session.add(maint)
+        db.session.commit()
+    except Exception as e:
+        try:
+            db.session.rollback()
+        except Exception:
+            pass
+        app.logger.warning(f"Erro ao registrar backup em MaintenanceLog: {e}")
+
+
 def _setup_maintenance_mode(app: Flask) -> None:
     """Configura middleware para modo de manutenÃ§Ã£o."""
     maintenance_mode = os.getenv("MAINTENANCE_MODE", "false").lower() == "true"
@@ -835,6 +867,55 @@ def _setup_maintenance_mode(app: Flask) -> None:
         return response
 
 
+def _inicializar_servicos(app: Flask) -> None:
+    """Inicialização dos serviços que dependem do banco (dentro do app_context, após create_all)."""
+    # Resolver a versão uma vez por processo (evita `git describe` a cada render)
+    try:
+        from .services.version_service import obter_versao
+
+        obter_versao(app)
+    except Exception as e:
+        app.logger.warning(f"Erro ao resolver versão: {e}")
+
+    # Instrumentação de tempo das queries (QueryLog + agregados por endpoint)
+    try:
+        from .services.query_monitor_service import init_query_monitor
+
+        init_query_monitor(app)
+    except Exception as e:
+        app.logger.warning(f"Erro ao iniciar monitor de queries: {e}")
+
+    # Ledger de saldos dos Ciclos: populado a partir dos lançamentos na primeira execução
+    try:
+        from .services.ciclo_ledger_service import popular_se_vazio
+
+        popular_se_vazio()
+    except Exception as e:
+        db.session.rollback()
+        app.logger.warning(f"Erro ao popular ledger de saldos dos ciclos: {e}")
+
+    # Busca global: índice FTS5 reconstruído se estiver vazio; comando `flask busca-reindexar`
+    try:
+        from .services.busca_global_service import preparar_indice, registrar_cli
+
+        registrar_cli(app)
+        preparar_indice()
+    except Exception as e:
+        db.session.rollback()
+        app.logger.warning(f"Erro ao preparar busca global: {e}")
+
+    # Calendário de feriados: grava (idempotente) o ano corrente e o seguinte
+    try:
+        from .optimizations import get_today_cached
+        from .services.feriados_service import persistir_anos
+
+        ano = get_today_cached().year
+        persistir_anos((ano, ano + 1))
+    except Exception as e:
+        db.session.rollback()
+        app.logger.warning(f"Erro ao gravar calendário de feriados: {e}")
+
+
 def create_app():
     """FunÃ§Ã£o principal de criaÃ§Ã£o da aplicaÃ§Ã£o Flask."""
     base_dir = getattr(sys, "_MEIPASS", os.path.dirname(os.path.dirname(__file__)))
@@ -870,4 +951,6 @@ def create_app():
             app.logger.error(f"Erro ao criar tabelas: {e}", exc_info=True)
             app.config["DB_OK"] = False
 
+        _inicializar_servicos(app)
+
     return app
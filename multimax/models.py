@@ -24,11 +24,14 @@ class BulkHourOperation(db.Model):
     cycle_month_id = db.Column(db.Integer, nullable=True)
     total_collaborators = db.Column(db.Integer, nullable=False)
     correction_of_id = db.Column(
-        db.String(36), db.ForeignKey("bulk_hour_operations.id"), nullable=True
+        db.String(36), db.ForeignKey("bulk_hour_operations.id"), nullable=True, index=True
     )  # Para rastrear correções
     # Relacionamento reverso para correções
     corrections = db.relationship("BulkHourOperation", backref=db.backref("original_lote", remote_side=[id]), lazy=True)
 
+    # Paginação por chave (created_at, id) na listagem de logs
+    __table_args__ = (db.Index("ix_bulk_hour_operations_created_at_id", "created_at", "id"),)
+
 
 class User(UserMixin, db.Model):
     __table_args__ = {"extend_existing": True}
@@ -62,11 +65,13 @@ class Produto(db.Model):
     unidade = db.Column(db.String(10), default="un")
     localizacao = db.Column(db.String(50), nullable=True)
     ativo = db.Column(db.Boolean, default=True, index=True)
+    busca = db.Column(db.String(255), nullable=True, index=True)  # texto normalizado (services/busca_service)
 
     historicos = db.relationship("Historico", backref="produto", lazy=True)
 
 
 class Historico(db.Model):
+    __table_args__ = (db.Index("ix_historico_product_data", "product_id", "data"),)
     id = db.Column(db.Integer, primary_key=True)
     data = db.Column(
         db.DateTime(timezone=True),
@@ -81,6 +86,25 @@ class Historico(db.Model):
     usuario = db.Column(db.String(100))
 
 
+class MovimentacaoLote(db.Model):
+    """Resposta de um lote de movimentações da API, guardada pela chave de idempotência"""
+
+    __tablename__ = "movimentacao_lote"
+    __table_args__ = (db.UniqueConstraint("user_id", "chave", name="uq_movimentacao_lote_user_chave"),)
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    chave = db.Column(db.String(100), nullable=False)
+    hash_corpo = db.Column(db.String(64), nullable=False)  # SHA-256 dos itens enviados
+    status_code = db.Column(db.Integer, nullable=False)
+    resposta = db.Column(db.Text, nullable=False)  # JSON devolvido ao cliente
+    created_at = db.Column(
+        db.DateTime(timezone=True),
+        default=lambda: datetime.now(ZoneInfo("America/Sao_Paulo")),
+        nullable=False,
+        index=True,
+    )
+
+
 class CleaningTask(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     nome_limpeza = db.Column(db.String(100), nullable=False)
@@ -92,6 +116,7 @@ class CleaningTask(db.Model):
     designados = db.Column(db.String(255))
     prioridade = db.Column(db.Integer, default=1)
     ativo = db.Column(db.Boolean, default=True)
+    busca = db.Column(db.String(255), nullable=True, index=True)  # texto normalizado (services/busca_service)
 
     historicos = db.relationship("CleaningHistory", backref="task", lazy=True)
     checklist_template = db.relationship("CleaningChecklistTemplate", backref="task", lazy=True)
@@ -172,6 +197,7 @@ class SystemLog(db.Model):
 
 
 class NotificationRead(db.Model):
+    __table_args__ = (db.Index("ix_notification_read_user_tipo_ref", "user_id", "tipo", "ref_id"),)
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, nullable=False)
     tipo = db.Column(db.String(20), nullable=False)  # 'estoque' ou 'limpeza'
@@ -196,6 +222,7 @@ class MeatReception(db.Model):
     peso_nota = db.Column(db.Float)
     peso_frango = db.Column(db.Float)
     recebedor_id = db.Column(db.Integer, db.ForeignKey("user.id"))
+    busca = db.Column(db.String(255), nullable=True, index=True)  # texto normalizado (services/busca_service)
 
 
 class MeatCarrier(db.Model):
@@ -239,6 +266,7 @@ class Collaborator(db.Model):
     matricula = db.Column(db.String(30), nullable=True)
     departamento = db.Column(db.String(50), nullable=True)
     setor_id = db.Column(db.Integer, db.ForeignKey("setor.id"), nullable=True, index=True)
+    busca = db.Column(db.String(255), nullable=True, index=True)  # texto normalizado (services/busca_service)
 
     user = db.relationship("User", backref="collaborator", lazy=True)
     shifts = db.relationship("Shift", backref="collaborator", lazy=True)
@@ -511,6 +539,7 @@ class Recipe(db.Model):
     )
     rendimento = db.Column(db.String(50), nullable=True)
     tempo_preparo = db.Column(db.Integer, nullable=True)
+    busca = db.Column(db.String(255), nullable=True, index=True)  # texto normalizado (services/busca_service)
 
     ingredients = db.relationship(
         "RecipeIngredient",
@@ -682,6 +711,7 @@ class CicloSemana(db.Model):
     week_start = db.Column(db.Date, nullable=False, index=True)
     week_end = db.Column(db.Date, nullable=False, index=True)
     label = db.Column(db.String(50), nullable=False, index=True)  # "Ciclo 1 | Janeiro" / "Ciclo Dezembro | Janeiro"
+    busca = db.Column(db.String(255), nullable=True, index=True)  # texto normalizado (services/busca_service)
     created_at = db.Column(
         db.DateTime(timezone=True),
         default=lambda: datetime.now(ZoneInfo("America/Sao_Paulo")),
@@ -750,6 +780,41 @@ class CicloSaldo(db.Model):
         return f"<CicloSaldo {self.collaborator_id} - {self.mes_ano} - {self.saldo}h>"
 
 
+class CicloSaldoLedger(db.Model):
+    """
+    Saldo materializado por (colaborador, setor, status do ciclo).
+    Mantido na mesma transação dos lançamentos, folgas, ajustes, exclusões e fechamentos;
+    setor_id = 0 agrupa registros antigos sem setor.
+    """
+
+    __tablename__ = "ciclo_saldo_ledger"
+    id = db.Column(db.Integer, primary_key=True)
+    collaborator_id = db.Column(
+        db.Integer,
+        db.ForeignKey("collaborator.id"),
+        nullable=False,
+        index=True,
+    )
+    setor_id = db.Column(db.Integer, nullable=False, default=0)
+    status_ciclo = db.Column(db.String(20), nullable=False)  # 'ativo', 'fechado'
+    total_horas = db.Column(db.Numeric(10, 1), nullable=False, default=0)
+    registros_count = db.Column(db.Integer, nullable=False, default=0)
+    folgas_adicionais = db.Column(db.Integer, nullable=False, default=0)  # Dias (CicloFolga tipo 'adicional')
+    folgas_usadas = db.Column(db.Integer, nullable=False, default=0)  # Dias (CicloFolga tipo 'uso')
+    updated_at = db.Column(
+        db.DateTime(timezone=True),
+        default=lambda: datetime.now(ZoneInfo("America/Sao_Paulo")),
+        nullable=True,
+    )
+
+    __table_args__ = (
+        db.UniqueConstraint("collaborator_id", "setor_id", "status_ciclo", name="uq_ciclo_ledger_collab_setor_status"),
+    )
+
+    def __repr__(self):
+        return f"<CicloSaldoLedger {self.collaborator_id}/{self.setor_id} {self.status_ciclo} {self.total_horas}h>"
+
+
 class UserLogin(db.Model):
     __tablename__ = "user_login"
     id = db.Column(db.Integer, primary_key=True)
@@ -765,6 +830,19 @@ class UserLogin(db.Model):
     user = db.relationship("User", backref="logins", lazy=True)
 
 
+class UserApiKey(db.Model):
+    """Chave de API de um usuário (apenas o SHA-256 é guardado)"""
+
+    __tablename__ = "user_api_key"
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False, index=True)
+    key_hash = db.Column(db.String(64), unique=True, nullable=False)
+    created_at = db.Column(
+        db.DateTime(timezone=True),
+        default=lambda: datetime.now(ZoneInfo("America/Sao_Paulo")),
+    )
+
+
 class Incident(db.Model):
     """Registro de incidentes e falhas do sistema"""
 
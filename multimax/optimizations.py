@@ -2,34 +2,42 @@
 Otimizações e utilitários de performance
 """
 
+import threading
+import time
 from datetime import date, datetime
-from functools import lru_cache
 from zoneinfo import ZoneInfo
 
+TZ_SAO_PAULO = ZoneInfo("America/Sao_Paulo")
 
-@lru_cache(maxsize=128)
-def _cached_date_today():
-    """Cache para date.today() - útil em loops"""
-    return date.today()
+# Validade do "agora" em cache. Curta o bastante para a virada do dia
+# ser percebida em até 1s, longa o bastante para loops quentes não
+# recalcularem datetime.now(tz) a cada iteração.
+NOW_CACHE_TTL = 1.0
 
+_cache_lock = threading.Lock()
+_cached_now: tuple[float, datetime] | None = None  # (instante monotônico, agora em São Paulo)
 
-@lru_cache(maxsize=64)
-def _cached_datetime_now():
-    """Cache para datetime.now() - útil em loops"""
-    return datetime.now(ZoneInfo("America/Sao_Paulo"))
 
+def get_now_cached(ttl: float = NOW_CACHE_TTL) -> datetime:
+    """Retorna datetime.now() em America/Sao_Paulo, reaproveitado por até `ttl` segundos"""
+    global _cached_now
+    entry = _cached_now
+    mono = time.monotonic()
+    if entry is not None and mono - entry[0] < ttl:
+        return entry[1]
+    with _cache_lock:
+        now = datetime.now(TZ_SAO_PAULO)
+        _cached_now = (mono, now)
+    return now
 
-def get_today_cached():
-    """Retorna date.today() com cache"""
-    return _cached_date_today()
 
-
-def get_now_cached():
-    """Retorna datetime.now() com cache"""
-    return _cached_datetime_now()
+def get_today_cached() -> date:
+    """Retorna a data de hoje em America/Sao_Paulo (acompanha a virada do dia)"""
+    return get_now_cached().date()
 
 
 def clear_date_cache():
     """Limpa cache de datas - chamar quando necessário"""
-    _cached_date_today.cache_clear()
-    _cached_datetime_now.cache_clear()
+    global _cached_now
+    with _cache_lock:
+        _cached_now = None
@@ -1,12 +1,28 @@
-import hashlib
+import json
 from datetime import date, datetime, timedelta
 from functools import wraps
 
-from flask import Blueprint, g, jsonify, request
+from flask import Blueprint, Response, g, jsonify, request
 from flask_login import current_user
+from sqlalchemy.exc import IntegrityError
 
 from .. import db
-from ..models import CleaningTask, Collaborator, Historico, NotificationRead, Produto, Recipe, User
+from ..models import Historico, NotificationRead, Produto
+from ..services.api_chave_service import autenticar as autenticar_chave
+from ..services.busca_global_service import buscar as buscar_global
+from ..services.eventos_service import barramento, publicar_estoque, transmitir
+from ..services.movimentacao_estoque_service import (
+    MovimentacaoInvalida,
+    buscar_lote,
+    hash_lote,
+    limite_lote,
+    movimentar,
+    movimentar_lote,
+    registrar_lote,
+    resolver_itens,
+)
+from ..services.notificacoes_leitura_service import carregar as carregar_notificacoes
+from ..services.notificacoes_leitura_service import invalidar_cache as invalidar_notificacoes
 
 bp = Blueprint("api", __name__, url_prefix="/api/v1")
 
@@ -31,12 +47,7 @@ def _cache_set(key: str, value, ttl: int = CACHE_TTL):
 
 def verify_api_key():
     api_key = request.headers.get("X-API-Key") or request.args.get("api_key")
-    if not api_key:
-        return None
-
-    key_hash = hashlib.sha256(api_key.encode()).hexdigest()
-    user = User.query.filter_by(api_key_hash=key_hash).first()
-    return user
+    return autenticar_chave(api_key)
 
 
 def api_auth_required(f):
@@ -231,6 +242,27 @@ def excluir_produto(id: int):
     return jsonify({"message": "Produto excluído com sucesso"})
 
 
+def _movimentar_api(produto_id: int, op: str, mensagem: str, detalhes_padrao: str):
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({"error": "Dados JSON não fornecidos"}), 400
+    try:
+        mov = movimentar(
+            produto_id, op, data.get("quantidade", 0), g.api_user.username, data.get("detalhes", detalhes_padrao)
+        )
+    except MovimentacaoInvalida as e:
+        erros = {
+            "produto_nao_encontrado": ("Produto não encontrado", 404),
+            "estoque_insuficiente": ("Quantidade insuficiente em estoque", 400),
+        }
+        erro, status = erros.get(e.codigo, ("Quantidade deve ser positiva", 400))
+        return jsonify({"error": erro, "code": e.codigo}), status
+    produto = db.session.get(Produto, produto_id)
+    if produto is not None:
+        publicar_estoque(produto, op, mov["quantidade"])
+    return jsonify({"message": mensagem, "novo_estoque": mov["estoque"]})
+
+
 @bp.route("/produtos/<int:id>/entrada", methods=["POST"])
 @api_auth_required
 def entrada_produto(id: int):
@@ -239,28 +271,7 @@ def entrada_produto(id: int):
             jsonify({"error": "Visualizadores não têm permissão para fazer alterações no sistema.", "code": 403}),
             403,
         )
-    produto = Produto.query.get_or_404(id)
-    data = request.get_json()
-    if not data:
-        return jsonify({"error": "Dados JSON não fornecidos"}), 400
-
-    quantidade = data.get("quantidade", 0)
-    if quantidade <= 0:
-        return jsonify({"error": "Quantidade deve ser positiva"}), 400
-
-    produto.quantidade += quantidade
-
-    hist = Historico()
-    hist.product_id = produto.id
-    hist.product_name = produto.nome
-    hist.action = "entrada"
-    hist.quantidade = quantidade
-    hist.details = data.get("detalhes", "Entrada via API")
-    hist.usuario = g.api_user.username
-    db.session.add(hist)
-    db.session.commit()
-
-    return jsonify({"message": "Entrada registrada com sucesso", "novo_estoque": produto.quantidade})
+    return _movimentar_api(id, "entrada", "Entrada registrada com sucesso", "Entrada via API")
 
 
 @bp.route("/produtos/<int:id>/saida", methods=["POST"])
@@ -271,31 +282,113 @@ def saida_produto(id: int):
             jsonify({"error": "Visualizadores não têm permissão para fazer alterações no sistema.", "code": 403}),
             403,
         )
-    produto = Produto.query.get_or_404(id)
-    data = request.get_json()
-    if not data:
-        return jsonify({"error": "Dados JSON não fornecidos"}), 400
+    return _movimentar_api(id, "saida", "Saída registrada com sucesso", "Saída via API")
 
-    quantidade = data.get("quantidade", 0)
-    if quantidade <= 0:
-        return jsonify({"error": "Quantidade deve ser positiva"}), 400
 
-    if quantidade > produto.quantidade:
-        return jsonify({"error": "Quantidade insuficiente em estoque"}), 400
+def _resultado_lote(r: dict) -> dict:
+    """Linha do resultado do lote no formato da API ({error, code} nas falhas)."""
+    if not r["ok"]:
+        return {"linha": r["linha"], "ok": False, "error": r["erro"], "code": r["codigo"]}
+    return {k: r[k] for k in ("linha", "ok", "produto_id", "nome", "op", "quantidade", "estoque")}
 
-    produto.quantidade -= quantidade
 
-    hist = Historico()
-    hist.product_id = produto.id
-    hist.product_name = produto.nome
-    hist.action = "saida"
-    hist.quantidade = quantidade
-    hist.details = data.get("detalhes", "Saída via API")
-    hist.usuario = g.api_user.username
-    db.session.add(hist)
-    db.session.commit()
+def _repetir_lote(anterior):
+    resp = jsonify(json.loads(anterior.resposta))
+    resp.status_code = anterior.status_code
+    resp.headers["Idempotent-Replayed"] = "true"
+    return resp
 
-    return jsonify({"message": "Saída registrada com sucesso", "novo_estoque": produto.quantidade})
+
+@bp.route("/movimentacoes/lote", methods=["POST"])
+@api_auth_required
+def movimentacoes_lote():
+    """
+    Aplica várias entradas/saídas numa única transação.
+
+    Corpo: {"itens": [{"id" ou "codigo", "op", "quantidade", "detalhes"}, ...], "atomico": true}
+    (ou a lista diretamente). Todas as linhas são validadas antes de qualquer escrita; com
+    atomico=false as linhas válidas são aplicadas e as inválidas voltam com erro. O header
+    Idempotency-Key torna o retry seguro: a mesma chave com o mesmo corpo devolve a resposta
+    gravada sem movimentar de novo.
+    """
+    data = request.get_json(silent=True)
+    itens = data.get("itens") if isinstance(data, dict) else data
+    if not isinstance(itens, list) or not itens:
+        return jsonify({"error": "Envie uma lista de itens", "code": "lote_vazio"}), 400
+    if len(itens) > limite_lote():
+        return jsonify({"error": f"Máximo de {limite_lote()} itens por lote", "code": "lote_muito_grande"}), 413
+    atomico = not (isinstance(data, dict) and data.get("atomico") is False)
+
+    chave = (request.headers.get("Idempotency-Key") or "").strip()
+    if len(chave) > 100:
+        return jsonify({"error": "Idempotency-Key deve ter até 100 caracteres", "code": "chave_invalida"}), 400
+    hash_corpo = hash_lote({"itens": itens, "atomico": atomico})
+    if chave:
+        anterior = buscar_lote(g.api_user.id, chave)
+        if anterior is not None:
+            if anterior.hash_corpo != hash_corpo:
+                return (
+                    jsonify({"error": "Idempotency-Key já usada com outro conteúdo", "code": "chave_reutilizada"}),
+                    422,
+                )
+            return _repetir_lote(anterior)
+
+    linhas, erros = resolver_itens(itens)
+    if erros and (atomico or not linhas):
+        return (
+            jsonify(
+                {
+                    "error": "Lote inválido; nada foi aplicado",
+                    "code": "lote_invalido",
+                    "resultados": [_resultado_lote(e) for e in erros],
+                }
+            ),
+            400,
+        )
+
+    resultados, _ = movimentar_lote(linhas, g.api_user.username, atomico=atomico, commit=False)
+    if atomico and not all(r["ok"] for r in resultados):
+        # Estoque mudou entre a validação e o UPDATE condicional: desfaz as linhas já aplicadas
+        db.session.rollback()
+        return (
+            jsonify(
+                {
+                    "error": "Estoque alterado durante o processamento; nada foi aplicado",
+                    "code": "conflito_estoque",
+                    "resultados": [_resultado_lote(r) for r in resultados],
+                }
+            ),
+            409,
+        )
+
+    resultados = sorted(resultados + erros, key=lambda r: r["linha"])
+    aplicadas = [r for r in resultados if r["ok"]]
+    corpo = {
+        "message": f"{len(aplicadas)} movimentação(ões) registrada(s)",
+        "aplicadas": len(aplicadas),
+        "falhas": len(resultados) - len(aplicadas),
+        "resultados": [_resultado_lote(r) for r in resultados],
+    }
+    if chave:
+        registrar_lote(g.api_user.id, chave, hash_corpo, 200, corpo)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Retry concorrente com a mesma chave gravou primeiro: desfaz este e devolve o dele
+        db.session.rollback()
+        anterior = buscar_lote(g.api_user.id, chave) if chave else None
+        if anterior is None:
+            raise
+        return _repetir_lote(anterior)
+
+    if aplicadas:
+        produtos = db.session.execute(
+            db.select(Produto).where(Produto.id.in_({r["produto_id"] for r in aplicadas}))
+        ).scalars()
+        por_id = {p.id: p for p in produtos}
+        for r in aplicadas:
+            publicar_estoque(por_id[r["produto_id"]], r["op"], r["quantidade"])
+    return jsonify(corpo)
 
 
 @bp.route("/historico", methods=["GET"])
@@ -370,114 +463,97 @@ def get_notifications():
     today = date.today()
 
     try:
-        crit = (
-            Produto.query.filter(
-                Produto.estoque_minimo.isnot(None),
-                Produto.estoque_minimo > 0,
-                Produto.quantidade <= Produto.estoque_minimo,
-            )
-            .order_by(Produto.quantidade.asc())
-            .limit(10)
-            .all()
-        )
-
-        for p in crit:
-            is_read = (
-                NotificationRead.query.filter_by(user_id=g.api_user.id, tipo="estoque", ref_id=p.id).first() is not None
-            )
-            if not is_read:
-                notifications.append(
-                    {
-                        "id": p.id,
-                        "type": "estoque",
-                        "icon": "exclamation-triangle-fill",
-                        "color": "danger",
-                        "title": f"Estoque crítico: {p.nome[:25]}",
-                        "subtitle": f"{p.quantidade}/{p.estoque_minimo} unidades",
-                        "url": "/estoque",
-                        "time": "Agora",
-                    }
-                )
+        dados, etag = carregar_notificacoes(g.api_user.id, today)
     except Exception:
-        pass
+        dados, etag = {"estoque": [], "limpeza": [], "validade": []}, None
 
-    try:
-        horizon = today + timedelta(days=3)
-        tasks = (
-            CleaningTask.query.filter(CleaningTask.proxima_data.isnot(None), CleaningTask.proxima_data <= horizon)
-            .order_by(CleaningTask.proxima_data.asc())
-            .limit(10)
-            .all()
+    for p in dados["estoque"]:
+        notifications.append(
+            {
+                "id": p["id"],
+                "type": "estoque",
+                "icon": "exclamation-triangle-fill",
+                "color": "danger",
+                "title": f"Estoque crítico: {p['nome'][:25]}",
+                "subtitle": f"{p['quantidade']}/{p['estoque_minimo']} unidades",
+                "url": "/estoque",
+                "time": "Agora",
+            }
         )
 
-        for t in tasks:
-            is_read = (
-                NotificationRead.query.filter_by(user_id=g.api_user.id, tipo="limpeza", ref_id=t.id).first() is not None
-            )
-            if not is_read:
-                if t.proxima_data < today:
-                    status = "Atrasada"
-                    color = "danger"
-                elif t.proxima_data == today:
-                    status = "Hoje"
-                    color = "warning"
-                else:
-                    status = t.proxima_data.strftime("%d/%m")
-                    color = "info"
-                notifications.append(
-                    {
-                        "id": t.id,
-                        "type": "limpeza",
-                        "icon": "calendar-check",
-                        "color": color,
-                        "title": f"Tarefa: {t.nome_limpeza[:25]}",
-                        "subtitle": status,
-                        "url": "/cronograma",
-                        "time": status,
-                    }
-                )
-    except Exception:
-        pass
+    for t in dados["limpeza"]:
+        if t["proxima_data"] < today:
+            status = "Atrasada"
+            color = "danger"
+        elif t["proxima_data"] == today:
+            status = "Hoje"
+            color = "warning"
+        else:
+            status = t["proxima_data"].strftime("%d/%m")
+            color = "info"
+        notifications.append(
+            {
+                "id": t["id"],
+                "type": "limpeza",
+                "icon": "calendar-check",
+                "color": color,
+                "title": f"Tarefa: {t['nome'][:25]}",
+                "subtitle": status,
+                "url": "/cronograma",
+                "time": status,
+            }
+        )
 
-    try:
-        prox_validade = (
-            Produto.query.filter(
-                Produto.data_validade.isnot(None),
-                Produto.data_validade <= today + timedelta(days=7),
-                Produto.quantidade > 0,
-            )
-            .order_by(Produto.data_validade.asc())
-            .limit(5)
-            .all()
+    for p in dados["validade"]:
+        if p["data_validade"] < today:
+            status = "Vencido"
+            color = "danger"
+        elif p["data_validade"] == today:
+            status = "Vence hoje"
+            color = "danger"
+        else:
+            dias = (p["data_validade"] - today).days
+            status = f"Vence em {dias}d"
+            color = "warning"
+        notifications.append(
+            {
+                "id": p["id"],
+                "type": "validade",
+                "icon": "clock-history",
+                "color": color,
+                "title": f"Validade: {p['nome'][:25]}",
+                "subtitle": status,
+                "url": "/estoque",
+                "time": status,
+            }
         )
 
-        for p in prox_validade:
-            if p.data_validade < today:
-                status = "Vencido"
-                color = "danger"
-            elif p.data_validade == today:
-                status = "Vence hoje"
-                color = "danger"
-            else:
-                dias = (p.data_validade - today).days
-                status = f"Vence em {dias}d"
-                color = "warning"
-            notifications.append(
-                {
-                    "id": p.id,
-                    "type": "validade",
-                    "icon": "clock-history",
-                    "color": color,
-                    "title": f"Validade: {p.nome[:25]}",
-                    "subtitle": status,
-                    "url": "/estoque",
-                    "time": status,
-                }
-            )
-    except Exception:
-        pass
+    resp = jsonify({"notifications": notifications[:15], "count": len(notifications)})
+    if etag:
+        # Polling: o cliente reenvia If-None-Match e recebe 304 enquanto nada mudou
+        resp.set_etag(etag)
+        resp.headers["Cache-Control"] = "private, no-cache"
+        return resp.make_conditional(request)
+    return resp
 
-    return jsonify({"notifications": notifications[:15], "count": len(notifications)})
+
+@bp.route("/eventos", methods=["GET"])
+@api_auth_required
+def stream_eventos():
+    """Server-Sent Events: deltas de estoque e limpeza publicados pelas rotas (substitui o polling)."""
+    assinatura = barramento.assinar(g.api_user.id)
+    if assinatura is None:
+        resp = jsonify({"error": "Limite de conexões de eventos atingido", "code": 503})
+        resp.status_code = 503
+        resp.headers["Retry-After"] = "60"
+        return resp
+    # O stream fica aberto por minutos: devolve a conexão ao pool antes de começar
+    db.session.close()
+    resp = Response(transmitir(assinatura), mimetype="text/event-stream")
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.headers["X-Accel-Buffering"] = "no"
+    resp.call_on_close(lambda: barramento.cancelar(assinatura))
+    return resp
 
 
 @bp.route("/notifications/read", methods=["POST"])
@@ -501,6 +577,7 @@ def mark_notification_read():
             nr.ref_id = ref_id
             db.session.add(nr)
             db.session.commit()
+            invalidar_notificacoes(current_user.id)
         return jsonify({"success": True})
     except Exception as e:
         db.session.rollback()
@@ -516,54 +593,11 @@ def global_search():
     if len(q) < 2:
         return jsonify({"results": []})
 
-    results = []
-
-    try:
-        produtos = (
-            Produto.query.filter((Produto.nome.ilike(f"%{q}%")) | (Produto.codigo.ilike(f"%{q}%"))).limit(5).all()
-        )
-        for p in produtos:
-            results.append(
-                {
-                    "type": "produto",
-                    "icon": "box-seam",
-                    "title": p.nome,
-                    "subtitle": f"Código: {p.codigo} | Estoque: {p.quantidade}",
-                    "url": f"/estoque/editar/{p.id}",
-                }
-            )
-    except Exception:
-        pass
-
-    try:
-        colaboradores = Collaborator.query.filter(Collaborator.name.ilike(f"%{q}%")).limit(3).all()
-        for c in colaboradores:
-            results.append(
-                {
-                    "type": "colaborador",
-                    "icon": "person",
-                    "title": c.name,
-                    "subtitle": c.role or "Colaborador",
-                    "url": "/colaboradores/escala",
-                }
-            )
-    except Exception:
-        pass
-
     try:
-        receitas = Recipe.query.filter(Recipe.nome.ilike(f"%{q}%")).limit(3).all()
-        for r in receitas:
-            results.append(
-                {
-                    "type": "receita",
-                    "icon": "journal-text",
-                    "title": r.nome,
-                    "subtitle": "Receita",
-                    "url": f"/receitas/{r.id}",
-                }
-            )
+        results, latencia_ms = buscar_global(q)
     except Exception:
-        pass
+        db.session.rollback()
+        results, latencia_ms = [], 0.0
 
     pages = [
         {"name": "Dashboard", "url": "/home/", "icon": "house-door"},
@@ -588,4 +622,6 @@ def global_search():
                 }
             )
 
-    return jsonify({"results": results[:12]})
+    resp = jsonify({"results": results[:12]})
+    resp.headers["Server-Timing"] = f"busca;dur={latencia_ms}"
+    return resp
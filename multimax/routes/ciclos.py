@@ -1,19 +1,26 @@
-import logging
 import math
 import os
-import re
-import unicodedata
 from datetime import date, datetime, timedelta
 from decimal import Decimal
 from types import SimpleNamespace
 from typing import Any, Literal
 from zoneinfo import ZoneInfo
 
-from flask import Blueprint, flash, jsonify, make_response, redirect, render_template, request, url_for
+from flask import (
+    Blueprint,
+    current_app,
+    flash,
+    jsonify,
+    make_response,
+    redirect,
+    render_template,
+    request,
+    url_for,
+)
 from flask.wrappers import Response
 from flask_login import current_user, login_required
 from flask_sqlalchemy.query import Query
-from sqlalchemy import func, or_
+from sqlalchemy import func
 from werkzeug.datastructures.file_storage import FileStorage
 
 from multimax import db
@@ -29,10 +36,34 @@ from multimax.models import (
     MedicalCertificate,
     Setor,
     SystemLog,
-    TimeOffRecord,
+    User,
     Vacation,
 )
+from multimax.services import busca_service
+from multimax.services.busca_service import normalizar
+from multimax.services.ciclo_balance_service import calcular_saldos, obter_valor_dia, saldo_vazio
+from multimax.services.ciclo_fechamento_service import (
+    Cronometro,
+    agrupar_totais,
+    fechar_folgas_e_ocorrencias,
+    fechar_registros,
+    inserir_carryover,
+)
+from multimax.services.ciclo_ledger_service import reconstruir, registrar_ciclo, registrar_folga, saldos_ledger
 from multimax.services.ciclo_saldo_service import _format_mes_ano, fechar_ciclo_mensal, resumo_em_dias_e_horas
+from multimax.services.ciclo_semanas_service import (
+    carregar_semanas_fechadas,
+    carregar_semanas_por_colaborador,
+    semanas_tem_registros,
+)
+from multimax.services.lote_horas_service import (
+    LOGS_POR_PAGINA,
+    aplicar_lote,
+    corrigir_lote,
+    criadores_lotes,
+    listar_lotes,
+    validar_dados,
+)
 
 try:
     from weasyprint import HTML
@@ -60,12 +91,18 @@ def register_jinja_filters(app):
 
 bp = Blueprint("ciclos", __name__, url_prefix="/ciclos")
 
+SEMANAS_POR_PAGINA = 20  # Semanas arquivadas por página na pesquisa
+
 
 # Página: formulário de criação de lote
 
 
 @bp.route("/lote_horas", methods=["GET", "POST"])
+@login_required
 def lote_horas():
+    if current_user.nivel not in ["admin", "DEV"]:
+        flash("Acesso negado. Apenas administradores podem gerenciar lotes de horas.", "danger")
+        return redirect(url_for("ciclos.index"))
     if request.method == "POST":
         # Coleta dados do formulário
         tipo: str | None = request.form.get("tipo")
@@ -109,7 +146,11 @@ def lote_horas():
 
 # Página: pré-visualização e confirmação do lote
 @bp.route("/lote_horas/preview", methods=["POST"])
+@login_required
 def lote_horas_preview():
+    if current_user.nivel not in ["admin", "DEV"]:
+        flash("Acesso negado. Apenas administradores podem gerenciar lotes de horas.", "danger")
+        return redirect(url_for("ciclos.index"))
     # Recebe dados do preview e confirma operação
     if request.method == "POST":
         tipo: str | None = request.form.get("tipo")
@@ -120,32 +161,31 @@ def lote_horas_preview():
         ciclo_semana_id: str | None = request.form.get("ciclo_semana_id")
         ciclo_mes_id: str | None = request.form.get("ciclo_mes_id")
 
-        # Cria operação de lote
-        bulk = BulkHourOperation()
-        bulk.created_by = str(current_user.id)
-        bulk.custom_date = data_personalizada
-        bulk.hours = float(horas)
-        bulk.type = tipo
-        bulk.observation = observacao or ""
-        bulk.cycle_week_id = int(ciclo_semana_id) if ciclo_semana_id else None
-        bulk.cycle_month_id = int(ciclo_mes_id) if ciclo_mes_id else None
-        bulk.total_collaborators = len(colaboradores_ids)
-        db.session.add(bulk)
-        db.session.flush()  # Garante ID para bulk_id
-        # Cria registros de TimeOffRecord para cada colaborador
-        for cid in colaboradores_ids:
-            reg = TimeOffRecord()
-            reg.collaborator_id = int(cid)
-            reg.date = data_personalizada
-            reg.record_type = tipo
-            reg.hours = float(horas)
-            reg.origin = "lote"
-            reg.notes = observacao or ""
-            reg.created_by = str(current_user.id)
-            reg.bulk_id = bulk.id
-            db.session.add(reg)
-        db.session.commit()
-        flash(f"Lote aplicado para {len(colaboradores_ids)} colaborador(es).", "success")
+        # Cria operação de lote e registros (INSERT em blocos, sem um objeto ORM por colaborador)
+        try:
+            tipo, horas_float, data = validar_dados(tipo, horas, data_personalizada)
+            bulk, stats = aplicar_lote(
+                str(current_user.id),
+                tipo,
+                horas_float,
+                data,
+                observacao,
+                colaboradores_ids,
+                ciclo_semana_id=int(ciclo_semana_id) if ciclo_semana_id else None,
+                ciclo_mes_id=int(ciclo_mes_id) if ciclo_mes_id else None,
+            )
+        except ValueError as e:
+            db.session.rollback()
+            flash(str(e), "danger")
+            return redirect(url_for("ciclos.lote_horas"))
+        except Exception as e:
+            db.session.rollback()
+            flash(f"Erro ao aplicar lote: {e}", "danger")
+            return redirect(url_for("ciclos.lote_horas"))
+        current_app.logger.info(
+            f"Lote {bulk.id}: {stats['linhas']} registros em {stats['duracao_s']}s ({stats['linhas_por_s']} linhas/s)"
+        )
+        flash(f"Lote aplicado para {stats['linhas']} colaborador(es).", "success")
         return redirect(url_for("ciclos.lote_horas_logs"))
 
     # Se não for POST, redireciona para o formulário
@@ -154,15 +194,53 @@ def lote_horas_preview():
 
 # Página: logs/auditoria de lotes
 @bp.route("/lote_horas/logs", methods=["GET"])
+@login_required
 def lote_horas_logs():
-    # Listar todos os lotes de horas, ordenados do mais recente para o mais antigo
-    lotes = BulkHourOperation.query.order_by(BulkHourOperation.created_at.desc()).all()
-    return render_template("ciclos/lote_horas_logs.html", lotes=lotes)
+    if current_user.nivel not in ["admin", "DEV"]:
+        flash("Acesso negado. Apenas administradores podem gerenciar lotes de horas.", "danger")
+        return redirect(url_for("ciclos.index"))
+    # Lotes do mais recente para o mais antigo, paginados por chave (created_at, id)
+    filtros = {
+        "tipo": (request.args.get("tipo") or "").strip() or None,
+        "data_inicio": _parse_date_arg(request.args.get("data_inicio")),
+        "data_fim": _parse_date_arg(request.args.get("data_fim")),
+        "criador": (request.args.get("criador") or "").strip() or None,
+    }
+    pagina = listar_lotes(
+        cursor=request.args.get("cursor"), limite=request.args.get("limite", type=int) or LOGS_POR_PAGINA, **filtros
+    )
+
+    # Nomes dos criadores (created_by guarda o id do usuário) numa única consulta
+    criadores = criadores_lotes()
+    ids_usuarios = [int(c) for c in criadores if str(c).isdigit()]
+    nomes = {str(u.id): u.name for u in User.query.filter(User.id.in_(ids_usuarios)).all()} if ids_usuarios else {}
+
+    filtros_url = {k: (v.isoformat() if isinstance(v, date) else v) for k, v in filtros.items() if v}
+    return render_template(
+        "ciclos/lote_horas_logs.html",
+        itens=pagina["itens"],
+        proximo_cursor=pagina["proximo_cursor"],
+        primeira_pagina=not request.args.get("cursor"),
+        filtros=filtros_url,
+        criadores=[(c, nomes.get(str(c), c)) for c in criadores],
+        nomes_criadores=nomes,
+    )
+
+
+def _parse_date_arg(valor: str | None) -> date | None:
+    try:
+        return datetime.strptime((valor or "").strip(), "%Y-%m-%d").date()
+    except ValueError:
+        return None
 
 
 # Página: correção de lote
 @bp.route("/lote_horas/corrigir/<lote_id>", methods=["GET", "POST"])
+@login_required
 def lote_horas_corrigir(lote_id):
+    if current_user.nivel not in ["admin", "DEV"]:
+        flash("Acesso negado. Apenas administradores podem gerenciar lotes de horas.", "danger")
+        return redirect(url_for("ciclos.index"))
     # Buscar lote original
     lote: Any | None = BulkHourOperation.query.get(lote_id)
     if not lote:
@@ -179,33 +257,37 @@ def lote_horas_corrigir(lote_id):
         ciclo_semana_id: str | None = request.form.get("ciclo_semana_id")
         ciclo_mes_id: str | None = request.form.get("ciclo_mes_id")
 
-        # Cria novo lote de correção
-        lote_correto = BulkHourOperation()
-        lote_correto.created_by = str(current_user.id)
-        lote_correto.custom_date = data_personalizada
-        lote_correto.hours = float(horas)
-        lote_correto.type = tipo
-        lote_correto.observation = observacao or ""
-        lote_correto.cycle_week_id = int(ciclo_semana_id) if ciclo_semana_id else None
-        lote_correto.cycle_month_id = int(ciclo_mes_id) if ciclo_mes_id else None
-        lote_correto.total_collaborators = len(colaboradores_ids)
-        lote_correto.correction_of_id = lote.id
-        db.session.add(lote_correto)
-        db.session.flush()
-        # Cria registros de TimeOffRecord para cada colaborador
-        for cid in colaboradores_ids:
-            reg = TimeOffRecord()
-            reg.collaborator_id = int(cid)
-            reg.date = data_personalizada
-            reg.record_type = tipo
-            reg.hours = float(horas)
-            reg.origin = "lote_correção"
-            reg.notes = observacao or ""
-            reg.created_by = str(current_user.id)
-            reg.bulk_id = lote_correto.id
-            db.session.add(reg)
-        db.session.commit()
-        flash(f"Lote de correção aplicado para {len(colaboradores_ids)} colaborador(es).", "success")
+        # Cria lote de correção e move os registros do original (UPDATE/DELETE por bulk_id)
+        try:
+            tipo, horas_float, data = validar_dados(tipo, horas, data_personalizada)
+            lote_correto, stats = corrigir_lote(
+                lote,
+                str(current_user.id),
+                tipo,
+                horas_float,
+                data,
+                observacao,
+                colaboradores_ids,
+                ciclo_semana_id=int(ciclo_semana_id) if ciclo_semana_id else None,
+                ciclo_mes_id=int(ciclo_mes_id) if ciclo_mes_id else None,
+            )
+        except ValueError as e:
+            db.session.rollback()
+            flash(str(e), "danger")
+            return redirect(url_for("ciclos.lote_horas_corrigir", lote_id=lote.id))
+        except Exception as e:
+            db.session.rollback()
+            flash(f"Erro ao corrigir lote: {e}", "danger")
+            return redirect(url_for("ciclos.lote_horas_corrigir", lote_id=lote.id))
+        current_app.logger.info(
+            f"Correção {lote_correto.id} do lote {lote.id}: {stats['atualizados']} atualizados, "
+            f"{stats['removidos']} removidos, {stats['inseridos']} inseridos ({stats['linhas_por_s']} linhas/s)"
+        )
+        flash(
+            f"Lote de correção aplicado para {lote_correto.total_collaborators} colaborador(es) "
+            f"({stats['atualizados']} atualizados, {stats['removidos']} removidos, {stats['inseridos']} novos).",
+            "success",
+        )
         return redirect(url_for("ciclos.lote_horas_logs"))
 
     # GET: exibe dados do lote original e colaboradores
@@ -244,100 +326,27 @@ def _get_active_ciclos_query(collaborator_id):
 
 def _calculate_collaborator_balance(collaborator_id):
     """
-    FUNÇÃO CENTRAL: Calcula saldo do colaborador a partir dos registros ativos
-    NÃO confia em valores armazenados - sempre recalcula a partir das horas
-    Otimizado: usa sum() do SQLAlchemy para melhor performance
+    FUNÇÃO CENTRAL: Saldo do colaborador nos registros ativos, lido do ledger materializado
+    (CicloSaldoLedger, mantido na mesma transação de cada escrita em Ciclo/CicloFolga).
+    Os campos dias_fechados/horas_restantes/valor_aproximado de Ciclo continuam não confiáveis.
     """
-    # Buscar soma de todas as horas usando sum() do SQLAlchemy (mais eficiente)
-    total_horas_decimal: Any | Decimal = _get_active_ciclos_query(collaborator_id).with_entities(
-        func.coalesce(func.sum(Ciclo.valor_horas), 0)
-    ).scalar() or Decimal("0.0")
-
-    # Converter para Decimal se necessário
-    if not isinstance(total_horas_decimal, Decimal):
-        total_horas = Decimal(str(total_horas_decimal))
-    else:
-        total_horas: Decimal = total_horas_decimal
-
-    # Calcular dias completos (floor de total_horas / 8)
-    # Apenas dias completos entram na conversão para R$
-    # Lógica correta: considerar saldo total, mesmo que venha de dívidas quitadas
-    total_horas_float = float(total_horas)
-
-    # Debug: log para verificar o cálculo
-    logger: logging.Logger = logging.getLogger(__name__)
-    logger.debug(f"Colaborador {collaborator_id}: total_horas = {total_horas_float}")
-
-    # Se total de horas é negativo, não há dias completos nem horas restantes
-    if total_horas_float < 0:
-        dias_completos = 0
-        horas_restantes = 0.0
-        logger.debug(f"Saldo negativo: {dias_completos} dias, {horas_restantes} horas")
-    else:
-        # Total positivo: calcular dias e horas restantes normalmente
-        dias_completos = int(math.floor(total_horas_float / 8.0))
-        horas_restantes: float = total_horas_float % 8.0
-        logger.debug(f"Saldo positivo: {dias_completos} dias, {horas_restantes} horas")
-
-    # Valor aproximado (dias_completos * valor_dia)
-    # Apenas dias completos têm valor em R$
-    valor_dia = Decimal(str(_get_valor_dia()))
-    valor_aproximado: Decimal = Decimal(str(dias_completos)) * valor_dia
-
-    return {
-        "total_horas": float(total_horas),
-        "dias_completos": dias_completos,
-        "horas_restantes": round(horas_restantes, 1),
-        "valor_aproximado": float(valor_aproximado),
-    }
+    valor_dia: float = _get_valor_dia()
+    saldos: dict[int, dict] = saldos_ledger([collaborator_id], valor_dia=valor_dia)
+    return saldos.get(collaborator_id) or saldo_vazio(valor_dia)
 
 
 def _calculate_collaborator_balance_range(collaborator_id, start_date, end_date, setor_id=None):
     """Calcula saldo do colaborador dentro de um período, opcionalmente filtrando por setor."""
-    q: Query = _get_active_ciclos_query(collaborator_id).filter(
-        Ciclo.data_lancamento >= start_date, Ciclo.data_lancamento <= end_date
+    valor_dia: float = _get_valor_dia()
+    saldos: dict[int, dict] = calcular_saldos(
+        [collaborator_id], setor_id=setor_id, data_inicio=start_date, data_fim=end_date, valor_dia=valor_dia
     )
-    if setor_id:
-        # Incluir: registros com setor_id preenchido OU registros antigos (NULL) do colaborador neste setor
-        q: Query = q.filter(
-            or_(Ciclo.setor_id == setor_id, (Ciclo.setor_id.is_(None) & (Collaborator.setor_id == setor_id)))
-        ).join(Collaborator)
-    total_horas_decimal: Any | Decimal = q.with_entities(
-        func.coalesce(func.sum(Ciclo.valor_horas), 0)
-    ).scalar() or Decimal("0.0")
-
-    total_horas = Decimal(str(total_horas_decimal))
-    total_horas_float = float(total_horas)
-
-    # Lógica correta: considerar saldo total, mesmo que venha de dívidas quitadas
-    if total_horas_float < 0:
-        dias_completos = 0
-        horas_restantes = 0.0
-    else:
-        # Total positivo: calcular dias e horas restantes normalmente
-        dias_completos = int(math.floor(total_horas_float / 8.0))
-        horas_restantes: float = total_horas_float % 8.0
-
-    valor_dia = Decimal(str(_get_valor_dia()))
-    valor_aproximado: Decimal = Decimal(str(dias_completos)) * valor_dia
-
-    return {
-        "total_horas": float(total_horas),
-        "dias_completos": dias_completos,
-        "horas_restantes": round(horas_restantes, 1),
-        "valor_aproximado": float(valor_aproximado),
-    }
+    return saldos.get(collaborator_id) or saldo_vazio(valor_dia)
 
 
 def _get_valor_dia():
     """Obtém valor de 1 dia (8h) em R$"""
-    try:
-        setting = AppSetting.query.filter_by(key="ciclo_valor_dia").first()
-        if setting and setting.value:
-            return float(setting.value)
-    except Exception:
-        pass
-    return 65.0  # Valor padrão
+    return obter_valor_dia()
 
 
 def _get_nome_empresa():
@@ -373,20 +382,12 @@ def _month_name_pt(month):
     return ""
 
 
-def _normalize_text(s):
-    s = (s or "").strip().lower()
-    s = unicodedata.normalize("NFKD", s)
-    s = "".join(ch for ch in s if not unicodedata.combining(ch))
-    s = re.sub(r"\s+", " ", s).strip()
-    return s
-
-
 def _parse_month_query(q):
     """
     Se q representar um mês (ex.: 'Janeiro', 'jan', '1', '01'), retorna (month_number, month_name_pt).
     Caso contrário, (None, None).
     """
-    qn: str = _normalize_text(q)
+    qn: str = normalizar(q)
     if not qn:
         return None, None
 
@@ -589,33 +590,11 @@ def _infer_reference_month_from_weeks(weeks):
 
 def _calculate_collaborator_balance_for_cycle(collaborator_id, ciclo_id):
     """Saldo por colaborador dentro de um ciclo mensal fechado (somente registros fechados desse ciclo_id)."""
-    total_horas_decimal: Any | Decimal = Ciclo.query.filter(
-        Ciclo.collaborator_id == collaborator_id,
-        Ciclo.status_ciclo == "fechado",
-        Ciclo.ciclo_id == ciclo_id,
-    ).with_entities(func.coalesce(func.sum(Ciclo.valor_horas), 0)).scalar() or Decimal("0.0")
-
-    total_horas = Decimal(str(total_horas_decimal))
-    total_horas_float = float(total_horas)
-
-    # Lógica correta: considerar saldo total, mesmo que venha de dívidas quitadas
-    if total_horas_float < 0:
-        dias_completos = 0
-        horas_restantes = 0.0
-    else:
-        # Total positivo: calcular dias e horas restantes normalmente
-        dias_completos = int(math.floor(total_horas_float / 8.0))
-        horas_restantes: float = total_horas_float % 8.0
-
-    valor_dia = Decimal(str(_get_valor_dia()))
-    valor_aproximado: Decimal = Decimal(str(dias_completos)) * valor_dia
-
-    return {
-        "total_horas": float(total_horas),
-        "dias_completos": dias_completos,
-        "horas_restantes": round(horas_restantes, 1),
-        "valor_aproximado": float(valor_aproximado),
-    }
+    valor_dia: float = _get_valor_dia()
+    saldos: dict[int, dict] = calcular_saldos(
+        [collaborator_id], status_ciclo="fechado", ciclo_id=ciclo_id, valor_dia=valor_dia
+    )
+    return saldos.get(collaborator_id) or saldo_vazio(valor_dia)
 
 
 def _get_ciclo_atual():
@@ -715,23 +694,19 @@ def index():
         # Buscar colaboradores ativos (filtrados por setor se houver)
         colaboradores: list[Collaborator] = _get_collaborators_by_setor(selected_setor_id)
 
-        # Calcular saldos para cada colaborador
-        colaboradores_stats = []
-        for colab in colaboradores:
-            # Na tela principal, mostrar o saldo total acumulado do colaborador (incluindo saldos de meses anteriores)
-            # Se houver filtro de setor, calcular apenas o saldo desse setor
-            if selected_setor_id:
-                balance: dict[str, float | int] = _calculate_collaborator_balance_range(
-                    colab.id, date(1900, 1, 1), date(2099, 12, 31), selected_setor_id
-                )
-            else:
-                balance = _calculate_collaborator_balance(colab.id)
-            colaboradores_stats.append({"collaborator": colab, "balance": balance})
-
         # Buscar configurações
         nome_empresa = _get_nome_empresa()
         valor_dia: float = _get_valor_dia()
 
+        # Saldos de todos os colaboradores lidos do ledger materializado (CicloSaldoLedger)
+        # Na tela principal, mostrar o saldo total acumulado do colaborador (incluindo saldos de meses anteriores)
+        # Se houver filtro de setor, calcular apenas o saldo desse setor
+        saldos: dict[int, dict] = saldos_ledger(setor_id=selected_setor_id, valor_dia=valor_dia)
+        colaboradores_stats = [
+            {"collaborator": colab, "balance": saldos.get(colab.id) or saldo_vazio(valor_dia)}
+            for colab in colaboradores
+        ]
+
         # Calcular ciclo atual
         ciclo_atual = _get_ciclo_atual()
 
@@ -797,9 +772,7 @@ def index():
         )
 
 
-@bp.route("/pesquisa", methods=["GET"], strict_slashes=False)
-@login_required
-def _summary_from_hours(total_horas_float):
+def _summary_from_hours(total_horas_float, valor_dia: float | None = None):
     """Calcula resumo a partir de horas totais."""
     try:
         # Lógica correta: considerar saldo total, mesmo que venha de dívidas quitadas
@@ -810,7 +783,7 @@ def _summary_from_hours(total_horas_float):
             # Total positivo: calcular dias e horas restantes normalmente
             dias = int(math.floor(total_horas_float / 8.0))
             hrs_rest: float = total_horas_float % 8.0
-        valor_dia = float(_get_valor_dia() or 0.0)
+        valor_dia = float((_get_valor_dia() if valor_dia is None else valor_dia) or 0.0)
         return {
             "total_horas": round(total_horas_float, 1),
             "dias_completos": dias,
@@ -827,61 +800,6 @@ def _summary_from_hours(total_horas_float):
         }
 
 
-def _process_week_details(s, ciclo_id, status):
-    """Processa detalhes de uma semana (horas, folgas, ocorrências)."""
-    week_start: object = s["week_start"]  # type: ignore[assignment]
-    week_end: object = s["week_end"]  # type: ignore[assignment]
-
-    horas = (
-        Ciclo.query.filter(
-            Ciclo.status_ciclo == status,
-            Ciclo.ciclo_id == ciclo_id if status == "fechado" else True,
-            Ciclo.data_lancamento >= week_start,
-            Ciclo.data_lancamento <= week_end,
-        )
-        .order_by(Ciclo.nome_colaborador.asc(), Ciclo.data_lancamento.asc(), Ciclo.id.asc())
-        .all()
-    )
-
-    # bloco duplicado/removido
-
-    horas = [h for h in horas if getattr(h, "origem", None) != "Folga utilizada"]
-    folgas = []  # Corrige erro de sorted sem lista (reportCallIssue)
-
-    ocorrencias = (
-        CicloOcorrencia.query.filter(
-            CicloOcorrencia.status_ciclo == status,
-            CicloOcorrencia.ciclo_id == ciclo_id if status == "fechado" else True,
-            CicloOcorrencia.data_ocorrencia >= week_start,
-            CicloOcorrencia.data_ocorrencia <= week_end,
-        )
-        .order_by(
-            CicloOcorrencia.nome_colaborador.asc(),
-            CicloOcorrencia.data_ocorrencia.asc(),
-            CicloOcorrencia.id.asc(),
-        )
-        .all()
-    )
-
-    total_horas = 0.0
-    if horas:
-        try:
-            total_horas = float(sum(float(h.valor_horas or 0) for h in horas))
-        except (ValueError, TypeError, AttributeError):
-            total_horas = 0.0
-
-    return {
-        "ciclo_id": ciclo_id,
-        "label": str(s.get("label", "")),
-        "week_start": week_start,
-        "week_end": week_end,
-        "horas": horas,
-        "folgas": folgas,
-        "ocorrencias": ocorrencias,
-        "resumo": _summary_from_hours(total_horas),
-    }
-
-
 @bp.route("/pesquisa", methods=["GET"], strict_slashes=False)
 @login_required
 def pesquisa():
@@ -895,13 +813,16 @@ def pesquisa():
         ciclo_id: int | None = request.args.get("ciclo_id", type=int)
         _, q_month_name = _parse_month_query(q)
 
-        semanas_detalhe = _buscar_semanas_fechadas(q, q_month_name, ciclo_id)
+        pagina: int = max(request.args.get("pagina", 1, type=int) or 1, 1)
 
-        if not semanas_detalhe:
+        semanas_detalhe, paginacao, ciclo_ids = _buscar_semanas_fechadas(q, q_month_name, ciclo_id, pagina)
+
+        if not semanas_detalhe and paginacao.total == 0:
             semanas_detalhe = _buscar_semanas_ativas(q)
+            ciclo_ids = _extrair_ciclo_ids(semanas_detalhe)
+            paginacao = None
 
         colaboradores = _get_all_collaborators()
-        ciclo_ids: list[int] = _extrair_ciclo_ids(semanas_detalhe)
 
         return render_template(
             "ciclos/pesquisa.html",
@@ -910,6 +831,7 @@ def pesquisa():
             q_month_name=q_month_name,
             filtro_ciclo_id=ciclo_id,
             semanas=semanas_detalhe,
+            paginacao=paginacao,
             colaboradores=colaboradores,
             ciclo_ids=ciclo_ids,
         )
@@ -921,38 +843,30 @@ def pesquisa():
         return redirect(url_for("ciclos.index"))
 
 
-def _buscar_semanas_fechadas(q: str, q_month_name: str | None, ciclo_id: int | None):
+def _buscar_semanas_fechadas(q: str, q_month_name: str | None, ciclo_id: int | None, pagina: int = 1):
+    """
+    Semanas arquivadas que casam com a busca, paginadas.
+
+    Returns:
+        (semanas detalhadas da página, paginação, ciclo_ids de todos os resultados)
+    """
     query: Query = CicloSemana.query
     if ciclo_id:
         query: Query = query.filter(CicloSemana.ciclo_id == ciclo_id)
-    if q_month_name:
-        query: Query = query.filter(CicloSemana.label.ilike(f"%{q_month_name}%"))
-    elif q:
-        query: Query = query.filter(CicloSemana.label.ilike(f"%{q}%"))
-
-    semanas = query.order_by(CicloSemana.ciclo_id.desc(), CicloSemana.week_start.asc()).limit(200).all()
-    return [_detalhar_semana_fechada(s) for s in semanas]
+    if q_month_name or q:
+        query: Query = query.filter(busca_service.filtro(CicloSemana.busca, q_month_name or q))
 
-
-def _detalhar_semana_fechada(s):
-    horas = _buscar_horas_semana(s.week_start, s.week_end, "fechado", s.ciclo_id)
-    folgas = _buscar_folgas_semana(s.week_start, s.week_end, "fechado", s.ciclo_id)
-    folgas = _mesclar_folgas_utilizadas(horas, folgas, "fechado")
-    horas = [h for h in horas if getattr(h, "origem", None) != "Folga utilizada"]
-    folgas = _ordenar_folgas(folgas)
-    ocorrencias = _buscar_ocorrencias_semana(s.week_start, s.week_end, "fechado", s.ciclo_id)
-    total_horas: float = _total_horas(horas)
-
-    return {
-        "ciclo_id": s.ciclo_id,
-        "label": s.label,
-        "week_start": s.week_start,
-        "week_end": s.week_end,
-        "horas": horas,
-        "folgas": folgas,
-        "ocorrencias": ocorrencias,
-        "resumo": _summary_from_hours(total_horas),
-    }
+    paginacao = query.order_by(CicloSemana.ciclo_id.desc(), CicloSemana.week_start.asc()).paginate(
+        page=pagina, per_page=SEMANAS_POR_PAGINA, error_out=False
+    )
+    ciclo_ids: list[int] = sorted(
+        (cid for (cid,) in query.with_entities(CicloSemana.ciclo_id).distinct() if cid is not None), reverse=True
+    )
+    valor_dia: float = _get_valor_dia()
+    semanas = carregar_semanas_fechadas(paginacao.items)
+    for semana in semanas:
+        semana["resumo"] = _summary_from_hours(_total_horas(semana["horas"]), valor_dia)
+    return semanas, paginacao, ciclo_ids
 
 
 def _buscar_semanas_ativas(q: str):
@@ -960,13 +874,7 @@ def _buscar_semanas_ativas(q: str):
     open_ciclo_id = _get_ciclo_atual()["ciclo_id"]
     semanas_open: list[dict[str, object]] = _weekly_cycles_for_open_month(current_date)
 
-    detalhes = []
-    for s in semanas_open:
-        label = str(s["label"])
-        if q and _normalize_text(q) not in _normalize_text(label):
-            continue
-        detalhes.append(_detalhar_semana_ativa(s, open_ciclo_id))
-    return detalhes
+    return [_detalhar_semana_ativa(s, open_ciclo_id) for s in semanas_open if busca_service.casa(q, str(s["label"]))]
 
 
 def _detalhar_semana_ativa(s, open_ciclo_id: int):
@@ -1103,118 +1011,20 @@ def _proximo_ciclo_id():
     return (ultimo_fechamento.ciclo_id + 1) if ultimo_fechamento else 1
 
 
-def _registros_ativos(setor_id: int | None = None):
-    query: Query = Ciclo.query.filter(Ciclo.status_ciclo == "ativo")
-    if setor_id:
-        # Filtrar por setor: registros com setor_id preenchido OU registros antigos (NULL) do colaborador neste setor
-        from sqlalchemy import or_
-
-        query: Query = query.filter(
-            or_(
-                Ciclo.setor_id == setor_id,
-                (Ciclo.setor_id.is_(None) & (Collaborator.setor_id == setor_id)),
-            )
-        ).join(Collaborator)
-    return query.all()
-
-
-def _agrupar_e_calcular_totais(registros_ativos):
-    colaboradores_totais = {}
-    colaboradores_list = list(set(reg.collaborator_id for reg in registros_ativos))
-
-    total_horas_geral = Decimal("0.0")
-    total_dias_geral = 0
-    total_valor_geral = Decimal("0.0")
-
-    for cid in colaboradores_list:
-        balance = _calculate_collaborator_balance(cid)
-        registros_colab = [r for r in registros_ativos if r.collaborator_id == cid]
-
-        total_horas_colab = Decimal(str(balance["total_horas"]))
-        dias_completos_colab = balance["dias_completos"]
-        valor_total_colab = Decimal(str(balance["valor_aproximado"]))
-        horas_restantes_colab = balance["horas_restantes"]
-
-        colaboradores_totais[cid] = {
-            "nome": registros_colab[0].nome_colaborador,
-            "total_horas": total_horas_colab,
-            "total_dias": dias_completos_colab,
-            "total_valor": valor_total_colab,
-            "horas_restantes": horas_restantes_colab,
-            "registros": registros_colab,
-        }
-
-        total_horas_geral += total_horas_colab
-        total_dias_geral += dias_completos_colab
-        total_valor_geral += valor_total_colab
-
-    totais_gerais = {
-        "horas": total_horas_geral,
-        "dias": total_dias_geral,
-        "valor": total_valor_geral,
-        "colaboradores": len(colaboradores_totais),
-    }
-    return colaboradores_totais, totais_gerais
-
-
-def _criar_carryover_e_fechar_registros(colaboradores_totais, next_month_start, proximo_ciclo_id) -> None:
-    usuario = current_user.name or current_user.username
-    for cid, dados in colaboradores_totais.items():
-        colaborador: Any | None = Collaborator.query.get(cid)
-        horas_restantes_colab = dados["horas_restantes"]
-
-        if 0 < horas_restantes_colab < 8.0:
-            novo_ciclo_carryover = Ciclo()
-            novo_ciclo_carryover.collaborator_id = cid
-            novo_ciclo_carryover.nome_colaborador = dados["nome"]
-            novo_ciclo_carryover.data_lancamento = next_month_start
-            novo_ciclo_carryover.setor_id = colaborador.setor_id if colaborador else None
-            novo_ciclo_carryover.origem = "Carryover"
-            novo_ciclo_carryover.descricao = f"Horas restantes do ciclo {proximo_ciclo_id - 1} transportadas"
-            novo_ciclo_carryover.valor_horas = Decimal(str(round(horas_restantes_colab, 1)))
-            novo_ciclo_carryover.dias_fechados = 0
-            novo_ciclo_carryover.horas_restantes = Decimal("0.0")
-            novo_ciclo_carryover.ciclo_id = None
-            novo_ciclo_carryover.status_ciclo = "ativo"
-            novo_ciclo_carryover.valor_aproximado = Decimal("0.0")
-            novo_ciclo_carryover.created_by = usuario
-            db.session.add(novo_ciclo_carryover)
-
-        for reg in dados["registros"]:
-            reg.ciclo_id = proximo_ciclo_id
-            reg.status_ciclo = "fechado"
-            reg.updated_at = datetime.now(ZoneInfo("America/Sao_Paulo"))
-            reg.updated_by = usuario
-
-
-def _fechar_folgas_e_ocorrencias(proximo_ciclo_id) -> None:
-    try:
-        # ✅ Fixo: Filterby setor_id indiretamente via collaborator
-        # Não filtramos por setor_id específico pois esta é uma operação de ciclo global
-        # Mas ainda assim garantimos que cada folga fica com seu setor_id durante a transição
-        folgas_ativas = CicloFolga.query.filter(CicloFolga.status_ciclo == "ativo").all()
-        for f in folgas_ativas:
-            f.ciclo_id = proximo_ciclo_id
-            f.status_ciclo = "fechado"
-        ocorr_ativas = CicloOcorrencia.query.filter(CicloOcorrencia.status_ciclo == "ativo").all()
-        for o in ocorr_ativas:
-            o.ciclo_id = proximo_ciclo_id
-            o.status_ciclo = "fechado"
-    except Exception:
-        pass
-
-
 def _arquivar_ciclos_semanais(proximo_ciclo_id, anchor_before_close) -> None:
+    # Arquivo das semanas é opcional: em SAVEPOINT, para que uma falha no flush (ex.: esquema antigo de
+    # ciclo_semana) não derrube o fechamento inteiro
     try:
-        CicloSemana.query.filter(CicloSemana.ciclo_id == proximo_ciclo_id).delete()
-        semanas: list[dict[str, object]] = _weekly_cycles_for_month(anchor_before_close)
-        for s in semanas:
-            cs = CicloSemana()
-            cs.ciclo_id = proximo_ciclo_id
-            cs.week_start = s["week_start"]  # type: ignore[assignment]
-            cs.week_end = s["week_end"]  # type: ignore[assignment]
-            cs.label = s["label"]  # type: ignore[assignment]
-            db.session.add(cs)
+        with db.session.begin_nested():
+            CicloSemana.query.filter(CicloSemana.ciclo_id == proximo_ciclo_id).delete()
+            semanas: list[dict[str, object]] = _weekly_cycles_for_month(anchor_before_close)
+            for s in semanas:
+                cs = CicloSemana()
+                cs.ciclo_id = proximo_ciclo_id
+                cs.week_start = s["week_start"]  # type: ignore[assignment]
+                cs.week_end = s["week_end"]  # type: ignore[assignment]
+                cs.label = s["label"]  # type: ignore[assignment]
+                db.session.add(cs)
     except Exception:
         pass
 
@@ -1348,6 +1158,7 @@ def lancar_horas() -> Any:
         ciclo.created_by = current_user.name or current_user.username
 
         db.session.add(ciclo)
+        registrar_ciclo(ciclo)
 
         # Log
         log = SystemLog()
@@ -1430,6 +1241,7 @@ def folgas_adicionar() -> Any:
         f.observacao = obs if obs else None
         f.status_ciclo = "ativo"
         db.session.add(f)
+        registrar_folga(f)
         db.session.commit()
         flash("Folga registrada com sucesso!", "success")
         return redirect(url_for("ciclos.index", collaborator_id=cid))
@@ -1448,6 +1260,7 @@ def folgas_excluir(id: int) -> Any:
     try:
         f = CicloFolga.query.get_or_404(id)
         cid = f.collaborator_id
+        registrar_folga(f, sinal=-1)
         db.session.delete(f)
         db.session.commit()
         flash("Folga excluída.", "success")
@@ -1679,7 +1492,8 @@ def ajustar(ciclo_id) -> Any:
         # NÃO calcular dias no ajuste - sempre 0
         # Conversão de horas em dias acontece APENAS no fechamento
 
-        # Atualizar registro
+        # Atualizar registro (ledger: retira o valor antigo e aplica o novo)
+        registrar_ciclo(ciclo, sinal=-1)
         ciclo.valor_horas = valor_horas_decimal
         ciclo.dias_fechados = 0  # Sempre 0
         ciclo.horas_restantes = Decimal("0.0")  # Sempre 0
@@ -1688,6 +1502,7 @@ def ajustar(ciclo_id) -> Any:
             ciclo.descricao = descricao
         ciclo.updated_at = datetime.now(ZoneInfo("America/Sao_Paulo"))
         ciclo.updated_by = current_user.name or current_user.username
+        registrar_ciclo(ciclo)
 
         # Log
         log = SystemLog()
@@ -1723,6 +1538,7 @@ def excluir(ciclo_id) -> Any:
             horas_excluidas = float(ciclo.valor_horas)
 
             # Excluir registro
+            registrar_ciclo(ciclo, sinal=-1)
             db.session.delete(ciclo)
 
             # Log
@@ -1742,6 +1558,7 @@ def excluir(ciclo_id) -> Any:
             colaborador_nome = folga.nome_colaborador
             horas_excluidas = float(-8.0 * (folga.dias or 1))
 
+            registrar_folga(folga, sinal=-1)
             db.session.delete(folga)
 
             log = SystemLog()
@@ -1779,63 +1596,15 @@ def resumo_fechamento() -> Any:
         colaboradores_resumo = []
 
         valor_dia: float = _get_valor_dia()
+        # Saldos (e contagem de registros ativos) de todos os colaboradores em uma única consulta agrupada,
+        # apenas do setor selecionado, se houver (CORREÇÃO PROBLEMA 1 E 2)
+        saldos: dict[int, dict] = calcular_saldos(setor_id=selected_setor_id, valor_dia=valor_dia)
         for colab in colaboradores:
-            # Calcular saldos apenas do setor selecionado, se houver (CORREÇÃO PROBLEMA 1 E 2)
-            if selected_setor_id:
-                # Total por setor usando a janela completa (todos registros ativos no setor)
-                # Incluir: registros com setor_id preenchido OU registros antigos (NULL) do colaborador neste setor
-                from sqlalchemy import or_
-
-                query: Query = (
-                    _get_active_ciclos_query(colab.id)
-                    .filter(
-                        or_(
-                            Ciclo.setor_id == selected_setor_id,
-                            (Ciclo.setor_id.is_(None) & (Collaborator.setor_id == selected_setor_id)),
-                        )
-                    )
-                    .join(Collaborator)
-                )
-                total_horas_decimal: Any | Decimal = query.with_entities(
-                    func.coalesce(func.sum(Ciclo.valor_horas), 0)
-                ).scalar() or Decimal("0.0")
-                total_horas = float(Decimal(str(total_horas_decimal)))
-                if total_horas < 0:
-                    dias_completos = 0
-                    horas_restantes = 0.0
-                else:
-                    dias_completos = int(math.floor(total_horas / 8.0))
-                    horas_restantes: float = round(total_horas % 8.0, 1)
-                valor_total = float(Decimal(str(dias_completos)) * Decimal(str(_get_valor_dia())))
-                # CORREÇÃO: Inicializa balance dict para evitar UnboundLocalError
-                balance = {
-                    "total_horas": total_horas,
-                    "dias_completos": dias_completos,
-                    "horas_restantes": horas_restantes,
-                    "valor_aproximado": valor_total,
-                }
-            else:
-                balance = _calculate_collaborator_balance(colab.id)
-                total_horas = balance["total_horas"]
-                dias_completos = balance["dias_completos"]
-                horas_restantes = balance["horas_restantes"]
-                valor_total = balance["valor_aproximado"]
-
-            # Buscar registros ativos (CORREÇÃO: agora filtra por setor se selecionado)
-            registros_query: Query = _get_active_ciclos_query(colab.id)
-            if selected_setor_id:
-                # Incluir: registros com setor_id preenchido OU registros antigos (NULL) do colaborador neste setor
-                from sqlalchemy import or_
-
-                registros_query: Query = registros_query.filter(
-                    or_(
-                        Ciclo.setor_id == selected_setor_id,
-                        (Ciclo.setor_id.is_(None) & (Collaborator.setor_id == selected_setor_id)),
-                    )
-                ).join(Collaborator)
-            registros = registros_query.all()
-
-            # Os valores já estão corretos em balance, não sobrescreve mais
+            balance = saldos.get(colab.id) or saldo_vazio(valor_dia)
+            total_horas = balance["total_horas"]
+            dias_completos = balance["dias_completos"]
+            horas_restantes = balance["horas_restantes"]
+            valor_total = balance["valor_aproximado"]
 
             if total_horas > 0:  # Só incluir se tiver horas
                 # ✅ Calcular saldo visual (apenas para exibição)
@@ -1850,7 +1619,7 @@ def resumo_fechamento() -> Any:
                         "horas_restantes": horas_restantes,
                         "saldo_visual": saldo_visual,  # ✅ Novo campo para exibição
                         "valor": round(valor_total, 2),
-                        "registros_count": len(registros),
+                        "registros_count": balance["registros_count"],
                     }
                 )
 
@@ -1916,22 +1685,40 @@ def confirmar_fechamento():
 
         anchor_before_close, next_month_start = _datas_fechamento()
         proximo_ciclo_id = _proximo_ciclo_id()
+        usuario = current_user.name or current_user.username
+        cronometro = Cronometro()
 
-        registros_ativos = _registros_ativos(selected_setor_id)
-        if not registros_ativos:
+        fechados: int = fechar_registros(proximo_ciclo_id, usuario, selected_setor_id)
+        cronometro.marcar("fechar_registros")
+        if not fechados:
+            db.session.rollback()
             flash("Nenhum registro ativo encontrado para fechamento.", "warning")
             return redirect(
                 url_for("ciclos.index", setor_id=selected_setor_id) if selected_setor_id else url_for("ciclos.index")
             )
 
-        colaboradores_totais, totais_gerais = _agrupar_e_calcular_totais(registros_ativos)
-
-        _criar_carryover_e_fechar_registros(colaboradores_totais, next_month_start, proximo_ciclo_id)
-        _fechar_folgas_e_ocorrencias(proximo_ciclo_id)
+        colaboradores_totais, totais_gerais = agrupar_totais(proximo_ciclo_id, _get_valor_dia())
+        cronometro.marcar("agrupar_totais")
+        inserir_carryover(colaboradores_totais, next_month_start, proximo_ciclo_id, usuario)
+        cronometro.marcar("carryover")
+        colaboradores_folgas = fechar_folgas_e_ocorrencias(proximo_ciclo_id)
+        cronometro.marcar("folgas_ocorrencias")
         _arquivar_ciclos_semanais(proximo_ciclo_id, anchor_before_close)
+        cronometro.marcar("arquivar_semanas")
         _registrar_fechamento_e_log(proximo_ciclo_id, totais_gerais, colaboradores_totais)
+        cronometro.marcar("fechamento_saldos")
+
+        # Ledger: registros mudaram de status (e houve carryover); recalcula só os colaboradores envolvidos
+        db.session.flush()
+        reconstruir(set(colaboradores_totais) | colaboradores_folgas)
+        cronometro.marcar("ledger")
 
         db.session.commit()
+        cronometro.marcar("commit")
+        current_app.logger.info(
+            f"Fechamento do ciclo {proximo_ciclo_id}: {fechados} registros, "
+            f"{totais_gerais['colaboradores']} colaboradores ({cronometro.resumo()})"
+        )
 
         flash(
             (
@@ -2285,77 +2072,10 @@ def pdf_individual(collaborator_id):
         current_date: date = _get_open_cycle_current_date()
         semanas: list[dict[str, object]] = _weekly_cycles_for_open_month(current_date)
 
-        semanas_detalhadas = []
-        for s in semanas:
-            week_start: object = s["week_start"]
-            week_end: object = s["week_end"]
-            horas = (
-                _get_active_ciclos_query(collaborator_id)
-                .filter(
-                    Ciclo.data_lancamento >= week_start,
-                    Ciclo.data_lancamento <= week_end,
-                    Ciclo.origem != "Folga utilizada",
-                )
-                .order_by(Ciclo.data_lancamento.asc(), Ciclo.id.asc())
-                .all()
-            )
-            folgas = (
-                CicloFolga.query.filter(
-                    CicloFolga.collaborator_id == collaborator_id,
-                    CicloFolga.setor_id == collaborator.setor_id,
-                    CicloFolga.status_ciclo == "ativo",
-                    CicloFolga.data_folga >= week_start,
-                    CicloFolga.data_folga <= week_end,
-                )
-                .order_by(CicloFolga.data_folga.asc(), CicloFolga.id.asc())
-                .all()
-            )
-            # Buscar "Folgas utilizadas" da tabela Ciclo separadamente
-            folgas_utilizadas_ciclo = (
-                _get_active_ciclos_query(collaborator_id)
-                .filter(
-                    Ciclo.data_lancamento >= week_start,
-                    Ciclo.data_lancamento <= week_end,
-                    Ciclo.origem == "Folga utilizada",
-                )
-                .order_by(Ciclo.data_lancamento.asc(), Ciclo.id.asc())
-                .all()
-            )
-            # Criar objetos similares a CicloFolga para mesclar
-            for h in folgas_utilizadas_ciclo:
-                folga_ciclo = SimpleNamespace(
-                    nome_colaborador=h.nome_colaborador,
-                    data_folga=h.data_lancamento,
-                    tipo="uso",
-                    dias=1,  # Folga utilizada sempre é 1 dia (8h)
-                    valor_horas=h.valor_horas,  # Incluir valor_horas para exibição
-                    observacao=h.descricao or "Folga utilizada via lançamento de horas",
-                    ciclo_id=None,
-                    status_ciclo=h.status_ciclo,
-                )
-                folgas = list(folgas) + [folga_ciclo]
-            # Reordenar por data após mesclar
-            folgas = sorted(folgas, key=lambda f: (f.data_folga, getattr(f, "id", 0)))
-            ocorrencias = (
-                CicloOcorrencia.query.filter(
-                    CicloOcorrencia.collaborator_id == collaborator_id,
-                    CicloOcorrencia.status_ciclo == "ativo",
-                    CicloOcorrencia.data_ocorrencia >= week_start,
-                    CicloOcorrencia.data_ocorrencia <= week_end,
-                )
-                .order_by(CicloOcorrencia.data_ocorrencia.asc(), CicloOcorrencia.id.asc())
-                .all()
-            )
-            semanas_detalhadas.append(
-                {
-                    "label": s["label"],
-                    "week_start": week_start,
-                    "week_end": week_end,
-                    "horas": horas,
-                    "folgas": folgas,
-                    "ocorrencias": ocorrencias,
-                }
-            )
+        # Horas, folgas e ocorrências do mês carregadas uma vez e distribuídas por semana
+        semanas_detalhadas = carregar_semanas_por_colaborador([collaborator], semanas, incluir_valor_horas=True)[
+            collaborator.id
+        ]
 
         # Calcular saldo
         balance = _calculate_collaborator_balance(collaborator_id)
@@ -2584,83 +2304,14 @@ def pdf_geral():
         current_date: date = _get_open_cycle_current_date()
         mes_inicio: str = _month_name_pt(current_date.month)
         semanas: list[dict[str, object]] = _weekly_cycles_for_open_month(current_date)
+        saldos: dict[int, dict] = calcular_saldos(valor_dia=valor_dia)
 
-        for colab in colaboradores:
-            balance = _calculate_collaborator_balance(colab.id)
+        semanas_por_colab = carregar_semanas_por_colaborador(colaboradores, semanas)
 
-            semanas_detalhadas = []
-            tem_algo = False
-            for s in semanas:
-                week_start: object = s["week_start"]
-                week_end: object = s["week_end"]
-                horas = (
-                    _get_active_ciclos_query(colab.id)
-                    .filter(
-                        Ciclo.data_lancamento >= week_start,
-                        Ciclo.data_lancamento <= week_end,
-                        Ciclo.origem != "Folga utilizada",
-                    )
-                    .order_by(Ciclo.data_lancamento.asc(), Ciclo.id.asc())
-                    .all()
-                )
-                folgas = (
-                    CicloFolga.query.filter(
-                        CicloFolga.collaborator_id == colab.id,
-                        CicloFolga.setor_id == colab.setor_id,
-                        CicloFolga.status_ciclo == "ativo",
-                        CicloFolga.data_folga >= week_start,
-                        CicloFolga.data_folga <= week_end,
-                    )
-                    .order_by(CicloFolga.data_folga.asc(), CicloFolga.id.asc())
-                    .all()
-                )
-                # Buscar "Folgas utilizadas" da tabela Ciclo separadamente
-                folgas_utilizadas_ciclo = (
-                    _get_active_ciclos_query(colab.id)
-                    .filter(
-                        Ciclo.data_lancamento >= week_start,
-                        Ciclo.data_lancamento <= week_end,
-                        Ciclo.origem == "Folga utilizada",
-                    )
-                    .order_by(Ciclo.data_lancamento.asc(), Ciclo.id.asc())
-                    .all()
-                )
-                # Criar objetos similares a CicloFolga para mesclar
-                for h in folgas_utilizadas_ciclo:
-                    folga_ciclo = SimpleNamespace(
-                        nome_colaborador=h.nome_colaborador,
-                        data_folga=h.data_lancamento,
-                        tipo="uso",
-                        dias=1,  # Folga utilizada sempre é 1 dia (8h)
-                        observacao=h.descricao or "Folga utilizada via lançamento de horas",
-                        ciclo_id=None,
-                        status_ciclo=h.status_ciclo,
-                    )
-                    folgas = list(folgas) + [folga_ciclo]
-                # Reordenar por data após mesclar
-                folgas = sorted(folgas, key=lambda f: (f.data_folga, getattr(f, "id", 0)))
-                ocorrencias = (
-                    CicloOcorrencia.query.filter(
-                        CicloOcorrencia.collaborator_id == colab.id,
-                        CicloOcorrencia.status_ciclo == "ativo",
-                        CicloOcorrencia.data_ocorrencia >= week_start,
-                        CicloOcorrencia.data_ocorrencia <= week_end,
-                    )
-                    .order_by(CicloOcorrencia.data_ocorrencia.asc(), CicloOcorrencia.id.asc())
-                    .all()
-                )
-                if horas or folgas or ocorrencias:
-                    tem_algo = True
-                semanas_detalhadas.append(
-                    {
-                        "label": s["label"],
-                        "week_start": week_start,
-                        "week_end": week_end,
-                        "horas": horas,
-                        "folgas": folgas,
-                        "ocorrencias": ocorrencias,
-                    }
-                )
+        for colab in colaboradores:
+            balance = saldos.get(colab.id) or saldo_vazio(valor_dia)
+            semanas_detalhadas = semanas_por_colab[colab.id]
+            tem_algo: bool = semanas_tem_registros(semanas_detalhadas)
 
             if tem_algo:  # Só incluir se tiver algo no mês atual
                 colaboradores_resumo.append(
@@ -2747,9 +2398,11 @@ def pdf_geral_ciclo(ciclo_id):
         weeks = CicloSemana.query.filter(CicloSemana.ciclo_id == ciclo_id).order_by(CicloSemana.week_start.asc()).all()
         mes_inicio: str = _infer_reference_month_from_weeks(weeks)
 
+        saldos: dict[int, dict] = calcular_saldos(status_ciclo="fechado", ciclo_id=ciclo_id, valor_dia=valor_dia)
+
         colaboradores_resumo = []
         for colab in colaboradores:
-            balance: dict[str, float | int] = _calculate_collaborator_balance_for_cycle(colab.id, ciclo_id)
+            balance = saldos.get(colab.id) or saldo_vazio(valor_dia)
             semanas_detalhadas = []
             tem_algo = False
             for w in weeks:
@@ -3075,82 +2728,14 @@ def _gerar_pdf_ciclo_aberto_bytes():
     if " " in mes_inicio:
         mes_inicio: str = mes_inicio.split()[0]
     semanas: list[dict[str, object]] = _weekly_cycles_for_open_month(current_date)
+    saldos: dict[int, dict] = calcular_saldos(valor_dia=valor_dia)
 
-    for colab in colaboradores:
-        balance = _calculate_collaborator_balance(colab.id)
+    semanas_por_colab = carregar_semanas_por_colaborador(colaboradores, semanas)
 
-        semanas_detalhadas = []
-        tem_algo = False
-        for s in semanas:
-            week_start: object = s["week_start"]
-            week_end: object = s["week_end"]
-            horas = (
-                _get_active_ciclos_query(colab.id)
-                .filter(
-                    Ciclo.data_lancamento >= week_start,
-                    Ciclo.data_lancamento <= week_end,
-                    Ciclo.origem != "Folga utilizada",
-                )
-                .order_by(Ciclo.data_lancamento.asc(), Ciclo.id.asc())
-                .all()
-            )
-            folgas = (
-                CicloFolga.query.filter(
-                    CicloFolga.collaborator_id == colab.id,
-                    CicloFolga.setor_id == colab.setor_id,
-                    CicloFolga.status_ciclo == "ativo",
-                    CicloFolga.data_folga >= week_start,
-                    CicloFolga.data_folga <= week_end,
-                )
-                .order_by(CicloFolga.data_folga.asc(), CicloFolga.id.asc())
-                .all()
-            )
-            # Buscar "Folgas utilizadas" da tabela Ciclo separadamente
-            folgas_utilizadas_ciclo = (
-                _get_active_ciclos_query(colab.id)
-                .filter(
-                    Ciclo.data_lancamento >= week_start,
-                    Ciclo.data_lancamento <= week_end,
-                    Ciclo.origem == "Folga utilizada",
-                )
-                .order_by(Ciclo.data_lancamento.asc(), Ciclo.id.asc())
-                .all()
-            )
-            # Criar objetos similares a CicloFolga para mesclar
-            for h in folgas_utilizadas_ciclo:
-                folga_ciclo = SimpleNamespace(
-                    nome_colaborador=h.nome_colaborador,
-                    data_folga=h.data_lancamento,
-                    tipo="uso",
-                    dias=1,
-                    observacao=h.descricao or "Folga utilizada via lançamento de horas",
-                    ciclo_id=None,
-                    status_ciclo=h.status_ciclo,
-                )
-                folgas = list(folgas) + [folga_ciclo]
-            folgas = sorted(folgas, key=lambda f: (f.data_folga, getattr(f, "id", 0)))
-            ocorrencias = (
-                CicloOcorrencia.query.filter(
-                    CicloOcorrencia.collaborator_id == colab.id,
-                    CicloOcorrencia.status_ciclo == "ativo",
-                    CicloOcorrencia.data_ocorrencia >= week_start,
-                    CicloOcorrencia.data_ocorrencia <= week_end,
-                )
-                .order_by(CicloOcorrencia.data_ocorrencia.asc(), CicloOcorrencia.id.asc())
-                .all()
-            )
-            if horas or folgas or ocorrencias:
-                tem_algo = True
-            semanas_detalhadas.append(
-                {
-                    "label": s["label"],
-                    "week_start": week_start,
-                    "week_end": week_end,
-                    "horas": horas,
-                    "folgas": folgas,
-                    "ocorrencias": ocorrencias,
-                }
-            )
+    for colab in colaboradores:
+        balance = saldos.get(colab.id) or saldo_vazio(valor_dia)
+        semanas_detalhadas = semanas_por_colab[colab.id]
+        tem_algo: bool = semanas_tem_registros(semanas_detalhadas)
 
         if tem_algo:
             colaboradores_resumo.append(
@@ -1,14 +1,16 @@
 from datetime import date, datetime, timedelta
-from zoneinfo import ZoneInfo
 
 from flask import Blueprint, flash, jsonify, redirect, render_template, request, url_for
 from flask_login import current_user, login_required
+from sqlalchemy import func
 
 from .. import db
 from ..models import AppSetting
 from ..models import Collaborator as CollaboratorModel
 from ..models import Holiday, MedicalCertificate, Shift, TimeOffRecord
 from ..models import Vacation as VacationModel
+from ..optimizations import TZ_SAO_PAULO, get_today_cached
+from ..services.feriados_service import feriados_periodo, invalidar_cache
 from ..services.notificacao_service import registrar_evento
 
 bp = Blueprint("colaboradores", __name__)
@@ -61,74 +63,84 @@ def _get_week_dates(semana_param, today):
     return semana_inicio, semana_fim
 
 
-def _check_folga_status(colab_id, dia_data):
-    """Verifica se há folga registrada para a data."""
-    from datetime import timedelta
-
+def _load_folga_intervals(colab_ids, inicio, fim):
+    """Carrega intervalos (colaborador, início, fim) de folgas usadas que tocam o período."""
     try:
-        folgas = (
-            TimeOffRecord.query.filter(
-                TimeOffRecord.collaborator_id == colab_id,
+        # Folgas de vários dias iniciadas antes do período ainda podem cobri-lo
+        max_days = (
+            db.session.query(func.max(TimeOffRecord.days))
+            .filter(
+                TimeOffRecord.collaborator_id.in_(colab_ids),
                 TimeOffRecord.record_type == "folga_usada",
-                TimeOffRecord.date <= dia_data,
+                TimeOffRecord.date <= fim,
             )
-            .order_by(TimeOffRecord.date.desc())
-            .limit(5)
-            .all()
+            .scalar()
         )
+        span = max(1, int(max_days or 1))
+        folgas = TimeOffRecord.query.filter(
+            TimeOffRecord.collaborator_id.in_(colab_ids),
+            TimeOffRecord.record_type == "folga_usada",
+            TimeOffRecord.date >= inicio - timedelta(days=span - 1),
+            TimeOffRecord.date <= fim,
+        ).all()
+        intervals = []
         for folga in folgas:
             days = max(1, int(folga.days or 1))
-            end_date = folga.date + timedelta(days=days - 1)
-            if folga.date <= dia_data <= end_date:
-                return "Folga"
+            intervals.append((folga.collaborator_id, folga.date, folga.date + timedelta(days=days - 1)))
+        return intervals
     except Exception:
-        pass
-    return None
-
-
-def _check_vacation_status(colab_id, dia_data):
-    """Verifica se há férias registradas para a data."""
-    try:
-        vac = VacationModel.query.filter(
-            VacationModel.collaborator_id == colab_id,
-            VacationModel.data_inicio <= dia_data,
-            VacationModel.data_fim >= dia_data,
-        ).first()
-        return "Férias" if vac else None
-    except Exception:
-        return None
+        db.session.rollback()
+        return []
 
 
-def _check_medical_status(colab_id, dia_data):
-    """Verifica se há atestado médico registrado para a data."""
+def _load_period_intervals(model, colab_ids, inicio, fim):
+    """Carrega intervalos (colaborador, data_inicio, data_fim) de Férias/Atestados sobrepostos ao período."""
     try:
-        mc = MedicalCertificate.query.filter(
-            MedicalCertificate.collaborator_id == colab_id,
-            MedicalCertificate.data_inicio <= dia_data,
-            MedicalCertificate.data_fim >= dia_data,
-        ).first()
-        return "Atestado" if mc else None
+        rows = (
+            db.session.query(model.collaborator_id, model.data_inicio, model.data_fim)
+            .filter(
+                model.collaborator_id.in_(colab_ids),
+                model.data_inicio <= fim,
+                model.data_fim >= inicio,
+            )
+            .all()
+        )
+        return [(cid, ini, end) for cid, ini, end in rows]
     except Exception:
-        return None
+        db.session.rollback()
+        return []
 
 
 def _build_status_map(cols, dias_semana):
-    """Constrói mapa de status (Folga, Férias, Atestado) por colaborador/data."""
-    status_map = {}
+    """Constrói mapa de status (Folga, Férias, Atestado) por colaborador/data.
 
-    for colab in cols:
-        for dia in dias_semana:
-            key = (colab.id, dia["data"].isoformat())
-
-            # Verificar com prioridade: Atestado > Férias > Folga
-            status = _check_medical_status(colab.id, dia["data"])
-            if not status:
-                status = _check_vacation_status(colab.id, dia["data"])
-            if not status:
-                status = _check_folga_status(colab.id, dia["data"])
-
-            if status:
-                status_map[key] = status
+    Carrega de uma vez os intervalos do período e aplica em memória, da menor
+    para a maior prioridade: Folga < Férias < Atestado.
+    """
+    status_map = {}
+    colab_ids = [c.id for c in cols]
+    if not colab_ids or not dias_semana:
+        return status_map
+
+    dias = sorted(d["data"] for d in dias_semana)
+    inicio, fim = dias[0], dias[-1]
+    dias_set = set(dias)
+
+    camadas = (
+        ("Folga", _load_folga_intervals(colab_ids, inicio, fim)),
+        ("Férias", _load_period_intervals(VacationModel, colab_ids, inicio, fim)),
+        ("Atestado", _load_period_intervals(MedicalCertificate, colab_ids, inicio, fim)),
+    )
+    for status, intervals in camadas:
+        for colab_id, ini, end in intervals:
+            if ini is None or end is None:
+                continue
+            d = max(ini, inicio)
+            limite = min(end, fim)
+            while d <= limite:
+                if d in dias_set:
+                    status_map[(colab_id, d.isoformat())] = status
+                d += timedelta(days=1)
 
     return status_map
 
@@ -332,78 +344,13 @@ def _sunday_events(current_monday, domingo_team, domingo_ref_date):
     return events
 
 
-def _ensure_fixed_holidays(today):
-    y = today.year
-    fixed = [
-        (date(y, 2, 2), "Padroeiro de Umbaúba"),
-        (date(y, 2, 6), "Aniversário de Umbaúba"),
-        (date(y + 1, 2, 2), "Padroeiro de Umbaúba"),
-        (date(y + 1, 2, 6), "Aniversário de Umbaúba"),
-    ]
-    for dt, nm in fixed:
-        h = Holiday.query.filter_by(date=dt).first()
-        if h:
-            h.name = nm
-            h.kind = "municipal-Umbaúba"
-        else:
-            hh = Holiday()
-            hh.date = dt
-            hh.name = nm
-            hh.kind = "municipal-Umbaúba"
-            db.session.add(hh)
-
-
-def _ensure_national_holidays(ano):
-    fixes = [
-        (date(ano, 1, 1), "Confraternização Universal"),
-        (date(ano, 4, 21), "Tiradentes"),
-        (date(ano, 5, 1), "Dia do Trabalho"),
-        (date(ano, 9, 7), "Independência do Brasil"),
-        (date(ano, 10, 12), "Nossa Senhora Aparecida"),
-        (date(ano, 11, 2), "Finados"),
-        (date(ano, 11, 15), "Proclamação da República"),
-        (date(ano, 11, 20), "Consciência Negra"),
-        (date(ano, 12, 25), "Natal"),
-    ]
-
-    def easter(y):
-        a = y % 19
-        b = y // 100
-        c = y % 100
-        d = (19 * a + b - (b // 4) - ((b - ((b + 8) // 25) + 1) // 3) + 15) % 30
-        e = (32 + 2 * (b % 4) + 2 * (c // 4) - d - (c % 4)) % 7
-        f = d + e - 7 * ((a + 11 * d + 22 * e) // 451) + 114
-        month = f // 31
-        day = (f % 31) + 1
-        return date(y, month, day)
-
-    try:
-        gf = easter(ano) - timedelta(days=2)
-        fixes.append((gf, "Sexta-Feira Santa"))
-        cc = easter(ano) + timedelta(days=60)
-        fixes.append((cc, "Corpus Christi"))
-    except Exception:
-        pass
-
-    for dt, nm in fixes:
-        h = Holiday.query.filter_by(date=dt).first()
-        if h:
-            h.name = nm
-            h.kind = "nacional"
-        else:
-            hh = Holiday()
-            hh.date = dt
-            hh.name = nm
-            hh.kind = "nacional"
-            db.session.add(hh)
-
-
-def _collect_holiday_events():
+def _holiday_events(today):
+    """Eventos e lista de feriados do calendário (somente leitura, via feriados_service)."""
     events = []
     feriados = []
     try:
-        hs = Holiday.query.order_by(Holiday.date.asc()).all()
-        feriados = hs
+        hs = feriados_periodo(date(today.year - 1, 1, 1), date(today.year + 1, 12, 31))
+        feriados = [h for h in hs if h["id"] is not None]
         color_map = {
             "nacional": "#20c997",
             "movel": "#198754",
@@ -414,11 +361,11 @@ def _collect_holiday_events():
             "estadual": "#0dcaf0",
         }
         for h in hs:
-            kind = (h.kind or "feriado").strip()
+            kind = (h["kind"] or "feriado").strip()
             events.append(
                 {
-                    "title": h.name,
-                    "start": h.date.strftime("%Y-%m-%d"),
+                    "title": h["name"],
+                    "start": h["date"].strftime("%Y-%m-%d"),
                     "color": color_map.get(kind, "#20c997"),
                     "url": url_for("colaboradores.escala"),
                     "kind": kind,
@@ -429,19 +376,6 @@ def _collect_holiday_events():
     return events, feriados
 
 
-def _holiday_events(today):
-    try:
-        _ensure_fixed_holidays(today)
-        _ensure_national_holidays(2026)
-        db.session.commit()
-    except Exception:
-        try:
-            db.session.rollback()
-        except Exception:
-            pass
-    return _collect_holiday_events()
-
-
 def _folga_events(cols):
     events = []
     try:
@@ -514,10 +448,10 @@ def _parse_semana_inicio(semana_str):
         if semana_str:
             semana_inicio = datetime.strptime(semana_str, "%Y-%m-%d").date()
             return semana_inicio - timedelta(days=semana_inicio.weekday())
-        today = date.today()
+        today = get_today_cached()
         return today - timedelta(days=today.weekday())
     except Exception:
-        today = date.today()
+        today = get_today_cached()
         return today - timedelta(days=today.weekday())
 
 
@@ -698,7 +632,7 @@ def _create_domingo_shifts(semana_inicio, tz):
 def escala():
     _ensure_collaborator_name_column()
     cols = CollaboratorModel.query.filter_by(active=True).order_by(CollaboratorModel.name.asc()).all()
-    today = date.today()
+    today = get_today_cached()
 
     semana_param = request.args.get("semana", "")
     semana_inicio, semana_fim, semana_anterior, semana_proxima, dias_semana = _calculate_semana_context(
@@ -816,6 +750,7 @@ def feriado_criar():
             h.kind = kind or None
             db.session.add(h)
         db.session.commit()
+        invalidar_cache(d.year)
         flash("Feriado salvo.", "success")
     except Exception as e:
         try:
@@ -836,6 +771,7 @@ def feriado_excluir(id: int):
     try:
         db.session.delete(h)
         db.session.commit()
+        invalidar_cache(h.date.year)
         flash("Feriado excluído.", "danger")
     except Exception as e:
         db.session.rollback()
@@ -1010,7 +946,7 @@ def gerar_escala_automatica():
         )
         return redirect(url_for("colaboradores.escala", semana=semana_inicio.strftime("%Y-%m-%d")))
 
-    tz = ZoneInfo("America/Sao_Paulo")
+    tz = TZ_SAO_PAULO
     turnos_criados = 0
 
     try:
@@ -1049,7 +985,7 @@ def limpar_escala_semana():
             semana_inicio = datetime.strptime(semana_str, "%Y-%m-%d").date()
             semana_inicio = semana_inicio - td(days=semana_inicio.weekday())
         else:
-            today = date.today()
+            today = get_today_cached()
             semana_inicio = today - td(days=today.weekday())
     except Exception:
         flash("Data invalida.", "warning")
@@ -1230,8 +1166,6 @@ def folga_agendar():
         flash("Dados inválidos para agendamento.", "warning")
         return redirect(url_for("usuarios.gestao"))
     try:
-        from sqlalchemy import func
-
         credits_sum = (
             db.session.query(func.coalesce(func.sum(TimeOffRecord.days), 0))
             .filter(TimeOffRecord.collaborator_id == cid, TimeOffRecord.record_type == "folga_adicional")
@@ -14,6 +14,8 @@ from ..models import (
     CleaningHistoryPhoto,
     CleaningTask,
 )
+from ..optimizations import get_today_cached
+from ..services.eventos_service import publicar_limpeza
 
 bp = Blueprint("cronograma", __name__)
 
@@ -108,7 +110,7 @@ def calcular_frequencia_padrao(ultima_data, frequencia):
 
 def calcular_proxima_prevista(ultima_data, frequencia, tipo, nome=None):
     """Calcula a próxima data prevista para uma tarefa aplicando regras especiais"""
-    hoje = datetime.now(ZoneInfo("America/Sao_Paulo")).date()
+    hoje = get_today_cached()
 
     # Caso especial: Limpeza da Caixa de Gordura
     if (nome or "").strip().lower() == "limpeza da caixa de gordura":
@@ -160,7 +162,7 @@ def calcular_proxima_prevista(ultima_data, frequencia, tipo, nome=None):
 
 def proxima_base_sem_regra(ultima_data, frequencia, tipo, nome=None):
     """Calcula próxima data base sem aplicar regras de ajuste"""
-    hoje = datetime.now(ZoneInfo("America/Sao_Paulo")).date()
+    hoje = get_today_cached()
 
     if (nome or "").strip().lower() == "limpeza da caixa de gordura":
         return calcular_caixa_gordura(hoje, ultima_data)
@@ -207,7 +209,7 @@ def _ensure_default_tasks():
             atualizados = True
 
     # Criar tarefas padrão se não existirem
-    hoje = date.today()
+    hoje = get_today_cached()
     for nome, (freq, tipo, obs) in TASK_PADROES.items():
         tarefa = CleaningTask.query.filter_by(nome_limpeza=nome).first()
         if not tarefa:
@@ -249,7 +251,7 @@ def _calcular_ajustes_tarefas(tarefas):
 
 def _calcular_status_tarefas(tarefas):
     """Calcula status (normal, urgente, atrasada) para cada tarefa"""
-    hoje = date.today()
+    hoje = get_today_cached()
     for t in tarefas:
         t.status = "normal"
         if t.proxima_data < hoje:
@@ -260,7 +262,7 @@ def _calcular_status_tarefas(tarefas):
 
 def _calcular_kpis():
     """Calcula KPIs para o dashboard"""
-    hoje = date.today()
+    hoje = get_today_cached()
 
     total_tarefas = CleaningTask.query.count()
     tarefas_atrasadas = CleaningTask.query.filter(CleaningTask.proxima_data < hoje).count()
@@ -342,7 +344,7 @@ def cronograma():
     # KPIs
     kpis = _calcular_kpis()
 
-    hoje = date.today()
+    hoje = get_today_cached()
 
     return render_template(
         "cronograma.html",
@@ -426,6 +428,7 @@ def salvar_cronograma():
             tarefa.observacao = observacao if observacao else tarefa.observacao
             tarefa.designados = designados if designados else tarefa.designados
             db.session.commit()
+            publicar_limpeza(tarefa)
             msg = (
                 f'Limpeza "{tarefa.nome_limpeza}" marcada como concluída e reagendada para '
                 f'{tarefa.proxima_data.strftime("%d/%m/%Y")}.'
@@ -460,8 +463,8 @@ def excluir_historico(id: int):
 @bp.route("/cronograma/api/calendario", methods=["GET"])
 @login_required
 def api_calendario():
-    ano = request.args.get("ano", date.today().year, type=int)
-    mes = request.args.get("mes", date.today().month, type=int)
+    ano = request.args.get("ano", get_today_cached().year, type=int)
+    mes = request.args.get("mes", get_today_cached().month, type=int)
 
     primeiro_dia = date(ano, mes, 1)
     if mes == 12:
@@ -480,7 +483,7 @@ def api_calendario():
 
     eventos = []
     cores = {"Parcial": "#3b82f6", "Geral": "#ef4444", "Mensal": "#f59e0b", "Semanal": "#22c55e"}
-    hoje = date.today()
+    hoje = get_today_cached()
 
     for t in tarefas:
         cor = cores.get(t.tipo, "#6b7280")
@@ -593,6 +596,7 @@ def concluir_completo():
             tarefa.ultima_data, tarefa.frequencia, tarefa.tipo, tarefa.nome_limpeza
         )
         db.session.commit()
+        publicar_limpeza(tarefa)
 
         flash(f'Limpeza "{tarefa.nome_limpeza}" concluída com sucesso!', "success")
     except Exception as e:
@@ -605,7 +609,7 @@ def concluir_completo():
 @bp.route("/cronograma/api/estatisticas", methods=["GET"])
 @login_required
 def api_estatisticas():
-    hoje = date.today()
+    hoje = get_today_cached()
 
     meses = []
     for i in range(5, -1, -1):
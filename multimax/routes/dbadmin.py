@@ -1,6 +1,5 @@
 import json
 import os
-import shutil
 import socket
 import subprocess
 import time
@@ -36,6 +35,8 @@ from ..models import (
     SystemLog,
     UserLogin,
 )
+from ..services.backup_service import eh_arquivo_backup, executar_backup, restaurar_backup
+from ..services.backup_verification_service import agendar_verificacao, estado_verificacao
 
 try:
     import psutil  # type: ignore
@@ -805,10 +806,16 @@ def _predict_disk_full_date():
 # ============================================================================
 
 
-def _log_slow_query(query, execution_time_ms, rows_returned=None, endpoint=None, user_id=None):
-    """Registra query lenta (>1s)"""
+def _log_slow_query(
+    query, execution_time_ms, rows_returned=None, endpoint=None, user_id=None, threshold_ms=1000, commit=True
+):
+    """Registra query lenta (acima de threshold_ms, default 1s)
+
+    Chamado pelo escritor em lote do query_monitor_service com commit=False
+    (o commit é feito uma vez por lote).
+    """
     try:
-        if execution_time_ms < 1000:
+        if execution_time_ms < threshold_ms:
             return
 
         query_log = QueryLog()
@@ -818,7 +825,8 @@ def _log_slow_query(query, execution_time_ms, rows_returned=None, endpoint=None,
         query_log.endpoint = endpoint
         query_log.user_id = user_id
         db.session.add(query_log)
-        db.session.commit()
+        if commit:
+            db.session.commit()
     except Exception:
         try:
             db.session.rollback()
@@ -829,7 +837,7 @@ def _log_slow_query(query, execution_time_ms, rows_returned=None, endpoint=None,
 def _get_slow_queries(limit=20):
     """Obtém queries mais lentas"""
     try:
-        return QueryLog.query.order_by(QueryLog.execution_time_ms.desc()).limit(limit).all()
+        return db.session.query(QueryLog).order_by(QueryLog.execution_time_ms.desc()).limit(limit).all()
     except Exception:
         return []
 
@@ -851,11 +859,15 @@ def _get_database_stats():
                 tables = [row[0] for row in result]
                 tables_count = len([t for t in tables if not t.startswith("sqlite_")])
 
+                from ..services.sqlite_profile_service import perfil_ativo
+
                 return {
                     "size_mb": round(size_mb, 2),
                     "size_bytes": size_bytes,
                     "tables_count": tables_count,
                     "type": "SQLite",
+                    "pragmas": perfil_ativo(db.engine),
+                    "pragma_profile": current_app.config.get("SQLITE_PRAGMA_PROFILE"),
                 }
 
         return {"type": "Unknown", "size_mb": None, "tables_count": None}
@@ -868,67 +880,10 @@ def _get_database_stats():
 # ============================================================================
 
 
-def _verify_backup(backup_path):
-    """Verifica integridade de um backup"""
-    try:
-        if not os.path.exists(backup_path):
-            return {"status": "failed", "message": "Arquivo não encontrado"}
-
-        size = os.path.getsize(backup_path)
-        if size == 0:
-            return {"status": "corrupted", "message": "Arquivo vazio"}
-
-        # Para SQLite, verifica se é um arquivo válido
-        if backup_path.endswith(".sqlite"):
-            try:
-                # Tenta abrir o arquivo
-                with open(backup_path, "rb") as f:
-                    header = f.read(16)
-                    if not header.startswith(b"SQLite format 3"):
-                        return {"status": "corrupted", "message": "Formato SQLite inválido"}
-            except Exception as e:
-                return {"status": "corrupted", "message": f"Erro ao ler arquivo: {str(e)}"}
-
-        return {"status": "verified", "message": "Backup verificado com sucesso", "size": size}
-    except Exception as e:
-        return {"status": "failed", "message": f"Erro na verificação: {str(e)}"}
-
-
 def _verify_all_backups():
-    """Verifica todos os backups"""
-    try:
-        bdir = str(current_app.config.get("BACKUP_DIR") or "").strip()
-        if not bdir:
-            return []
-
-        results = []
-        for name in os.listdir(bdir):
-            path = os.path.join(bdir, name)
-            if os.path.isfile(path) and name.endswith(".sqlite"):
-                verification = _verify_backup(path)
-
-                # Salvar verificação no banco
-                backup_ver = BackupVerification()
-                backup_ver.backup_filename = name
-                backup_ver.backup_size = verification.get("size")
-                backup_ver.verification_status = verification["status"]
-                backup_ver.verification_method = "size_check"
-                backup_ver.error_message = verification.get("message") if verification["status"] != "verified" else None
-                backup_ver.verified_by = "system"
-                db.session.add(backup_ver)
-
-                results.append(
-                    {"filename": name, "status": verification["status"], "message": verification.get("message")}
-                )
-
-        db.session.commit()
-        return results
-    except Exception:
-        try:
-            db.session.rollback()
-        except Exception:
-            pass
-        return []
+    """Agenda a verificação de todos os backups em segundo plano e retorna o estado do trabalho"""
+    bdir = str(current_app.config.get("BACKUP_DIR") or "").strip()
+    return agendar_verificacao(current_app._get_current_object(), bdir)
 
 
 # ============================================================================
@@ -947,7 +902,7 @@ def _get_logs_statistics():
         old_system_logs = SystemLog.query.filter(SystemLog.data < cutoff_30d).count()
 
         # Contagem de QueryLog
-        total_query_logs = QueryLog.query.count()
+        total_query_logs = db.session.query(QueryLog).count()
 
         # Contagem de MetricHistory
         total_metrics = MetricHistory.query.count()
@@ -998,7 +953,7 @@ def _get_backups_statistics():
         total_size = 0
         for name in os.listdir(bdir):
             path = os.path.join(bdir, name)
-            if os.path.isfile(path) and name.endswith(".sqlite"):
+            if os.path.isfile(path) and eh_arquivo_backup(name):
                 try:
                     size = os.path.getsize(path)
                     total_size += size
@@ -1215,7 +1170,7 @@ def _cleanup_old_logs(days=30, query_logs_keep=1000, metrics_days=30):
         deleted_system = SystemLog.query.filter(SystemLog.data < cutoff).delete()
 
         # Limpar QueryLog antigo (manter últimos N)
-        query_logs = QueryLog.query.order_by(QueryLog.timestamp.desc()).offset(query_logs_keep).all()
+        query_logs = db.session.query(QueryLog).order_by(QueryLog.timestamp.desc()).offset(query_logs_keep).all()
         deleted_queries = 0
         for qlog in query_logs:
             db.session.delete(qlog)
@@ -1337,7 +1292,7 @@ def _cleanup_old_backups(keep_count=20):
         backups = []
         for name in os.listdir(bdir):
             path = os.path.join(bdir, name)
-            if os.path.isfile(path) and name.endswith(".sqlite"):
+            if os.path.isfile(path) and eh_arquivo_backup(name):
                 try:
                     mtime = os.path.getmtime(path)
                     backups.append((mtime, path, name))
@@ -1844,6 +1799,78 @@ def slow_queries():
         return jsonify({"ok": False, "error": str(e)}), 500
 
 
+@bp.route("/queries/endpoints", methods=["GET", "POST"], strict_slashes=False)
+@login_required
+def query_endpoint_stats():
+    """
+    Endpoint JSON com agregados de queries por endpoint (count, p50/p95, linhas).
+
+    GET só lê; POST com reset=1 zera os agregados.
+    """
+    if not _check_dev_access():
+        return jsonify({"ok": False, "error": "forbidden"}), 403
+
+    from ..services.query_monitor_service import obter_monitor
+
+    monitor = obter_monitor(current_app)
+    if monitor is None:
+        return jsonify({"ok": True, "enabled": False, "endpoints": []})
+    if request.method == "POST" and request.values.get("reset") in ("1", "true"):
+        monitor.limpar_estatisticas()
+    return jsonify(
+        {
+            "ok": True,
+            "enabled": True,
+            "threshold_ms": monitor.limite_ms,
+            "dropped": monitor.descartadas,
+            "endpoints": monitor.estatisticas(),
+        }
+    )
+
+
+@bp.route("/api-keys/cache", methods=["GET", "POST"], strict_slashes=False)
+@login_required
+def api_key_cache_stats():
+    """
+    Endpoint JSON com acertos/falhas do cache de autenticação por chave de API.
+
+    GET só lê; POST com reset=1 esvazia o cache e zera os contadores.
+    """
+    if not _check_dev_access():
+        return jsonify({"ok": False, "error": "forbidden"}), 403
+
+    from ..services.api_chave_service import cache
+
+    if request.method == "POST" and request.values.get("reset") in ("1", "true"):
+        cache.limpar(zerar_contadores=True)
+    return jsonify({"ok": True, **cache.estatisticas()})
+
+
+@bp.route("/busca/metricas", methods=["GET", "POST"], strict_slashes=False)
+@login_required
+def busca_metricas():
+    """
+    Endpoint JSON com a latência da busca global.
+
+    GET só lê; ações vão por POST: reset=1 zera as métricas e reindexar=1 reconstrói o índice
+    (o mesmo que `flask busca-reindexar`).
+    """
+    if not _check_dev_access():
+        return jsonify({"ok": False, "error": "forbidden"}), 403
+
+    from ..services.busca_global_service import fts_ativo, metricas, reindexar
+
+    indexados = None
+    if request.method == "POST":
+        if request.values.get("reindexar") in ("1", "true"):
+            indexados = reindexar()
+        if request.values.get("reset") in ("1", "true"):
+            metricas.zerar()
+    return jsonify(
+        {"ok": True, "backend": "fts5" if fts_ativo() else "sql", "indexados": indexados, **metricas.estatisticas()}
+    )
+
+
 @bp.route("/database/stats", methods=["GET"], strict_slashes=False)
 @login_required
 def database_stats():
@@ -1861,17 +1888,27 @@ def database_stats():
 @bp.route("/backups/verify", methods=["POST"], strict_slashes=False)
 @login_required
 def verify_backups():
-    """Verifica integridade de todos os backups"""
+    """Agenda a verificação de integridade de todos os backups (resultado em /backups/verify/status)"""
     if not _check_dev_access():
         return jsonify({"ok": False, "error": "forbidden"}), 403
 
     try:
-        results = _verify_all_backups()
-        return jsonify({"ok": True, "results": results})
+        job = _verify_all_backups()
+        return jsonify({"ok": True, "job": job}), 202
     except Exception as e:
         return jsonify({"ok": False, "error": str(e)}), 500
 
 
+@bp.route("/backups/verify/status", methods=["GET"], strict_slashes=False)
+@login_required
+def verify_backups_status():
+    """Estado da última verificação de backups agendada (com os resultados, quando gravados)"""
+    if not _check_dev_access():
+        return jsonify({"ok": False, "error": "forbidden"}), 403
+
+    return jsonify({"ok": True, "job": estado_verificacao()})
+
+
 @bp.route("/maintenance/cleanup", methods=["POST"], strict_slashes=False)
 @login_required
 def maintenance_cleanup():
@@ -1966,7 +2003,14 @@ def backup_now():
                 ok = False
     except Exception:
         ok = False
-    flash("Backup criado." if ok else "Falha ao criar backup.", "success" if ok else "danger")
+    if ok:
+        stats = current_app.config.get("LAST_BACKUP_STATS") or {}
+        detalhes = ""
+        if stats:
+            detalhes = f" ({stats.get('duration_s')}s, {stats.get('throughput_mb_s')} MB/s)"
+        flash(f"Backup criado.{detalhes}", "success")
+    else:
+        flash("Falha ao criar backup.", "danger")
     return redirect(url_for("dbadmin.index"))
 
 
@@ -2013,6 +2057,17 @@ def excluir(name: str):
     return redirect(url_for("dbadmin.index"))
 
 
+def _fechar_conexoes() -> None:
+    """Fecha a sessão e o pool antes de o arquivo do banco ser trocado pela restauração."""
+    try:
+        from .. import db
+
+        db.session.close()
+        db.engine.dispose()
+    except Exception:
+        pass
+
+
 @bp.route("/restaurar/<path:name>", methods=["POST"], strict_slashes=False)
 @login_required
 def restaurar(name: str):
@@ -2036,13 +2091,6 @@ def restaurar(name: str):
         flash("Backup não encontrado.", "warning")
         return redirect(url_for("dbadmin.index"))
     try:
-        try:
-            from .. import db
-
-            db.session.close()
-            db.engine.dispose()
-        except Exception:
-            pass
         try:
             ok = False
             fn = getattr(current_app, "perform_backup", None)
@@ -2051,12 +2099,12 @@ def restaurar(name: str):
             if not ok and os.path.exists(db_path):
                 ts = time.strftime("%Y%m%d-%H%M%S")
                 snap = os.path.join(bdir, f"pre-restore-{ts}.sqlite")
-                shutil.copy2(db_path, snap)
+                executar_backup(db_path, snap, compressao="none")
             if ok:
                 flash("Backup automático criado antes da restauração.", "info")
         except Exception:
             pass
-        shutil.copy2(src, db_path)
+        restaurar_backup(src, db_path, fechar_conexoes=_fechar_conexoes)
         flash("Banco restaurado a partir do backup.", "success")
     except Exception as e:
         flash(f"Erro ao restaurar: {e}", "danger")
@@ -2102,14 +2150,7 @@ def restaurar_snapshot():
             return redirect(url_for("dbadmin.index"))
         candidates.sort(key=lambda t: t[0], reverse=True)
         src = candidates[0][1]
-        try:
-            from .. import db
-
-            db.session.close()
-            db.engine.dispose()
-        except Exception:
-            pass
-        shutil.copy2(src, db_path)
+        restaurar_backup(src, db_path, fechar_conexoes=_fechar_conexoes)
         flash("Banco restaurado a partir do último snapshot.", "success")
     except Exception as e:
         flash(f"Erro ao restaurar snapshot: {e}", "danger")
@@ -2559,6 +2600,15 @@ def git_update():
     if not _check_dev_access():
         return jsonify({"ok": False, "error": "forbidden"}), 403
 
+    # O checkout pode ter sido atualizado fora da aplicação (deploy manual):
+    # recalcular a versão em cache do processo
+    try:
+        from ..services.version_service import atualizar_versao
+
+        atualizar_versao(current_app)
+    except Exception as e:
+        current_app.logger.warning(f"Erro ao atualizar versão em cache: {e}")
+
     return (
         jsonify(
             {
@@ -2734,10 +2784,9 @@ def maintenance_run_all():
             optimize_result = _optimize_database()
             results["optimize"] = optimize_result
 
-        # Verificação de backups
+        # Verificação de backups (em segundo plano; acompanhar por /backups/verify/status)
         if run_verify:
-            verify_result = _verify_all_backups()
-            results["verify"] = verify_result
+            results["verify"] = _verify_all_backups()
 
         return jsonify({"ok": True, "message": "Manutenções executadas com sucesso", "results": results})
     except Exception as e:
@@ -24,6 +24,10 @@ from sqlalchemy import func, or_
 
 from .. import db
 from ..models import EstoqueProducao, Historico, HistoricoAjusteEstoque, Produto, Setor
+from ..services import busca_service
+from ..services.eventos_service import publicar_estoque
+from ..services.movimentacao_estoque_service import DETALHES_PADRAO, MovimentacaoInvalida, movimentar
+from ..services.movimentacao_resumo_service import somar_por_periodo
 from ..services.notificacao_service import registrar_evento
 
 # Usar URL prefix vazio para manter retrocompat com /estoque
@@ -105,21 +109,8 @@ def _processar_movimentacao(produto: Produto, op: str):
         flash("A quantidade deve ser maior que zero.", "warning")
         return redirect(url_for("estoque_producao.index"))
     try:
-        if op == "saida" and produto.quantidade < quantidade:
-            flash(f"Saída de {quantidade} excede estoque atual ({produto.quantidade}).", "warning")
-            return redirect(url_for("estoque_producao.index"))
-        produto.quantidade += quantidade if op == "entrada" else -quantidade
-        hist = Historico()
-        hist.product_id = produto.id
-        hist.product_name = produto.nome
-        hist.action = op
-        hist.quantidade = quantidade
-        hist.details = (request.form.get("detalhes") or "").strip() or (
-            "Entrada de estoque" if op == "entrada" else "Saída de estoque"
-        )
-        hist.usuario = current_user.username
-        db.session.add(hist)
-        db.session.commit()
+        mov = movimentar(produto.id, op, quantidade, current_user.username, request.form.get("detalhes"))
+        publicar_estoque(produto, op, quantidade)
         flash(
             f"{'Entrada' if op == 'entrada' else 'Saída'} de {quantidade} unidades registrada.",
             "primary" if op == "entrada" else "warning",
@@ -127,14 +118,15 @@ def _processar_movimentacao(produto: Produto, op: str):
         try:
             registrar_evento(
                 "entrada de estoque" if op == "entrada" else "saída de estoque",
-                produto=produto.nome,
+                produto=mov["nome"],
                 quantidade=quantidade,
-                descricao=hist.details,
+                descricao=(request.form.get("detalhes") or "").strip() or DETALHES_PADRAO[op],
             )
         except Exception:
             pass
+    except MovimentacaoInvalida as e:
+        flash(str(e), "warning")
     except Exception as e:
-        db.session.rollback()
         logging.getLogger(__name__).error(f"Erro ao registrar movimentação de estoque: {e}", exc_info=True)
         flash(f"Erro ao registrar movimentação: {e}", "danger")
     return redirect(url_for("estoque_producao.index"))
@@ -162,17 +154,10 @@ def _parse_date_safe(s: str) -> date | None:
         return None
 
 
-def _fetch_hist(prod_id: int, start_date: date | None = None) -> list[Historico]:
-    query = Historico.query.filter_by(product_id=prod_id)
-    if start_date:
-        query = query.filter(Historico.data >= datetime.combine(start_date, datetime.min.time()))
-    return query.order_by(Historico.data.asc()).all()
-
-
 def _get_produtos_filtrados(search: str, cat: str, page: int, per_page: int = 12):
     query = Produto.query
     if search:
-        query = query.filter(or_(Produto.nome.ilike(f"%{search}%"), Produto.codigo.ilike(f"%{search}%")))
+        query = query.filter(busca_service.filtro(Produto.busca, search))
     if cat:
         query = query.filter(Produto.categoria == cat)
     return query.order_by(Produto.nome.asc()).paginate(page=page, per_page=per_page, error_out=False)
@@ -192,7 +177,8 @@ def _get_produto_por_busca(busca: str, g_id: int | None):
         return prod, []
     if busca:
         resultados = (
-            Produto.query.filter(or_(Produto.nome.ilike(f"%{busca}%"), Produto.codigo.ilike(f"%{busca}%")))
+            Produto.query.filter(busca_service.filtro(Produto.busca, busca))
+            .order_by(busca_service.relevancia(Produto.busca, busca), Produto.nome)
             .limit(10)
             .all()
         )
@@ -203,8 +189,8 @@ def _get_produto_por_busca(busca: str, g_id: int | None):
 def _get_produto_graficos(produto: Produto | None, g_di: date | None, g_df: date | None):
     if not produto:
         return {}
-    historicos = _fetch_hist(produto.id, g_di)
-    if not historicos:
+    somas = somar_por_periodo(produto.id, "dia", g_di, g_df)
+    if not somas:
         return {}
     final = {
         "labels": [],
@@ -213,16 +199,15 @@ def _get_produto_graficos(produto: Produto | None, g_di: date | None, g_df: date
         "estoque": [],
     }
     quantidade_acumulada = 0
-    for h in historicos:
-        if g_df and h.data.date() > g_df:
-            continue
-        label_data = h.data.strftime("%d/%m/%Y")
-        if h.action == "entrada":
-            quantidade_acumulada += h.quantidade
-            final["entradas"].append({"x": label_data, "y": h.quantidade})
-        elif h.action == "saida":
-            quantidade_acumulada -= h.quantidade
-            final["saidas"].append({"x": label_data, "y": h.quantidade})
+    for dia in sorted(somas):
+        label_data = dia.strftime("%d/%m/%Y")
+        entrada = somas[dia].get("entrada", 0)
+        saida = somas[dia].get("saida", 0)
+        quantidade_acumulada += entrada - saida
+        if entrada:
+            final["entradas"].append({"x": label_data, "y": entrada})
+        if saida:
+            final["saidas"].append({"x": label_data, "y": saida})
         final["labels"].append(label_data)
         final["estoque"].append({"x": label_data, "y": quantidade_acumulada})
     return final
@@ -431,22 +416,18 @@ def entrada_produto(id: int):
         flash("Visualizadores não têm permissão para fazer alterações no sistema.", "danger")
         return redirect(url_for("estoque_producao.lista_produtos"))
     produto = Produto.query.get_or_404(id)
-    qtd = int(request.form.get("quantidade", "0"))
-    produto.quantidade += qtd
-    db.session.commit()
-    hist = Historico()
-    hist.product_id = produto.id
-    hist.product_name = produto.nome
-    hist.action = "entrada"
-    hist.quantidade = qtd
-    hist.details = request.form.get("detalhes")
-    hist.usuario = current_user.username
-    db.session.add(hist)
-    db.session.commit()
+    try:
+        mov = movimentar(
+            produto.id, "entrada", request.form.get("quantidade"), current_user.username, request.form.get("detalhes")
+        )
+    except MovimentacaoInvalida as e:
+        flash(str(e), "danger")
+        return redirect(url_for("estoque_producao.lista_produtos"))
+    publicar_estoque(produto, "entrada", mov["quantidade"])
     registrar_evento(
         "entrada de estoque",
         produto=produto.nome,
-        quantidade=qtd,
+        quantidade=mov["quantidade"],
         descricao=(request.form.get("detalhes") or "").strip(),
     )
     flash("Entrada registrada!", "success")
@@ -460,25 +441,22 @@ def saida_produto(id: int):
         flash("Visualizadores não têm permissão para fazer alterações no sistema.", "danger")
         return redirect(url_for("estoque_producao.lista_produtos"))
     produto = Produto.query.get_or_404(id)
-    qtd = int(request.form.get("quantidade", "0"))
-    if produto.quantidade < qtd:
-        flash("Quantidade insuficiente em estoque.", "danger")
+    try:
+        mov = movimentar(
+            produto.id, "saida", request.form.get("quantidade"), current_user.username, request.form.get("detalhes")
+        )
+    except MovimentacaoInvalida as e:
+        msg = "Quantidade insuficiente em estoque." if e.codigo == "estoque_insuficiente" else str(e)
+        flash(msg, "danger")
         return redirect(url_for("estoque_producao.lista_produtos"))
-    produto.quantidade -= qtd
-    db.session.commit()
-    hist = Historico()
-    hist.product_id = produto.id
-    hist.product_name = produto.nome
-    hist.action = "saida"
-    hist.quantidade = qtd
-    hist.details = request.form.get("detalhes")
-    hist.usuario = current_user.username
-    db.session.add(hist)
-    db.session.commit()
+    publicar_estoque(produto, "saida", mov["quantidade"])
     registrar_evento(
-        "saída de estoque", produto=produto.nome, quantidade=qtd, descricao=(request.form.get("detalhes") or "").strip()
+        "saída de estoque",
+        produto=produto.nome,
+        quantidade=mov["quantidade"],
+        descricao=(request.form.get("detalhes") or "").strip(),
     )
-    if produto.quantidade == 0:
+    if mov["estoque"] == 0:
         registrar_evento("produto zerado", produto=produto.nome, quantidade=0)
     flash("Saída registrada!", "warning")
     return redirect(url_for("estoque_producao.lista_produtos"))
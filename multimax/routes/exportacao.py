@@ -31,7 +31,6 @@ from reportlab.platypus import (
 from ..models import CleaningHistory as CleaningHistoryModel
 from ..models import CleaningTask as CleaningTaskModel
 from ..models import (
-    Historico,
     MeatCarrier,
     MeatPart,
     MeatReception,
@@ -40,6 +39,7 @@ from ..models import (
     RecipeIngredient,
     User,
 )
+from ..services.movimentacao_resumo_service import serie_anual, serie_diaria, serie_mensal, serie_semanal
 
 matplotlib.use("Agg")
 
@@ -862,14 +862,6 @@ def exportar_graficos_produto(id):
         )
         story.append(Spacer(1, 0.3 * inch))
 
-        def fetch_hist(start_date=None, end_date=None):
-            q = Historico.query.filter(Historico.product_id == produto.id)
-            if start_date:
-                q = q.filter(Historico.data >= start_date)
-            if end_date:
-                q = q.filter(Historico.data <= end_date)
-            return q.order_by(Historico.data.asc()).all()
-
         def add_table(title, labels, entradas, saidas):
             data = [["Período", "Entradas", "Saídas"]]
             for i in range(max(len(labels), len(entradas), len(saidas))):
@@ -921,80 +913,17 @@ def exportar_graficos_produto(id):
             except Exception:
                 pass
 
-        def agg_weekly():
-            from datetime import date, timedelta
-
-            end = date.today()
-            start = end - timedelta(days=7 * 8)
-            hist = fetch_hist(datetime.combine(start, datetime.min.time()))
-            buckets = {}
-            cursor = start - timedelta(days=start.weekday())
-            while cursor <= end:
-                key = cursor
-                buckets[key] = {"entrada": 0, "saida": 0, "label": f"Semana {cursor.strftime('%d/%m')}"}
-                cursor += timedelta(days=7)
-            for h in hist:
-                d = h.data.date()
-                monday = d - timedelta(days=d.weekday())
-                if monday in buckets:
-                    buckets[monday][h.action] += h.quantidade or 0
-            items = [buckets[k] for k in sorted(buckets.keys())]
-            labels = [v["label"] for v in items]
-            entradas = [v["entrada"] for v in items]
-            saidas = [v["saida"] for v in items]
-            return labels, entradas, saidas
-
-        def agg_monthly():
-            from datetime import date
-
-            today = date.today()
-            buckets = {}
-            y, m = today.year, today.month
-            for i in range(11, -1, -1):
-                yy = y
-                mm = m - i
-                while mm <= 0:
-                    yy -= 1
-                    mm += 12
-                buckets[(yy, mm)] = {"entrada": 0, "saida": 0, "label": f"{mm:02d}/{yy}"}
-            hist = fetch_hist()
-            for h in hist:
-                k = (h.data.year, h.data.month)
-                if k in buckets:
-                    buckets[k][h.action] += h.quantidade or 0
-            items = [buckets[k] for k in sorted(buckets.keys())]
-            labels = [v["label"] for v in items]
-            entradas = [v["entrada"] for v in items]
-            saidas = [v["saida"] for v in items]
-            return labels, entradas, saidas
-
-        def agg_yearly():
-            from datetime import date
-
-            this = date.today().year
-            buckets = {yy: {"entrada": 0, "saida": 0, "label": str(yy)} for yy in range(this - 4, this + 1)}
-            hist = fetch_hist()
-            for h in hist:
-                yy = h.data.year
-                if yy in buckets:
-                    buckets[yy][h.action] += h.quantidade or 0
-            items = [buckets[yy] for yy in sorted(buckets.keys())]
-            labels = [v["label"] for v in items]
-            entradas = [v["entrada"] for v in items]
-            saidas = [v["saida"] for v in items]
-            return labels, entradas, saidas
-
-        labels, entradas, saidas = agg_weekly()
+        labels, entradas, saidas = serie_semanal(produto.id)
         add_bar_chart("Semanal (Últimas 8 semanas)", labels, entradas, saidas)
         add_table("Semanal (Últimas 8 semanas)", labels, entradas, saidas)
         story.append(PageBreak())
 
-        labels, entradas, saidas = agg_monthly()
+        labels, entradas, saidas = serie_mensal(produto.id)
         add_bar_chart("Mensal (Últimos 12 meses)", labels, entradas, saidas)
         add_table("Mensal (Últimos 12 meses)", labels, entradas, saidas)
         story.append(PageBreak())
 
-        labels, entradas, saidas = agg_yearly()
+        labels, entradas, saidas = serie_anual(produto.id)
         add_bar_chart("Anual (Últimos 5 anos)", labels, entradas, saidas)
         add_table("Anual (Últimos 5 anos)", labels, entradas, saidas)
 
@@ -1012,23 +941,7 @@ def exportar_graficos_produto(id):
             story.append(PageBreak())
             if di_dt > df_dt:
                 di_dt, df_dt = df_dt, di_dt
-            hist = fetch_hist(di_dt, df_dt)
-            from datetime import timedelta as _td
-
-            buckets = {}
-            cursor = di_dt.date()
-            while cursor <= df_dt.date():
-                buckets[cursor] = {"entrada": 0, "saida": 0, "label": cursor.strftime("%d/%m")}
-                cursor += _td(days=1)
-            items = [buckets[k] for k in sorted(buckets.keys())]
-            for h in hist:
-                d = h.data.date()
-                if d in buckets:
-                    buckets[d][h.action] += h.quantidade or 0
-            items = [buckets[k] for k in sorted(buckets.keys())]
-            labels = [v["label"] for v in items]
-            entradas = [v["entrada"] for v in items]
-            saidas = [v["saida"] for v in items]
+            labels, entradas, saidas = serie_diaria(produto.id, di_dt.date(), df_dt.date())
             add_bar_chart("Período Personalizado", labels, entradas, saidas)
             add_table("Período Personalizado", labels, entradas, saidas)
 
@@ -7,10 +7,14 @@ from sqlalchemy import func
 
 from .. import db
 from ..models import AppSetting as AppSettingModel
-from ..models import CleaningHistory, CleaningTask, Collaborator
+from ..models import CleaningTask, Collaborator
 from ..models import Historico as HistoricoModel
-from ..models import Holiday, MeatReception, NotificationRead, Produto, SystemLog, TimeOffRecord
+from ..models import Produto
 from ..module_registry import get_active_module_labels
+from ..optimizations import get_today_cached
+from ..services.atividade_service import COTAS_DASHBOARD, carregar_cotas
+from ..services.feriados_service import carnaval, feriados_do_ano, proximo_feriado
+from ..services.notificacoes_leitura_service import carregar as carregar_notificacoes
 
 bp = Blueprint("home", __name__, url_prefix="/home")
 
@@ -75,7 +79,7 @@ def get_dashboard_metrics():
         metrics["produtos_baixo_estoque"] = Produto.query.filter(
             Produto.estoque_minimo > 0, Produto.quantidade <= Produto.estoque_minimo
         ).count()
-        today = date.today()
+        today = get_today_cached()
         metrics["tarefas_atrasadas"] = CleaningTask.query.filter(CleaningTask.proxima_data < today).count()
         horizon = today + timedelta(days=7)
         metrics["tarefas_proximas"] = CleaningTask.query.filter(
@@ -107,7 +111,7 @@ def get_stock_chart_data():
     """Retorna dados para o gráfico de movimentações dos últimos 7 dias - otimizado"""
     data = {"labels": [], "entradas": [], "saidas": []}
     try:
-        today = date.today()
+        today = get_today_cached()
         inicio_7_dias = datetime.combine(today - timedelta(days=6), datetime.min.time())
         fim_hoje = datetime.combine(today, datetime.max.time())
 
@@ -316,6 +320,70 @@ def _build_rodizio_week_events(current_monday: date, open_ref: str) -> list[dict
     return events
 
 
+def _evento_atividade(item: dict) -> dict | None:
+    """Converte um item do feed de atividades em evento do calendário."""
+    fonte = item["fonte"]
+    inicio = item["data"].isoformat()
+    if fonte == "estoque":
+        t = "Entrada" if (item["evento"] or "").lower() == "entrada" else "Saída"
+        sign = "+" if t == "Entrada" else "-"
+        return {
+            "title": f"📦 {t}: {item['produto']} {sign}{item['quantidade'] or 0}",
+            "start": inicio,
+            "color": "#198754",
+            "url": url_for("estoque.editar", id=item["ref_id"]) if item["ref_id"] else None,
+        }
+    if fonte == "limpeza":
+        return {
+            "title": f"✅ Limpeza concluída: {item['produto']}",
+            "start": inicio,
+            "color": "#198754",
+            "url": url_for("cronograma.cronograma"),
+        }
+    if fonte == "carnes":
+        return {
+            "title": f"🥩 Recepção de carnes: {item['produto']} ({item['tipo']})",
+            "start": inicio,
+            "color": "#6c757d",
+            "url": url_for("carnes.index"),
+        }
+    if fonte == "sistema":
+        return {
+            "title": f"⚙️ {item['origem']}: {item['evento']}",
+            "start": inicio,
+            "color": "#6610f2",
+            "url": url_for("usuarios.monitor") if item["origem"] in ("Usuarios", "Sistema") else None,
+        }
+    if fonte == "folgas":
+        return {
+            "title": f"🏖️ Crédito de Folga: +{item['quantidade']}",
+            "start": item["data"].strftime("%Y-%m-%d"),
+            "color": "#ffa94d",
+            "url": url_for("colaboradores.escala"),
+        }
+    return None
+
+
+def _eventos_feriados(anos) -> list[dict[str, str]]:
+    """Eventos de feriados do calendário (lidos do feriados_service, sem recálculo por requisição)."""
+    events = []
+    for yy in anos:
+        events.append(
+            {"title": "🎉 Carnaval", "start": carnaval(yy).strftime("%Y-%m-%d"), "color": "#dc3545", "kind": "holiday"}
+        )
+        for h in feriados_do_ano(yy):
+            prefixo = "🎉 Feriado Nacional: " if h["kind"] == "nacional" else "🎉 Feriado: "
+            events.append(
+                {
+                    "title": f"{prefixo}{h['name']}",
+                    "start": h["date"].strftime("%Y-%m-%d"),
+                    "color": "#dc3545",
+                    "kind": "holiday",
+                }
+            )
+    return events
+
+
 @bp.after_app_request
 def _home_no_cache(response):
     try:
@@ -460,36 +528,25 @@ def dashboard_authenticated():  # noqa: C901 - função principal do dashboard a
             )
     except Exception:
         pass
-    # Estoque (Histórico)
+    # Atividades (estoque, limpeza concluída, carnes, sistema e créditos de folga), com cota por fonte
     try:
-        hist = HistoricoModel.query.order_by(HistoricoModel.data.desc()).limit(100).all()
-        for h in hist:
-            t = "Entrada" if (h.action or "").lower() == "entrada" else "Saída"
-            qty = h.quantidade or 0
-            sign = "+" if t == "Entrada" else "-"
-            events.append(
-                {
-                    "title": f"📦 {t}: {h.product_name} {sign}{qty}",
-                    "start": (h.data or datetime.utcnow()).isoformat(),
-                    "color": "#198754",
-                    "url": url_for("estoque.editar", id=h.product_id) if h.product_id else None,
-                }
-            )
+        itens = carregar_cotas(COTAS_DASHBOARD, user_id=getattr(current_user, "id", None))
+        events.extend(e for e in (_evento_atividade(item) for item in itens) if e)
     except Exception:
         pass
     try:
-        from datetime import date, timedelta
+        from datetime import timedelta
 
-        today = date.today()
+        today = get_today_cached()
         current_monday = today - timedelta(days=today.weekday())
         ref_monday, open_ref = _resolve_rodizio_reference(current_monday)
         events.extend(_build_rodizio_week_events(ref_monday, open_ref))
     except Exception:
         pass
     try:
-        from datetime import date, timedelta
+        from datetime import timedelta
 
-        today = date.today()
+        today = get_today_cached()
         horizon = today + timedelta(days=45)
         tasks = (
             CleaningTask.query.filter(CleaningTask.proxima_data.isnot(None), CleaningTask.proxima_data <= horizon)
@@ -509,172 +566,12 @@ def dashboard_authenticated():  # noqa: C901 - função principal do dashboard a
                 )
     except Exception:
         pass
-    # Limpeza concluída
-    try:
-        ch = CleaningHistory.query.order_by(CleaningHistory.data_conclusao.desc()).limit(50).all()
-        for c in ch:
-            events.append(
-                {
-                    "title": f"✅ Limpeza concluída: {c.nome_limpeza}",
-                    "start": (c.data_conclusao or datetime.utcnow()).isoformat(),
-                    "color": "#198754",
-                    "url": url_for("cronograma.cronograma"),
-                }
-            )
-    except Exception:
-        pass
-    # Carnes
-    try:
-        recs = MeatReception.query.order_by(MeatReception.data.desc()).limit(50).all()
-        for r in recs:
-            events.append(
-                {
-                    "title": f"🥩 Recepção de carnes: {r.fornecedor} ({r.tipo})",
-                    "start": (r.data or datetime.utcnow()).isoformat(),
-                    "color": "#6c757d",
-                    "url": url_for("carnes.index"),
-                }
-            )
-    except Exception:
-        pass
-    # Sistema
-    try:
-        logs = SystemLog.query.order_by(SystemLog.data.desc()).limit(50).all()
-        for lg in logs:
-            events.append(
-                {
-                    "title": f"⚙️ {lg.origem}: {lg.evento}",
-                    "start": (lg.data or datetime.utcnow()).isoformat(),
-                    "color": "#6610f2",
-                    "url": url_for("usuarios.monitor") if lg.origem in ("Usuarios", "Sistema") else None,
-                }
-            )
-    except Exception:
-        pass
-    # Feriados
-    try:
-        from datetime import date as _date
-
-        def _fixed(mm: int, dd: int, yy: int):
-            return _date(yy, mm, dd).strftime("%Y-%m-%d")
-
-        def _easter_date(yy: int):
-            a = yy % 19
-            b = yy // 100
-            c = yy % 100
-            d = (19 * a + b - (b // 4) - ((b + 8) // 25) + 15) % 30
-            e = (32 + 2 * (b % 4) + 2 * (c // 4) - d - (c % 4)) % 7
-            m = (d + e + 114) // 31
-            p = ((d + e + 114) % 31) + 1
-            return _date(yy, m, p)
-
-        def _movable_holidays(yy: int):
-            from datetime import timedelta as _td
-
-            easter = _easter_date(yy)
-            carnival = easter - _td(days=47)
-            good_friday = easter - _td(days=2)
-            corpus_christi = easter + _td(days=60)
-            return [
-                {"title": "🎉 Carnaval", "start": carnival.strftime("%Y-%m-%d"), "color": "#dc3545", "kind": "holiday"},
-                {
-                    "title": "✝️ Paixão de Cristo",
-                    "start": good_friday.strftime("%Y-%m-%d"),
-                    "color": "#dc3545",
-                    "kind": "holiday",
-                },
-                {
-                    "title": "✝️ Corpus Christi",
-                    "start": corpus_christi.strftime("%Y-%m-%d"),
-                    "color": "#dc3545",
-                    "kind": "holiday",
-                },
-            ]
-
-        def _federal_holidays(yy: int):
-            return [
-                {
-                    "title": "🎉 Feriado Nacional: Confraternização Universal",
-                    "start": _fixed(1, 1, yy),
-                    "color": "#dc3545",
-                    "kind": "holiday",
-                },
-                {
-                    "title": "🎉 Feriado Nacional: Tiradentes",
-                    "start": _fixed(4, 21, yy),
-                    "color": "#dc3545",
-                    "kind": "holiday",
-                },
-                {
-                    "title": "🎉 Feriado Nacional: Dia do Trabalho",
-                    "start": _fixed(5, 1, yy),
-                    "color": "#dc3545",
-                    "kind": "holiday",
-                },
-                {
-                    "title": "🎉 Feriado Nacional: Independência do Brasil",
-                    "start": _fixed(9, 7, yy),
-                    "color": "#dc3545",
-                    "kind": "holiday",
-                },
-                {
-                    "title": "🎉 Feriado Nacional: Nossa Senhora Aparecida",
-                    "start": _fixed(10, 12, yy),
-                    "color": "#dc3545",
-                    "kind": "holiday",
-                },
-                {
-                    "title": "🎉 Feriado Nacional: Finados",
-                    "start": _fixed(11, 2, yy),
-                    "color": "#dc3545",
-                    "kind": "holiday",
-                },
-                {
-                    "title": "🎉 Feriado Nacional: Proclamação da República",
-                    "start": _fixed(11, 15, yy),
-                    "color": "#dc3545",
-                    "kind": "holiday",
-                },
-                {
-                    "title": "🎉 Feriado Nacional: Natal",
-                    "start": _fixed(12, 25, yy),
-                    "color": "#dc3545",
-                    "kind": "holiday",
-                },
-            ]
-
-        years = []
-        try:
-            y0 = _date.today().year
-            years = [y0 - 1, y0, y0 + 1]
-        except Exception:
-            years = []
-        hols = []
-        for yy in years:
-            hols.extend(_federal_holidays(yy))
-            hols.extend(_movable_holidays(yy))
-        events.extend(hols)
-    except Exception:
-        pass
+    # Feriados (calendário pré-calculado; ano anterior, corrente e seguinte)
     try:
-        credits = (
-            TimeOffRecord.query.filter(TimeOffRecord.record_type == "folga_adicional")
-            .order_by(TimeOffRecord.date.desc())
-            .limit(100)
-            .all()
-        )
-        for lc in credits:
-            events.append(
-                {
-                    "title": f"🏖️ Crédito de Folga: +{lc.days}",
-                    "start": lc.date.strftime("%Y-%m-%d"),
-                    "color": "#ffa94d",
-                    "url": url_for("colaboradores.escala"),
-                }
-            )
+        y0 = get_today_cached().year
+        events.extend(_eventos_feriados(range(y0 - 1, y0 + 2)))
     except Exception:
         pass
-
     mural_text = ""
     try:
         s = AppSettingModel.query.filter_by(key="mural_text").first()
@@ -692,42 +589,25 @@ def dashboard_authenticated():  # noqa: C901 - função principal do dashboard a
     mural_html = _to_html(mural_text)
     next_holiday = None
     try:
-        from datetime import date as _date
-
-        today = _date.today()
-        nh = Holiday.query.filter(Holiday.date >= today).order_by(Holiday.date.asc()).first()
+        today = get_today_cached()
+        nh = proximo_feriado(today)
         if nh:
-            next_holiday = {"name": nh.name, "date_str": nh.date.strftime("%d/%m/%Y")}
+            next_holiday = {"name": nh["name"], "date_str": nh["date"].strftime("%d/%m/%Y")}
     except Exception:
         next_holiday = None
     notifications = []
     try:
-        crit = (
-            Produto.query.filter(
-                Produto.estoque_minimo.isnot(None),
-                Produto.estoque_minimo > 0,
-                Produto.quantidade <= Produto.estoque_minimo,
-            )
-            .order_by(Produto.nome.asc())
-            .limit(10)
-            .all()
-        )
-        for p in crit:
-            try:
-                is_read = (
-                    NotificationRead.query.filter_by(user_id=current_user.id, tipo="estoque", ref_id=p.id).first()
-                    is not None
-                )
-            except Exception:
-                is_read = False
-            if is_read:
-                continue
+        dados_notif, _ = carregar_notificacoes(current_user.id, get_today_cached())
+    except Exception:
+        dados_notif = {"estoque": [], "limpeza": []}
+    try:
+        for p in sorted(dados_notif["estoque"], key=lambda x: x["nome"] or ""):
             notifications.append(
                 {
-                    "id": p.id,
+                    "id": p["id"],
                     "type": "estoque",
-                    "title": f"Estoque crítico: {p.nome}",
-                    "subtitle": f"Disponível: {p.quantidade} • Mínimo: {p.estoque_minimo}",
+                    "title": f"Estoque crítico: {p['nome']}",
+                    "subtitle": f"Disponível: {p['quantidade']} • Mínimo: {p['estoque_minimo']}",
                     "color": "text-bg-danger",
                     "emoji": "⚠️",
                     "url": url_for("estoque.index"),
@@ -736,32 +616,13 @@ def dashboard_authenticated():  # noqa: C901 - função principal do dashboard a
     except Exception:
         pass
     try:
-        from datetime import date as _date
-        from datetime import timedelta as _td
-
-        horizon = _date.today() + _td(days=3)
-        tasks = (
-            CleaningTask.query.filter(CleaningTask.proxima_data.isnot(None), CleaningTask.proxima_data <= horizon)
-            .order_by(CleaningTask.proxima_data.asc())
-            .limit(10)
-            .all()
-        )
-        for t in tasks:
-            try:
-                is_read = (
-                    NotificationRead.query.filter_by(user_id=current_user.id, tipo="limpeza", ref_id=t.id).first()
-                    is not None
-                )
-            except Exception:
-                is_read = False
-            if is_read:
-                continue
+        for t in dados_notif["limpeza"]:
             notifications.append(
                 {
-                    "id": t.id,
+                    "id": t["id"],
                     "type": "limpeza",
-                    "title": f"Tarefa próxima: {t.nome_limpeza}",
-                    "subtitle": f"Prevista: {t.proxima_data.strftime('%d/%m/%Y')}",
+                    "title": f"Tarefa próxima: {t['nome']}",
+                    "subtitle": f"Prevista: {t['proxima_data'].strftime('%d/%m/%Y')}",
                     "color": "text-bg-warning",
                     "emoji": "📅",
                     "url": url_for("cronograma.cronograma"),
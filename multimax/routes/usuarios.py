@@ -7,7 +7,7 @@ from datetime import datetime
 from pathlib import Path
 from typing import Sequence, cast
 
-from flask import Blueprint, current_app, flash, redirect, render_template, request, url_for
+from flask import Blueprint, current_app, flash, jsonify, redirect, render_template, request, url_for
 from flask_login import current_user, login_required
 
 from .. import db
@@ -15,10 +15,8 @@ from ..models import (
     AppSetting,
     ArticleVote,
     Ciclo,
-    CleaningHistory,
     CleaningTask,
     Collaborator,
-    Historico,
     Holiday,
     JobRole,
     MeatReception,
@@ -36,6 +34,10 @@ from ..models import (
     Vacation,
 )
 from ..password_hash import check_password_hash, generate_password_hash
+from ..services.api_chave_service import gerar_chave, invalidar_usuario, revogar_chaves
+from ..services.atividade_service import FONTES_GESTAO, carregar_feed, serializar
+from ..services.notificacoes_leitura_service import invalidar_cache as invalidar_notificacoes
+from ..services.timeoff_balance_service import calcular_snapshots, snapshot_vazio
 
 bp = Blueprint("usuarios", __name__)
 
@@ -378,48 +380,14 @@ def _perfil_shift_hour_guess(shift_type: str):
 
 
 def _collect_logs():
-    hist_estoque = Historico.query.order_by(Historico.data.desc()).limit(50).all()
-    hist_limpeza = CleaningHistory.query.order_by(CleaningHistory.data_conclusao.desc()).limit(50).all()
-    hist_sistema = SystemLog.query.order_by(SystemLog.data.desc()).limit(50).all()
-    logs = []
-    for h in hist_estoque:
-        logs.append(
-            {
-                "data": h.data,
-                "origem": "Estoque",
-                "evento": h.action,
-                "detalhes": h.details,
-                "usuario": h.usuario,
-                "produto": h.product_name,
-                "quantidade": h.quantidade,
-            }
-        )
-    for h in hist_limpeza:
-        logs.append(
-            {
-                "data": h.data_conclusao,
-                "origem": "Limpeza",
-                "evento": "conclusao",
-                "detalhes": h.observacao,
-                "usuario": h.usuario_conclusao,
-                "produto": h.nome_limpeza,
-                "quantidade": None,
-            }
-        )
-    for s in hist_sistema:
-        logs.append(
-            {
-                "data": s.data,
-                "origem": s.origem,
-                "evento": s.evento,
-                "detalhes": s.detalhes,
-                "usuario": s.usuario,
-                "produto": None,
-                "quantidade": None,
-            }
-        )
-    logs.sort(key=lambda x: x["data"], reverse=True)
-    return logs
+    """
+    Cabeça do feed de atividades (estoque, limpeza e sistema), em cache por usuário.
+
+    Returns:
+        (itens, cursor) — o cursor alimenta o "carregar mais" (/gestao/atividades) da última página.
+    """
+    feed = carregar_feed(FONTES_GESTAO, limite=150, user_id=getattr(current_user, "id", None))
+    return feed["itens"], feed["proximo_cursor"]
 
 
 def _collaborators_with_display(q: str):
@@ -520,9 +488,8 @@ def _access_logs_context(acc_user: str):
 
 
 def _gestao_bank_context(colaboradores, per_page: int):
-    from sqlalchemy import func
-
     bank_balances = {}
+    snapshots = {}
     saldo_collab = None
     saldo_hours = None
     saldo_days = None
@@ -531,14 +498,10 @@ def _gestao_bank_context(colaboradores, per_page: int):
     saldo_end = None
 
     try:
-        sums = (
-            db.session.query(TimeOffRecord.collaborator_id, func.coalesce(func.sum(TimeOffRecord.hours), 0.0))
-            .filter(TimeOffRecord.record_type == "horas")
-            .group_by(TimeOffRecord.collaborator_id)
-            .all()
-        )
-        for cid, total in sums:
-            bank_balances[int(cid)] = float(total or 0.0)
+        # Uma consulta agregada para horas e folgas de todos os colaboradores
+        snapshots = calcular_snapshots()
+        for cid, snap in snapshots.items():
+            bank_balances[cid] = snap["horas"]
 
         scid = request.args.get("saldo_collaborator_id", type=int)
         saldo_start, saldo_end = _parse_saldo_dates()
@@ -548,7 +511,7 @@ def _gestao_bank_context(colaboradores, per_page: int):
         bank_balances = {}
 
     recent_entries = _recent_hour_entries()
-    folgas = _calculate_folgas(colaboradores)
+    folgas = _calculate_folgas(colaboradores, snapshots)
 
     bh_collab_id = request.args.get("bh_collaborator_id", type=int)
     bh_page = _safe_int_arg("bh_page", 1)
@@ -768,34 +731,15 @@ def _recent_hour_entries():
         return []
 
 
-def _calculate_folgas(colaboradores):
-    from sqlalchemy import func
-
+def _calculate_folgas(colaboradores, snapshots=None):
+    """Saldo líquido de folgas (crédito - usadas - convertidas) de cada colaborador."""
     folgas = []
     try:
+        if snapshots is None:
+            snapshots = calcular_snapshots([c.id for c in colaboradores])
         for c in colaboradores:
-            try:
-                credits_sum = (
-                    db.session.query(func.coalesce(func.sum(TimeOffRecord.days), 0))
-                    .filter(TimeOffRecord.collaborator_id == c.id, TimeOffRecord.record_type == "folga_adicional")
-                    .scalar()
-                    or 0
-                )
-                assigned_sum = (
-                    db.session.query(func.coalesce(func.sum(TimeOffRecord.days), 0))
-                    .filter(TimeOffRecord.collaborator_id == c.id, TimeOffRecord.record_type == "folga_usada")
-                    .scalar()
-                    or 0
-                )
-                converted_sum = (
-                    db.session.query(func.coalesce(func.sum(TimeOffRecord.days), 0))
-                    .filter(TimeOffRecord.collaborator_id == c.id, TimeOffRecord.record_type == "conversao")
-                    .scalar()
-                    or 0
-                )
-                folgas.append({"collab": c, "balance": int(credits_sum) - int(assigned_sum) - int(converted_sum)})
-            except Exception:
-                continue
+            snap = snapshots.get(c.id) or snapshot_vazio()
+            folgas.append({"collab": c, "balance": snap["folgas_saldo"]})
     except Exception as e:
         import logging
 
@@ -1132,7 +1076,7 @@ def update_password(user_id):
     new_password = request.form.get("new_password", "").strip()
     if not new_password:
         flash("Informe a nova senha.", "warning")
-        return redirect(url_for("usuarios.users"))
+        return redirect(url_for("usuarios.gestao"))
     try:
         user.password_hash = generate_password_hash(new_password)
         log = SystemLog()
@@ -1170,7 +1114,7 @@ def reset_password(user_id):
     except Exception as e:
         db.session.rollback()
         flash(f"Erro ao redefinir senha: {e}", "danger")
-    return redirect(url_for("usuarios.users"))
+    return redirect(url_for("usuarios.gestao"))
 
 
 @bp.route("/users/<int:user_id>/nivel", methods=["POST"])
@@ -1197,6 +1141,7 @@ def update_level(user_id):
         log.usuario = current_user.name
         db.session.add(log)
         db.session.commit()
+        invalidar_usuario(user.id)
         flash(f'Nivel do usuário "{user.name}" atualizado para "{nivel}".', "info")
     except Exception as e:
         db.session.rollback()
@@ -1204,6 +1149,42 @@ def update_level(user_id):
     return redirect(url_for("usuarios.gestao"))
 
 
+@bp.route("/users/<int:user_id>/api_key", methods=["POST"])
+@login_required
+def api_key_user(user_id):
+    """Gera (substituindo a anterior) ou revoga a chave de API do usuário."""
+    if current_user.nivel not in ("admin", "DEV"):
+        flash("Você não tem permissão para gerenciar chaves de API.", "danger")
+        return redirect(url_for("estoque.index"))
+    user = User.query.get_or_404(user_id)
+    if user.nivel in ("admin", "DEV") and current_user.nivel != "DEV" and user.id != current_user.id:
+        flash("Apenas o desenvolvedor pode gerenciar chaves de administradores.", "danger")
+        return redirect(url_for("usuarios.gestao"))
+    revogar = request.form.get("acao") == "revogar"
+    try:
+        chave = None
+        if revogar:
+            revogar_chaves(user.id)
+        else:
+            chave = gerar_chave(user.id)
+        log = SystemLog()
+        log.origem = "Usuarios"
+        log.evento = "api_key"
+        log.detalhes = f"Chave de API {'revogada' if revogar else 'gerada'} para {user.username}"
+        log.usuario = current_user.name
+        db.session.add(log)
+        db.session.commit()
+        invalidar_usuario(user.id)
+        if chave:
+            flash(f'Chave de API de "{user.name}" (copie agora, não será exibida de novo): {chave}', "warning")
+        else:
+            flash(f'Chave de API de "{user.name}" revogada.', "info")
+    except Exception as e:
+        db.session.rollback()
+        flash(f"Erro ao gerenciar chave de API: {e}", "danger")
+    return redirect(url_for("usuarios.gestao"))
+
+
 @bp.route("/users/<int:user_id>/excluir", methods=["POST"])
 @login_required
 def excluir_user(user_id):
@@ -1212,12 +1193,12 @@ def excluir_user(user_id):
         return redirect(url_for("estoque.index"))
     if current_user.id == user_id:
         flash("Você não pode excluir sua própria conta.", "warning")
-        return redirect(url_for("usuarios.users"))
+        return redirect(url_for("usuarios.gestao"))
     user = User.query.get_or_404(user_id)
     # Apenas DEV pode excluir administradores
     if user.nivel in ("admin", "DEV") and current_user.nivel != "DEV":
         flash("Apenas o desenvolvedor pode excluir administradores.", "danger")
-        return redirect(url_for("usuarios.users"))
+        return redirect(url_for("usuarios.gestao"))
     try:
         # Remover registros relacionados antes de excluir o usuário
         # 1. Desvincular colaborador (setar user_id como NULL)
@@ -1241,6 +1222,9 @@ def excluir_user(user_id):
         # 7. Atualizar mudanças de registro de jornada (setar changed_by como NULL)
         RegistroJornadaChange.query.filter_by(changed_by=user_id).update({"changed_by": None})
 
+        # 8. Revogar chaves de API
+        revogar_chaves(user_id)
+
         # Agora podemos excluir o usuário com segurança
         db.session.delete(user)
 
@@ -1251,11 +1235,12 @@ def excluir_user(user_id):
         log.usuario = current_user.name
         db.session.add(log)
         db.session.commit()
+        invalidar_usuario(user_id)
         flash(f'Usuário "{user.name}" excluído com sucesso.', "success")
     except Exception as e:
         db.session.rollback()
         flash(f"Erro ao excluir usuário: {e}", "danger")
-    return redirect(url_for("usuarios.users"))
+    return redirect(url_for("usuarios.gestao"))
 
 
 @bp.route("/monitor")
@@ -1285,6 +1270,7 @@ def notifications_read():
                 nr.ref_id = ref_id
                 db.session.add(nr)
                 db.session.commit()
+                invalidar_notificacoes(current_user.id)
         except Exception:
             db.session.rollback()
     return redirect(nxt)
@@ -1300,6 +1286,7 @@ def notifications_unread():
         try:
             NotificationRead.query.filter_by(user_id=current_user.id, tipo=tipo, ref_id=ref_id).delete()
             db.session.commit()
+            invalidar_notificacoes(current_user.id)
         except Exception:
             db.session.rollback()
     return redirect(nxt)
@@ -1312,6 +1299,7 @@ def notifications_unread_all():
     try:
         NotificationRead.query.filter_by(user_id=current_user.id).delete()
         db.session.commit()
+        invalidar_notificacoes(current_user.id)
     except Exception:
         db.session.rollback()
     return redirect(nxt)
@@ -1360,6 +1348,7 @@ def notifications_read_all():
                 nr.ref_id = t.id
                 db.session.add(nr)
         db.session.commit()
+        invalidar_notificacoes(current_user.id)
     except Exception:
         try:
             db.session.rollback()
@@ -1421,6 +1410,19 @@ def perfil_senha():
     return redirect(url_for("usuarios.perfil"))
 
 
+@bp.route("/gestao/atividades", methods=["GET"])
+@login_required
+def gestao_atividades():
+    """Carregar mais: próxima página do feed de atividades a partir do cursor."""
+    if current_user.nivel not in ("admin", "DEV"):
+        return jsonify({"ok": False, "error": "Acesso negado"}), 403
+    limite = _safe_int_arg("limite", 50)
+    pagina = carregar_feed(FONTES_GESTAO, limite=limite, cursor=request.args.get("cursor"), user_id=current_user.id)
+    return jsonify(
+        {"ok": True, "itens": [serializar(i) for i in pagina["itens"]], "proximo_cursor": pagina["proximo_cursor"]}
+    )
+
+
 @bp.route("/gestao", methods=["GET"])
 @login_required
 def gestao():
@@ -1433,7 +1435,7 @@ def gestao():
 
     u_page = _safe_int_arg("u_page", 1)
     l_page = _safe_int_arg("l_page", 1)
-    logs = _collect_logs()
+    logs, logs_cursor = _collect_logs()
     logs_page, l_total_pages, l_page = _paginate_list(logs, l_page, 2)
 
     # Buscar todos os usuários (com ou sem collaborator)
@@ -1463,6 +1465,7 @@ def gestao():
         "gestao.html",
         active_page="gestao",
         logs_page=logs_page,
+        logs_cursor=logs_cursor if l_page >= l_total_pages else None,
         l_page=l_page,
         l_total_pages=l_total_pages,
         users_page=users_page,
@@ -0,0 +1,173 @@
+"""
+Autenticação da API por chave (header X-API-Key) com cache em memória.
+
+Só o SHA-256 da chave fica no banco (UserApiKey). Cada chamada autenticada por chave
+consultava User por esse hash; agora o hash é mapeado para um PrincipalApi (id,
+username, name, nivel) num cache LRU limitado e com TTL, de modo que integrações que
+chamam a API em sequência não pagam uma consulta por requisição.
+
+O cache é invalidado por usuário sempre que nível ou chave mudam (usuarios.update_level,
+geração/revogação de chave) e na exclusão do usuário. As rotas invalidam depois do
+commit, para que uma requisição concorrente não repovoe o cache com o estado antigo.
+O TTL limita o atraso em outros processos.
+
+Configuração por variável de ambiente:
+
+    API_KEY_CACHE_MAX   entradas no cache (default: 256)
+    API_KEY_CACHE_TTL   segundos de validade de cada entrada (default: 60)
+"""
+
+import hashlib
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from sqlalchemy import delete, select
+
+from .. import db
+from ..models import User, UserApiKey
+
+CACHE_MAX_PADRAO = 256
+CACHE_TTL_PADRAO = 60.0
+PREFIXO_CHAVE = "mmx_"
+
+
+@dataclass(frozen=True)
+class PrincipalApi:
+    """Usuário autenticado por chave, sem sessão ORM (seguro para guardar entre requisições)."""
+
+    id: int
+    username: str
+    name: str
+    nivel: str
+
+    @property
+    def is_authenticated(self) -> bool:
+        return True
+
+
+class CacheChaves:
+    """LRU com TTL de hash da chave -> PrincipalApi (thread-safe)."""
+
+    def __init__(self, max_itens: int = CACHE_MAX_PADRAO, ttl_s: float = CACHE_TTL_PADRAO):
+        self.max_itens = max_itens
+        self.ttl_s = ttl_s
+        self._itens: "OrderedDict[str, tuple[PrincipalApi, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+        self.invalidacoes = 0
+
+    def obter(self, key_hash: str) -> Optional[PrincipalApi]:
+        with self._lock:
+            item = self._itens.get(key_hash)
+            if item is not None and item[1] > time.monotonic():
+                self._itens.move_to_end(key_hash)
+                self.acertos += 1
+                return item[0]
+            if item is not None:
+                del self._itens[key_hash]
+            self.falhas += 1
+            return None
+
+    def guardar(self, key_hash: str, principal: PrincipalApi) -> None:
+        with self._lock:
+            self._itens[key_hash] = (principal, time.monotonic() + self.ttl_s)
+            self._itens.move_to_end(key_hash)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def invalidar_usuario(self, user_id: int) -> int:
+        with self._lock:
+            chaves = [h for h, (principal, _) in self._itens.items() if principal.id == user_id]
+            for h in chaves:
+                del self._itens[h]
+            self.invalidacoes += len(chaves)
+            return len(chaves)
+
+    def limpar(self, zerar_contadores: bool = False) -> None:
+        with self._lock:
+            self._itens.clear()
+            if zerar_contadores:
+                self.acertos = self.falhas = self.invalidacoes = 0
+
+    def estatisticas(self) -> dict[str, Any]:
+        with self._lock:
+            total = self.acertos + self.falhas
+            return {
+                "itens": len(self._itens),
+                "max_itens": self.max_itens,
+                "ttl_s": self.ttl_s,
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "invalidacoes": self.invalidacoes,
+                "taxa_acerto": round(self.acertos / total, 4) if total else None,
+            }
+
+
+def _env_num(nome: str, padrao, tipo=float):
+    try:
+        valor = tipo(str(os.getenv(nome, "")).strip())
+        return valor if valor > 0 else padrao
+    except ValueError:
+        return padrao
+
+
+cache = CacheChaves(
+    _env_num("API_KEY_CACHE_MAX", CACHE_MAX_PADRAO, int),
+    _env_num("API_KEY_CACHE_TTL", CACHE_TTL_PADRAO),
+)
+
+
+def hash_chave(chave: str) -> str:
+    return hashlib.sha256(chave.encode()).hexdigest()
+
+
+def autenticar(chave: Optional[str]) -> Optional[PrincipalApi]:
+    """Resolve a chave para o usuário dono (cache primeiro; no miss, uma consulta com join)."""
+    if not chave:
+        return None
+    key_hash = hash_chave(chave)
+    principal = cache.obter(key_hash)
+    if principal is not None:
+        return principal
+    linha = db.session.execute(
+        select(User.id, User.username, User.name, User.nivel)
+        .join(UserApiKey, UserApiKey.user_id == User.id)
+        .where(UserApiKey.key_hash == key_hash)
+    ).first()
+    if linha is None:
+        return None
+    principal = PrincipalApi(*linha)
+    cache.guardar(key_hash, principal)
+    return principal
+
+
+def gerar_chave(user_id: int) -> str:
+    """
+    Substitui a chave do usuário por uma nova e retorna o texto puro (exibido uma única vez).
+
+    Não faz commit; após o commit chame invalidar_usuario(user_id).
+    """
+    chave = PREFIXO_CHAVE + secrets.token_urlsafe(32)
+    revogar_chaves(user_id)
+    db.session.add(UserApiKey(user_id=user_id, key_hash=hash_chave(chave)))
+    return chave
+
+
+def revogar_chaves(user_id: int) -> None:
+    """Remove as chaves do usuário (sem commit)."""
+    db.session.execute(delete(UserApiKey).where(UserApiKey.user_id == user_id))
+
+
+def invalidar_usuario(user_id: int) -> int:
+    """Descarta do cache os principals do usuário; retorna quantas entradas saíram."""
+    return cache.invalidar_usuario(user_id)
+
+
+def estatisticas() -> dict[str, Any]:
+    return cache.estatisticas()
@@ -0,0 +1,343 @@
+"""
+Feed unificado de atividades (estoque, limpeza, sistema, carnes e créditos de folga).
+
+Cada fonte é lida já ordenada por (tempo desc, id desc), em blocos com paginação por
+chave, e as fontes são intercaladas preguiçosamente com heapq.merge: para montar uma
+página de N itens cada fonte lê no máximo N+1 linhas, sem ordenar listas em Python.
+
+O cursor de "carregar mais" é opaco (tempo, fonte, id do último item entregue). A
+cabeça do feed (primeira página, sem cursor) fica em cache por usuário por alguns
+segundos, para /gestao e o dashboard não remontarem o mesmo feed a cada requisição.
+
+O calendário do dashboard usa carregar_cotas(): cada fonte entra com a sua própria
+cota (COTAS_DASHBOARD), para que uma rajada de SystemLog não empurre as demais fontes
+para fora do calendário como aconteceria com um único limite sobre o feed intercalado.
+
+Configuração por variável de ambiente:
+
+    ATIVIDADE_FEED_TTL   segundos de cache da cabeça do feed por usuário (default: 5; 0 desativa)
+"""
+
+import base64
+import heapq
+import itertools
+import os
+import threading
+import time
+from datetime import date, datetime
+from typing import Any, Callable, Iterable, Iterator, Optional
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import and_, or_, select
+
+from .. import db
+from ..models import CleaningHistory, Historico, MeatReception, SystemLog, TimeOffRecord
+
+TZ = ZoneInfo("America/Sao_Paulo")
+TTL_PADRAO = 5.0
+LIMITE_MAXIMO = 500
+MAX_ENTRADAS_CACHE = 256
+
+FONTES_GESTAO = ("estoque", "limpeza", "sistema")
+FONTES_DASHBOARD = ("estoque", "limpeza", "carnes", "sistema", "folgas")
+# itens por fonte no calendário do dashboard
+COTAS_DASHBOARD = {"estoque": 100, "limpeza": 50, "carnes": 50, "sistema": 50, "folgas": 100}
+
+_cache: dict[tuple, tuple[float, Any]] = {}
+_lock = threading.Lock()
+
+
+def _item(fonte: str, linha, data: datetime, **campos) -> dict[str, Any]:
+    item = {
+        "fonte": fonte,
+        "id": linha.id,
+        "data": data,
+        "origem": None,
+        "evento": None,
+        "detalhes": None,
+        "usuario": None,
+        "produto": None,
+        "quantidade": None,
+        "ref_id": None,
+        "tipo": None,
+    }
+    item.update(campos)
+    return item
+
+
+def _mapear_estoque(h, data):
+    return _item(
+        "estoque",
+        h,
+        data,
+        origem="Estoque",
+        evento=h.action,
+        detalhes=h.details,
+        usuario=h.usuario,
+        produto=h.product_name,
+        quantidade=h.quantidade,
+        ref_id=h.product_id,
+    )
+
+
+def _mapear_limpeza(c, data):
+    return _item(
+        "limpeza",
+        c,
+        data,
+        origem="Limpeza",
+        evento="conclusao",
+        detalhes=c.observacao,
+        usuario=c.usuario_conclusao,
+        produto=c.nome_limpeza,
+        ref_id=c.task_id,
+    )
+
+
+def _mapear_sistema(s, data):
+    return _item("sistema", s, data, origem=s.origem, evento=s.evento, detalhes=s.detalhes, usuario=s.usuario)
+
+
+def _mapear_carnes(r, data):
+    return _item(
+        "carnes", r, data, origem="Carnes", evento="recepcao", detalhes=r.observacao, produto=r.fornecedor, tipo=r.tipo
+    )
+
+
+def _mapear_folgas(f, data):
+    return _item(
+        "folgas",
+        f,
+        data,
+        origem="Folgas",
+        evento="folga_adicional",
+        detalhes=f.notes,
+        usuario=f.created_by,
+        quantidade=f.days,
+        ref_id=f.collaborator_id,
+    )
+
+
+# fonte -> (coluna de tempo, colunas lidas, filtros fixos, mapeador)
+FONTES: dict[str, tuple[Any, tuple, tuple, Callable]] = {
+    "estoque": (
+        Historico.data,
+        (
+            Historico.id,
+            Historico.data,
+            Historico.action,
+            Historico.details,
+            Historico.usuario,
+            Historico.product_name,
+            Historico.quantidade,
+            Historico.product_id,
+        ),
+        (),
+        _mapear_estoque,
+    ),
+    "limpeza": (
+        CleaningHistory.data_conclusao,
+        (
+            CleaningHistory.id,
+            CleaningHistory.data_conclusao,
+            CleaningHistory.observacao,
+            CleaningHistory.usuario_conclusao,
+            CleaningHistory.nome_limpeza,
+            CleaningHistory.task_id,
+        ),
+        (),
+        _mapear_limpeza,
+    ),
+    "sistema": (
+        SystemLog.data,
+        (SystemLog.id, SystemLog.data, SystemLog.origem, SystemLog.evento, SystemLog.detalhes, SystemLog.usuario),
+        (),
+        _mapear_sistema,
+    ),
+    "carnes": (
+        MeatReception.data,
+        (MeatReception.id, MeatReception.data, MeatReception.fornecedor, MeatReception.tipo, MeatReception.observacao),
+        (),
+        _mapear_carnes,
+    ),
+    "folgas": (
+        TimeOffRecord.date,
+        (
+            TimeOffRecord.id,
+            TimeOffRecord.date,
+            TimeOffRecord.days,
+            TimeOffRecord.notes,
+            TimeOffRecord.created_by,
+            TimeOffRecord.collaborator_id,
+        ),
+        (TimeOffRecord.record_type == "folga_adicional",),
+        _mapear_folgas,
+    ),
+}
+
+
+def ttl_cache() -> float:
+    """Segundos de cache definidos em ATIVIDADE_FEED_TTL."""
+    try:
+        return max(0.0, float(str(os.getenv("ATIVIDADE_FEED_TTL", "")).strip()))
+    except ValueError:
+        return TTL_PADRAO
+
+
+def _normalizar(valor) -> datetime:
+    """Horário local (America/Sao_Paulo) sem fuso, para comparar fontes DateTime e Date entre si."""
+    if isinstance(valor, datetime):
+        if valor.tzinfo is not None:
+            return valor.astimezone(TZ).replace(tzinfo=None)
+        return valor
+    return datetime.combine(valor, datetime.min.time())
+
+
+def _chave(item: dict[str, Any]) -> tuple:
+    return item["data"], item["fonte"], item["id"]
+
+
+def codificar_cursor(item: dict[str, Any]) -> str:
+    """Cursor opaco (tempo, fonte, id) do último item entregue."""
+    bruto = f"{item['data'].isoformat()}|{item['fonte']}|{item['id']}"
+    return base64.urlsafe_b64encode(bruto.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decodificar_cursor(cursor: Optional[str]) -> Optional[tuple[datetime, str, int]]:
+    """Decodifica o cursor; None quando ausente ou inválido (volta para o início do feed)."""
+    if not cursor:
+        return None
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        momento, fonte, item_id = bruto.split("|", 2)
+        return datetime.fromisoformat(momento), fonte, int(item_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def _ler_fonte(fonte: str, apos: Optional[tuple] = None, lote: int = 100) -> Iterator[dict[str, Any]]:
+    """
+    Itens de uma fonte em ordem (tempo desc, id desc), lidos em blocos de `lote` linhas.
+
+    Entre blocos a paginação é por chave nos valores crus do banco. Com `apos` (chave de
+    cursor), a primeira consulta usa tempo <= cursor e os empates já entregues são
+    descartados aqui ao comparar a chave normalizada.
+    """
+    coluna, colunas, filtros, mapear = FONTES[fonte]
+    id_col = colunas[0]
+    base = select(*colunas).where(coluna.isnot(None), *filtros)
+    if apos is not None:
+        limite_tempo = apos[0].date() if isinstance(coluna.type, db.Date) else apos[0].replace(tzinfo=TZ)
+        base = base.where(coluna <= limite_tempo)
+
+    ultimo = None
+    while True:
+        query = base
+        if ultimo is not None:
+            tempo, ultimo_id = ultimo
+            query = query.where(or_(coluna < tempo, and_(coluna == tempo, id_col < ultimo_id)))
+        linhas = db.session.execute(query.order_by(coluna.desc(), id_col.desc()).limit(lote)).all()
+        for linha in linhas:
+            item = mapear(linha, _normalizar(linha[1]))
+            if apos is None or _chave(item) < apos:
+                yield item
+        if len(linhas) < lote:
+            return
+        ultimo = (linhas[-1][1], linhas[-1][0])
+
+
+def iterar_feed(
+    fontes: Iterable[str] = FONTES_DASHBOARD, cursor: Optional[str] = None, lote: int = 100
+) -> Iterator[dict[str, Any]]:
+    """Feed intercalado de todas as fontes, do mais recente para o mais antigo (preguiçoso)."""
+    apos = decodificar_cursor(cursor)
+    if apos is not None:
+        apos = (apos[0].replace(tzinfo=None), apos[1], apos[2])
+    fluxos = [_ler_fonte(f, apos, lote) for f in dict.fromkeys(fontes) if f in FONTES]
+    return heapq.merge(*fluxos, key=_chave, reverse=True)
+
+
+def _pagina(fontes: tuple[str, ...], limite: int, cursor: Optional[str]) -> dict[str, Any]:
+    itens = []
+    proximo = None
+    for item in iterar_feed(fontes, cursor, lote=limite + 1):
+        if len(itens) == limite:
+            proximo = codificar_cursor(itens[-1])
+            break
+        itens.append(item)
+    return {"itens": itens, "proximo_cursor": proximo}
+
+
+def carregar_feed(
+    fontes: Iterable[str] = FONTES_DASHBOARD,
+    limite: int = 50,
+    cursor: Optional[str] = None,
+    user_id: Optional[int] = None,
+) -> dict[str, Any]:
+    """
+    Página do feed de atividades.
+
+    Sem cursor e com user_id, a página é servida do cache por usuário (ATIVIDADE_FEED_TTL).
+
+    Returns:
+        dict com itens (dicts com fonte, id, data, origem, evento, detalhes, usuario, produto,
+        quantidade, ref_id, tipo) e proximo_cursor (None no fim do feed).
+    """
+    fontes = tuple(dict.fromkeys(fontes))
+    limite = max(1, min(int(limite or 50), LIMITE_MAXIMO))
+    if cursor:
+        return _pagina(fontes, limite, cursor)
+    resultado = _em_cache((user_id, fontes, limite), lambda: _pagina(fontes, limite, None))
+    return {"itens": list(resultado["itens"]), "proximo_cursor": resultado["proximo_cursor"]}
+
+
+def carregar_cotas(cotas: dict[str, int], user_id: Optional[int] = None) -> list[dict[str, Any]]:
+    """
+    Os `cota` itens mais recentes de cada fonte, intercalados do mais recente para o mais antigo.
+
+    Cada fonte lê no máximo a sua cota; a lista fica em cache por usuário como a cabeça do feed.
+    """
+    cotas = {f: max(0, min(int(n), LIMITE_MAXIMO)) for f, n in cotas.items() if f in FONTES}
+
+    def montar():
+        fluxos = [itertools.islice(_ler_fonte(f, lote=n or 1), n) for f, n in cotas.items()]
+        return list(heapq.merge(*fluxos, key=_chave, reverse=True))
+
+    return list(_em_cache((user_id, "cotas", tuple(sorted(cotas.items()))), montar))
+
+
+def _em_cache(chave: tuple, montar: Callable[[], Any]) -> Any:
+    """Resultado de montar() em cache por ATIVIDADE_FEED_TTL; chave[0] é o usuário (None não usa cache)."""
+    ttl = ttl_cache()
+    if chave[0] is None or ttl <= 0:
+        return montar()
+    agora = time.monotonic()
+    with _lock:
+        em_cache = _cache.get(chave)
+    if em_cache and em_cache[0] > agora:
+        return em_cache[1]
+
+    resultado = montar()
+    with _lock:
+        if len(_cache) >= MAX_ENTRADAS_CACHE:
+            for k in [k for k, (expira, _) in _cache.items() if expira <= agora] or list(_cache)[:1]:
+                _cache.pop(k, None)
+        _cache[chave] = (agora + ttl, resultado)
+    return resultado
+
+
+def limpar_cache(user_id: Optional[int] = None) -> None:
+    """Descarta a cabeça em cache de um usuário (ou de todos)."""
+    with _lock:
+        if user_id is None:
+            _cache.clear()
+        else:
+            for k in [k for k in _cache if k[0] == user_id]:
+                _cache.pop(k, None)
+
+
+def serializar(item: dict[str, Any]) -> dict[str, Any]:
+    """Item do feed pronto para JSON (data em ISO 8601)."""
+    dados = dict(item)
+    dados["data"] = item["data"].isoformat() if isinstance(item["data"], (datetime, date)) else item["data"]
+    return dados
@@ -0,0 +1,250 @@
+"""
+Backup online do banco SQLite via API de backup (sqlite3.Connection.backup).
+
+A cópia é feita em passos de N páginas com uma pausa entre eles, de forma que o
+lock de leitura no banco de origem é liberado entre os passos e as threads de
+requisição não ficam travadas. O arquivo é gravado num temporário e movido
+atomicamente para o destino (nunca fica um backup "rasgado" no diretório).
+
+Opcionalmente o resultado é comprimido em streaming (gzip, ou zstd quando o pacote
+`zstandard` estiver instalado). Configuração por variáveis de ambiente:
+
+    BACKUP_PAGES_PER_STEP   páginas copiadas por passo (default: 1024)
+    BACKUP_STEP_SLEEP_MS    pausa entre passos em ms (default: 20)
+    BACKUP_COMPRESSION      none/gzip/zstd (default: none)
+"""
+
+import gzip
+import os
+import shutil
+import sqlite3
+import time
+from typing import Any, Callable, Optional
+
+try:
+    import zstandard  # type: ignore
+except Exception:
+    zstandard = None
+
+COMPRESSOES = ("none", "gzip", "zstd")
+EXTENSOES_BACKUP = (".sqlite", ".sqlite.gz", ".sqlite.zst")
+PAGINAS_POR_PASSO_PADRAO = 1024
+PAUSA_PADRAO_MS = 20
+MAX_REINICIOS = 3  # Reinícios tolerados (origem alterada durante a cópia) antes de copiar em passo único
+CHUNK_COMPRESSAO = 1024 * 1024
+
+
+class _MuitosReinicios(Exception):
+    pass
+
+
+def eh_arquivo_backup(nome: str) -> bool:
+    """Indica se o nome corresponde a um backup (.sqlite, .sqlite.gz ou .sqlite.zst)."""
+    return isinstance(nome, str) and nome.lower().endswith(EXTENSOES_BACKUP)
+
+
+def _env_int(nome: str, padrao: int) -> int:
+    try:
+        return int(str(os.getenv(nome, "")).strip())
+    except ValueError:
+        return padrao
+
+
+def compressao_configurada() -> str:
+    """Compressão definida em BACKUP_COMPRESSION (zstd cai para gzip se indisponível)."""
+    valor = str(os.getenv("BACKUP_COMPRESSION", "none")).strip().lower()
+    if valor not in COMPRESSOES:
+        valor = "none"
+    if valor == "zstd" and zstandard is None:
+        valor = "gzip"
+    return valor
+
+
+def _copiar_paginado(origem: sqlite3.Connection, destino: sqlite3.Connection, paginas: int, pausa_s: float) -> int:
+    """Executa a API de backup em passos; retorna o total de páginas copiadas."""
+    estado = {"restantes": None, "reinicios": 0, "total": 0}
+
+    def _progresso(status, restantes, total):
+        # 'restantes' volta a crescer quando a origem é alterada por outra conexão e a cópia reinicia
+        if estado["restantes"] is not None and restantes > estado["restantes"]:
+            estado["reinicios"] += 1
+            if estado["reinicios"] > MAX_REINICIOS:
+                raise _MuitosReinicios()
+        estado["restantes"] = restantes
+        estado["total"] = total
+        if restantes and pausa_s > 0:
+            time.sleep(pausa_s)
+
+    try:
+        origem.backup(destino, pages=paginas, progress=_progresso)
+    except _MuitosReinicios:
+        # Banco muito ativo: um único passo (em WAL, leitores não bloqueiam escritores)
+        origem.backup(destino, pages=-1)
+    return int(estado["total"] or 0)
+
+
+def _comprimir(origem_path: str, destino_path: str, compressao: str) -> None:
+    """Comprime o arquivo em blocos (streaming), sem carregar o banco em memória."""
+    with open(origem_path, "rb") as fin:
+        if compressao == "zstd" and zstandard is not None:
+            with open(destino_path, "wb") as fout:
+                with zstandard.ZstdCompressor(level=3).stream_writer(fout) as writer:
+                    shutil.copyfileobj(fin, writer, CHUNK_COMPRESSAO)
+        else:
+            with gzip.open(destino_path, "wb", compresslevel=6) as fout:
+                shutil.copyfileobj(fin, fout, CHUNK_COMPRESSAO)
+
+
+def descomprimir_para(origem_path: str, destino_path: str) -> None:
+    """Copia um backup para destino_path, descomprimindo .gz/.zst quando necessário."""
+    nome = origem_path.lower()
+    if nome.endswith(".gz"):
+        with gzip.open(origem_path, "rb") as fin, open(destino_path, "wb") as fout:
+            shutil.copyfileobj(fin, fout, CHUNK_COMPRESSAO)
+    elif nome.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError("Pacote zstandard não instalado para restaurar backup .zst")
+        with open(origem_path, "rb") as fin, open(destino_path, "wb") as fout:
+            zstandard.ZstdDecompressor().copy_stream(fin, fout)
+    else:
+        shutil.copy2(origem_path, destino_path)
+
+
+class BackupInvalido(Exception):
+    """O arquivo de backup não descomprime ou não passa no PRAGMA quick_check."""
+
+
+def _remover(*paths: str) -> None:
+    for path in paths:
+        if os.path.exists(path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def restaurar_backup(origem_path: str, db_path: str, fechar_conexoes: Optional[Callable[[], None]] = None) -> None:
+    """
+    Substitui o banco por um backup (descomprimindo se necessário) sem arriscar o banco atual.
+
+    1. O backup é descomprimido em db_path + ".restore-tmp" e validado com PRAGMA quick_check;
+       um .gz/.zst truncado ou corrompido levanta BackupInvalido e o banco atual fica intacto.
+    2. fechar_conexoes() (ex.: db.engine.dispose) é chamado só agora, logo antes da troca,
+       para que nenhuma conexão do pool fique aberta sobre os arquivos -wal/-shm.
+    3. O WAL do banco atual é esvaziado (checkpoint), o arquivo validado entra no lugar com
+       os.replace() e, só então, -wal/-shm são removidos (um -wal antigo seria reaplicado
+       sobre o banco restaurado).
+    """
+    tmp_path = db_path + ".restore-tmp"
+    try:
+        try:
+            descomprimir_para(origem_path, tmp_path)
+            conn = sqlite3.connect(tmp_path)
+            try:
+                resultado = [linha[0] for linha in conn.execute("PRAGMA quick_check").fetchall()]
+            finally:
+                conn.close()
+        except (OSError, EOFError, sqlite3.DatabaseError) as e:
+            raise BackupInvalido(f"Backup ilegível: {e}") from e
+        if resultado != ["ok"]:
+            raise BackupInvalido(f"Backup reprovado no quick_check: {'; '.join(map(str, resultado[:5]))}")
+
+        if fechar_conexoes is not None:
+            fechar_conexoes()
+        if os.path.exists(db_path):
+            try:
+                conn = sqlite3.connect(db_path)
+                try:
+                    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                finally:
+                    conn.close()
+            except sqlite3.Error:
+                pass
+        os.replace(tmp_path, db_path)
+        _remover(db_path + "-wal", db_path + "-shm")
+    finally:
+        _remover(tmp_path, tmp_path + "-wal", tmp_path + "-shm", tmp_path + "-journal")
+
+
+def executar_backup(
+    db_path: str,
+    destino: str,
+    paginas_por_passo: Optional[int] = None,
+    pausa_ms: Optional[int] = None,
+    compressao: Optional[str] = None,
+) -> dict[str, Any]:
+    """
+    Cria um backup consistente de db_path em destino usando a API de backup do SQLite.
+
+    Args:
+        db_path: Caminho do banco SQLite de origem
+        destino: Caminho do backup (.sqlite); com compressão recebe o sufixo .gz/.zst
+        paginas_por_passo: Páginas por passo (default: BACKUP_PAGES_PER_STEP)
+        pausa_ms: Pausa entre passos (default: BACKUP_STEP_SLEEP_MS)
+        compressao: 'none', 'gzip' ou 'zstd' (default: BACKUP_COMPRESSION)
+
+    Returns:
+        dict com path, bytes (arquivo final), db_bytes, pages, duration_s,
+        throughput_mb_s (sobre o tamanho do banco) e compression.
+    """
+    if paginas_por_passo is None:
+        paginas_por_passo = _env_int("BACKUP_PAGES_PER_STEP", PAGINAS_POR_PASSO_PADRAO)
+    if pausa_ms is None:
+        pausa_ms = _env_int("BACKUP_STEP_SLEEP_MS", PAUSA_PADRAO_MS)
+    compressao = compressao_configurada() if compressao is None else compressao
+    if compressao == "zstd" and zstandard is None:
+        compressao = "gzip"
+    if compressao not in COMPRESSOES:
+        compressao = "none"
+
+    inicio = time.perf_counter()
+    tmp_path = f"{destino}.tmp"
+    try:
+        origem = sqlite3.connect(db_path)
+        try:
+            dest = sqlite3.connect(tmp_path)
+            try:
+                paginas = _copiar_paginado(origem, dest, max(1, int(paginas_por_passo)), max(0, pausa_ms) / 1000.0)
+                # Backup autocontido: sem depender de arquivos -wal/-shm ao ser restaurado
+                dest.execute("PRAGMA journal_mode=DELETE")
+            finally:
+                dest.close()
+        finally:
+            origem.close()
+
+        db_bytes = os.path.getsize(tmp_path)
+        if compressao == "none":
+            final_path = destino
+            os.replace(tmp_path, final_path)
+        else:
+            final_path = destino + (".zst" if compressao == "zstd" else ".gz")
+            tmp_comp = f"{final_path}.tmp"
+            _comprimir(tmp_path, tmp_comp, compressao)
+            os.replace(tmp_comp, final_path)
+            os.remove(tmp_path)
+    finally:
+        for resto in (tmp_path, f"{destino}.gz.tmp", f"{destino}.zst.tmp"):
+            if os.path.exists(resto):
+                try:
+                    os.remove(resto)
+                except OSError:
+                    pass
+
+    # Remove variante antiga do mesmo backup (ex.: backup-24h.sqlite após ativar compressão)
+    for variante in (destino, destino + ".gz", destino + ".zst"):
+        if variante != final_path and os.path.exists(variante):
+            try:
+                os.remove(variante)
+            except OSError:
+                pass
+
+    duracao = time.perf_counter() - inicio
+    return {
+        "path": final_path,
+        "bytes": os.path.getsize(final_path),
+        "db_bytes": db_bytes,
+        "pages": paginas,
+        "duration_s": round(duracao, 3),
+        "throughput_mb_s": round((db_bytes / (1024 * 1024)) / duracao, 2) if duracao > 0 else None,
+        "compression": compressao,
+    }
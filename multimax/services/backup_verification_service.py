@@ -0,0 +1,319 @@
+"""
+Verificação real de backups SQLite.
+
+Cada backup é aberto somente leitura (URI ``mode=ro``) e passa por
+``PRAGMA quick_check`` (ou ``integrity_check``); em seguida as tabelas principais
+(ciclo, collaborator, produto) são contadas e comparadas com o banco em uso.
+
+O painel não espera a verificação: agendar_verificacao() dispara uma thread de
+fundo (uma verificação por vez) que lê os arquivos, grava as linhas de
+BackupVerification e deixa o resumo em estado_verificacao(), consultado pela
+página até o trabalho terminar. O módulo sqlite3 libera o GIL enquanto o PRAGMA
+percorre o arquivo, então as threads do waitress continuam atendendo. O
+resultado da parte cara (integridade + contagens do backup) fica em cache pela
+chave (arquivo, mtime, tamanho); só a comparação com o banco atual é refeita.
+
+Configuração por variáveis de ambiente:
+
+    BACKUP_VERIFY_MODE       quick/full (default: quick = quick_check)
+    BACKUP_VERIFY_MIN_RATIO  fração mínima de linhas do backup em relação ao banco atual (default: 0.5)
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+import uuid
+from datetime import datetime
+from typing import Any, Optional
+
+from flask import Flask
+from sqlalchemy import text
+
+from .. import db
+from ..models import BackupVerification
+from .backup_service import descomprimir_para, eh_arquivo_backup
+
+TABELAS_CHAVE = ("ciclo", "collaborator", "produto")
+MODOS = {"quick": "quick_check", "full": "integrity_check"}
+RAZAO_MINIMA_PADRAO = 0.5
+MAX_ERROS_INTEGRIDADE = 5
+
+_cache: dict[str, tuple[int, int, dict[str, Any]]] = {}
+_cache_lock = threading.Lock()
+
+_trabalho: dict[str, Any] = {}
+_trabalho_lock = threading.Lock()
+
+
+def _env_float(nome: str, padrao: float) -> float:
+    try:
+        return float(str(os.getenv(nome, "")).strip())
+    except ValueError:
+        return padrao
+
+
+def modo_configurado() -> str:
+    """PRAGMA usado na verificação ('quick_check' ou 'integrity_check')."""
+    return MODOS.get(str(os.getenv("BACKUP_VERIFY_MODE", "quick")).strip().lower(), "quick_check")
+
+
+def verificar_arquivo(path: str, pragma: str = "quick_check", tabelas: tuple[str, ...] = TABELAS_CHAVE) -> dict:
+    """
+    Verifica um arquivo de backup.
+
+    Backups .gz/.zst são descomprimidos num temporário antes da verificação.
+
+    Returns:
+        dict com ok, integrity (lista de mensagens do PRAGMA), counts (tabela -> linhas
+        ou None se ausente) e error (mensagem, quando o arquivo não pôde ser lido).
+    """
+    if pragma not in MODOS.values():
+        pragma = "quick_check"
+    tmp_path = None
+    alvo = path
+    try:
+        if not path.lower().endswith(".sqlite"):
+            fd, tmp_path = tempfile.mkstemp(suffix=".sqlite", prefix="verify-")
+            os.close(fd)
+            descomprimir_para(path, tmp_path)
+            alvo = tmp_path
+
+        with open(alvo, "rb") as f:
+            if not f.read(16).startswith(b"SQLite format 3"):
+                return {"ok": False, "integrity": [], "counts": {}, "error": "Formato SQLite inválido"}
+
+        conn = sqlite3.connect(f"file:{alvo}?mode=ro", uri=True)
+        try:
+            linhas = conn.execute(f"PRAGMA {pragma}({MAX_ERROS_INTEGRIDADE})").fetchall()
+            integridade = [str(r[0]) for r in linhas]
+            consulta = conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+            existentes = {r[0] for r in consulta.fetchall()}
+            contagens: dict[str, Optional[int]] = {}
+            for tabela in tabelas:
+                if tabela in existentes:
+                    contagens[tabela] = int(conn.execute(f'SELECT COUNT(*) FROM "{tabela}"').fetchone()[0])
+                else:
+                    contagens[tabela] = None
+        finally:
+            conn.close()
+        return {"ok": integridade == ["ok"], "integrity": integridade, "counts": contagens, "error": None}
+    except Exception as e:
+        return {"ok": False, "integrity": [], "counts": {}, "error": str(e)}
+    finally:
+        if tmp_path and os.path.exists(tmp_path):
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+
+def limpar_cache() -> None:
+    """Descarta resultados em cache."""
+    with _cache_lock:
+        _cache.clear()
+
+
+def contagens_atuais(session, tabelas: tuple[str, ...] = TABELAS_CHAVE) -> dict[str, Optional[int]]:
+    """Conta as linhas das tabelas principais no banco em uso."""
+    contagens: dict[str, Optional[int]] = {}
+    for tabela in tabelas:
+        try:
+            contagens[tabela] = int(session.execute(text(f'SELECT COUNT(*) FROM "{tabela}"')).scalar() or 0)
+        except Exception:
+            session.rollback()
+            contagens[tabela] = None
+    return contagens
+
+
+def avaliar(bruto: dict, atuais: dict[str, Optional[int]], razao_minima: float) -> tuple[str, str]:
+    """
+    Converte o resultado de verificar_arquivo em (status, mensagem) de BackupVerification.
+
+    - corrupted: arquivo ilegível ou quick_check/integrity_check com erros
+    - failed: tabela principal ausente, vazia ou bem menor que no banco atual
+    - verified: caso contrário
+    """
+    if bruto.get("error"):
+        return "corrupted", bruto["error"]
+    if not bruto.get("ok"):
+        return "corrupted", "; ".join(bruto.get("integrity") or ["Falha na verificação de integridade"])
+
+    problemas = []
+    resumo = []
+    for tabela, atual in atuais.items():
+        no_backup = (bruto.get("counts") or {}).get(tabela)
+        if no_backup is None:
+            problemas.append(f"tabela {tabela} ausente")
+            continue
+        resumo.append(f"{tabela}={no_backup}/{atual if atual is not None else '?'}")
+        if atual and no_backup < atual * razao_minima:
+            problemas.append(f"{tabela} com {no_backup} linhas (banco atual: {atual})")
+    if problemas:
+        return "failed", "; ".join(problemas)
+    return "verified", "Integridade ok; linhas (backup/atual): " + ", ".join(resumo)
+
+
+def _chave(path: str) -> Optional[tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _listar_backups(bdir: str) -> list[tuple[str, str, tuple[int, int]]]:
+    """(nome, caminho, (mtime_ns, tamanho)) de cada arquivo de backup do diretório."""
+    arquivos = []
+    for nome in sorted(os.listdir(bdir)):
+        path = os.path.join(bdir, nome)
+        if os.path.isfile(path) and eh_arquivo_backup(nome):
+            chave = _chave(path)
+            if chave is not None:
+                arquivos.append((nome, path, chave))
+    return arquivos
+
+
+def _verificar_com_cache(arquivos, pragma: str) -> dict[str, tuple[dict, bool]]:
+    """Resultado bruto de cada arquivo (path -> (resultado, veio_do_cache)); só verifica o que mudou."""
+    brutos: dict[str, tuple[dict, bool]] = {}
+    for _, path, chave in arquivos:
+        with _cache_lock:
+            em_cache = _cache.get(path)
+        if em_cache and em_cache[:2] == chave and em_cache[2].get("pragma") == pragma:
+            brutos[path] = (em_cache[2], True)
+            continue
+        bruto = verificar_arquivo(path, pragma)
+        bruto["pragma"] = pragma
+        brutos[path] = (bruto, False)
+        with _cache_lock:
+            _cache[path] = (chave[0], chave[1], bruto)
+    return brutos
+
+
+def verificar_backups(bdir: str, session, pragma: Optional[str] = None) -> list[dict[str, Any]]:
+    """
+    Verifica todos os backups do diretório (retorna quando todos foram lidos).
+
+    Chamado pela thread de agendar_verificacao(); as rotas não o chamam direto.
+
+    Args:
+        bdir: Diretório de backups
+        session: Sessão SQLAlchemy do banco em uso (para as contagens atuais)
+        pragma: 'quick_check' ou 'integrity_check' (default: BACKUP_VERIFY_MODE)
+
+    Returns:
+        Lista de dicts com filename, size, status, message, method, counts e cached.
+    """
+    if not bdir or not os.path.isdir(bdir):
+        return []
+    pragma = pragma if pragma in MODOS.values() else modo_configurado()
+    razao_minima = _env_float("BACKUP_VERIFY_MIN_RATIO", RAZAO_MINIMA_PADRAO)
+
+    arquivos = _listar_backups(bdir)
+    brutos = _verificar_com_cache(arquivos, pragma)
+    atuais = contagens_atuais(session)
+    resultados = []
+    for nome, path, chave in arquivos:
+        bruto, cached = brutos[path]
+        status, mensagem = avaliar(bruto, atuais, razao_minima)
+        resultados.append(
+            {
+                "filename": nome,
+                "size": chave[1],
+                "status": status,
+                "message": mensagem,
+                "method": pragma,
+                "counts": bruto.get("counts") or {},
+                "cached": cached,
+            }
+        )
+    return resultados
+
+
+def registrar_verificacoes(verificacoes: list[dict[str, Any]], session) -> list[dict[str, Any]]:
+    """
+    Grava uma linha de BackupVerification por arquivo verificado (sem commit).
+
+    Returns:
+        Resumo por arquivo (filename, status, message, counts, cached) para o painel.
+    """
+    resumo = []
+    for verificacao in verificacoes:
+        registro = BackupVerification()
+        registro.backup_filename = verificacao["filename"]
+        registro.backup_size = verificacao["size"]
+        registro.verification_status = verificacao["status"]
+        registro.verification_method = verificacao["method"] + (" (cache)" if verificacao["cached"] else "")
+        registro.error_message = verificacao["message"] if verificacao["status"] != "verified" else None
+        registro.verified_by = "system"
+        session.add(registro)
+        resumo.append(
+            {
+                "filename": verificacao["filename"],
+                "status": verificacao["status"],
+                "message": verificacao["message"],
+                "counts": verificacao["counts"],
+                "cached": verificacao["cached"],
+            }
+        )
+    return resumo
+
+
+def estado_verificacao() -> Optional[dict[str, Any]]:
+    """
+    Cópia do estado da última verificação agendada (None se nenhuma foi agendada).
+
+    Campos: id, status ('executando', 'concluida' ou 'erro'), iniciado_em,
+    concluido_em, resultados (lista de registrar_verificacoes) e erro.
+    """
+    with _trabalho_lock:
+        return dict(_trabalho) if _trabalho else None
+
+
+def agendar_verificacao(app: Flask, bdir: str) -> dict[str, Any]:
+    """
+    Agenda a verificação de todos os backups numa thread de fundo e retorna na hora.
+
+    Se já houver uma verificação em andamento, não inicia outra: devolve o estado
+    da que está rodando.
+    """
+    with _trabalho_lock:
+        if _trabalho.get("status") == "executando":
+            return dict(_trabalho)
+        _trabalho.clear()
+        _trabalho.update(
+            {
+                "id": uuid.uuid4().hex,
+                "status": "executando",
+                "iniciado_em": datetime.now().isoformat(timespec="seconds"),
+                "concluido_em": None,
+                "resultados": [],
+                "erro": None,
+            }
+        )
+        estado = dict(_trabalho)
+    threading.Thread(
+        target=_executar_verificacao, args=(app, bdir, estado["id"]), name="backup-verify", daemon=True
+    ).start()
+    return estado
+
+
+def _concluir(id_trabalho: str, **campos) -> None:
+    with _trabalho_lock:
+        if _trabalho.get("id") == id_trabalho:
+            campos["concluido_em"] = datetime.now().isoformat(timespec="seconds")
+            _trabalho.update(campos)
+
+
+def _executar_verificacao(app: Flask, bdir: str, id_trabalho: str) -> None:
+    with app.app_context():
+        try:
+            resultados = registrar_verificacoes(verificar_backups(bdir, db.session), db.session)
+            db.session.commit()
+            _concluir(id_trabalho, status="concluida", resultados=resultados)
+        except Exception as e:
+            db.session.rollback()
+            _concluir(id_trabalho, status="erro", erro=str(e))
+        finally:
+            db.session.remove()
@@ -0,0 +1,358 @@
+"""
+Busca global (/api/v1/search): uma única lista ranqueada sobre produtos, colaboradores,
+receitas, tarefas de limpeza e recebimentos de carne.
+
+No SQLite, o índice é a tabela virtual FTS5 `busca_global` (tokenizer unicode61 sem
+acentos), com uma linha por registro: rowid = id * len(TIPOS) + código do tipo, texto =
+coluna `busca` do registro (services/busca_service). Uma consulta MATCH com prefixo por
+token ("lingu tosc" -> "lingu"* "tosc"*) ordenada por bm25 devolve os (tipo, id) mais
+relevantes; os registros são então carregados com um IN por tipo presente.
+
+Sem FTS5 (Postgres ou SQLite compilado sem o módulo), a mesma lista sai de um UNION ALL
+sobre as colunas `busca`, com filtro() e relevancia() do busca_service.
+
+Manutenção:
+    - a tabela FTS5 é criada/removida junto com db.create_all()/db.drop_all();
+    - after_insert/after_update/after_delete atualizam a linha do registro na mesma
+      transação do flush. Só escritas pelo flush do ORM passam por esses eventos: um
+      update()/insert()/delete() do Core (ou bulk do ORM) sobre essas tabelas não atualiza
+      o índice; quem grava assim chama atualizar_linhas() (busca_service.preencher já chama)
+      ou reindexar();
+    - `flask busca-reindexar` (ou reindexar()) recalcula as colunas `busca` e reconstrói
+      o índice com um INSERT ... SELECT por tabela; na inicialização, um índice vazio com
+      tabelas populadas é reconstruído automaticamente (preparar_indice).
+
+A latência de cada consulta fica em `metricas` (janela das últimas consultas, por
+backend), exposta em /db/busca/metricas e no header Server-Timing da API.
+"""
+
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Callable, Optional
+
+import click
+from sqlalchemy import event, literal, literal_column, select, table, text, union_all
+
+from .. import db
+from ..models import CleaningTask, Collaborator, MeatReception, Produto, Recipe
+from . import busca_service
+
+TABELA = "busca_global"
+LIMITE_RESULTADOS = 10
+
+# Código fixo de cada tipo (compõe o rowid do índice; não reordenar)
+TIPOS = {
+    "produto": (0, Produto),
+    "colaborador": (1, Collaborator),
+    "receita": (2, Recipe),
+    "limpeza": (3, CleaningTask),
+    "recepcao": (4, MeatReception),
+}
+_TIPO_POR_CODIGO = {codigo: tipo for tipo, (codigo, _) in TIPOS.items()}
+_TIPO_POR_MODELO = {modelo: tipo for tipo, (_, modelo) in TIPOS.items()}
+
+_fts_por_banco: dict[str, bool] = {}
+
+
+class MetricasBusca:
+    """Latência (ms) das últimas consultas da busca global (thread-safe)."""
+
+    def __init__(self, janela: int = 500):
+        self._latencias: deque[float] = deque(maxlen=janela)
+        self._lock = threading.Lock()
+        self.consultas = 0
+        self.por_backend: Counter = Counter()
+        self.ultima_ms: Optional[float] = None
+
+    def registrar(self, backend: str, ms: float) -> None:
+        with self._lock:
+            self._latencias.append(ms)
+            self.consultas += 1
+            self.por_backend[backend] += 1
+            self.ultima_ms = ms
+
+    def zerar(self) -> None:
+        with self._lock:
+            self._latencias.clear()
+            self.consultas = 0
+            self.por_backend.clear()
+            self.ultima_ms = None
+
+    def estatisticas(self) -> dict[str, Any]:
+        with self._lock:
+            amostra = sorted(self._latencias)
+            por_backend = dict(self.por_backend)
+            consultas, ultima = self.consultas, self.ultima_ms
+
+        def percentil(p: float) -> Optional[float]:
+            return amostra[min(len(amostra) - 1, int(p * len(amostra)))] if amostra else None
+
+        return {
+            "consultas": consultas,
+            "por_backend": por_backend,
+            "janela": len(amostra),
+            "media_ms": round(sum(amostra) / len(amostra), 2) if amostra else None,
+            "p50_ms": percentil(0.5),
+            "p95_ms": percentil(0.95),
+            "max_ms": amostra[-1] if amostra else None,
+            "ultima_ms": ultima,
+        }
+
+
+metricas = MetricasBusca()
+
+
+# ---------------------------------------------------------------------------
+# Tabela FTS5: ciclo de vida junto com o metadata
+# ---------------------------------------------------------------------------
+
+
+def _chave_banco(connection) -> str:
+    return str(connection.engine.url)
+
+
+@event.listens_for(db.metadata, "after_create")
+def _criar_tabela_fts(target, connection, **kw) -> None:
+    disponivel = False
+    if connection.dialect.name == "sqlite":
+        try:
+            with connection.begin_nested():
+                connection.exec_driver_sql(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA} USING fts5("
+                    "texto, tokenize = 'unicode61 remove_diacritics 2')"
+                )
+            disponivel = True
+        except Exception:
+            disponivel = False  # SQLite sem FTS5: fica o fallback SQL
+    _fts_por_banco[_chave_banco(connection)] = disponivel
+
+
+@event.listens_for(db.metadata, "before_drop")
+def _remover_tabela_fts(target, connection, **kw) -> None:
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {TABELA}")
+    _fts_por_banco[_chave_banco(connection)] = False
+
+
+def fts_ativo(connection=None) -> bool:
+    connection = connection if connection is not None else db.session.connection()
+    chave = _chave_banco(connection)
+    if chave not in _fts_por_banco:
+        _fts_por_banco[chave] = connection.dialect.name == "sqlite" and bool(
+            connection.exec_driver_sql(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (TABELA,)
+            ).scalar()
+        )
+    return _fts_por_banco[chave]
+
+
+# ---------------------------------------------------------------------------
+# Manutenção incremental
+# ---------------------------------------------------------------------------
+
+
+def _rowid(tipo: str, ref_id: int) -> int:
+    return ref_id * len(TIPOS) + TIPOS[tipo][0]
+
+
+def _indexar(mapper, connection, target) -> None:
+    if not fts_ativo(connection):
+        return
+    rowid = _rowid(_TIPO_POR_MODELO[type(target)], target.id)
+    connection.exec_driver_sql(f"DELETE FROM {TABELA} WHERE rowid = ?", (rowid,))
+    if target.busca:
+        connection.exec_driver_sql(f"INSERT INTO {TABELA} (rowid, texto) VALUES (?, ?)", (rowid, target.busca))
+
+
+def _desindexar(mapper, connection, target) -> None:
+    if fts_ativo(connection):
+        rowid = _rowid(_TIPO_POR_MODELO[type(target)], target.id)
+        connection.exec_driver_sql(f"DELETE FROM {TABELA} WHERE rowid = ?", (rowid,))
+
+
+for _modelo in _TIPO_POR_MODELO:
+    event.listen(_modelo, "after_insert", _indexar)
+    event.listen(_modelo, "after_update", _indexar)
+    event.listen(_modelo, "after_delete", _desindexar)
+
+
+def atualizar_linhas(modelo, linhas: list[tuple[int, Optional[str]]]) -> None:
+    """Reflete no índice FTS5 valores de `busca` gravados sem o flush do ORM: [(id, busca), ...]."""
+    tipo = _TIPO_POR_MODELO.get(modelo)
+    if tipo is None or not linhas or not fts_ativo():
+        return
+    db.session.execute(
+        text(f"DELETE FROM {TABELA} WHERE rowid = :rowid"), [{"rowid": _rowid(tipo, i)} for i, _ in linhas]
+    )
+    novas = [{"rowid": _rowid(tipo, i), "texto": busca} for i, busca in linhas if busca]
+    if novas:
+        db.session.execute(text(f"INSERT INTO {TABELA} (rowid, texto) VALUES (:rowid, :texto)"), novas)
+
+
+def reindexar() -> int:
+    """Recalcula as colunas `busca` e reconstrói o índice FTS5 (com commit); retorna quantos registros indexou."""
+    total = busca_service.preencher(list(_TIPO_POR_MODELO), todos=True, indexar=False)
+    if fts_ativo():
+        db.session.execute(text(f"DELETE FROM {TABELA}"))
+        total = 0
+        for codigo, modelo in TIPOS.values():
+            total += (
+                db.session.execute(
+                    text(
+                        f"INSERT INTO {TABELA} (rowid, texto) SELECT id * :n + :codigo, busca "
+                        f"FROM {modelo.__tablename__} WHERE busca IS NOT NULL AND busca <> ''"
+                    ),
+                    {"n": len(TIPOS), "codigo": codigo},
+                ).rowcount
+                or 0
+            )
+    db.session.commit()
+    return total
+
+
+def preparar_indice() -> int:
+    """Na inicialização: reconstrói o índice FTS5 se ele estiver vazio e houver registros; retorna quantos indexou."""
+    if not fts_ativo():
+        return 0
+    if db.session.execute(text(f"SELECT 1 FROM {TABELA} LIMIT 1")).first():
+        return 0
+    if not any(db.session.query(m.id).limit(1).first() for m in _TIPO_POR_MODELO):
+        return 0
+    return reindexar()
+
+
+def registrar_cli(app) -> None:
+    @app.cli.command("busca-reindexar")
+    def busca_reindexar():
+        """Reconstrói o índice da busca global."""
+        click.echo(f"{reindexar()} registros indexados")
+
+
+# ---------------------------------------------------------------------------
+# Consulta
+# ---------------------------------------------------------------------------
+
+
+def _expressao_match(partes: list[str]) -> str:
+    return " ".join('"' + t.replace('"', '""') + '"*' for t in partes)
+
+
+def ids_por_termo(modelo, partes: list[str]):
+    """
+    SELECT dos ids de `modelo` em que cada token é prefixo de alguma palavra, resolvido no índice
+    FTS5 (para busca_service.filtro). None se o modelo não está no índice ou não há FTS5.
+    """
+    tipo = _TIPO_POR_MODELO.get(modelo)
+    if tipo is None or not partes or not fts_ativo():
+        return None
+    rowid = literal_column("rowid")
+    return (
+        select(rowid.op("/")(len(TIPOS)))
+        .select_from(table(TABELA))
+        .where(
+            literal_column(TABELA).op("MATCH")(_expressao_match(partes)),
+            rowid.op("%")(len(TIPOS)) == TIPOS[tipo][0],
+        )
+    )
+
+
+def _consultar_fts(termo: str, limite: int) -> list[tuple[str, int]]:
+    linhas = db.session.execute(
+        text(f"SELECT rowid FROM {TABELA} WHERE {TABELA} MATCH :q ORDER BY rank LIMIT :limite"),
+        {"q": _expressao_match(busca_service.tokens(termo)), "limite": limite},
+    ).scalars()
+    return [(_TIPO_POR_CODIGO[rowid % len(TIPOS)], rowid // len(TIPOS)) for rowid in linhas]
+
+
+def _consultar_sql(termo: str, limite: int) -> list[tuple[str, int]]:
+    partes = [
+        select(
+            literal(tipo).label("tipo"),
+            modelo.id.label("ref_id"),
+            busca_service.relevancia(modelo.busca, termo).label("relevancia"),
+            modelo.busca.label("busca"),
+        ).where(busca_service.filtro(modelo.busca, termo))
+        for tipo, (_, modelo) in TIPOS.items()
+    ]
+    uniao = union_all(*partes).subquery()
+    stmt = select(uniao.c.tipo, uniao.c.ref_id).order_by(uniao.c.relevancia, uniao.c.busca).limit(limite)
+    return [(tipo, int(ref_id)) for tipo, ref_id in db.session.execute(stmt)]
+
+
+def _resultado_produto(p: Produto) -> dict:
+    return {
+        "icon": "box-seam",
+        "title": p.nome,
+        "subtitle": f"Código: {p.codigo} | Estoque: {p.quantidade}",
+        "url": f"/estoque/editar/{p.id}",
+    }
+
+
+def _resultado_colaborador(c: Collaborator) -> dict:
+    return {"icon": "person", "title": c.name, "subtitle": c.role or "Colaborador", "url": "/colaboradores/escala"}
+
+
+def _resultado_receita(r: Recipe) -> dict:
+    return {"icon": "journal-text", "title": r.nome, "subtitle": "Receita", "url": f"/receitas/{r.id}"}
+
+
+def _resultado_limpeza(t: CleaningTask) -> dict:
+    proxima = t.proxima_data.strftime("%d/%m/%Y") if t.proxima_data else "-"
+    return {
+        "icon": "calendar-check",
+        "title": t.nome_limpeza,
+        "subtitle": f"Limpeza {t.frequencia} | Próxima: {proxima}",
+        "url": "/cronograma",
+    }
+
+
+def _resultado_recepcao(r: MeatReception) -> dict:
+    data = r.data.strftime("%d/%m/%Y") if r.data else "-"
+    return {
+        "icon": "basket",
+        "title": f"Recebimento {r.fornecedor}",
+        "subtitle": f"{r.tipo} | {data}",
+        "url": f"/carnes/relatorio/{r.id}",
+    }
+
+
+_FORMATADORES: dict[str, Callable[[Any], dict]] = {
+    "produto": _resultado_produto,
+    "colaborador": _resultado_colaborador,
+    "receita": _resultado_receita,
+    "limpeza": _resultado_limpeza,
+    "recepcao": _resultado_recepcao,
+}
+
+
+def _carregar(encontrados: list[tuple[str, int]]) -> list[dict]:
+    """Carrega os registros com um IN por tipo e monta os resultados na ordem do ranking."""
+    ids_por_tipo: dict[str, list[int]] = {}
+    for tipo, ref_id in encontrados:
+        ids_por_tipo.setdefault(tipo, []).append(ref_id)
+    registros = {}
+    for tipo, ids in ids_por_tipo.items():
+        modelo = TIPOS[tipo][1]
+        for obj in modelo.query.filter(modelo.id.in_(ids)):
+            registros[(tipo, obj.id)] = obj
+    return [
+        {"type": tipo, **_FORMATADORES[tipo](registros[(tipo, ref_id)])}
+        for tipo, ref_id in encontrados
+        if (tipo, ref_id) in registros
+    ]
+
+
+def buscar(termo: Optional[str], limite: int = LIMITE_RESULTADOS) -> tuple[list[dict], float]:
+    """Resultados ranqueados para o termo e a latência da consulta (ms)."""
+    inicio = time.perf_counter()
+    if not busca_service.tokens(termo):
+        return [], 0.0
+    if fts_ativo():
+        backend, encontrados = "fts5", _consultar_fts(termo or "", limite)
+    else:
+        backend, encontrados = "sql", _consultar_sql(termo or "", limite)
+    resultados = _carregar(encontrados)
+    ms = round((time.perf_counter() - inicio) * 1000, 2)
+    metricas.registrar(backend, ms)
+    return resultados, ms
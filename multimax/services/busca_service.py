@@ -0,0 +1,140 @@
+"""
+Busca sem acentos: texto normalizado persistido nas tabelas pesquisáveis.
+
+Cada modelo de CAMPOS_BUSCA tem uma coluna `busca` (com índice B-tree) com os campos
+pesquisáveis em minúsculas, sem acentos e com espaços colapsados (ex.: "Linguiça  Toscana"
++ "AK0001" -> "linguica toscana ak0001"). A coluna é mantida pelos eventos before_insert/
+before_update do ORM, de modo que a pesquisa compara o termo (normalizado uma vez) com a
+coluna pronta, sem ILIKE/lower() sobre o texto original nem unicodedata por linha.
+
+Casamento por token: cada palavra do termo precisa ser prefixo de alguma palavra do texto
+("lingu tosc" encontra "Linguiça Toscana"). filtro() monta a condição assim:
+
+    - texto que começa com o termo: intervalo `busca >= :t AND busca < :t_seguinte`,
+      que o SQLite resolve pelo índice de `busca` (LIKE 'x%' não usa o índice);
+    - token no meio do texto: consulta MATCH no índice FTS5 da busca global
+      (services/busca_global_service) para os modelos indexados nele; nos demais
+      (CicloSemana) e em bancos sem FTS5 a condição cai para LIKE '% t%', que percorre a
+      tabela.
+
+A ordenação (relevancia) põe primeiro o texto igual ao termo, depois o que começa com ele,
+e por fim os demais casamentos.
+
+Bancos existentes ganham a coluna, o índice e o preenchimento pela migração
+one-time-migrations/2026_10_17_add_coluna_busca.py; preencher() recalcula a coluna.
+"""
+
+import re
+import unicodedata
+from typing import Iterable, Optional
+
+from sqlalchemy import and_, case, event, or_, select, true, update
+
+from .. import db
+from ..models import CicloSemana, CleaningTask, Collaborator, MeatReception, Produto, Recipe
+
+CAMPOS_BUSCA = {
+    CicloSemana: ("label",),
+    Collaborator: ("name",),
+    Produto: ("nome", "codigo"),
+    Recipe: ("nome",),
+    CleaningTask: ("nome_limpeza", "tipo", "designados"),
+    MeatReception: ("fornecedor", "tipo", "reference_code"),
+}
+
+
+def normalizar(texto: Optional[str]) -> str:
+    """Minúsculas, sem acentos e com espaços colapsados."""
+    s = unicodedata.normalize("NFKD", (texto or "").strip().lower())
+    s = "".join(ch for ch in s if not unicodedata.combining(ch))
+    return re.sub(r"\s+", " ", s).strip()
+
+
+def texto_busca(valores: Iterable[Optional[str]]) -> str:
+    return normalizar(" ".join(str(v) for v in valores if v))
+
+
+def tokens(termo: Optional[str]) -> list[str]:
+    return normalizar(termo).split()
+
+
+def _sincronizar(mapper, connection, target) -> None:
+    target.busca = texto_busca(getattr(target, campo) for campo in CAMPOS_BUSCA[type(target)])
+
+
+for _modelo in CAMPOS_BUSCA:
+    event.listen(_modelo, "before_insert", _sincronizar)
+    event.listen(_modelo, "before_update", _sincronizar)
+
+
+def _seguinte(prefixo: str) -> str:
+    """Menor texto maior que todos os que começam com `prefixo` (último caractere + 1)."""
+    return prefixo[:-1] + chr(ord(prefixo[-1]) + 1)
+
+
+def _comeca_com(coluna, prefixo: str):
+    """`coluna` começa com `prefixo`: intervalo no SQLite (usa o índice), LIKE nos demais dialetos."""
+    if db.session.get_bind().dialect.name == "sqlite":
+        return and_(coluna >= prefixo, coluna < _seguinte(prefixo))
+    return coluna.startswith(prefixo, autoescape=True)
+
+
+def filtro(coluna, termo: Optional[str]):
+    """Condição SQL: cada token do termo é prefixo de alguma palavra da coluna normalizada."""
+    partes = tokens(termo)
+    if not partes:
+        return true()
+    inicio = _comeca_com(coluna, " ".join(partes))
+
+    from . import busca_global_service  # import tardio: busca_global_service importa este módulo
+
+    ids = busca_global_service.ids_por_termo(coluna.class_, partes)
+    if ids is not None:
+        return or_(inicio, coluna.class_.id.in_(ids))
+    return or_(
+        inicio,
+        and_(*(or_(_comeca_com(coluna, t), coluna.contains(" " + t, autoescape=True)) for t in partes)),
+    )
+
+
+def relevancia(coluna, termo: Optional[str]):
+    """Expressão de ordenação: 0 = igual ao termo, 1 = começa com o termo, 2 = demais casamentos."""
+    termo_normalizado = normalizar(termo)
+    if not termo_normalizado:
+        return case((coluna == termo_normalizado, 0), else_=2)
+    return case(
+        (coluna == termo_normalizado, 0),
+        (_comeca_com(coluna, termo_normalizado), 1),
+        else_=2,
+    )
+
+
+def casa(termo: Optional[str], texto: Optional[str]) -> bool:
+    """Mesma regra de filtro(), para textos que não vêm do banco (ex.: semanas do mês aberto)."""
+    palavras = normalizar(texto).split()
+    return all(any(p.startswith(t) for p in palavras) for t in tokens(termo))
+
+
+def preencher(modelos: Optional[Iterable] = None, todos: bool = False, indexar: bool = True) -> int:
+    """
+    Preenche `busca` nas linhas em que ainda está NULL (ou em todas, com todos=True), sem commit;
+    retorna quantas foram preenchidas.
+
+    O UPDATE em massa não passa pelos eventos do ORM; com indexar=True as linhas tocadas são
+    refletidas no índice FTS5 da busca global na mesma transação.
+    """
+    from . import busca_global_service  # import tardio: busca_global_service importa este módulo
+
+    total = 0
+    for modelo in modelos or CAMPOS_BUSCA:
+        colunas = [getattr(modelo, campo) for campo in CAMPOS_BUSCA[modelo]]
+        stmt = select(modelo.id, *colunas)
+        if not todos:
+            stmt = stmt.where(modelo.busca.is_(None))
+        valores = [{"id": linha[0], "busca": texto_busca(linha[1:])} for linha in db.session.execute(stmt)]
+        if valores:
+            db.session.execute(update(modelo), valores)
+            if indexar:
+                busca_global_service.atualizar_linhas(modelo, [(v["id"], v["busca"]) for v in valores])
+            total += len(valores)
+    return total
@@ -0,0 +1,118 @@
+"""
+Motor de saldos do sistema de Ciclos.
+
+Calcula, em uma única consulta agrupada, o saldo de horas de todos os colaboradores:
+total de horas, dias completos, horas restantes e valor aproximado em R$.
+Substitui o cálculo colaborador a colaborador (uma consulta SUM por pessoa).
+"""
+
+import math
+from datetime import date
+from decimal import Decimal
+from typing import Iterable, Optional
+
+from sqlalchemy import func, or_
+
+from .. import db
+from ..models import AppSetting, Ciclo, Collaborator
+
+VALOR_DIA_PADRAO = 65.0
+
+
+def obter_valor_dia() -> float:
+    """Obtém valor de 1 dia (8h) em R$ configurado em AppSetting."""
+    try:
+        setting = AppSetting.query.filter_by(key="ciclo_valor_dia").first()
+        if setting and setting.value:
+            return float(setting.value)
+    except Exception:
+        pass
+    return VALOR_DIA_PADRAO
+
+
+def saldo_a_partir_de_horas(total_horas: Decimal | float, valor_dia: float) -> dict:
+    """
+    Converte um total de horas no dicionário de saldo usado pelas telas e PDFs.
+    Saldo negativo não gera dias completos nem horas restantes.
+    """
+    total_horas_float = float(Decimal(str(total_horas)))
+    if total_horas_float < 0:
+        dias_completos = 0
+        horas_restantes = 0.0
+    else:
+        dias_completos = int(math.floor(total_horas_float / 8.0))
+        horas_restantes = total_horas_float % 8.0
+    valor_aproximado = Decimal(str(dias_completos)) * Decimal(str(valor_dia))
+    return {
+        "total_horas": total_horas_float,
+        "dias_completos": dias_completos,
+        "horas_restantes": round(horas_restantes, 1),
+        "valor_aproximado": float(valor_aproximado),
+    }
+
+
+def calcular_saldos(
+    collaborator_ids: Optional[Iterable[int]] = None,
+    setor_id: Optional[int] = None,
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+    status_ciclo: str = "ativo",
+    ciclo_id: Optional[int] = None,
+    valor_dia: Optional[float] = None,
+) -> dict[int, dict]:
+    """
+    Calcula o saldo de vários colaboradores com um único GROUP BY.
+
+    Args:
+        collaborator_ids: Restringe aos colaboradores informados (default: todos com registros)
+        setor_id: Filtra registros do setor (inclui registros antigos sem setor do colaborador do setor)
+        data_inicio: Data inicial (inclusiva) do lançamento
+        data_fim: Data final (inclusiva) do lançamento
+        status_ciclo: 'ativo' (mês aberto) ou 'fechado'
+        ciclo_id: Ciclo mensal fechado (usado junto com status 'fechado')
+        valor_dia: Valor do dia em R$ (default: lido uma vez de AppSetting)
+
+    Returns:
+        dict collaborator_id -> saldo (mesmo formato de saldo_a_partir_de_horas,
+        acrescido de 'registros_count'). Colaboradores sem registros não aparecem;
+        use saldo_vazio() como valor padrão.
+    """
+    if valor_dia is None:
+        valor_dia = obter_valor_dia()
+
+    query = db.session.query(
+        Ciclo.collaborator_id,
+        func.coalesce(func.sum(Ciclo.valor_horas), 0),
+        func.count(Ciclo.id),
+    ).filter(Ciclo.status_ciclo == status_ciclo)
+
+    if ciclo_id is not None:
+        query = query.filter(Ciclo.ciclo_id == ciclo_id)
+    if data_inicio is not None:
+        query = query.filter(Ciclo.data_lancamento >= data_inicio)
+    if data_fim is not None:
+        query = query.filter(Ciclo.data_lancamento <= data_fim)
+    if collaborator_ids is not None:
+        ids = list(collaborator_ids)
+        if not ids:
+            return {}
+        query = query.filter(Ciclo.collaborator_id.in_(ids))
+    if setor_id:
+        # Incluir: registros com setor_id preenchido OU registros antigos (NULL) do colaborador neste setor
+        query = query.join(Collaborator, Collaborator.id == Ciclo.collaborator_id).filter(
+            or_(Ciclo.setor_id == setor_id, (Ciclo.setor_id.is_(None) & (Collaborator.setor_id == setor_id)))
+        )
+
+    saldos: dict[int, dict] = {}
+    for cid, total_horas, registros_count in query.group_by(Ciclo.collaborator_id).all():
+        saldo = saldo_a_partir_de_horas(total_horas or 0, valor_dia)
+        saldo["registros_count"] = int(registros_count or 0)
+        saldos[int(cid)] = saldo
+    return saldos
+
+
+def saldo_vazio(valor_dia: float = VALOR_DIA_PADRAO) -> dict:
+    """Saldo de um colaborador sem registros no filtro consultado."""
+    saldo = saldo_a_partir_de_horas(0, valor_dia)
+    saldo["registros_count"] = 0
+    return saldo
@@ -0,0 +1,184 @@
+"""
+Motor do fechamento mensal de ciclos, baseado em operações de conjunto.
+
+O fechamento roda numa transação curta, em etapas:
+
+1. fechar_registros: um UPDATE ... WHERE status_ciclo = 'ativo' marca os lançamentos
+   com o novo ciclo_id (no SQLite, a trava de escrita é pega logo no início e os totais
+   saem exatamente dos registros fechados, mesmo que outro lançamento chegue no meio);
+2. agrupar_totais: um GROUP BY por colaborador sobre os registros recém-fechados (nome
+   e setor vêm na mesma consulta, sem um Collaborator.query.get por colaborador);
+3. inserir_carryover: as horas restantes (< 8h) voltam como lançamentos ativos do mês
+   seguinte num único INSERT em executemany;
+4. fechar_folgas_e_ocorrencias: um UPDATE para CicloFolga e outro para CicloOcorrencia.
+
+Cada etapa é cronometrada por Cronometro, para que o log do fechamento mostre onde o
+tempo foi gasto. Arquivo das semanas, CicloFechamento, CicloSaldo e ledger continuam a
+cargo da rota, na mesma transação.
+"""
+
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Optional
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import and_, func, or_, select, update
+
+from .. import db
+from ..models import Ciclo, CicloFolga, CicloOcorrencia, Collaborator
+from .ciclo_balance_service import obter_valor_dia, saldo_a_partir_de_horas
+from .lote_horas_service import inserir_em_lote
+
+
+class Cronometro:
+    """Tempo (ms) de cada etapa, na ordem em que foram executadas."""
+
+    def __init__(self):
+        self.etapas: dict[str, float] = {}
+        self._inicio = self._marca = time.perf_counter()
+
+    def marcar(self, etapa: str) -> None:
+        agora = time.perf_counter()
+        self.etapas[etapa] = round((agora - self._marca) * 1000, 1)
+        self._marca = agora
+
+    @property
+    def total_ms(self) -> float:
+        return round((time.perf_counter() - self._inicio) * 1000, 1)
+
+    def resumo(self) -> str:
+        partes = [f"{etapa}={ms}ms" for etapa, ms in self.etapas.items()]
+        return ", ".join(partes + [f"total={self.total_ms}ms"])
+
+
+def _filtro_setor(setor_id: Optional[int]):
+    """Registros do setor: setor_id preenchido OU registros antigos (NULL) de colaborador do setor."""
+    colaboradores_setor = select(Collaborator.id).where(Collaborator.setor_id == setor_id)
+    return or_(
+        Ciclo.setor_id == setor_id, and_(Ciclo.setor_id.is_(None), Ciclo.collaborator_id.in_(colaboradores_setor))
+    )
+
+
+def fechar_registros(proximo_ciclo_id: int, usuario: str, setor_id: Optional[int] = None) -> int:
+    """Fecha os lançamentos ativos (do setor, se informado) com um UPDATE; retorna quantos foram fechados."""
+    stmt = update(Ciclo).where(Ciclo.status_ciclo == "ativo")
+    if setor_id:
+        stmt = stmt.where(_filtro_setor(setor_id))
+    stmt = stmt.values(
+        ciclo_id=proximo_ciclo_id,
+        status_ciclo="fechado",
+        updated_at=datetime.now(ZoneInfo("America/Sao_Paulo")),
+        updated_by=usuario,
+    ).execution_options(synchronize_session=False)
+    return db.session.execute(stmt).rowcount or 0
+
+
+def agrupar_totais(proximo_ciclo_id: int, valor_dia: Optional[float] = None) -> tuple[dict[int, dict], dict]:
+    """
+    Totais por colaborador dos registros fechados no ciclo, com um único GROUP BY.
+
+    Returns:
+        (colaboradores_totais, totais_gerais). colaboradores_totais[cid] tem nome,
+        setor_id, total_horas (Decimal), total_dias, total_valor (Decimal),
+        horas_restantes e registros_count.
+    """
+    if valor_dia is None:
+        valor_dia = obter_valor_dia()
+    linhas = db.session.execute(
+        select(
+            Ciclo.collaborator_id,
+            func.coalesce(func.sum(Ciclo.valor_horas), 0),
+            func.count(Ciclo.id),
+            func.max(Ciclo.nome_colaborador),
+            func.coalesce(func.max(Collaborator.setor_id), func.max(Ciclo.setor_id)),
+        )
+        .outerjoin(Collaborator, Collaborator.id == Ciclo.collaborator_id)
+        .where(Ciclo.ciclo_id == proximo_ciclo_id, Ciclo.status_ciclo == "fechado")
+        .group_by(Ciclo.collaborator_id)
+    ).all()
+
+    colaboradores_totais: dict[int, dict] = {}
+    total_horas_geral = Decimal("0.0")
+    total_dias_geral = 0
+    total_valor_geral = Decimal("0.0")
+    for cid, total_horas, registros_count, nome, setor_id in linhas:
+        saldo = saldo_a_partir_de_horas(total_horas or 0, valor_dia)
+        total_horas_colab = Decimal(str(saldo["total_horas"]))
+        valor_total_colab = Decimal(str(saldo["valor_aproximado"]))
+        colaboradores_totais[int(cid)] = {
+            "nome": nome,
+            "setor_id": setor_id,
+            "total_horas": total_horas_colab,
+            "total_dias": saldo["dias_completos"],
+            "total_valor": valor_total_colab,
+            "horas_restantes": saldo["horas_restantes"],
+            "registros_count": int(registros_count or 0),
+        }
+        total_horas_geral += total_horas_colab
+        total_dias_geral += saldo["dias_completos"]
+        total_valor_geral += valor_total_colab
+
+    totais_gerais = {
+        "horas": total_horas_geral,
+        "dias": total_dias_geral,
+        "valor": total_valor_geral,
+        "colaboradores": len(colaboradores_totais),
+    }
+    return colaboradores_totais, totais_gerais
+
+
+def inserir_carryover(
+    colaboradores_totais: dict[int, dict], next_month_start: date, proximo_ciclo_id: int, usuario: str
+) -> int:
+    """Transporta as horas restantes (0 < h < 8) como lançamentos ativos do mês seguinte (sem commit)."""
+    agora = datetime.now(ZoneInfo("America/Sao_Paulo"))
+    linhas: list[dict[str, Any]] = [
+        {
+            "collaborator_id": cid,
+            "nome_colaborador": dados["nome"],
+            "data_lancamento": next_month_start,
+            "setor_id": dados["setor_id"],
+            "origem": "Carryover",
+            "descricao": f"Horas restantes do ciclo {proximo_ciclo_id - 1} transportadas",
+            "valor_horas": Decimal(str(round(dados["horas_restantes"], 1))),
+            "dias_fechados": 0,
+            "horas_restantes": Decimal("0.0"),
+            "ciclo_id": None,
+            "status_ciclo": "ativo",
+            "valor_aproximado": Decimal("0.0"),
+            "created_at": agora,
+            "created_by": usuario,
+        }
+        for cid, dados in colaboradores_totais.items()
+        if 0 < dados["horas_restantes"] < 8.0
+    ]
+    if linhas:
+        inserir_em_lote(Ciclo, linhas, commit=False)
+    return len(linhas)
+
+
+def fechar_folgas_e_ocorrencias(proximo_ciclo_id: int) -> set[int]:
+    """
+    Fecha folgas e ocorrências ativas (operação global, sem filtro de setor) com um UPDATE
+    por tabela; retorna os colaboradores com folgas fechadas.
+
+    Roda em SAVEPOINT: uma falha (ex.: esquema antigo) não derruba o fechamento.
+    """
+    try:
+        with db.session.begin_nested():
+            for modelo in (CicloFolga, CicloOcorrencia):
+                db.session.execute(
+                    update(modelo)
+                    .where(modelo.status_ciclo == "ativo")
+                    .values(ciclo_id=proximo_ciclo_id, status_ciclo="fechado")
+                    .execution_options(synchronize_session=False)
+                )
+            ids = db.session.execute(
+                select(CicloFolga.collaborator_id)
+                .where(CicloFolga.ciclo_id == proximo_ciclo_id, CicloFolga.status_ciclo == "fechado")
+                .distinct()
+            ).scalars()
+            return set(ids)
+    except Exception:
+        return set()
@@ -0,0 +1,294 @@
+"""
+Ledger materializado de saldos do sistema de Ciclos.
+
+Cada linha de CicloSaldoLedger guarda, para (colaborador, setor, status_ciclo), a soma
+de Ciclo.valor_horas, a quantidade de lançamentos e os dias de folga (CicloFolga).
+As rotas que escrevem em Ciclo/CicloFolga aplicam o delta na mesma sessão, antes do
+commit: o ledger nunca fica à frente (ou atrás) dos registros brutos.
+
+A leitura do saldo vira uma consulta por chave, e verificar() compara o ledger com as
+somas brutas para detectar divergências (reconstruir() corrige).
+"""
+
+from datetime import datetime
+from decimal import Decimal
+from typing import Iterable, Optional
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import case, func, or_
+
+from .. import db
+from ..models import Ciclo, CicloFolga, CicloSaldoLedger, Collaborator
+from .ciclo_balance_service import obter_valor_dia, saldo_a_partir_de_horas
+from .dialeto_service import dialeto_upsert
+
+SEM_SETOR = 0  # Chave de setor para registros antigos sem setor_id
+CAMPOS = ("total_horas", "registros_count", "folgas_adicionais", "folgas_usadas")
+
+
+def _setor(setor_id: Optional[int]) -> int:
+    return int(setor_id) if setor_id else SEM_SETOR
+
+
+def aplicar_delta(
+    collaborator_id: int,
+    setor_id: Optional[int],
+    status_ciclo: str,
+    horas: Decimal | float = 0,
+    registros: int = 0,
+    folgas_adicionais: int = 0,
+    folgas_usadas: int = 0,
+) -> None:
+    """
+    Soma um delta na linha do ledger (cria a linha se não existir).
+
+    Não faz commit: deve ser chamado na mesma transação da escrita em Ciclo/CicloFolga.
+    """
+    horas_dec = Decimal(str(horas or 0))
+    valores = {
+        "collaborator_id": int(collaborator_id),
+        "setor_id": _setor(setor_id),
+        "status_ciclo": status_ciclo,
+        "total_horas": horas_dec,
+        "registros_count": int(registros),
+        "folgas_adicionais": int(folgas_adicionais),
+        "folgas_usadas": int(folgas_usadas),
+        "updated_at": datetime.now(ZoneInfo("America/Sao_Paulo")),
+    }
+    insert = dialeto_upsert()
+    if insert is not None:
+        stmt = insert(CicloSaldoLedger).values(**valores)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["collaborator_id", "setor_id", "status_ciclo"],
+            set_={
+                "total_horas": CicloSaldoLedger.total_horas + horas_dec,
+                "registros_count": CicloSaldoLedger.registros_count + int(registros),
+                "folgas_adicionais": CicloSaldoLedger.folgas_adicionais + int(folgas_adicionais),
+                "folgas_usadas": CicloSaldoLedger.folgas_usadas + int(folgas_usadas),
+                "updated_at": valores["updated_at"],
+            },
+        )
+        db.session.execute(stmt)
+        return
+
+    linha = CicloSaldoLedger.query.filter_by(
+        collaborator_id=valores["collaborator_id"], setor_id=valores["setor_id"], status_ciclo=status_ciclo
+    ).first()
+    if linha is None:
+        db.session.add(CicloSaldoLedger(**valores))
+        return
+    linha.total_horas = Decimal(str(linha.total_horas or 0)) + horas_dec
+    linha.registros_count = (linha.registros_count or 0) + int(registros)
+    linha.folgas_adicionais = (linha.folgas_adicionais or 0) + int(folgas_adicionais)
+    linha.folgas_usadas = (linha.folgas_usadas or 0) + int(folgas_usadas)
+    linha.updated_at = valores["updated_at"]
+
+
+def registrar_ciclo(ciclo: Ciclo, sinal: int = 1) -> None:
+    """Aplica (sinal=1) ou remove (sinal=-1) um lançamento de horas do ledger."""
+    aplicar_delta(
+        ciclo.collaborator_id,
+        ciclo.setor_id,
+        ciclo.status_ciclo or "ativo",
+        horas=Decimal(str(ciclo.valor_horas or 0)) * sinal,
+        registros=sinal,
+    )
+
+
+def registrar_folga(folga: CicloFolga, sinal: int = 1) -> None:
+    """Aplica (sinal=1) ou remove (sinal=-1) uma folga de ciclo do ledger."""
+    dias = int(folga.dias or 1) * sinal
+    aplicar_delta(
+        folga.collaborator_id,
+        folga.setor_id,
+        folga.status_ciclo or "ativo",
+        folgas_adicionais=dias if folga.tipo == "adicional" else 0,
+        folgas_usadas=dias if folga.tipo == "uso" else 0,
+    )
+
+
+def _somas_brutas(collaborator_ids: Optional[list[int]] = None) -> dict[tuple[int, int, str], dict]:
+    """Somas de Ciclo e CicloFolga agrupadas pela chave do ledger."""
+    somas: dict[tuple[int, int, str], dict] = {}
+
+    def _linha(chave):
+        if chave not in somas:
+            somas[chave] = {
+                "total_horas": Decimal("0"),
+                "registros_count": 0,
+                "folgas_adicionais": 0,
+                "folgas_usadas": 0,
+            }
+        return somas[chave]
+
+    q_horas = db.session.query(
+        Ciclo.collaborator_id,
+        Ciclo.setor_id,
+        Ciclo.status_ciclo,
+        func.coalesce(func.sum(Ciclo.valor_horas), 0),
+        func.count(Ciclo.id),
+    )
+    dias = func.coalesce(CicloFolga.dias, 1)
+    q_folgas = db.session.query(
+        CicloFolga.collaborator_id,
+        CicloFolga.setor_id,
+        CicloFolga.status_ciclo,
+        func.coalesce(func.sum(case((CicloFolga.tipo == "adicional", dias), else_=0)), 0),
+        func.coalesce(func.sum(case((CicloFolga.tipo == "uso", dias), else_=0)), 0),
+    )
+    if collaborator_ids is not None:
+        q_horas = q_horas.filter(Ciclo.collaborator_id.in_(collaborator_ids))
+        q_folgas = q_folgas.filter(CicloFolga.collaborator_id.in_(collaborator_ids))
+
+    for cid, setor_id, status, total, count in q_horas.group_by(
+        Ciclo.collaborator_id, Ciclo.setor_id, Ciclo.status_ciclo
+    ).all():
+        linha = _linha((int(cid), _setor(setor_id), status))
+        linha["total_horas"] = Decimal(str(total or 0))
+        linha["registros_count"] = int(count or 0)
+    for cid, setor_id, status, adicionais, usadas in q_folgas.group_by(
+        CicloFolga.collaborator_id, CicloFolga.setor_id, CicloFolga.status_ciclo
+    ).all():
+        linha = _linha((int(cid), _setor(setor_id), status))
+        linha["folgas_adicionais"] = int(adicionais or 0)
+        linha["folgas_usadas"] = int(usadas or 0)
+    return somas
+
+
+def _linhas_ledger(collaborator_ids: Optional[list[int]] = None) -> dict[tuple[int, int, str], dict]:
+    query = CicloSaldoLedger.query
+    if collaborator_ids is not None:
+        query = query.filter(CicloSaldoLedger.collaborator_id.in_(collaborator_ids))
+    return {
+        (r.collaborator_id, r.setor_id, r.status_ciclo): {
+            "total_horas": Decimal(str(r.total_horas or 0)),
+            "registros_count": int(r.registros_count or 0),
+            "folgas_adicionais": int(r.folgas_adicionais or 0),
+            "folgas_usadas": int(r.folgas_usadas or 0),
+        }
+        for r in query.all()
+    }
+
+
+def _vazio(valores: dict) -> bool:
+    return all(not valores[c] for c in CAMPOS)
+
+
+def verificar(collaborator_ids: Optional[Iterable[int]] = None) -> list[dict]:
+    """
+    Compara o ledger com as somas brutas de Ciclo/CicloFolga.
+
+    Returns:
+        Lista de divergências: {collaborator_id, setor_id, status_ciclo, campo, ledger, bruto}.
+        Lista vazia quando o ledger está consistente.
+    """
+    ids = list(collaborator_ids) if collaborator_ids is not None else None
+    brutas = _somas_brutas(ids)
+    ledger = _linhas_ledger(ids)
+    divergencias = []
+    for chave in sorted(set(brutas) | set(ledger), key=lambda k: (k[0], k[1], k[2] or "")):
+        bruto = brutas.get(chave)
+        atual = ledger.get(chave)
+        for campo in CAMPOS:
+            v_bruto = bruto[campo] if bruto else 0
+            v_ledger = atual[campo] if atual else 0
+            if v_bruto != v_ledger:
+                divergencias.append(
+                    {
+                        "collaborator_id": chave[0],
+                        "setor_id": chave[1],
+                        "status_ciclo": chave[2],
+                        "campo": campo,
+                        "ledger": float(v_ledger) if campo == "total_horas" else v_ledger,
+                        "bruto": float(v_bruto) if campo == "total_horas" else v_bruto,
+                    }
+                )
+    return divergencias
+
+
+def reconstruir(collaborator_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Recria as linhas do ledger a partir dos registros brutos (todos ou só dos colaboradores informados).
+
+    Não faz commit (usado dentro do fechamento); retorna o número de linhas gravadas.
+    """
+    ids = list(collaborator_ids) if collaborator_ids is not None else None
+    if ids is not None and not ids:
+        return 0
+    delete = CicloSaldoLedger.query
+    if ids is not None:
+        delete = delete.filter(CicloSaldoLedger.collaborator_id.in_(ids))
+    delete.delete(synchronize_session=False)
+
+    agora = datetime.now(ZoneInfo("America/Sao_Paulo"))
+    linhas = [
+        {
+            "collaborator_id": cid,
+            "setor_id": setor_id,
+            "status_ciclo": status,
+            "updated_at": agora,
+            **valores,
+        }
+        for (cid, setor_id, status), valores in _somas_brutas(ids).items()
+        if not _vazio(valores)
+    ]
+    if linhas:
+        db.session.execute(CicloSaldoLedger.__table__.insert(), linhas)
+    return len(linhas)
+
+
+def popular_se_vazio() -> int:
+    """Reconstrói o ledger na primeira execução (tabela recém-criada e lançamentos existentes)."""
+    if db.session.query(CicloSaldoLedger.id).limit(1).scalar() is not None:
+        return 0
+    tem_registros = (
+        db.session.query(Ciclo.id).limit(1).scalar() is not None
+        or db.session.query(CicloFolga.id).limit(1).scalar() is not None
+    )
+    if not tem_registros:
+        return 0
+    total = reconstruir()
+    db.session.commit()
+    return total
+
+
+def saldos_ledger(
+    collaborator_ids: Optional[Iterable[int]] = None,
+    setor_id: Optional[int] = None,
+    status_ciclo: str = "ativo",
+    valor_dia: Optional[float] = None,
+) -> dict[int, dict]:
+    """
+    Saldos lidos do ledger, no mesmo formato de calcular_saldos().
+
+    Com setor_id, considera as linhas do setor e as linhas sem setor de colaboradores
+    desse setor (mesma regra de calcular_saldos).
+    """
+    if valor_dia is None:
+        valor_dia = obter_valor_dia()
+    query = db.session.query(
+        CicloSaldoLedger.collaborator_id,
+        func.sum(CicloSaldoLedger.total_horas),
+        func.sum(CicloSaldoLedger.registros_count),
+    ).filter(CicloSaldoLedger.status_ciclo == status_ciclo)
+    if collaborator_ids is not None:
+        ids = list(collaborator_ids)
+        if not ids:
+            return {}
+        query = query.filter(CicloSaldoLedger.collaborator_id.in_(ids))
+    if setor_id:
+        query = query.join(Collaborator, Collaborator.id == CicloSaldoLedger.collaborator_id).filter(
+            or_(
+                CicloSaldoLedger.setor_id == setor_id,
+                (CicloSaldoLedger.setor_id == SEM_SETOR) & (Collaborator.setor_id == setor_id),
+            )
+        )
+
+    saldos: dict[int, dict] = {}
+    for cid, total_horas, registros_count in query.group_by(CicloSaldoLedger.collaborator_id).all():
+        if not registros_count:
+            continue
+        saldo = saldo_a_partir_de_horas(total_horas or 0, valor_dia)
+        saldo["registros_count"] = int(registros_count)
+        saldos[int(cid)] = saldo
+    return saldos
@@ -16,6 +16,7 @@ from sqlalchemy import and_
 
 from .. import db
 from ..models import CicloSaldo, Collaborator
+from .dialeto_service import dialeto_upsert
 
 
 def _format_mes_ano(data: Optional[datetime] = None) -> str:
@@ -229,16 +230,21 @@ def fechar_ciclo_mensal(
     Função chamada ao fechar ciclo mensal.
     Calcula e armazena saldo de horas para cada colaborador.
 
+    Os saldos são gravados em lote: um INSERT ... ON CONFLICT (collaborator_id, mes_ano)
+    DO UPDATE no SQLite/PostgreSQL; nos demais dialetos, uma consulta dos saldos
+    existentes do mês e registrar_saldo() por colaborador.
+
     Args:
-        colaboradores_totais: Dict com dados dos colaboradores (mesmo formato da função _agrupar_e_calcular_totais)
+        colaboradores_totais: Dict com dados dos colaboradores (formato de ciclo_fechamento_service.agrupar_totais)
         mes_ano: Mês em formato "MM-YYYY"
         usuario: Usuário que realizou o fechamento
 
     Returns:
         dict com:
-            - 'saldos_registrados': list de CicloSaldo criados/atualizados
+            - 'saldos_registrados': list de dicts (collaborator_id, mes_ano, saldo) gravados
             - 'resumo_saldos': dict com resumo visual dos saldos
     """
+    agora = datetime.now(ZoneInfo("America/Sao_Paulo"))
     saldos_registrados = []
     resumo_saldos = {}
 
@@ -247,10 +253,7 @@ def fechar_ciclo_mensal(
 
         # Calcular saldo (resto da divisão por 8)
         saldo = calcular_saldo_mensal(total_horas)
-
-        # Registrar no banco
-        saldo_record = registrar_saldo(cid, mes_ano, saldo, usuario)
-        saldos_registrados.append(saldo_record)
+        saldos_registrados.append({"collaborator_id": cid, "mes_ano": mes_ano, "saldo": Decimal(str(round(saldo, 1)))})
 
         # Preparar resumo visual
         resumo_saldos[cid] = {
@@ -260,6 +263,19 @@ def fechar_ciclo_mensal(
             "saldo_visual": resumo_em_dias_e_horas(saldo),
         }
 
+    insert = dialeto_upsert()
+    if saldos_registrados and insert is not None:
+        linhas = [{**linha, "created_by": usuario, "created_at": agora} for linha in saldos_registrados]
+        stmt = insert(CicloSaldo)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["collaborator_id", "mes_ano"],
+            set_={"saldo": stmt.excluded.saldo, "updated_at": agora, "updated_by": usuario},
+        )
+        db.session.execute(stmt, linhas)
+    else:
+        for linha in saldos_registrados:
+            registrar_saldo(linha["collaborator_id"], mes_ano, float(linha["saldo"]), usuario)
+
     return {
         "saldos_registrados": saldos_registrados,
         "resumo_saldos": resumo_saldos,
@@ -0,0 +1,255 @@
+"""
+Carregamento em lote dos ciclos semanais para PDFs e relatórios de Ciclos.
+
+Busca horas (Ciclo), folgas (CicloFolga) e ocorrências (CicloOcorrencia) do período
+inteiro com uma consulta por tabela e distribui os registros em memória por
+(colaborador, semana), no lugar de três consultas por colaborador por semana.
+
+carregar_semanas_fechadas() faz o mesmo para as semanas arquivadas (CicloSemana) da
+pesquisa de ciclos, que podem pertencer a vários ciclos mensais fechados.
+"""
+
+from bisect import bisect_right
+from datetime import date
+from types import SimpleNamespace
+from typing import Any, Iterable, Optional
+
+from ..models import Ciclo, CicloFolga, CicloOcorrencia
+
+ORIGEM_FOLGA_UTILIZADA = "Folga utilizada"
+
+
+class _IndiceSemanas:
+    """Localiza a semana (índice) que contém uma data, via busca binária nos inícios."""
+
+    def __init__(self, semanas: list[dict[str, Any]]):
+        ordem = sorted(range(len(semanas)), key=lambda i: semanas[i]["week_start"])
+        self._inicios: list[date] = [semanas[i]["week_start"] for i in ordem]
+        self._fins: list[date] = [semanas[i]["week_end"] for i in ordem]
+        self._indices: list[int] = ordem
+
+    def localizar(self, d: Optional[date]) -> Optional[int]:
+        if d is None:
+            return None
+        pos = bisect_right(self._inicios, d) - 1
+        if pos < 0 or d > self._fins[pos]:
+            return None
+        return self._indices[pos]
+
+
+def _folga_utilizada_como_folga(h, incluir_valor_horas: bool, ciclo_id: Optional[int]) -> SimpleNamespace:
+    """Cria objeto similar a CicloFolga a partir de um lançamento 'Folga utilizada'."""
+    dados: dict[str, Any] = {
+        "nome_colaborador": h.nome_colaborador,
+        "data_folga": h.data_lancamento,
+        "tipo": "uso",
+        "dias": 1,  # Folga utilizada sempre é 1 dia (8h)
+        "observacao": h.descricao or "Folga utilizada via lançamento de horas",
+        "ciclo_id": ciclo_id,
+        "status_ciclo": h.status_ciclo,
+    }
+    if incluir_valor_horas:
+        dados["valor_horas"] = h.valor_horas
+    return SimpleNamespace(**dados)
+
+
+def carregar_semanas_por_colaborador(
+    colaboradores: Iterable[Any],
+    semanas: Iterable[dict[str, Any]],
+    status_ciclo: str = "ativo",
+    ciclo_id: Optional[int] = None,
+    incluir_valor_horas: bool = False,
+) -> dict[int, list[dict[str, Any]]]:
+    """
+    Monta o detalhamento semanal (horas, folgas, ocorrências) de vários colaboradores.
+
+    Args:
+        colaboradores: Colaboradores (precisam de .id e .setor_id)
+        semanas: Dicts com 'label', 'week_start' e 'week_end' (ex.: _weekly_cycles_for_open_month)
+        status_ciclo: 'ativo' (mês aberto) ou 'fechado'
+        ciclo_id: Ciclo mensal fechado; também usado como ciclo_id das folgas utilizadas
+        incluir_valor_horas: Expõe valor_horas nas folgas utilizadas (exibido em horas no PDF)
+
+    Returns:
+        dict collaborator_id -> lista de semanas no mesmo formato usado pelos templates de PDF.
+        Folgas seguem o setor atual do colaborador, como nas consultas individuais.
+    """
+    colaboradores = list(colaboradores)
+    semanas = list(semanas)
+    saida: dict[int, list[dict[str, Any]]] = {
+        c.id: [
+            {
+                "label": s["label"],
+                "week_start": s["week_start"],
+                "week_end": s["week_end"],
+                "horas": [],
+                "folgas": [],
+                "ocorrencias": [],
+            }
+            for s in semanas
+        ]
+        for c in colaboradores
+    }
+    if not colaboradores or not semanas:
+        return saida
+
+    setor_por_colaborador: dict[int, Any] = {c.id: c.setor_id for c in colaboradores}
+    ids = list(setor_por_colaborador)
+    inicio: date = min(s["week_start"] for s in semanas)
+    fim: date = max(s["week_end"] for s in semanas)
+    indice = _IndiceSemanas(semanas)
+
+    def _filtro_ciclo(model):
+        filtros = [model.status_ciclo == status_ciclo, model.collaborator_id.in_(ids)]
+        if ciclo_id is not None:
+            filtros.append(model.ciclo_id == ciclo_id)
+        return filtros
+
+    horas = (
+        Ciclo.query.filter(*_filtro_ciclo(Ciclo), Ciclo.data_lancamento >= inicio, Ciclo.data_lancamento <= fim)
+        .order_by(Ciclo.data_lancamento.asc(), Ciclo.id.asc())
+        .all()
+    )
+    folgas = (
+        CicloFolga.query.filter(
+            *_filtro_ciclo(CicloFolga), CicloFolga.data_folga >= inicio, CicloFolga.data_folga <= fim
+        )
+        .order_by(CicloFolga.data_folga.asc(), CicloFolga.id.asc())
+        .all()
+    )
+    ocorrencias = (
+        CicloOcorrencia.query.filter(
+            *_filtro_ciclo(CicloOcorrencia),
+            CicloOcorrencia.data_ocorrencia >= inicio,
+            CicloOcorrencia.data_ocorrencia <= fim,
+        )
+        .order_by(CicloOcorrencia.data_ocorrencia.asc(), CicloOcorrencia.id.asc())
+        .all()
+    )
+
+    folgas_utilizadas: dict[tuple[int, int], list[SimpleNamespace]] = {}
+    for h in horas:
+        idx = indice.localizar(h.data_lancamento)
+        if idx is None:
+            continue
+        if h.origem == ORIGEM_FOLGA_UTILIZADA:
+            folga_ciclo = _folga_utilizada_como_folga(h, incluir_valor_horas, ciclo_id)
+            folgas_utilizadas.setdefault((h.collaborator_id, idx), []).append(folga_ciclo)
+        else:
+            saida[h.collaborator_id][idx]["horas"].append(h)
+
+    for f in folgas:
+        if f.setor_id != setor_por_colaborador.get(f.collaborator_id):
+            continue
+        idx = indice.localizar(f.data_folga)
+        if idx is not None:
+            saida[f.collaborator_id][idx]["folgas"].append(f)
+
+    # Mesclar folgas utilizadas e reordenar por data (ordenação estável, como nas consultas individuais)
+    for (cid, idx), extras in folgas_utilizadas.items():
+        semana = saida[cid][idx]
+        semana["folgas"] = sorted(semana["folgas"] + extras, key=lambda f: (f.data_folga, getattr(f, "id", 0)))
+
+    for o in ocorrencias:
+        idx = indice.localizar(o.data_ocorrencia)
+        if idx is not None:
+            saida[o.collaborator_id][idx]["ocorrencias"].append(o)
+
+    return saida
+
+
+def carregar_semanas_fechadas(semanas: Iterable[Any]) -> list[dict[str, Any]]:
+    """
+    Detalha semanas arquivadas (CicloSemana ou objetos com ciclo_id, label, week_start e
+    week_end) de um ou mais ciclos fechados.
+
+    Uma consulta por tabela cobre todos os ciclo_ids e o intervalo de datas da lista; cada
+    registro é atribuído à semana do seu ciclo_id por busca binária (as semanas de um
+    mesmo ciclo não se sobrepõem). Folgas utilizadas lançadas como horas viram folgas
+    do tipo 'uso', como na consulta individual.
+
+    Returns:
+        Lista (na ordem recebida) de dicts com ciclo_id, label, week_start, week_end,
+        horas, folgas e ocorrencias; horas/ocorrências ordenadas por colaborador e data,
+        folgas por data.
+    """
+    semanas = list(semanas)
+    saida: list[dict[str, Any]] = [
+        {
+            "ciclo_id": s.ciclo_id,
+            "label": s.label,
+            "week_start": s.week_start,
+            "week_end": s.week_end,
+            "horas": [],
+            "folgas": [],
+            "ocorrencias": [],
+        }
+        for s in semanas
+    ]
+    if not semanas:
+        return saida
+
+    posicoes: dict[int, list[int]] = {}
+    for i, s in enumerate(semanas):
+        posicoes.setdefault(s.ciclo_id, []).append(i)
+    indices = {cid: (_IndiceSemanas([saida[i] for i in pos]), pos) for cid, pos in posicoes.items()}
+    inicio: date = min(s.week_start for s in semanas)
+    fim: date = max(s.week_end for s in semanas)
+
+    def _semana(ciclo_id: Optional[int], d: Optional[date]) -> Optional[dict[str, Any]]:
+        indice = indices.get(ciclo_id)
+        if indice is None:
+            return None
+        idx = indice[0].localizar(d)
+        return saida[indice[1][idx]] if idx is not None else None
+
+    def _filtros(model, coluna):
+        return (model.status_ciclo == "fechado", model.ciclo_id.in_(list(indices)), coluna >= inicio, coluna <= fim)
+
+    horas = (
+        Ciclo.query.filter(*_filtros(Ciclo, Ciclo.data_lancamento))
+        .order_by(Ciclo.nome_colaborador.asc(), Ciclo.data_lancamento.asc(), Ciclo.id.asc())
+        .all()
+    )
+    folgas = (
+        CicloFolga.query.filter(*_filtros(CicloFolga, CicloFolga.data_folga))
+        .order_by(CicloFolga.data_folga.asc(), CicloFolga.id.asc())
+        .all()
+    )
+    ocorrencias = (
+        CicloOcorrencia.query.filter(*_filtros(CicloOcorrencia, CicloOcorrencia.data_ocorrencia))
+        .order_by(
+            CicloOcorrencia.nome_colaborador.asc(), CicloOcorrencia.data_ocorrencia.asc(), CicloOcorrencia.id.asc()
+        )
+        .all()
+    )
+
+    com_folga_utilizada: set[int] = set()
+    for h in horas:
+        semana = _semana(h.ciclo_id, h.data_lancamento)
+        if semana is None:
+            continue
+        if h.origem == ORIGEM_FOLGA_UTILIZADA:
+            semana["folgas"].append(_folga_utilizada_como_folga(h, True, h.ciclo_id))
+            com_folga_utilizada.add(id(semana))
+        else:
+            semana["horas"].append(h)
+    for f in folgas:
+        semana = _semana(f.ciclo_id, f.data_folga)
+        if semana is not None:
+            semana["folgas"].append(f)
+    for o in ocorrencias:
+        semana = _semana(o.ciclo_id, o.data_ocorrencia)
+        if semana is not None:
+            semana["ocorrencias"].append(o)
+
+    # Folgas utilizadas entram na ordem por data (ordenação estável, como nas consultas individuais)
+    for semana in saida:
+        if id(semana) in com_folga_utilizada:
+            semana["folgas"].sort(key=lambda f: (f.data_folga, getattr(f, "id", 0)))
+    return saida
+
+
+def semanas_tem_registros(semanas_detalhadas: Iterable[dict[str, Any]]) -> bool:
+    """Indica se alguma semana possui horas, folgas ou ocorrências."""
+    return any(s["horas"] or s["folgas"] or s["ocorrencias"] for s in semanas_detalhadas)
@@ -0,0 +1,22 @@
+"""
+Construções SQL que dependem do dialeto do banco em uso.
+"""
+
+from .. import db
+
+
+def dialeto_upsert():
+    """
+    INSERT específico do dialeto (SQLite/PostgreSQL) com suporte a ON CONFLICT.
+
+    Retorna None nos demais dialetos; quem chama deve ter um caminho alternativo
+    (consulta + INSERT/UPDATE) para esse caso.
+    """
+    nome = db.session.get_bind().dialect.name
+    if nome == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif nome == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    return insert
@@ -0,0 +1,170 @@
+"""
+Pub/sub em processo para o stream de eventos (Server-Sent Events).
+
+Rotas publicam eventos depois do commit (movimentações de estoque, conclusões de
+limpeza) e cada cliente conectado em /api/v1/eventos tem uma fila própria e limitada:
+se o cliente não consome, o evento mais antigo é descartado e o cliente recebe um
+evento "resync" para recarregar as notificações inteiras.
+
+Sob o waitress cada conexão SSE ocupa uma thread enquanto está aberta, então o número
+de clientes simultâneos é limitado (o excedente recebe 503 e continua no polling) e
+cada stream termina após SSE_DURACAO_MAX segundos (o EventSource reconecta sozinho).
+Enquanto não há eventos, o stream só envia um comentário de heartbeat.
+
+Configuração por variável de ambiente:
+
+    SSE_MAX_CLIENTES   conexões simultâneas (default: 4)
+    SSE_FILA           eventos por cliente antes de descartar (default: 50)
+    SSE_HEARTBEAT      segundos entre heartbeats (default: 20)
+    SSE_DURACAO_MAX    segundos de vida de cada stream (default: 300)
+"""
+
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+from typing import Any, Iterator, Optional
+
+from .notificacoes_leitura_service import invalidar_cache as invalidar_notificacoes
+
+MAX_CLIENTES_PADRAO = 4
+FILA_PADRAO = 50
+HEARTBEAT_PADRAO = 20.0
+DURACAO_MAX_PADRAO = 300.0
+RETRY_MS = 5000
+
+
+def _env_num(nome: str, padrao, tipo=float):
+    try:
+        valor = tipo(str(os.getenv(nome, "")).strip())
+        return valor if valor > 0 else padrao
+    except ValueError:
+        return padrao
+
+
+class Assinatura:
+    """Fila limitada de um cliente conectado."""
+
+    def __init__(self, barramento: "Barramento", user_id: Optional[int], tamanho: int):
+        self.barramento = barramento
+        self.user_id = user_id
+        self.fila: queue.Queue = queue.Queue(maxsize=tamanho)
+        self.descartados = 0
+
+
+class Barramento:
+    """Distribui eventos para as assinaturas ativas (thread-safe)."""
+
+    def __init__(self):
+        self._assinaturas: set[Assinatura] = set()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.publicados = 0
+
+    def assinar(self, user_id: Optional[int] = None, max_clientes: Optional[int] = None) -> Optional[Assinatura]:
+        """Cria a assinatura; None quando o limite de clientes simultâneos foi atingido."""
+        limite = max_clientes or _env_num("SSE_MAX_CLIENTES", MAX_CLIENTES_PADRAO, int)
+        assinatura = Assinatura(self, user_id, _env_num("SSE_FILA", FILA_PADRAO, int))
+        with self._lock:
+            if len(self._assinaturas) >= limite:
+                return None
+            self._assinaturas.add(assinatura)
+        return assinatura
+
+    def cancelar(self, assinatura: Assinatura) -> None:
+        with self._lock:
+            self._assinaturas.discard(assinatura)
+
+    def clientes(self) -> int:
+        with self._lock:
+            return len(self._assinaturas)
+
+    def publicar(self, tipo: str, dados: dict[str, Any]) -> int:
+        """Entrega o evento a todas as assinaturas; retorna quantos clientes o receberam."""
+        evento = {"id": next(self._ids), "tipo": tipo, "dados": dados}
+        with self._lock:
+            alvos = list(self._assinaturas)
+            self.publicados += 1
+        for assinatura in alvos:
+            while True:
+                try:
+                    assinatura.fila.put_nowait(evento)
+                    break
+                except queue.Full:
+                    try:
+                        assinatura.fila.get_nowait()  # descarta o mais antigo
+                        assinatura.descartados += 1
+                    except queue.Empty:
+                        pass
+        return len(alvos)
+
+
+barramento = Barramento()
+
+
+def publicar(tipo: str, **dados) -> int:
+    """Publica um evento no barramento do processo (nunca levanta exceção para a rota)."""
+    try:
+        return barramento.publicar(tipo, dados)
+    except Exception:
+        return 0
+
+
+def publicar_estoque(produto, acao: str, quantidade: int) -> int:
+    """Delta de uma movimentação de estoque (já commitada); invalida o cache de notificações."""
+    invalidar_notificacoes()
+    minimo = produto.estoque_minimo or 0
+    return publicar(
+        "estoque",
+        produto_id=produto.id,
+        nome=produto.nome,
+        acao=acao,
+        quantidade=quantidade,
+        estoque=produto.quantidade,
+        estoque_minimo=minimo,
+        critico=bool(minimo > 0 and (produto.quantidade or 0) <= minimo),
+    )
+
+
+def publicar_limpeza(tarefa) -> int:
+    """Delta de uma conclusão de limpeza (já commitada); invalida o cache de notificações."""
+    invalidar_notificacoes()
+    return publicar("limpeza", task_id=tarefa.id, nome=tarefa.nome_limpeza, proxima_data=tarefa.proxima_data)
+
+
+def formatar(evento: dict[str, Any]) -> str:
+    """Evento no formato text/event-stream."""
+    dados = json.dumps(evento["dados"], ensure_ascii=False, default=str)
+    return f"id: {evento['id']}\nevent: {evento['tipo']}\ndata: {dados}\n\n"
+
+
+def transmitir(
+    assinatura: Assinatura, heartbeat_s: Optional[float] = None, duracao_max_s: Optional[float] = None
+) -> Iterator[str]:
+    """
+    Gerador do corpo da resposta SSE: eventos da fila, heartbeats e fim após duracao_max_s.
+
+    Não acessa o banco (roda depois que a requisição liberou a sessão).
+    """
+    heartbeat_s = heartbeat_s or _env_num("SSE_HEARTBEAT", HEARTBEAT_PADRAO)
+    duracao_max_s = duracao_max_s or _env_num("SSE_DURACAO_MAX", DURACAO_MAX_PADRAO)
+    fim = time.monotonic() + duracao_max_s
+    try:
+        yield f"retry: {RETRY_MS}\n: conectado\n\n"
+        while True:
+            restante = fim - time.monotonic()
+            if restante <= 0:
+                return
+            try:
+                evento = assinatura.fila.get(timeout=min(heartbeat_s, restante))
+            except queue.Empty:
+                yield ": ping\n\n"
+                continue
+            if assinatura.descartados:
+                assinatura.descartados = 0
+                yield formatar({"id": evento["id"], "tipo": "resync", "dados": {}})
+            yield formatar(evento)
+    finally:
+        assinatura.barramento.cancelar(assinatura)
@@ -0,0 +1,158 @@
+"""
+Calendário de feriados (nacionais, móveis e municipais de Umbaúba).
+
+As datas de um ano (fixas + móveis calculadas a partir da Páscoa) são calculadas uma
+única vez por processo. A gravação em Holiday é idempotente e em lote (um INSERT com
+ON CONFLICT DO NOTHING na data) e acontece apenas na inicialização do app ou por
+persistir_anos(); o caminho de leitura (dashboard, /escala) nunca escreve.
+
+As leituras vêm de um cache em memória por ano (linhas de Holiday, incluindo feriados
+cadastrados manualmente). Rotas que alteram Holiday chamam invalidar_cache().
+Enquanto um ano ainda não foi gravado, a leitura usa as datas calculadas.
+"""
+
+import threading
+import time
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Any, Iterable, Optional
+
+from sqlalchemy import extract, select
+
+from .. import db
+from ..models import Holiday
+from .dialeto_service import dialeto_upsert
+
+CACHE_TTL_S = 600.0
+
+KIND_NACIONAL = "nacional"
+KIND_MUNICIPAL = "municipal-Umbaúba"
+KIND_FACULTATIVO = "facultativo"
+
+FIXOS_NACIONAIS = (
+    (1, 1, "Confraternização Universal"),
+    (4, 21, "Tiradentes"),
+    (5, 1, "Dia do Trabalho"),
+    (9, 7, "Independência do Brasil"),
+    (10, 12, "Nossa Senhora Aparecida"),
+    (11, 2, "Finados"),
+    (11, 15, "Proclamação da República"),
+    (11, 20, "Consciência Negra"),
+    (12, 25, "Natal"),
+)
+FIXOS_MUNICIPAIS = (
+    (2, 2, "Padroeiro de Umbaúba"),
+    (2, 6, "Aniversário de Umbaúba"),
+)
+
+_cache: dict[int, tuple[float, tuple[dict[str, Any], ...]]] = {}
+_lock = threading.Lock()
+
+
+def pascoa(ano: int) -> date:
+    """Domingo de Páscoa (algoritmo de Meeus/Jones/Butcher, calendário gregoriano)."""
+    a = ano % 19
+    b, c = divmod(ano, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    ll = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * ll) // 451
+    mes, dia = divmod(h + ll - 7 * m + 114, 31)
+    return date(ano, mes, dia + 1)
+
+
+def carnaval(ano: int) -> date:
+    """Terça-feira de Carnaval (ponto facultativo; exibido no calendário, não gravado)."""
+    return pascoa(ano) - timedelta(days=47)
+
+
+@lru_cache(maxsize=32)
+def calcular_ano(ano: int) -> tuple[tuple[date, str, str], ...]:
+    """Feriados gravados em Holiday para o ano: (data, nome, kind), ordenados por data."""
+    p = pascoa(ano)
+    itens = [(date(ano, m, d), nome, KIND_NACIONAL) for m, d, nome in FIXOS_NACIONAIS]
+    itens += [(date(ano, m, d), nome, KIND_MUNICIPAL) for m, d, nome in FIXOS_MUNICIPAIS]
+    itens += [
+        (p - timedelta(days=2), "Sexta-Feira Santa", KIND_NACIONAL),
+        (p + timedelta(days=60), "Corpus Christi", KIND_NACIONAL),
+    ]
+    return tuple(sorted(itens))
+
+
+def persistir_anos(anos: Iterable[int]) -> int:
+    """
+    Grava os feriados calculados dos anos em Holiday (idempotente; não altera datas já cadastradas).
+
+    Returns:
+        Quantidade de linhas inseridas.
+    """
+    linhas = [
+        {"date": d, "name": nome, "kind": kind} for ano in sorted(set(anos)) for d, nome, kind in calcular_ano(ano)
+    ]
+    if not linhas:
+        return 0
+    existentes = set(
+        db.session.execute(select(Holiday.date).where(Holiday.date.in_([r["date"] for r in linhas]))).scalars()
+    )
+    novas = [r for r in linhas if r["date"] not in existentes]
+    if novas:
+        insert = dialeto_upsert()
+        if insert is not None:
+            db.session.execute(insert(Holiday).on_conflict_do_nothing(index_elements=["date"]), novas)
+        else:
+            db.session.execute(Holiday.__table__.insert(), novas)
+        db.session.commit()
+    invalidar_cache()
+    return len(novas)
+
+
+def invalidar_cache(ano: Optional[int] = None) -> None:
+    """Descarta o cache de leitura (de um ano ou de todos)."""
+    with _lock:
+        if ano is None:
+            _cache.clear()
+        else:
+            _cache.pop(ano, None)
+
+
+def feriados_do_ano(ano: int) -> tuple[dict[str, Any], ...]:
+    """Feriados do ano (dicts com id, date, name, kind), ordenados por data; somente leitura."""
+    agora = time.monotonic()
+    with _lock:
+        em_cache = _cache.get(ano)
+    if em_cache and em_cache[0] > agora:
+        return em_cache[1]
+
+    linhas = db.session.execute(
+        select(Holiday.id, Holiday.date, Holiday.name, Holiday.kind)
+        .where(extract("year", Holiday.date) == ano)
+        .order_by(Holiday.date.asc())
+    ).all()
+    itens = [{"id": r.id, "date": r.date, "name": r.name, "kind": r.kind} for r in linhas]
+    calculados = calcular_ano(ano)
+    datas = {i["date"] for i in itens}
+    if not any(d in datas for d, _, _ in calculados):
+        # Ano ainda não gravado: usa as datas calculadas, sem escrever no banco
+        itens += [{"id": None, "date": d, "name": nome, "kind": kind} for d, nome, kind in calculados if d not in datas]
+        itens.sort(key=lambda i: i["date"])
+    resultado = tuple(itens)
+    with _lock:
+        _cache[ano] = (agora + CACHE_TTL_S, resultado)
+    return resultado
+
+
+def feriados_periodo(inicio: date, fim: date) -> list[dict[str, Any]]:
+    """Feriados entre inicio e fim (inclusive)."""
+    return [h for ano in range(inicio.year, fim.year + 1) for h in feriados_do_ano(ano) if inicio <= h["date"] <= fim]
+
+
+def proximo_feriado(hoje: date) -> Optional[dict[str, Any]]:
+    """Primeiro feriado a partir de hoje (ano corrente ou seguinte)."""
+    for ano in (hoje.year, hoje.year + 1):
+        for h in feriados_do_ano(ano):
+            if h["date"] >= hoje:
+                return h
+    return None
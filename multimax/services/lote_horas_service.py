@@ -0,0 +1,322 @@
+"""
+Motor de operações em lote de horas (BulkHourOperation / TimeOffRecord).
+
+Também fornece a listagem paginada dos logs de lotes (paginação por chave em
+(created_at, id), usando o índice ix_bulk_hour_operations_created_at_id).
+
+Os registros do lote são gravados com INSERT do Core em executemany (sem um objeto ORM
+por colaborador), em blocos com commit por bloco. A correção de um lote é feita com
+UPDATE/DELETE por bulk_id, sem percorrer os registros um a um. inserir_em_lote() serve
+para qualquer tabela (TimeOffRecord, Ciclo...).
+
+Configuração por variável de ambiente:
+
+    LOTE_HORAS_CHUNK   linhas por bloco/commit (default: 500)
+"""
+
+import base64
+import os
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Iterable, Optional
+
+from sqlalchemy import and_, delete, func, or_, select, update
+
+from .. import db
+from ..models import BulkHourOperation, TimeOffRecord
+
+CHUNK_PADRAO = 500
+TIPOS_LOTE = ("acrescimo", "desconto")
+LOGS_POR_PAGINA = 50
+
+
+def tamanho_chunk() -> int:
+    """Linhas por bloco definido em LOTE_HORAS_CHUNK."""
+    try:
+        return max(1, int(str(os.getenv("LOTE_HORAS_CHUNK", "")).strip()))
+    except ValueError:
+        return CHUNK_PADRAO
+
+
+def _estatisticas(linhas: int, blocos: int, inicio: float) -> dict[str, Any]:
+    duracao = time.perf_counter() - inicio
+    return {
+        "linhas": linhas,
+        "blocos": blocos,
+        "duracao_s": round(duracao, 3),
+        "linhas_por_s": round(linhas / duracao, 1) if duracao > 0 else None,
+    }
+
+
+def inserir_em_lote(
+    tabela, linhas: list[dict[str, Any]], chunk: Optional[int] = None, commit: bool = True
+) -> dict[str, Any]:
+    """
+    Insere linhas com INSERT do Core (executemany), em blocos.
+
+    Args:
+        tabela: Table ou modelo (usa __table__)
+        linhas: dicts coluna -> valor (defaults Python das colunas são aplicados pelo Core)
+        chunk: Linhas por bloco (default: LOTE_HORAS_CHUNK)
+        commit: Commit ao fim de cada bloco (False: o chamador controla a transação)
+
+    Returns:
+        dict com linhas, blocos, duracao_s e linhas_por_s.
+    """
+    tabela = getattr(tabela, "__table__", tabela)
+    chunk = chunk or tamanho_chunk()
+    inicio = time.perf_counter()
+    blocos = 0
+    for i in range(0, len(linhas), chunk):
+        db.session.execute(tabela.insert(), linhas[i : i + chunk])
+        blocos += 1
+        if commit:
+            db.session.commit()
+    return _estatisticas(len(linhas), blocos, inicio)
+
+
+def validar_dados(tipo: Optional[str], horas: Optional[str], data_str: Optional[str]) -> tuple[str, float, date]:
+    """Valida tipo/horas/data do formulário de lote; levanta ValueError com a mensagem para o usuário."""
+    tipo = (tipo or "").strip().lower()
+    if tipo not in TIPOS_LOTE:
+        raise ValueError("Tipo inválido.")
+    try:
+        horas_float = float(str(horas or "").replace(",", "."))
+    except ValueError:
+        raise ValueError("Horas inválidas.") from None
+    if horas_float <= 0:
+        raise ValueError("Horas devem ser maiores que zero.")
+    try:
+        data = datetime.strptime((data_str or "").strip(), "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError("Data inválida.") from None
+    return tipo, horas_float, data
+
+
+def _ids(collaborator_ids: Iterable) -> list[int]:
+    vistos: dict[int, None] = {}
+    for cid in collaborator_ids:
+        try:
+            vistos[int(cid)] = None
+        except (TypeError, ValueError):
+            continue
+    return list(vistos)
+
+
+def _novo_lote(
+    usuario: str,
+    tipo: str,
+    horas: float,
+    data: date,
+    observacao: Optional[str],
+    total: int,
+    ciclo_semana_id: Optional[int] = None,
+    ciclo_mes_id: Optional[int] = None,
+    correcao_de: Optional[str] = None,
+) -> BulkHourOperation:
+    bulk = BulkHourOperation()
+    bulk.created_by = usuario
+    bulk.custom_date = data
+    bulk.hours = horas
+    bulk.type = tipo
+    bulk.observation = observacao or ""
+    bulk.cycle_week_id = ciclo_semana_id
+    bulk.cycle_month_id = ciclo_mes_id
+    bulk.total_collaborators = total
+    bulk.correction_of_id = correcao_de
+    db.session.add(bulk)
+    db.session.flush()  # Garante ID para bulk_id
+    return bulk
+
+
+def _linhas_registros(bulk: BulkHourOperation, collaborator_ids: list[int], origem: str) -> list[dict[str, Any]]:
+    return [
+        {
+            "collaborator_id": cid,
+            "date": bulk.custom_date,
+            "record_type": bulk.type,
+            "hours": bulk.hours,
+            "origin": origem,
+            "notes": bulk.observation,
+            "created_by": bulk.created_by,
+            "bulk_id": bulk.id,
+        }
+        for cid in collaborator_ids
+    ]
+
+
+def aplicar_lote(
+    usuario: str,
+    tipo: str,
+    horas: float,
+    data: date,
+    observacao: Optional[str],
+    collaborator_ids: Iterable,
+    ciclo_semana_id: Optional[int] = None,
+    ciclo_mes_id: Optional[int] = None,
+    chunk: Optional[int] = None,
+) -> tuple[BulkHourOperation, dict[str, Any]]:
+    """
+    Cria o lote e insere um TimeOffRecord por colaborador em blocos.
+
+    O cabeçalho do lote é gravado no primeiro commit; cada bloco de registros tem seu
+    próprio commit (uma falha no meio deixa gravados os blocos anteriores, com o total
+    do lote indicando quantos eram esperados).
+
+    Returns:
+        (lote, estatísticas de inserir_em_lote)
+    """
+    ids = _ids(collaborator_ids)
+    inicio = time.perf_counter()
+    bulk = _novo_lote(usuario, tipo, horas, data, observacao, len(ids), ciclo_semana_id, ciclo_mes_id)
+    db.session.commit()
+    stats = inserir_em_lote(TimeOffRecord, _linhas_registros(bulk, ids, "lote"), chunk=chunk)
+    stats.update(_estatisticas(stats["linhas"], stats["blocos"], inicio))
+    return bulk, stats
+
+
+def corrigir_lote(
+    lote: BulkHourOperation,
+    usuario: str,
+    tipo: str,
+    horas: float,
+    data: date,
+    observacao: Optional[str],
+    collaborator_ids: Iterable,
+    ciclo_semana_id: Optional[int] = None,
+    ciclo_mes_id: Optional[int] = None,
+    chunk: Optional[int] = None,
+) -> tuple[BulkHourOperation, dict[str, Any]]:
+    """
+    Cria um lote de correção e move para ele os registros do lote original.
+
+    - colaboradores mantidos: um UPDATE por bulk_id (novos valores + bulk_id da correção)
+    - colaboradores removidos: um DELETE por bulk_id
+    - colaboradores novos: INSERT em blocos
+
+    Returns:
+        (lote de correção, estatísticas com atualizados/removidos/inseridos e linhas_por_s)
+    """
+    ids = _ids(collaborator_ids)
+    inicio = time.perf_counter()
+    novo = _novo_lote(usuario, tipo, horas, data, observacao, len(ids), ciclo_semana_id, ciclo_mes_id, lote.id)
+
+    existentes = set(
+        db.session.execute(select(TimeOffRecord.collaborator_id).where(TimeOffRecord.bulk_id == lote.id)).scalars()
+    )
+    mantidos = [cid for cid in ids if cid in existentes]
+    atualizados = 0
+    if mantidos:
+        atualizados = db.session.execute(
+            update(TimeOffRecord)
+            .where(TimeOffRecord.bulk_id == lote.id, TimeOffRecord.collaborator_id.in_(mantidos))
+            .values(
+                date=data,
+                record_type=tipo,
+                hours=horas,
+                origin="lote_correção",
+                notes=observacao or "",
+                bulk_id=novo.id,
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount
+    removidos = db.session.execute(
+        delete(TimeOffRecord).where(TimeOffRecord.bulk_id == lote.id).execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+
+    novos = [cid for cid in ids if cid not in existentes]
+    stats = inserir_em_lote(TimeOffRecord, _linhas_registros(novo, novos, "lote_correção"), chunk=chunk)
+    total = atualizados + removidos + stats["linhas"]
+    stats.update(_estatisticas(total, stats["blocos"] + 1, inicio))
+    stats.update({"atualizados": atualizados, "removidos": removidos, "inseridos": len(novos)})
+    return novo, stats
+
+
+def codificar_cursor(lote: BulkHourOperation) -> str:
+    """Cursor opaco (created_at, id) do último lote de uma página."""
+    bruto = f"{lote.created_at.isoformat()}|{lote.id}"
+    return base64.urlsafe_b64encode(bruto.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decodificar_cursor(cursor: Optional[str]) -> Optional[tuple[datetime, str]]:
+    """Decodifica o cursor; None quando ausente ou inválido (volta para a primeira página)."""
+    if not cursor:
+        return None
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        momento, lote_id = bruto.split("|", 1)
+        return datetime.fromisoformat(momento), lote_id
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def listar_lotes(
+    cursor: Optional[str] = None,
+    limite: int = LOGS_POR_PAGINA,
+    tipo: Optional[str] = None,
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+    criador: Optional[str] = None,
+) -> dict[str, Any]:
+    """
+    Página de lotes, do mais recente para o mais antigo.
+
+    Contagens de registros e de correções vêm como subconsultas na mesma consulta
+    (sem N+1 ao renderizar). Filtros: tipo, período de criação (inclusivo) e criador.
+
+    Returns:
+        dict com itens (lote, registros, correcoes) e proximo_cursor (None na última página).
+    """
+    limite = max(1, min(int(limite or LOGS_POR_PAGINA), 200))
+    registros = (
+        select(func.count(TimeOffRecord.id))
+        .where(TimeOffRecord.bulk_id == BulkHourOperation.id)
+        .correlate(BulkHourOperation)
+        .scalar_subquery()
+    )
+    correcao = db.aliased(BulkHourOperation)
+    correcoes = (
+        select(func.count(correcao.id))
+        .where(correcao.correction_of_id == BulkHourOperation.id)
+        .correlate(BulkHourOperation)
+        .scalar_subquery()
+    )
+    query = select(BulkHourOperation, registros, correcoes)
+
+    if tipo in TIPOS_LOTE:
+        query = query.where(BulkHourOperation.type == tipo)
+    if criador:
+        query = query.where(BulkHourOperation.created_by == str(criador))
+    if data_inicio:
+        query = query.where(BulkHourOperation.created_at >= datetime.combine(data_inicio, datetime.min.time()))
+    if data_fim:
+        query = query.where(
+            BulkHourOperation.created_at < datetime.combine(data_fim + timedelta(days=1), datetime.min.time())
+        )
+    chave = decodificar_cursor(cursor)
+    if chave:
+        momento, lote_id = chave
+        query = query.where(
+            or_(
+                BulkHourOperation.created_at < momento,
+                and_(BulkHourOperation.created_at == momento, BulkHourOperation.id < lote_id),
+            )
+        )
+
+    linhas = db.session.execute(
+        query.order_by(BulkHourOperation.created_at.desc(), BulkHourOperation.id.desc()).limit(limite + 1)
+    ).all()
+    itens = [
+        {"lote": lote, "registros": int(n_reg or 0), "correcoes": int(n_corr or 0)} for lote, n_reg, n_corr in linhas
+    ]
+    proximo = None
+    if len(itens) > limite:
+        itens = itens[:limite]
+        proximo = codificar_cursor(itens[-1]["lote"])
+    return {"itens": itens, "proximo_cursor": proximo}
+
+
+def criadores_lotes() -> list[str]:
+    """Valores distintos de created_by (para o filtro por criador)."""
+    return [c for c in db.session.execute(select(BulkHourOperation.created_by).distinct()).scalars().all() if c]
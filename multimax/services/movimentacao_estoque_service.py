@@ -0,0 +1,317 @@
+"""
+Motor de movimentações de estoque (entrada/saída de Produto).
+
+Cada movimentação é um único UPDATE condicional no banco:
+
+    UPDATE produto SET quantidade = quantidade - :q WHERE id = :id AND quantidade >= :q
+
+e o registro em Historico é gravado na mesma transação. Não há leitura-modificação-
+escrita em Python: dois leitores simultâneos no mesmo produto não perdem atualizações e
+a verificação de estoque suficiente é feita pelo próprio UPDATE.
+
+movimentar_lote() aplica várias linhas de uma vez (uma transação; Historico em
+executemany), com resultado por linha. Para o endpoint de lote da API, resolver_itens()
+valida todas as linhas antes de qualquer escrita e as respostas ficam guardadas em
+MovimentacaoLote pela chave de idempotência, para que um retry não movimente duas vezes.
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Any, Iterable, Optional
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import delete, func, insert, or_, select, update
+from sqlalchemy.orm.attributes import set_committed_value
+
+from .. import db
+from ..models import Historico, MovimentacaoLote, Produto
+
+OPERACOES = ("entrada", "saida")
+DETALHES_PADRAO = {"entrada": "Entrada de estoque", "saida": "Saída de estoque"}
+LOTE_MAX_PADRAO = 500
+IDEMPOTENCIA_DIAS = 7
+
+
+class MovimentacaoInvalida(ValueError):
+    """Movimentação recusada; `codigo` identifica o motivo para respostas da API."""
+
+    def __init__(self, mensagem: str, codigo: str, disponivel: Optional[int] = None):
+        super().__init__(mensagem)
+        self.codigo = codigo
+        self.disponivel = disponivel
+
+
+def validar(op: Any, quantidade: Any) -> tuple[str, int]:
+    """Normaliza operação e quantidade; levanta MovimentacaoInvalida."""
+    op = str(op or "").strip().lower()
+    if op not in OPERACOES:
+        raise MovimentacaoInvalida("Operação inválida (use entrada ou saida).", "operacao_invalida")
+    if isinstance(quantidade, bool):
+        raise MovimentacaoInvalida("Quantidade inválida.", "quantidade_invalida")
+    try:
+        qtd = int(str(quantidade).strip())
+    except (TypeError, ValueError):
+        raise MovimentacaoInvalida("Quantidade inválida.", "quantidade_invalida") from None
+    if qtd <= 0:
+        raise MovimentacaoInvalida("A quantidade deve ser maior que zero.", "quantidade_invalida")
+    return op, qtd
+
+
+def _atualizar(produto_id: int, op: str, qtd: int) -> tuple[int, str]:
+    """UPDATE condicional; retorna (novo estoque, nome) ou levanta MovimentacaoInvalida."""
+    atual = func.coalesce(Produto.quantidade, 0)
+    stmt = update(Produto).where(Produto.id == produto_id)
+    if op == "entrada":
+        stmt = stmt.values(quantidade=atual + qtd)
+    else:
+        stmt = stmt.where(atual >= qtd).values(quantidade=atual - qtd)
+    stmt = stmt.execution_options(synchronize_session=False)
+
+    if db.session.get_bind().dialect.update_returning:
+        linha = db.session.execute(stmt.returning(Produto.quantidade, Produto.nome)).first()
+    else:
+        linha = None
+        if db.session.execute(stmt).rowcount:
+            linha = db.session.execute(select(Produto.quantidade, Produto.nome).where(Produto.id == produto_id)).first()
+    if linha is None:
+        existente = db.session.execute(select(Produto.quantidade).where(Produto.id == produto_id)).first()
+        if existente is None:
+            raise MovimentacaoInvalida("Produto não encontrado.", "produto_nao_encontrado")
+        disponivel = int(existente[0] or 0)
+        raise MovimentacaoInvalida(
+            f"Saída de {qtd} excede estoque atual ({disponivel}).", "estoque_insuficiente", disponivel
+        )
+
+    novo, nome = int(linha[0]), linha[1]
+    # Mantém coerente a instância já carregada na sessão (o UPDATE não passa pelo identity map)
+    instancia = db.session.identity_map.get(db.session.identity_key(Produto, produto_id))
+    if instancia is not None:
+        set_committed_value(instancia, "quantidade", novo)
+    return novo, nome
+
+
+def _linha_historico(produto_id: int, nome: str, op: str, qtd: int, detalhes: Optional[str], usuario: str) -> dict:
+    return {
+        "product_id": produto_id,
+        "product_name": nome,
+        "action": op,
+        "quantidade": qtd,
+        "details": (str(detalhes or "").strip() or DETALHES_PADRAO[op])[:255],
+        "usuario": usuario,
+        "data": datetime.now(ZoneInfo("America/Sao_Paulo")),
+    }
+
+
+def movimentar(
+    produto_id: int,
+    op: str,
+    quantidade: Any,
+    usuario: str,
+    detalhes: Optional[str] = None,
+    commit: bool = True,
+) -> dict[str, Any]:
+    """
+    Aplica uma entrada/saída e grava o Historico na mesma transação.
+
+    Em caso de recusa a transação é desfeita (quando commit=True) e MovimentacaoInvalida
+    é levantada.
+
+    Returns:
+        dict com produto_id, nome, op, quantidade e estoque (novo saldo).
+    """
+    op, qtd = validar(op, quantidade)
+    try:
+        novo, nome = _atualizar(int(produto_id), op, qtd)
+        db.session.execute(insert(Historico), [_linha_historico(int(produto_id), nome, op, qtd, detalhes, usuario)])
+        if commit:
+            db.session.commit()
+    except Exception:
+        if commit:
+            db.session.rollback()
+        raise
+    return {"produto_id": int(produto_id), "nome": nome, "op": op, "quantidade": qtd, "estoque": novo}
+
+
+def movimentar_lote(
+    linhas: Iterable[dict[str, Any]], usuario: str, atomico: bool = True, commit: bool = True
+) -> tuple[list[dict[str, Any]], bool]:
+    """
+    Aplica várias movimentações numa transação.
+
+    Cada linha: {"produto_id", "op", "quantidade", "detalhes"} e, opcionalmente, "linha"
+    (índice devolvido no resultado; default é a posição). Com atomico=False só as linhas
+    recusadas ficam de fora: um UPDATE condicional que não casa nenhuma linha não altera
+    nada, então não há o que desfazer. Com atomico=True a primeira linha recusada desfaz o
+    lote inteiro: com commit=True o rollback é feito aqui; com commit=False a transação é
+    do chamador, que deve desfazê-la (db.session.rollback()) ao receber False.
+
+    Sem SAVEPOINT de propósito: no pysqlite o SAVEPOINT pode abrir a transação, e o
+    RELEASE efetivaria os UPDATEs sem o Historico.
+
+    Returns:
+        (resultados por linha com ok/erro/codigo, True se algo foi gravado)
+    """
+    resultados: list[dict[str, Any]] = []
+    historicos: list[dict[str, Any]] = []
+    falhou = False
+    for pos, linha in enumerate(linhas):
+        i = linha.get("linha", pos)
+        try:
+            op, qtd = validar(linha.get("op"), linha.get("quantidade"))
+            produto_id = int(linha.get("produto_id") or 0)
+            novo, nome = _atualizar(produto_id, op, qtd)
+        except MovimentacaoInvalida as e:
+            falhou = True
+            resultados.append({"linha": i, "ok": False, "erro": str(e), "codigo": e.codigo})
+            if atomico:
+                break
+            continue
+        historicos.append(_linha_historico(produto_id, nome, op, qtd, linha.get("detalhes"), usuario))
+        resultados.append(
+            {
+                "linha": i,
+                "ok": True,
+                "produto_id": produto_id,
+                "nome": nome,
+                "op": op,
+                "quantidade": qtd,
+                "estoque": novo,
+            }
+        )
+
+    if atomico and falhou:
+        if commit:
+            db.session.rollback()
+        for r in resultados:
+            if r["ok"]:
+                r.update({"ok": False, "erro": "Lote desfeito por erro em outra linha.", "codigo": "lote_desfeito"})
+        return resultados, False
+    if historicos:
+        db.session.execute(insert(Historico), historicos)
+    if commit:
+        db.session.commit()
+    return resultados, bool(historicos)
+
+
+def limite_lote() -> int:
+    """Máximo de linhas por lote (MOVIMENTACAO_LOTE_MAX)."""
+    try:
+        valor = int(os.getenv("MOVIMENTACAO_LOTE_MAX", LOTE_MAX_PADRAO))
+        return valor if valor > 0 else LOTE_MAX_PADRAO
+    except ValueError:
+        return LOTE_MAX_PADRAO
+
+
+def _erro_linha(i: int, mensagem: str, codigo: str) -> dict[str, Any]:
+    return {"linha": i, "ok": False, "erro": mensagem, "codigo": codigo}
+
+
+def resolver_itens(itens: list[Any]) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    """
+    Valida um lote da API antes de qualquer escrita.
+
+    Cada item: {"id" ou "codigo", "op", "quantidade", "detalhes"}. Produtos são resolvidos
+    com uma consulta (ids e códigos juntos) e o saldo é simulado na ordem do lote, de modo
+    que todas as linhas com estoque insuficiente aparecem de uma vez. O UPDATE condicional
+    continua sendo a garantia final contra movimentações concorrentes.
+
+    Returns:
+        (linhas prontas para movimentar_lote, erros por linha)
+    """
+    erros: list[dict[str, Any]] = []
+    parciais = []
+    ids: set[int] = set()
+    codigos: set[str] = set()
+    for i, item in enumerate(itens):
+        if not isinstance(item, dict):
+            erros.append(_erro_linha(i, "Item deve ser um objeto.", "item_invalido"))
+            continue
+        try:
+            op, qtd = validar(item.get("op"), item.get("quantidade"))
+        except MovimentacaoInvalida as e:
+            erros.append(_erro_linha(i, str(e), e.codigo))
+            continue
+        ident, codigo = item.get("id"), str(item.get("codigo") or "").strip()
+        if ident not in (None, ""):
+            try:
+                ident = int(ident)
+            except (TypeError, ValueError):
+                erros.append(_erro_linha(i, "id do produto inválido.", "produto_invalido"))
+                continue
+            ids.add(ident)
+        elif codigo:
+            ident = None
+            codigos.add(codigo)
+        else:
+            erros.append(_erro_linha(i, "Informe id ou codigo do produto.", "produto_invalido"))
+            continue
+        parciais.append((i, ident, codigo, op, qtd, item.get("detalhes")))
+
+    por_id: dict[int, tuple[str, int]] = {}
+    por_codigo: dict[str, int] = {}
+    filtros = ([Produto.id.in_(ids)] if ids else []) + ([Produto.codigo.in_(codigos)] if codigos else [])
+    if filtros:
+        for pid, codigo, quantidade in db.session.execute(
+            select(Produto.id, Produto.codigo, Produto.quantidade).where(or_(*filtros))
+        ):
+            por_id[pid] = (codigo, int(quantidade or 0))
+            por_codigo[codigo] = pid
+
+    saldo = {pid: qtd for pid, (_, qtd) in por_id.items()}
+    linhas: list[dict[str, Any]] = []
+    for i, ident, codigo, op, qtd, detalhes in parciais:
+        produto_id = ident if ident is not None else por_codigo.get(codigo)
+        if produto_id not in por_id:
+            erros.append(_erro_linha(i, "Produto não encontrado.", "produto_nao_encontrado"))
+            continue
+        if op == "saida" and saldo[produto_id] < qtd:
+            erros.append(
+                _erro_linha(i, f"Saída de {qtd} excede estoque atual ({saldo[produto_id]}).", "estoque_insuficiente")
+            )
+            continue
+        saldo[produto_id] += qtd if op == "entrada" else -qtd
+        linhas.append(
+            {
+                "linha": i,
+                "produto_id": produto_id,
+                "op": op,
+                "quantidade": qtd,
+                "detalhes": detalhes,
+            }
+        )
+    erros.sort(key=lambda e: e["linha"])
+    return linhas, erros
+
+
+def hash_lote(corpo: Any) -> str:
+    """SHA-256 canônico do corpo do lote (detecta reuso da chave com outro conteúdo)."""
+    texto = json.dumps(corpo, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
+def buscar_lote(user_id: int, chave: str) -> Optional[MovimentacaoLote]:
+    """Lote já processado com esta chave de idempotência (por usuário)."""
+    return db.session.execute(
+        select(MovimentacaoLote).where(MovimentacaoLote.user_id == user_id, MovimentacaoLote.chave == chave)
+    ).scalar_one_or_none()
+
+
+def registrar_lote(user_id: int, chave: str, hash_corpo: str, status_code: int, resposta: dict[str, Any]) -> None:
+    """
+    Guarda a resposta do lote na transação corrente (sem commit), junto com as movimentações.
+
+    Aproveita para descartar chaves com mais de IDEMPOTENCIA_DIAS dias.
+    """
+    limite = datetime.now(ZoneInfo("America/Sao_Paulo")) - timedelta(days=IDEMPOTENCIA_DIAS)
+    db.session.execute(delete(MovimentacaoLote).where(MovimentacaoLote.created_at < limite))
+    db.session.add(
+        MovimentacaoLote(
+            user_id=user_id,
+            chave=chave,
+            hash_corpo=hash_corpo,
+            status_code=status_code,
+            resposta=json.dumps(resposta, ensure_ascii=False, default=str),
+        )
+    )
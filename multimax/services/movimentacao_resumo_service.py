@@ -0,0 +1,102 @@
+"""
+Somas de movimentação de estoque (Historico) por período, calculadas no banco.
+
+Os gráficos de produto (PDF de exportacao.exportar_graficos_produto e a aba de gráficos
+do estoque) carregavam cada linha de Historico do produto — sem limite de data, no caso
+dos totais mensais e anuais — só para somar as quantidades em Python. Aqui cada série é
+um único SELECT ... GROUP BY (período, action) filtrado por product_id e pelo intervalo
+da série, coberto pelo índice composto ix_historico_product_data (product_id, data).
+
+O período é a data de início do balde ("YYYY-MM-DD"): o próprio dia, a segunda-feira da
+semana, o dia 1 do mês ou 1º de janeiro, calculado com strftime/date no SQLite e
+date_trunc no PostgreSQL. As séries devolvem os baldes vazios com zero, na ordem.
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import func, select
+
+from .. import db
+from ..models import Historico
+
+_FORMATO_SQLITE = {"dia": "%Y-%m-%d", "mes": "%Y-%m-01", "ano": "%Y-01-01"}
+_TRUNC_POSTGRES = {"dia": "day", "semana": "week", "mes": "month", "ano": "year"}
+
+
+def _inicio_periodo(granularidade: str):
+    if db.session.get_bind().dialect.name == "postgresql":
+        return func.to_char(func.date_trunc(_TRUNC_POSTGRES[granularidade], Historico.data), "YYYY-MM-DD")
+    if granularidade == "semana":
+        # 'weekday 0' avança até o domingo (ou fica nele); -6 dias volta à segunda-feira
+        return func.date(Historico.data, "weekday 0", "-6 days")
+    return func.strftime(_FORMATO_SQLITE[granularidade], Historico.data)
+
+
+def somar_por_periodo(
+    produto_id: int, granularidade: str, inicio: Optional[date] = None, fim: Optional[date] = None
+) -> dict[date, dict[str, int]]:
+    """
+    Soma das quantidades por período e action ("entrada", "saida", ...) num único GROUP BY.
+
+    Args:
+        granularidade: "dia", "semana", "mes" ou "ano"
+        inicio, fim: intervalo de datas (inclusivo), opcional
+
+    Returns:
+        {início do período: {action: quantidade}}, só com os períodos que têm movimentação
+    """
+    periodo = _inicio_periodo(granularidade).label("periodo")
+    stmt = select(periodo, Historico.action, func.coalesce(func.sum(Historico.quantidade), 0)).where(
+        Historico.product_id == produto_id
+    )
+    if inicio:
+        stmt = stmt.where(Historico.data >= datetime.combine(inicio, datetime.min.time()))
+    if fim:
+        stmt = stmt.where(Historico.data < datetime.combine(fim + timedelta(days=1), datetime.min.time()))
+    somas: dict[date, dict[str, int]] = {}
+    for chave, acao, total in db.session.execute(stmt.group_by(periodo, Historico.action)):
+        if chave is None or acao is None:
+            continue
+        somas.setdefault(date.fromisoformat(str(chave)[:10]), {})[acao] = int(total or 0)
+    return somas
+
+
+def _serie(produto_id: int, granularidade: str, baldes: list[date], rotulo, fim: Optional[date] = None):
+    somas = somar_por_periodo(produto_id, granularidade, baldes[0], fim)
+    labels = [rotulo(b) for b in baldes]
+    entradas = [somas.get(b, {}).get("entrada", 0) for b in baldes]
+    saidas = [somas.get(b, {}).get("saida", 0) for b in baldes]
+    return labels, entradas, saidas
+
+
+def serie_semanal(produto_id: int, semanas: int = 8, hoje: Optional[date] = None):
+    """(labels, entradas, saidas) das semanas (segunda a domingo) que cobrem os últimos `semanas` * 7 dias."""
+    hoje = hoje or date.today()
+    inicio = hoje - timedelta(days=7 * semanas)
+    segunda = inicio - timedelta(days=inicio.weekday())
+    baldes = [segunda + timedelta(days=7 * i) for i in range((hoje - segunda).days // 7 + 1)]
+    return _serie(produto_id, "semana", baldes, lambda b: f"Semana {b.strftime('%d/%m')}")
+
+
+def serie_mensal(produto_id: int, meses: int = 12, hoje: Optional[date] = None):
+    """(labels, entradas, saidas) dos últimos `meses` meses, incluindo o atual."""
+    hoje = hoje or date.today()
+    baldes = []
+    for i in range(meses - 1, -1, -1):
+        ano, mes = divmod(hoje.year * 12 + hoje.month - 1 - i, 12)
+        baldes.append(date(ano, mes + 1, 1))
+    return _serie(produto_id, "mes", baldes, lambda b: f"{b.month:02d}/{b.year}")
+
+
+def serie_anual(produto_id: int, anos: int = 5, hoje: Optional[date] = None):
+    """(labels, entradas, saidas) dos últimos `anos` anos, incluindo o atual."""
+    hoje = hoje or date.today()
+    baldes = [date(a, 1, 1) for a in range(hoje.year - anos + 1, hoje.year + 1)]
+    return _serie(produto_id, "ano", baldes, lambda b: str(b.year))
+
+
+def serie_diaria(produto_id: int, inicio: date, fim: date):
+    """(labels, entradas, saidas) de cada dia do intervalo (inclusivo)."""
+    baldes = [inicio + timedelta(days=i) for i in range((fim - inicio).days + 1)]
+    return _serie(produto_id, "dia", baldes, lambda b: b.strftime("%d/%m"), fim)
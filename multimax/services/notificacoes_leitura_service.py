@@ -0,0 +1,169 @@
+"""
+Notificações do usuário (estoque crítico, limpezas próximas e validade).
+
+Os candidatos de estoque e de limpeza e as marcações de lidas (NotificationRead) são
+resolvidos numa única consulta: UNION ALL dos candidatos, cada ramo com LEFT JOIN em
+notification_read por (user_id, tipo, ref_id) e filtro "sem marcação" (anti-join, usando
+o índice ix_notification_read_user_tipo_ref). Validade não tem marcação de lida.
+
+O resultado fica em cache por usuário por alguns segundos, com um ETag calculado sobre
+o conteúdo: /api/v1/notifications responde 304 enquanto nada mudou. Rotas que marcam
+ou desmarcam notificações chamam invalidar_cache().
+
+Configuração por variável de ambiente:
+
+    NOTIFICACOES_CACHE_TTL   segundos de cache por usuário (default: 15; 0 desativa)
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import date, timedelta
+from typing import Any, Optional
+
+from sqlalchemy import and_, literal, null, select, union_all
+
+from .. import db
+from ..models import CleaningTask, NotificationRead, Produto
+
+TTL_PADRAO = 15.0
+LIMITE_ESTOQUE = 10
+LIMITE_LIMPEZA = 10
+LIMITE_VALIDADE = 5
+DIAS_LIMPEZA = 3
+DIAS_VALIDADE = 7
+
+_cache: dict[tuple[int, date], tuple[float, dict[str, Any], str]] = {}
+_lock = threading.Lock()
+
+
+def ttl_cache() -> float:
+    """Segundos de cache definidos em NOTIFICACOES_CACHE_TTL."""
+    try:
+        return max(0.0, float(str(os.getenv("NOTIFICACOES_CACHE_TTL", "")).strip()))
+    except ValueError:
+        return TTL_PADRAO
+
+
+def _sem_marcacao(query, tipo: str, ref_col, user_id: int):
+    """Anti-join: mantém só os candidatos sem NotificationRead do usuário para (tipo, ref_id)."""
+    return query.outerjoin(
+        NotificationRead,
+        and_(NotificationRead.user_id == user_id, NotificationRead.tipo == tipo, NotificationRead.ref_id == ref_col),
+    ).where(NotificationRead.id.is_(None))
+
+
+def _nao_lidas(user_id: int, hoje: date) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    """Produtos críticos e limpezas próximas ainda não lidos pelo usuário (uma consulta)."""
+    estoque = _sem_marcacao(
+        select(
+            literal("estoque").label("tipo"),
+            Produto.id.label("ref_id"),
+            Produto.nome.label("nome"),
+            Produto.quantidade.label("quantidade"),
+            Produto.estoque_minimo.label("minimo"),
+            null().label("data"),
+        ).where(
+            Produto.estoque_minimo.isnot(None),
+            Produto.estoque_minimo > 0,
+            Produto.quantidade <= Produto.estoque_minimo,
+        ),
+        "estoque",
+        Produto.id,
+        user_id,
+    )
+    horizonte = hoje + timedelta(days=DIAS_LIMPEZA)
+    limpeza = _sem_marcacao(
+        select(
+            literal("limpeza").label("tipo"),
+            CleaningTask.id.label("ref_id"),
+            CleaningTask.nome_limpeza.label("nome"),
+            null().label("quantidade"),
+            null().label("minimo"),
+            CleaningTask.proxima_data.label("data"),
+        ).where(CleaningTask.proxima_data.isnot(None), CleaningTask.proxima_data <= horizonte),
+        "limpeza",
+        CleaningTask.id,
+        user_id,
+    )
+    # ORDER BY/LIMIT por ramo exige subconsultas dentro do UNION ALL (SQLite)
+    estoque = estoque.order_by(Produto.quantidade.asc(), Produto.id.asc()).limit(LIMITE_ESTOQUE).subquery()
+    limpeza = limpeza.order_by(CleaningTask.proxima_data.asc(), CleaningTask.id.asc()).limit(LIMITE_LIMPEZA).subquery()
+    linhas = db.session.execute(union_all(select(estoque), select(limpeza))).all()
+
+    criticos = [
+        {"id": r.ref_id, "nome": r.nome, "quantidade": r.quantidade, "estoque_minimo": r.minimo}
+        for r in linhas
+        if r.tipo == "estoque"
+    ]
+    tarefas = [
+        {"id": r.ref_id, "nome": r.nome, "proxima_data": _como_data(r.data)} for r in linhas if r.tipo == "limpeza"
+    ]
+    criticos.sort(key=lambda p: (p["quantidade"], p["id"]))
+    tarefas.sort(key=lambda t: (t["proxima_data"], t["id"]))
+    return criticos, tarefas
+
+
+def _como_data(valor) -> date:
+    # No UNION com NULL o SQLite devolve a data como texto
+    return date.fromisoformat(valor) if isinstance(valor, str) else valor
+
+
+def _validade(hoje: date) -> list[dict[str, Any]]:
+    linhas = db.session.execute(
+        select(Produto.id, Produto.nome, Produto.data_validade)
+        .where(
+            Produto.data_validade.isnot(None),
+            Produto.data_validade <= hoje + timedelta(days=DIAS_VALIDADE),
+            Produto.quantidade > 0,
+        )
+        .order_by(Produto.data_validade.asc())
+        .limit(LIMITE_VALIDADE)
+    ).all()
+    return [{"id": r.id, "nome": r.nome, "data_validade": r.data_validade} for r in linhas]
+
+
+def _etag(dados: dict[str, Any], hoje: date) -> str:
+    # A data entra no hash: os mesmos itens rendem textos diferentes ("vence em N dias") a cada dia
+    bruto = json.dumps({"hoje": hoje.isoformat(), "dados": dados}, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha1(bruto, usedforsecurity=False).hexdigest()
+
+
+def carregar(user_id: int, hoje: date) -> tuple[dict[str, Any], str]:
+    """
+    Notificações do usuário: (dados, etag).
+
+    dados = {"estoque": [...], "limpeza": [...], "validade": [...]}, com candidatos já
+    filtrados pelas marcações de lidas (estoque em ordem de quantidade, limpeza e
+    validade em ordem de data).
+    """
+    chave = (int(user_id), hoje)
+    agora = time.monotonic()
+    ttl = ttl_cache()
+    if ttl > 0:
+        with _lock:
+            em_cache = _cache.get(chave)
+        if em_cache and em_cache[0] > agora:
+            return em_cache[1], em_cache[2]
+
+    criticos, tarefas = _nao_lidas(user_id, hoje)
+    dados = {"estoque": criticos, "limpeza": tarefas, "validade": _validade(hoje)}
+    etag = _etag(dados, hoje)
+    if ttl > 0:
+        with _lock:
+            for k in [k for k, v in _cache.items() if v[0] <= agora]:
+                _cache.pop(k, None)
+            _cache[chave] = (agora + ttl, dados, etag)
+    return dados, etag
+
+
+def invalidar_cache(user_id: Optional[int] = None) -> None:
+    """Descarta o cache de um usuário (ou de todos)."""
+    with _lock:
+        if user_id is None:
+            _cache.clear()
+        else:
+            for k in [k for k in _cache if k[0] == int(user_id)]:
+                _cache.pop(k, None)
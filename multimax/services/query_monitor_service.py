@@ -0,0 +1,290 @@
+"""
+Instrumentação de tempo das queries SQL.
+
+Registra eventos before_cursor_execute/after_cursor_execute no engine, mede cada
+statement e o atribui ao endpoint Flask e ao usuário da requisição corrente.
+
+- Statements acima do limite (SLOW_QUERY_THRESHOLD_MS) entram numa fila e são
+  gravados em QueryLog por uma thread de escrita em lote (via dbadmin._log_slow_query),
+  sem commit dentro da requisição.
+- Agregados por endpoint ficam em memória: quantidade de statements, p50/p95/máximo
+  do tempo, linhas retornadas e média de statements por requisição (indicador de N+1).
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Optional
+
+from flask import Flask, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy import inspect as sa_inspect
+
+from .. import db
+
+logger = logging.getLogger(__name__)
+
+LIMITE_LENTA_PADRAO_MS = 1000.0
+AMOSTRAS_POR_ENDPOINT = 500  # Janela de tempos usada para os percentis
+TAMANHO_FILA = 1000
+LOTE_ESCRITA = 50
+INTERVALO_ESCRITA_S = 2.0
+ENDPOINT_SEM_REQUISICAO = "<sem requisição>"
+ENDPOINT_SEM_ROTA = "<unmatched>"  # 404 e caminhos sem rota: uma chave só, sem crescer por URL
+
+_local = threading.local()
+
+
+def _percentil(valores: list[float], p: float) -> float:
+    """Percentil por interpolação linear (valores já ordenados)."""
+    if not valores:
+        return 0.0
+    k = (len(valores) - 1) * p
+    inf = int(k)
+    sup = min(inf + 1, len(valores) - 1)
+    return valores[inf] + (valores[sup] - valores[inf]) * (k - inf)
+
+
+class _EstatisticasEndpoint:
+    __slots__ = ("quantidade", "total_ms", "linhas", "requisicoes", "tempos")
+
+    def __init__(self) -> None:
+        self.quantidade = 0
+        self.total_ms = 0.0
+        self.linhas = 0
+        self.requisicoes = 0
+        self.tempos: deque[float] = deque(maxlen=AMOSTRAS_POR_ENDPOINT)
+
+
+class QueryMonitor:
+    """Coleta tempos de queries e encaminha as lentas para o escritor em segundo plano."""
+
+    def __init__(self, app: Flask, limite_ms: float = LIMITE_LENTA_PADRAO_MS):
+        self.app = app
+        self.limite_ms = limite_ms
+        self._stats: dict[str, _EstatisticasEndpoint] = {}
+        self._stats_lock = threading.Lock()
+        self._fila: queue.Queue = queue.Queue(maxsize=TAMANHO_FILA)
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+        self.descartadas = 0
+
+    # ------------------------------------------------------------------ eventos
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if getattr(_local, "ignorar", False):
+            return
+        conn.info.setdefault("query_monitor_inicio", []).append(time.perf_counter())
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if getattr(_local, "ignorar", False):
+            return
+        inicios = conn.info.get("query_monitor_inicio")
+        if not inicios:
+            return
+        duracao_ms = (time.perf_counter() - inicios.pop()) * 1000.0
+
+        # rowcount é -1 quando o driver não informa (ex.: SELECT no SQLite)
+        rowcount = getattr(cursor, "rowcount", -1)
+        linhas = rowcount if isinstance(rowcount, int) and rowcount >= 0 else None
+
+        endpoint, user_id = self._contexto_requisicao()
+        self._registrar(endpoint, duracao_ms, linhas)
+
+        if duracao_ms >= self.limite_ms:
+            self._enfileirar(statement, duracao_ms, linhas, endpoint, user_id)
+
+    def handle_error(self, contexto):
+        """Descarta o início do statement que falhou, para não parear o próximo tempo com ele."""
+        if getattr(_local, "ignorar", False) or contexto.connection is None:
+            return
+        inicios = contexto.connection.info.get("query_monitor_inicio")
+        if inicios:
+            inicios.pop()
+
+    def _contexto_requisicao(self) -> tuple[str, Optional[int]]:
+        if not has_request_context():
+            return ENDPOINT_SEM_REQUISICAO, None
+        endpoint = request.endpoint or ENDPOINT_SEM_ROTA
+        g.query_monitor_statements = getattr(g, "query_monitor_statements", 0) + 1
+        # Usa apenas o usuário já carregado pelo Flask-Login (não dispara nova query)
+        user = getattr(g, "_login_user", None)
+        user_id = None
+        if user is not None and getattr(user, "is_authenticated", False):
+            # Lê a identidade sem carregar atributos expirados (ex.: após rollback na rota)
+            estado = sa_inspect(user, raiseerr=False)
+            identidade = estado.identity if estado is not None else None
+            user_id = identidade[0] if identidade else None
+        return endpoint, user_id
+
+    def _registrar(self, endpoint: str, duracao_ms: float, linhas: Optional[int]) -> None:
+        with self._stats_lock:
+            stats = self._stats.get(endpoint)
+            if stats is None:
+                stats = self._stats[endpoint] = _EstatisticasEndpoint()
+            stats.quantidade += 1
+            stats.total_ms += duracao_ms
+            if linhas:
+                stats.linhas += linhas
+            stats.tempos.append(duracao_ms)
+
+    def registrar_requisicao(self, endpoint: Optional[str]) -> None:
+        """Conta uma requisição concluída que executou ao menos um statement."""
+        if not endpoint:
+            return
+        with self._stats_lock:
+            stats = self._stats.get(endpoint)
+            if stats is not None:
+                stats.requisicoes += 1
+
+    # --------------------------------------------------------------- agregados
+
+    def estatisticas(self) -> list[dict[str, Any]]:
+        """
+        Retorna os agregados por endpoint, ordenados pelo tempo total.
+
+        Returns:
+            Lista de dicts com endpoint, count, total_ms, p50_ms, p95_ms, max_ms,
+            rows e queries_por_request.
+        """
+        with self._stats_lock:
+            copia = [
+                (ep, s.quantidade, s.total_ms, s.linhas, s.requisicoes, sorted(s.tempos))
+                for ep, s in self._stats.items()
+            ]
+        resultado = []
+        for endpoint, quantidade, total_ms, linhas, requisicoes, tempos in copia:
+            resultado.append(
+                {
+                    "endpoint": endpoint,
+                    "count": quantidade,
+                    "total_ms": round(total_ms, 2),
+                    "p50_ms": round(_percentil(tempos, 0.50), 2),
+                    "p95_ms": round(_percentil(tempos, 0.95), 2),
+                    "max_ms": round(tempos[-1], 2) if tempos else 0.0,
+                    "rows": linhas,
+                    "requests": requisicoes,
+                    "queries_por_request": round(quantidade / requisicoes, 1) if requisicoes else None,
+                }
+            )
+        resultado.sort(key=lambda r: r["total_ms"], reverse=True)
+        return resultado
+
+    def limpar_estatisticas(self) -> None:
+        with self._stats_lock:
+            self._stats.clear()
+
+    # ------------------------------------------------------- escrita em segundo plano
+
+    def _enfileirar(self, statement, duracao_ms, linhas, endpoint, user_id) -> None:
+        try:
+            self._fila.put_nowait((statement, duracao_ms, linhas, endpoint, user_id))
+        except queue.Full:
+            self.descartadas += 1
+            return
+        self._garantir_thread()
+
+    def _garantir_thread(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop_escrita, name="slow-query-writer", daemon=True)
+                self._thread.start()
+
+    def _loop_escrita(self) -> None:
+        while True:
+            try:
+                primeiro = self._fila.get(timeout=INTERVALO_ESCRITA_S)
+            except queue.Empty:
+                continue
+            self._gravar_lote([primeiro] + self._drenar(LOTE_ESCRITA - 1))
+
+    def _drenar(self, maximo: int) -> list[tuple]:
+        itens = []
+        while len(itens) < maximo:
+            try:
+                itens.append(self._fila.get_nowait())
+            except queue.Empty:
+                break
+        return itens
+
+    def flush(self) -> int:
+        """Grava imediatamente todas as queries lentas pendentes. Retorna quantas foram gravadas."""
+        total = 0
+        while True:
+            lote = self._drenar(LOTE_ESCRITA)
+            if not lote:
+                return total
+            self._gravar_lote(lote)
+            total += len(lote)
+
+    def _gravar_lote(self, lote: list[tuple]) -> None:
+        from ..routes.dbadmin import _log_slow_query
+
+        _local.ignorar = True  # Não medir os próprios INSERTs em QueryLog
+        try:
+            with self.app.app_context():
+                for statement, duracao_ms, linhas, endpoint, user_id in lote:
+                    _log_slow_query(
+                        statement,
+                        duracao_ms,
+                        rows_returned=linhas,
+                        endpoint=endpoint,
+                        user_id=user_id,
+                        threshold_ms=0,  # Já filtradas pelo limite ao enfileirar
+                        commit=False,
+                    )
+                try:
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    logger.warning(f"Erro ao gravar queries lentas: {e}")
+                finally:
+                    db.session.remove()
+        finally:
+            _local.ignorar = False
+
+
+def init_query_monitor(app: Flask) -> Optional[QueryMonitor]:
+    """
+    Instala a instrumentação no engine da aplicação (chamar dentro de app_context).
+
+    Configuração (app.config ou variável de ambiente):
+        QUERY_MONITOR_ENABLED: 'true'/'false' (default: true)
+        SLOW_QUERY_THRESHOLD_MS: limite em ms para gravar em QueryLog (default: 1000)
+
+    Returns:
+        O monitor instalado (também em app.extensions['query_monitor']) ou None se desabilitado.
+    """
+    habilitado = app.config.get("QUERY_MONITOR_ENABLED", os.getenv("QUERY_MONITOR_ENABLED", "true"))
+    if str(habilitado).lower() not in ("1", "true", "yes", "on"):
+        return None
+    try:
+        limite_ms = float(app.config.get("SLOW_QUERY_THRESHOLD_MS", os.getenv("SLOW_QUERY_THRESHOLD_MS", "")) or 0)
+    except (TypeError, ValueError):
+        limite_ms = 0
+    if limite_ms <= 0:
+        limite_ms = LIMITE_LENTA_PADRAO_MS
+
+    monitor = QueryMonitor(app, limite_ms)
+    engine = db.engine
+    event.listen(engine, "before_cursor_execute", monitor.before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", monitor.after_cursor_execute)
+    event.listen(engine, "handle_error", monitor.handle_error)
+
+    @app.teardown_request
+    def _query_monitor_fim_requisicao(exc=None):
+        if getattr(g, "query_monitor_statements", 0):
+            monitor.registrar_requisicao(request.endpoint or ENDPOINT_SEM_ROTA)
+
+    app.extensions["query_monitor"] = monitor
+    return monitor
+
+
+def obter_monitor(app: Flask) -> Optional[QueryMonitor]:
+    """Retorna o monitor instalado na aplicação (None se desabilitado)."""
+    return app.extensions.get("query_monitor")
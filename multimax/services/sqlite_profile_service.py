@@ -0,0 +1,136 @@
+"""
+Perfil de PRAGMAs aplicado a cada conexão SQLite.
+
+Com waitress multi-thread, o modo de journal padrão (DELETE) faz leitores
+esperarem escritores e gera "database is locked" em escritas concorrentes
+(lançamento de horas, movimentações de estoque). O perfil é aplicado no evento
+"connect" do engine e pode ser ajustado por variáveis de ambiente:
+
+    SQLITE_JOURNAL_MODE   (default: WAL)
+    SQLITE_BUSY_TIMEOUT   ms de espera por lock (default: 5000)
+    SQLITE_SYNCHRONOUS    OFF/NORMAL/FULL/EXTRA (default: NORMAL, seguro com WAL)
+    SQLITE_CACHE_SIZE     páginas, ou KiB se negativo (default: -20000 ≈ 20 MB)
+    SQLITE_MMAP_SIZE      bytes (default: 134217728 = 128 MB)
+    SQLITE_TEMP_STORE     DEFAULT/FILE/MEMORY (default: MEMORY)
+    SQLITE_FOREIGN_KEYS   on/off (default: off; o esquema atual não declara
+                          ON DELETE em todas as FKs e exclusões existentes dependem disso)
+"""
+
+import os
+from typing import Any
+
+from flask import Flask
+from sqlalchemy import event, text
+
+JOURNAL_MODES = ("DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF")
+SYNCHRONOUS_MODES = ("OFF", "NORMAL", "FULL", "EXTRA")
+TEMP_STORE_MODES = ("DEFAULT", "FILE", "MEMORY")
+
+PERFIL_PADRAO: dict[str, Any] = {
+    "journal_mode": "WAL",
+    "busy_timeout": 5000,
+    "synchronous": "NORMAL",
+    "cache_size": -20000,
+    "mmap_size": 134217728,
+    "temp_store": "MEMORY",
+    "foreign_keys": False,
+}
+
+# busy_timeout antes de journal_mode: a troca para WAL pode precisar aguardar um lock
+_ORDEM = ("busy_timeout", "journal_mode", "synchronous", "cache_size", "mmap_size", "temp_store", "foreign_keys")
+
+
+def _env_int(nome: str, padrao: int) -> int:
+    try:
+        return int(str(os.getenv(nome, "")).strip())
+    except ValueError:
+        return padrao
+
+
+def _env_opcao(nome: str, opcoes: tuple[str, ...], padrao: str) -> str:
+    valor = str(os.getenv(nome, "")).strip().upper()
+    return valor if valor in opcoes else padrao
+
+
+def carregar_perfil() -> dict[str, Any]:
+    """Monta o perfil a partir do padrão e das variáveis de ambiente SQLITE_*."""
+    p = PERFIL_PADRAO
+    return {
+        "journal_mode": _env_opcao("SQLITE_JOURNAL_MODE", JOURNAL_MODES, p["journal_mode"]),
+        "busy_timeout": max(0, _env_int("SQLITE_BUSY_TIMEOUT", p["busy_timeout"])),
+        "synchronous": _env_opcao("SQLITE_SYNCHRONOUS", SYNCHRONOUS_MODES, p["synchronous"]),
+        "cache_size": _env_int("SQLITE_CACHE_SIZE", p["cache_size"]),
+        "mmap_size": max(0, _env_int("SQLITE_MMAP_SIZE", p["mmap_size"])),
+        "temp_store": _env_opcao("SQLITE_TEMP_STORE", TEMP_STORE_MODES, p["temp_store"]),
+        "foreign_keys": str(os.getenv("SQLITE_FOREIGN_KEYS", "")).strip().lower() in ("1", "true", "on", "yes"),
+    }
+
+
+def _statements(perfil: dict[str, Any]) -> list[str]:
+    valores = dict(perfil)
+    valores["foreign_keys"] = "ON" if perfil.get("foreign_keys") else "OFF"
+    return [f"PRAGMA {nome}={valores[nome]}" for nome in _ORDEM if nome in valores]
+
+
+def aplicar_perfil(dbapi_connection, perfil: dict[str, Any]) -> None:
+    """Executa os PRAGMAs do perfil numa conexão DB-API sqlite3."""
+    cursor = dbapi_connection.cursor()
+    try:
+        for stmt in _statements(perfil):
+            try:
+                cursor.execute(stmt)
+            except Exception:  # PRAGMA não suportado não deve impedir a conexão
+                continue
+    finally:
+        cursor.close()
+
+
+def instalar_perfil_sqlite(app: Flask, engine) -> dict[str, Any] | None:
+    """
+    Registra o perfil no evento "connect" do engine (somente SQLite).
+
+    Args:
+        app: Aplicação Flask (o perfil fica em app.config['SQLITE_PRAGMA_PROFILE'])
+        engine: Engine SQLAlchemy da aplicação
+
+    Returns:
+        Perfil configurado, ou None se o banco não for SQLite.
+    """
+    if engine.dialect.name != "sqlite":
+        return None
+    perfil = carregar_perfil()
+
+    @event.listens_for(engine, "connect")
+    def _aplicar_pragmas(dbapi_connection, connection_record):
+        aplicar_perfil(dbapi_connection, perfil)
+
+    app.config["SQLITE_PRAGMA_PROFILE"] = perfil
+    return perfil
+
+
+def perfil_ativo(engine) -> dict[str, Any]:
+    """
+    Lê os PRAGMAs efetivamente ativos numa conexão do pool.
+
+    Returns:
+        dict pragma -> valor (vazio se o banco não for SQLite ou em caso de erro).
+    """
+    if engine.dialect.name != "sqlite":
+        return {}
+    ativo: dict[str, Any] = {}
+    try:
+        with engine.connect() as conn:
+            for nome in _ORDEM:
+                valor = conn.execute(text(f"PRAGMA {nome}")).scalar()
+                if nome == "synchronous" and isinstance(valor, int) and valor < len(SYNCHRONOUS_MODES):
+                    valor = SYNCHRONOUS_MODES[valor]
+                elif nome == "temp_store" and isinstance(valor, int) and valor < len(TEMP_STORE_MODES):
+                    valor = TEMP_STORE_MODES[valor]
+                elif nome == "foreign_keys":
+                    valor = bool(valor)
+                elif isinstance(valor, str):
+                    valor = valor.upper()
+                ativo[nome] = valor
+    except Exception:
+        return {}
+    return ativo
@@ -0,0 +1,69 @@
+"""
+Snapshot de saldos do banco de horas e folgas (TimeOffRecord).
+
+Uma única consulta com agregação condicional (SUM(CASE ...)) por colaborador
+retorna horas do banco, folgas creditadas, usadas, convertidas e o saldo
+líquido de folgas. Usado por /gestao.
+"""
+
+from typing import Iterable, Optional
+
+from sqlalchemy import case, func
+
+from .. import db
+from ..models import TimeOffRecord
+
+
+def _soma_condicional(coluna, record_type: str):
+    return func.coalesce(func.sum(case((TimeOffRecord.record_type == record_type, coluna), else_=0)), 0)
+
+
+def snapshot_vazio() -> dict:
+    """Snapshot de um colaborador sem registros."""
+    return {
+        "horas": 0.0,
+        "folgas_credito": 0,
+        "folgas_usadas": 0,
+        "folgas_convertidas": 0,
+        "folgas_saldo": 0,
+    }
+
+
+def calcular_snapshots(collaborator_ids: Optional[Iterable[int]] = None) -> dict[int, dict]:
+    """
+    Calcula o snapshot de saldos de vários colaboradores em uma consulta.
+
+    Args:
+        collaborator_ids: Restringe aos colaboradores informados (default: todos com registros)
+
+    Returns:
+        dict collaborator_id -> {horas, folgas_credito, folgas_usadas, folgas_convertidas, folgas_saldo}.
+        Colaboradores sem registros não aparecem; use snapshot_vazio() como padrão.
+    """
+    query = db.session.query(
+        TimeOffRecord.collaborator_id,
+        _soma_condicional(TimeOffRecord.hours, "horas"),
+        _soma_condicional(TimeOffRecord.days, "folga_adicional"),
+        _soma_condicional(TimeOffRecord.days, "folga_usada"),
+        _soma_condicional(TimeOffRecord.days, "conversao"),
+    ).filter(TimeOffRecord.record_type.in_(("horas", "folga_adicional", "folga_usada", "conversao")))
+
+    if collaborator_ids is not None:
+        ids = list(collaborator_ids)
+        if not ids:
+            return {}
+        query = query.filter(TimeOffRecord.collaborator_id.in_(ids))
+
+    snapshots: dict[int, dict] = {}
+    for cid, horas, credito, usadas, convertidas in query.group_by(TimeOffRecord.collaborator_id).all():
+        credito = int(credito or 0)
+        usadas = int(usadas or 0)
+        convertidas = int(convertidas or 0)
+        snapshots[int(cid)] = {
+            "horas": float(horas or 0.0),
+            "folgas_credito": credito,
+            "folgas_usadas": usadas,
+            "folgas_convertidas": convertidas,
+            "folgas_saldo": credito - usadas - convertidas,
+        }
+    return snapshots
@@ -0,0 +1,93 @@
+"""
+Resolução da versão da aplicação exibida nos templates.
+
+A versão é resolvida uma única vez por processo (variável de ambiente APP_VERSION,
+depois `git describe`, depois AppSetting 'app_version') e guardada em
+app.config["APP_VERSION_RESOLVED"]. O context processor apenas lê o valor em cache,
+evitando um subprocesso `git` a cada renderização. A atualização do checkout
+(dbadmin.git_update) chama atualizar_versao() para recalcular.
+"""
+
+import os
+import subprocess
+import threading
+from typing import Optional
+
+from flask import Flask
+
+VERSAO_PADRAO = "dev"
+CONFIG_KEY = "APP_VERSION_RESOLVED"
+
+_lock = threading.Lock()
+
+
+def _versao_do_git(base_dir: Optional[str] = None) -> str:
+    """Obtém a tag mais recente via `git describe` (string vazia se indisponível)."""
+    if base_dir is None:
+        base_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+    try:
+        r = subprocess.run(
+            ["git", "describe", "--tags", "--abbrev=0"], cwd=base_dir, capture_output=True, text=True, timeout=2
+        )
+        if r.returncode == 0 and r.stdout.strip():
+            return r.stdout.strip()
+    except (subprocess.TimeoutExpired, FileNotFoundError, subprocess.SubprocessError, OSError):
+        pass
+    return ""
+
+
+def _versao_do_banco(app: Flask) -> str:
+    """Obtém a versão registrada em AppSetting 'app_version'."""
+    try:
+        from ..models import AppSetting
+
+        s = AppSetting.query.filter_by(key="app_version").first()
+        return (s.value or "").strip() if s else ""
+    except Exception as e:
+        app.logger.warning(f"Erro ao obter versão do banco: {e}")
+        return ""
+
+
+def _resolver(app: Flask) -> str:
+    ver = (os.getenv("APP_VERSION") or "").strip()
+    if not ver:
+        ver = _versao_do_git()
+    if not ver:
+        ver = _versao_do_banco(app)
+    return ver or VERSAO_PADRAO
+
+
+def obter_versao(app: Flask) -> str:
+    """
+    Retorna a versão em cache do processo, resolvendo-a na primeira chamada.
+
+    Args:
+        app: Aplicação Flask (o cache fica em app.config)
+
+    Returns:
+        Versão da aplicação ou 'dev' quando nenhuma fonte está disponível.
+    """
+    ver = app.config.get(CONFIG_KEY)
+    if ver:
+        return ver
+    with _lock:
+        ver = app.config.get(CONFIG_KEY)
+        if not ver:
+            ver = _resolver(app)
+            app.config[CONFIG_KEY] = ver
+    return ver
+
+
+def atualizar_versao(app: Flask) -> str:
+    """
+    Descarta o valor em cache e resolve a versão novamente.
+    Usado após atualizar o checkout (git pull/tags).
+
+    Returns:
+        Nova versão resolvida.
+    """
+    with _lock:
+        ver = _resolver(app)
+        app.config[CONFIG_KEY] = ver
+    app.logger.info(f"Versão da aplicação atualizada: {ver}")
+    return ver
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Migração One-Time: coluna normalizada `busca` nas tabelas pesquisáveis
+
+Data: 2026-10-17
+Motivo: a busca sem acentos compara o termo com a coluna `busca` (minúsculas, sem acentos),
+mantida pelo ORM; db.create_all() não adiciona colunas nem índices em tabelas já existentes.
+A migração adiciona coluna e índice, preenche as linhas existentes e reconstrói o índice
+FTS5 da busca global a partir da coluna.
+Execução: python one-time-migrations/2026_10_17_add_coluna_busca.py
+"""
+
+import sys
+from pathlib import Path
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import inspect  # noqa: E402
+
+from multimax import create_app, db  # noqa: E402
+from multimax.services.busca_global_service import reindexar  # noqa: E402
+from multimax.services.busca_service import CAMPOS_BUSCA, preencher  # noqa: E402
+
+TABELAS = tuple(modelo.__tablename__ for modelo in CAMPOS_BUSCA)
+
+
+def migrate():
+    """Adiciona coluna e índice `busca` se ainda não existirem e preenche as linhas pendentes"""
+    app = create_app()
+    with app.app_context():
+        try:
+            insp = inspect(db.engine)
+            for tabela in TABELAS:
+                if "busca" not in {c["name"] for c in insp.get_columns(tabela)}:
+                    db.session.execute(db.text(f"ALTER TABLE {tabela} ADD COLUMN busca VARCHAR(255)"))
+                    print(f"✓ Coluna {tabela}.busca adicionada")
+                else:
+                    print(f"✓ Coluna {tabela}.busca já existe")
+                db.session.execute(db.text(f"CREATE INDEX IF NOT EXISTS ix_{tabela}_busca ON {tabela} (busca)"))
+                print(f"✓ Índice ix_{tabela}_busca")
+            db.session.commit()
+
+            print(f"✓ {preencher()} linha(s) preenchida(s)")
+            db.session.commit()
+            print(f"✓ {reindexar()} registro(s) no índice da busca global")
+            print("\n✓ Operação concluída com sucesso!")
+        except Exception as e:
+            db.session.rollback()
+            print(f"\n✗ Erro na migração da coluna busca: {e}")
+            raise
+
+
+if __name__ == "__main__":
+    migrate()
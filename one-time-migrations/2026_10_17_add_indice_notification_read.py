@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Migração One-Time: índice das marcações de notificações lidas
+
+Data: 2026-10-17
+Motivo: as notificações não lidas passaram a ser calculadas com um anti-join em
+notification_read (user_id, tipo, ref_id); db.create_all() não cria índices em tabelas já existentes.
+Execução: python one-time-migrations/2026_10_17_add_indice_notification_read.py
+"""
+
+import sys
+from pathlib import Path
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from multimax import create_app, db  # noqa: E402
+
+INDICES = (("ix_notification_read_user_tipo_ref", "notification_read", "user_id, tipo, ref_id"),)
+
+
+def migrate():
+    """Cria o índice se ainda não existir"""
+    app = create_app()
+    with app.app_context():
+        try:
+            for nome, tabela, colunas in INDICES:
+                db.session.execute(db.text(f"CREATE INDEX IF NOT EXISTS {nome} ON {tabela} ({colunas})"))
+                print(f"✓ Índice {nome} ({tabela}: {colunas})")
+            db.session.commit()
+            print("\n✓ Operação concluída com sucesso!")
+        except Exception as e:
+            db.session.rollback()
+            print(f"\n✗ Erro ao criar índice: {e}")
+            raise
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Migração One-Time: índices da listagem de logs de lotes de horas
+
+Data: 2026-10-17
+Motivo: a listagem de /ciclos/lote_horas/logs passou a paginar por (created_at, id) e a contar
+correções por correction_of_id; db.create_all() não cria índices em tabelas já existentes.
+Execução: python one-time-migrations/2026_10_17_add_indices_bulk_hour_operations.py
+"""
+
+import sys
+from pathlib import Path
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from multimax import create_app, db  # noqa: E402
+
+INDICES = (
+    ("ix_bulk_hour_operations_created_at_id", "bulk_hour_operations", "created_at, id"),
+    ("ix_bulk_hour_operations_correction_of_id", "bulk_hour_operations", "correction_of_id"),
+)
+
+
+def migrate():
+    """Cria os índices se ainda não existirem"""
+    app = create_app()
+    with app.app_context():
+        try:
+            for nome, tabela, colunas in INDICES:
+                db.session.execute(db.text(f"CREATE INDEX IF NOT EXISTS {nome} ON {tabela} ({colunas})"))
+                print(f"✓ Índice {nome} ({tabela}: {colunas})")
+            db.session.commit()
+            print("\n✓ Operação concluída com sucesso!")
+        except Exception as e:
+            db.session.rollback()
+            print(f"\n✗ Erro ao criar índices: {e}")
+            raise
+
+
+if __name__ == "__main__":
+    migrate()
@@ -77,6 +77,7 @@
             'db-url-maintenance-cleanup',
             'db-url-maintenance-optimize',
             'db-url-verify-backups',
+            'db-url-verify-backups-status',
             'db-url-maintenance-run-all',
             'db-url-maintenance-export-report',
             'db-url-git-status',
@@ -786,6 +787,39 @@
         }
     }
 
+    function showVerifyResults(job) {
+        if (job.status === 'erro') {
+            alert('Erro ao verificar backups: ' + (job.erro || 'Erro desconhecido'));
+            return;
+        }
+        var msg = 'Verificação concluída:\n';
+        (job.resultados || []).forEach(function(r) {
+            msg += r.filename + ': ' + r.status + '\n';
+        });
+        alert(msg);
+        loadMaintenanceStats();
+        loadMaintenanceRecommendations();
+    }
+
+    // A verificação roda em segundo plano no servidor; consulta o estado até terminar
+    function pollVerifyStatus(jobId) {
+        if (!state.urls.verify_backups_status) return;
+        setTimeout(async function() {
+            try {
+                var resp = await fetch(state.urls.verify_backups_status);
+                var json = await resp.json();
+                var job = json && json.ok ? json.job : null;
+                if (job && job.id === jobId && job.status === 'executando') {
+                    pollVerifyStatus(jobId);
+                } else if (job) {
+                    showVerifyResults(job);
+                }
+            } catch(e) {
+                alert('Erro ao consultar verificação: ' + e.message);
+            }
+        }, 2000);
+    }
+
     async function verifyAllBackups() {
         if (!confirm('Verificar integridade de todos os backups?')) return;
         try {
@@ -793,13 +827,7 @@
             var resp = await fetch(state.urls.verify_backups, { method: 'POST' });
             var json = await resp.json();
             if (json && json.ok) {
-                var msg = 'Verificação concluída:\n';
-                json.results.forEach(function(r) {
-                    msg += r.filename + ': ' + r.status + '\n';
-                });
-                alert(msg);
-                loadMaintenanceStats();
-                loadMaintenanceRecommendations();
+                pollVerifyStatus(json.job.id);
             } else {
                 alert('Erro: ' + (json.error || 'Erro desconhecido'));
             }
@@ -827,7 +855,8 @@
                     msg += 'Otimização: concluída\n';
                 }
                 if (json.results.verify) {
-                    msg += 'Verificação: concluída\n';
+                    msg += 'Verificação de backups: em andamento (o resultado aparece ao terminar)\n';
+                    pollVerifyStatus(json.results.verify.id);
                 }
                 alert(msg);
                 loadMaintenanceStats();
@@ -1,4 +1,4 @@
-const CACHE_VERSION = 'v10';
+const CACHE_VERSION = 'v11';
 const STATIC_CACHE = `multimax-static-${CACHE_VERSION}`;
 const DYNAMIC_CACHE = `multimax-dynamic-${CACHE_VERSION}`;
 const API_CACHE = `multimax-api-${CACHE_VERSION}`;
@@ -102,6 +102,9 @@ self.addEventListener('fetch', event => {
 
   if (request.method !== 'GET') return;
 
+  // Stream SSE: não passa pelo cache (a resposta não termina)
+  if (url.pathname === '/api/v1/eventos') return;
+
   if (url.pathname.startsWith('/static/')) {
     event.respondWith(CACHE_STRATEGIES.cacheFirst(request, STATIC_CACHE));
     return;
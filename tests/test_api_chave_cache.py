@@ -0,0 +1,93 @@
+"""
+Testes para a autenticação por chave de API e o cache de principals.
+"""
+
+import re
+
+import pytest
+
+from multimax import create_app, db
+from multimax.models import Produto, User, UserApiKey
+from multimax.password_hash import generate_password_hash
+from multimax.services.api_chave_service import CacheChaves, PrincipalApi, autenticar, cache
+
+
+@pytest.fixture
+def app():
+    """Cria uma instância da aplicação para testes."""
+    app = create_app()
+    app.config["TESTING"] = True
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+    app.config["SECRET_KEY"] = "test-secret-key"
+    app.config["WTF_CSRF_ENABLED"] = False
+
+    with app.app_context():
+        db.create_all()
+        cache.limpar(zerar_contadores=True)
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def _usuario(username, nivel):
+    user = User()
+    user.username = username
+    user.name = username.title()
+    user.password_hash = generate_password_hash("senha123")
+    user.nivel = nivel
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def test_lru_ttl_e_invalidacao():
+    c = CacheChaves(max_itens=2, ttl_s=60)
+    c.guardar("a", PrincipalApi(1, "a", "A", "operador"))
+    c.guardar("b", PrincipalApi(2, "b", "B", "operador"))
+    assert c.obter("a").id == 1  # "a" passa a ser o mais recente
+    c.guardar("c", PrincipalApi(1, "a", "A", "operador"))
+    assert c.obter("b") is None  # LRU descartou "b"
+    assert c.invalidar_usuario(1) == 2 and c.obter("a") is None
+    c.ttl_s = -1
+    c.guardar("d", PrincipalApi(3, "d", "D", "admin"))
+    assert c.obter("d") is None  # expirado
+    assert c.estatisticas()["acertos"] == 1 and c.estatisticas()["falhas"] == 3
+
+
+def test_chave_cacheada_e_invalidada_por_nivel_e_exclusao(app):
+    _usuario("dev", "DEV")
+    integrador = _usuario("scanner", "operador")
+    p = Produto()
+    p.codigo = "AK0001"
+    p.nome = "Linguiça"
+    p.quantidade = 10
+    db.session.add(p)
+    db.session.commit()
+    admin = app.test_client()
+    admin.post("/login", data={"username": "dev", "password": "senha123", "action": "login"})
+
+    resp = admin.post(f"/users/{integrador.id}/api_key", data={"acao": "gerar"}, follow_redirects=True)
+    chave = re.search(r"mmx_[A-Za-z0-9_-]+", resp.get_data(as_text=True)).group(0)
+    assert UserApiKey.query.filter_by(user_id=integrador.id).count() == 1
+
+    api = app.test_client()
+    headers = {"X-API-Key": chave}
+    for _ in range(3):
+        assert api.post(f"/api/v1/produtos/{p.id}/saida", json={"quantidade": 1}, headers=headers).status_code == 200
+    stats = admin.get("/db/api-keys/cache").get_json()
+    assert (stats["falhas"], stats["acertos"], stats["itens"]) == (1, 2, 1)
+    assert admin.get("/db/api-keys/cache?reset=1").get_json()["itens"] == 1  # GET não limpa
+    stats = admin.post("/db/api-keys/cache", data={"reset": "1"}).get_json()
+    assert (stats["falhas"], stats["acertos"], stats["itens"]) == (0, 0, 0)
+    for _ in range(2):
+        assert api.post(f"/api/v1/produtos/{p.id}/saida", json={"quantidade": 1}, headers=headers).status_code == 200
+    assert cache.estatisticas()["itens"] == 1
+
+    admin.post(f"/users/{integrador.id}/nivel", data={"nivel": "visualizador"})
+    assert cache.estatisticas()["itens"] == 0
+    assert api.post(f"/api/v1/produtos/{p.id}/saida", json={"quantidade": 1}, headers=headers).status_code == 403
+
+    admin.post(f"/users/{integrador.id}/excluir")
+    assert UserApiKey.query.count() == 0
+    assert autenticar(chave) is None
+    assert autenticar("mmx_invalida") is None
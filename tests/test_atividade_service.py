@@ -0,0 +1,168 @@
+"""
+Testes para o feed unificado de atividades (intercalação por heap e cursor).
+"""
+
+from datetime import date, datetime, timedelta
+
+import pytest
+from flask import template_rendered
+
+from multimax import create_app, db
+from multimax.models import CleaningHistory, Collaborator, Historico, MeatReception, SystemLog, TimeOffRecord, User
+from multimax.password_hash import generate_password_hash
+from multimax.services import atividade_service
+from multimax.services.atividade_service import FONTES_DASHBOARD, carregar_cotas, carregar_feed, iterar_feed
+
+
+@pytest.fixture
+def app():
+    """Cria uma instância da aplicação para testes."""
+    app = create_app()
+    app.config["TESTING"] = True
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+    app.config["SECRET_KEY"] = "test-secret-key"
+    app.config["WTF_CSRF_ENABLED"] = False
+
+    with app.app_context():
+        db.create_all()
+        atividade_service.limpar_cache()
+        yield app
+        atividade_service.limpar_cache()
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def atividades(app):
+    base = datetime(2026, 5, 10, 8, 0)
+    colab = Collaborator()
+    colab.name = "Ana"
+    db.session.add(colab)
+    db.session.flush()
+    for i in range(6):
+        h = Historico()
+        h.data = base + timedelta(hours=i)
+        h.product_name = f"Produto {i}"
+        h.action = "entrada" if i % 2 else "saida"
+        h.quantidade = i
+        db.session.add(h)
+        s = SystemLog()
+        s.data = base + timedelta(hours=i)  # mesmo horário do histórico: desempate por fonte
+        s.origem = "Sistema"
+        s.evento = f"evento {i}"
+        db.session.add(s)
+    c = CleaningHistory()
+    c.data_conclusao = base + timedelta(minutes=30)
+    c.nome_limpeza = "Câmara fria"
+    r = MeatReception()
+    r.data = base - timedelta(days=1)
+    r.fornecedor = "Frigorífico"
+    r.tipo = "bovino"
+    f = TimeOffRecord()
+    f.collaborator_id = colab.id
+    f.date = date(2026, 5, 10)
+    f.record_type = "folga_adicional"
+    f.days = 2
+    outra = TimeOffRecord()
+    outra.collaborator_id = colab.id
+    outra.date = date(2026, 5, 11)
+    outra.record_type = "folga_usada"
+    outra.days = 1
+    db.session.add_all([c, r, f, outra])
+    db.session.commit()
+
+
+def _chaves(itens):
+    return [(i["data"], i["fonte"], i["id"]) for i in itens]
+
+
+def test_feed_intercalado_e_cursor(atividades):
+    todos = list(iterar_feed(FONTES_DASHBOARD, lote=2))
+    assert len(todos) == 15  # 6 + 6 + limpeza + carnes + 1 crédito (folga usada fica de fora)
+    assert _chaves(todos) == sorted(_chaves(todos), reverse=True)
+    assert todos[0]["fonte"] == "sistema" and todos[1]["fonte"] == "estoque"
+    assert todos[-1]["fonte"] == "carnes"
+    assert {i["fonte"] for i in todos if i["data"] == datetime(2026, 5, 10)} == {"folgas"}
+
+    vistos = []
+    cursor = None
+    while True:
+        pagina = carregar_feed(FONTES_DASHBOARD, limite=4, cursor=cursor)
+        vistos.extend(pagina["itens"])
+        cursor = pagina["proximo_cursor"]
+        if not cursor:
+            break
+    assert _chaves(vistos) == _chaves(todos)
+    assert carregar_feed(FONTES_DASHBOARD, cursor="invalido!")["itens"][0] == todos[0]
+
+
+def test_cabeca_em_cache_por_usuario(atividades, monkeypatch):
+    monkeypatch.setenv("ATIVIDADE_FEED_TTL", "60")
+    primeira = carregar_feed(("sistema",), limite=3, user_id=1)
+    s = SystemLog()
+    s.data = datetime(2026, 6, 1, 9, 0)
+    s.origem = "Sistema"
+    s.evento = "novo"
+    db.session.add(s)
+    db.session.commit()
+
+    assert carregar_feed(("sistema",), limite=3, user_id=1)["itens"] == primeira["itens"]
+    assert carregar_feed(("sistema",), limite=3, user_id=2)["itens"][0]["evento"] == "novo"
+    atividade_service.limpar_cache(1)
+    assert carregar_feed(("sistema",), limite=3, user_id=1)["itens"][0]["evento"] == "novo"
+
+
+def test_rotas_usam_feed(app, atividades):
+    user = User()
+    user.username = "admin"
+    user.name = "Admin"
+    user.password_hash = generate_password_hash("senha123")
+    user.nivel = "admin"
+    db.session.add(user)
+    db.session.commit()
+    client = app.test_client()
+    client.post("/login", data={"username": "admin", "password": "senha123", "action": "login"})
+
+    dados = client.get("/gestao/atividades?limite=5").get_json()
+    assert dados["ok"] and len(dados["itens"]) == 5 and dados["proximo_cursor"]
+    assert dados["itens"][0]["evento"] == "login"  # registrado agora pelo próprio login
+    assert dados["itens"][1]["data"] == "2026-05-10T13:00:00"
+    resto = client.get(f"/gestao/atividades?limite=50&cursor={dados['proximo_cursor']}").get_json()
+    assert len(resto["itens"]) == 9 and resto["proximo_cursor"] is None
+
+    assert client.get("/gestao").status_code == 200
+    contextos = []
+    template_rendered.connect(lambda _app, template, context, **_: contextos.append(context), app, weak=False)
+    assert client.get("/home/dashboard/full").status_code == 200
+    titulos = {e["title"] for e in contextos[-1]["events"]}
+    esperados = {"🏖️ Crédito de Folga: +2", "📦 Entrada: Produto 5 +5", "🥩 Recepção de carnes: Frigorífico (bovino)"}
+    assert esperados <= titulos
+
+
+def test_cotas_por_fonte_e_carregar_mais(app, atividades):
+    recente = datetime(2026, 6, 1, 8, 0)
+    for i in range(160):  # rajada de logs mais recente que todo o resto
+        s = SystemLog()
+        s.data = recente + timedelta(minutes=i)
+        s.origem = "Sistema"
+        s.evento = f"rajada {i}"
+        db.session.add(s)
+    db.session.commit()
+
+    itens = carregar_cotas({"estoque": 100, "sistema": 50, "folgas": 100})
+    fontes = [i["fonte"] for i in itens]
+    assert (fontes.count("estoque"), fontes.count("sistema"), fontes.count("folgas")) == (6, 50, 1)
+    assert _chaves(itens) == sorted(_chaves(itens), reverse=True)
+
+    user = User()
+    user.username = "admin"
+    user.name = "Admin"
+    user.password_hash = generate_password_hash("senha123")
+    user.nivel = "admin"
+    db.session.add(user)
+    db.session.commit()
+    client = app.test_client()
+    client.post("/login", data={"username": "admin", "password": "senha123", "action": "login"})
+    html = client.get("/gestao?l_page=999").get_data(as_text=True)
+    assert 'id="gestaoLogsMais"' in html and 'data-url="/gestao/atividades"' in html
+    assert 'id="gestaoLogsMais"' not in client.get("/gestao?l_page=1").get_data(as_text=True)
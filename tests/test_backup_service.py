@@ -0,0 +1,105 @@
+"""
+Testes para o backup online (API de backup do SQLite) e restauração.
+"""
+
+import gzip
+import sqlite3
+
+import pytest
+
+from multimax.services import backup_service
+from multimax.services.backup_service import eh_arquivo_backup, executar_backup, restaurar_backup
+
+
+def _criar_banco(path, linhas=500):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE produto (id INTEGER PRIMARY KEY, nome TEXT)")
+    conn.executemany("INSERT INTO produto (nome) VALUES (?)", [(f"produto {i}" * 5,) for i in range(linhas)])
+    conn.commit()
+    return conn
+
+
+def _contar(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM produto").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_backup_paginado_sem_compressao(tmp_path):
+    origem = tmp_path / "estoque.db"
+    conn = _criar_banco(origem)  # conexão aberta: dados ainda no -wal
+    destino = tmp_path / "multimax_1.sqlite"
+
+    stats = executar_backup(str(origem), str(destino), paginas_por_passo=2, pausa_ms=0, compressao="none")
+    conn.close()
+
+    assert stats["path"] == str(destino)
+    assert stats["pages"] > 2
+    assert stats["duration_s"] >= 0
+    assert stats["compression"] == "none"
+    assert _contar(destino) == 500
+    with sqlite3.connect(destino) as b:
+        assert b.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+    assert not (tmp_path / "multimax_1.sqlite.tmp").exists()
+
+
+def test_backup_gzip_e_restauracao(tmp_path):
+    origem = tmp_path / "estoque.db"
+    _criar_banco(origem, linhas=50).close()
+    destino = tmp_path / "backup-24h.sqlite"
+    destino.write_bytes(b"antigo")  # variante sem compressão deve ser substituída
+
+    stats = executar_backup(str(origem), str(destino), pausa_ms=0, compressao="gzip")
+    assert stats["path"].endswith(".sqlite.gz")
+    assert not destino.exists()
+    with gzip.open(stats["path"], "rb") as f:
+        assert f.read(15) == b"SQLite format 3"
+
+    restaurado = tmp_path / "restaurado.db"
+    (tmp_path / "restaurado.db-wal").write_bytes(b"lixo")
+    restaurar_backup(stats["path"], str(restaurado))
+    assert not (tmp_path / "restaurado.db-wal").exists()
+    assert _contar(restaurado) == 50
+
+
+def test_restauracao_de_backup_corrompido_preserva_banco(tmp_path):
+    atual = tmp_path / "atual.db"
+    _criar_banco(atual, linhas=7).close()
+    origem = tmp_path / "estoque.db"
+    _criar_banco(origem, linhas=50).close()
+    stats = executar_backup(str(origem), str(tmp_path / "b.sqlite"), pausa_ms=0, compressao="gzip")
+    truncado = tmp_path / "truncado.sqlite.gz"
+    with open(stats["path"], "rb") as f:
+        truncado.write_bytes(f.read()[:200])
+
+    chamadas = []
+    with pytest.raises(backup_service.BackupInvalido):
+        restaurar_backup(str(truncado), str(atual), fechar_conexoes=lambda: chamadas.append(1))
+    assert chamadas == []
+    assert _contar(atual) == 7
+    assert not (tmp_path / "atual.db.restore-tmp").exists()
+
+    restaurar_backup(stats["path"], str(atual), fechar_conexoes=lambda: chamadas.append(1))
+    assert chamadas == [1]
+    assert _contar(atual) == 50
+
+
+def test_zstd_sem_pacote_usa_gzip(tmp_path, monkeypatch):
+    monkeypatch.setattr(backup_service, "zstandard", None)
+    monkeypatch.setenv("BACKUP_COMPRESSION", "zstd")
+    assert backup_service.compressao_configurada() == "gzip"
+
+    origem = tmp_path / "estoque.db"
+    _criar_banco(origem, linhas=5).close()
+    stats = executar_backup(str(origem), str(tmp_path / "b.sqlite"), pausa_ms=0)
+    assert stats["compression"] == "gzip"
+
+
+def test_eh_arquivo_backup():
+    assert eh_arquivo_backup("multimax_1.sqlite")
+    assert eh_arquivo_backup("backup-24h.sqlite.gz")
+    assert eh_arquivo_backup("x.sqlite.zst")
+    assert not eh_arquivo_backup("x.sqlite.tmp")
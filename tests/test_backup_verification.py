@@ -0,0 +1,164 @@
+"""
+Testes para a verificação de backups (quick_check + contagem das tabelas principais).
+"""
+
+import gzip
+import os
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from multimax import create_app, db
+from multimax.models import BackupVerification, User
+from multimax.password_hash import generate_password_hash
+from multimax.services import backup_verification_service as bvs
+
+
+class _SessaoFalsa:
+    """Sessão mínima: devolve contagens fixas para SELECT COUNT(*)."""
+
+    def __init__(self, contagens):
+        self.contagens = contagens
+
+    def execute(self, stmt):
+        tabela = str(stmt).split('"')[1]
+        valor = self.contagens[tabela]
+        return type("R", (), {"scalar": lambda _self: valor})()
+
+    def rollback(self):
+        pass
+
+
+def _criar_backup(path, linhas=10, tabelas=bvs.TABELAS_CHAVE):
+    conn = sqlite3.connect(path)
+    for tabela in tabelas:
+        conn.execute(f"CREATE TABLE {tabela} (id INTEGER PRIMARY KEY, nome TEXT)")
+        conn.executemany(f"INSERT INTO {tabela} (nome) VALUES (?)", [(f"x{i}",) for i in range(linhas)])
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture(autouse=True)
+def _cache_limpo():
+    bvs.limpar_cache()
+    yield
+    bvs.limpar_cache()
+
+
+def test_verifica_integridade_e_contagens(tmp_path):
+    _criar_backup(tmp_path / "ok.sqlite")
+    _criar_backup(tmp_path / "parcial.sqlite", tabelas=("ciclo", "produto"))
+    _criar_backup(tmp_path / "pequeno.sqlite", linhas=2)
+    (tmp_path / "lixo.sqlite").write_bytes(b"nao e sqlite")
+    (tmp_path / "outro.txt").write_text("ignorado")
+    sessao = _SessaoFalsa({"ciclo": 10, "collaborator": 10, "produto": 12})
+
+    res = {r["filename"]: r for r in bvs.verificar_backups(str(tmp_path), sessao)}
+
+    assert set(res) == {"ok.sqlite", "parcial.sqlite", "pequeno.sqlite", "lixo.sqlite"}
+    assert res["ok.sqlite"]["status"] == "verified"
+    assert res["ok.sqlite"]["counts"] == {"ciclo": 10, "collaborator": 10, "produto": 10}
+    assert res["ok.sqlite"]["method"] == "quick_check"
+    assert res["parcial.sqlite"]["status"] == "failed"
+    assert "collaborator ausente" in res["parcial.sqlite"]["message"]
+    assert res["pequeno.sqlite"]["status"] == "failed"
+    assert res["lixo.sqlite"]["status"] == "corrupted"
+
+
+def test_cache_por_mtime_e_tamanho(tmp_path, monkeypatch):
+    _criar_backup(tmp_path / "b.sqlite")
+    sessao = _SessaoFalsa({"ciclo": 1, "collaborator": 1, "produto": 1})
+    chamadas = []
+    original = bvs.verificar_arquivo
+
+    def _contando(path, pragma="quick_check"):
+        chamadas.append(path)
+        return original(path, pragma)
+
+    monkeypatch.setattr(bvs, "verificar_arquivo", _contando)
+    assert bvs.verificar_backups(str(tmp_path), sessao)[0]["cached"] is False
+    assert bvs.verificar_backups(str(tmp_path), sessao)[0]["cached"] is True
+    assert len(chamadas) == 1
+
+    # Arquivo alterado (tamanho/mtime): verifica de novo
+    with sqlite3.connect(tmp_path / "b.sqlite") as conn:
+        conn.executemany("INSERT INTO produto (nome) VALUES (?)", [("y" * 500,)] * 200)
+    assert bvs.verificar_backups(str(tmp_path), sessao)[0]["cached"] is False
+    assert len(chamadas) == 2
+
+
+def test_backup_comprimido(tmp_path):
+    _criar_backup(tmp_path / "base.sqlite", linhas=3)
+    with open(tmp_path / "base.sqlite", "rb") as fin, gzip.open(tmp_path / "c.sqlite.gz", "wb") as fout:
+        fout.write(fin.read())
+    (tmp_path / "base.sqlite").unlink()
+    sessao = _SessaoFalsa({"ciclo": 3, "collaborator": 3, "produto": 3})
+    res = bvs.verificar_backups(str(tmp_path), sessao, pragma="integrity_check")
+    assert res[0]["status"] == "verified"
+    assert res[0]["method"] == "integrity_check"
+    assert res[0]["counts"]["produto"] == 3
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """Aplicação sobre banco em arquivo: a thread de verificação abre a própria conexão."""
+    monkeypatch.setenv("SQLALCHEMY_DATABASE_URI", f"sqlite:///{tmp_path / 'app.db'}")
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    app = create_app()
+    app.config["TESTING"] = True
+
+    with app.app_context():
+        db.create_all()
+        user = User()
+        user.username = "dev"
+        user.name = "Dev"
+        user.password_hash = generate_password_hash("senha123")
+        user.nivel = "DEV"
+        db.session.add(user)
+        db.session.commit()
+        yield app
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+
+
+def _aguardar(client, timeout=10.0):
+    fim = time.monotonic() + timeout
+    while time.monotonic() < fim:
+        job = client.get("/db/backups/verify/status").get_json()["job"]
+        if job["status"] != "executando":
+            return job
+        time.sleep(0.05)
+    raise AssertionError("verificação não terminou")
+
+
+def test_verificacao_em_segundo_plano_nao_bloqueia_a_rota(app, monkeypatch):
+    _criar_backup(os.path.join(app.config["BACKUP_DIR"], "a.sqlite"))
+    liberar = threading.Event()
+    original = bvs.verificar_arquivo
+
+    def _lento(path, pragma="quick_check"):
+        assert liberar.wait(10)
+        return original(path, pragma)
+
+    monkeypatch.setattr(bvs, "verificar_arquivo", _lento)
+    client = app.test_client()
+    client.post("/login", data={"username": "dev", "password": "senha123", "action": "login"})
+
+    resp = client.post("/db/backups/verify")
+    assert resp.status_code == 202
+    job = resp.get_json()["job"]
+    assert job["status"] == "executando"
+    # Enquanto roda, um novo pedido devolve o mesmo trabalho em vez de iniciar outro
+    assert client.post("/db/backups/verify").get_json()["job"]["id"] == job["id"]
+    assert client.get("/db/backups/verify/status").get_json()["job"]["status"] == "executando"
+    assert BackupVerification.query.count() == 0
+
+    liberar.set()
+    final = _aguardar(client)
+    assert final["id"] == job["id"] and final["status"] == "concluida"
+    assert [(r["filename"], r["status"]) for r in final["resultados"]] == [("a.sqlite", "verified")]
+    registro = BackupVerification.query.one()
+    assert (registro.backup_filename, registro.verification_status) == ("a.sqlite", "verified")
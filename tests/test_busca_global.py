@@ -0,0 +1,130 @@
+"""
+Testes para a busca global (índice FTS5 e fallback SQL).
+"""
+
+from datetime import date
+
+import pytest
+from sqlalchemy import update
+
+from multimax import create_app, db
+from multimax.models import CleaningTask, Collaborator, MeatReception, Produto, Recipe, User
+from multimax.password_hash import generate_password_hash
+from multimax.services import busca_global_service, busca_service
+from multimax.services.busca_global_service import buscar, fts_ativo, metricas, reindexar
+
+
+@pytest.fixture
+def app():
+    """Cria uma instância da aplicação para testes."""
+    app = create_app()
+    app.config["TESTING"] = True
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+    app.config["SECRET_KEY"] = "test-secret-key"
+    app.config["WTF_CSRF_ENABLED"] = False
+
+    with app.app_context():
+        db.create_all()
+        metricas.zerar()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def _popular():
+    p = Produto()
+    p.codigo = "BG0001"
+    p.nome = "Linguiça Toscana"
+    c = Collaborator()
+    c.name = "José Toscano"
+    r = Recipe()
+    r.nome = "Molho à Toscana"
+    t = CleaningTask()
+    t.nome_limpeza = "Câmara fria"
+    t.frequencia = "Semanal"
+    t.tipo = "semanal"
+    t.ultima_data = date(2026, 1, 1)
+    t.proxima_data = date(2026, 1, 8)
+    m = MeatReception()
+    m.fornecedor = "Frigorífico Toscana"
+    m.tipo = "bovina"
+    db.session.add_all([p, c, r, t, m])
+    db.session.commit()
+    return p, c, r, t, m
+
+
+def _titulos(termo):
+    resultados, _ = buscar(termo)
+    return {(item["type"], item["title"]) for item in resultados}
+
+
+def test_indice_incremental_e_reconstrucao(app):
+    assert fts_ativo()
+    p, c, r, t, m = _popular()
+
+    assert _titulos("tosc") == {
+        ("produto", "Linguiça Toscana"),
+        ("colaborador", "José Toscano"),
+        ("receita", "Molho à Toscana"),
+        ("recepcao", "Recebimento Frigorífico Toscana"),
+    }
+    assert _titulos("camara FRIA") == {("limpeza", "Câmara fria")}
+    assert _titulos("bg0001") == {("produto", "Linguiça Toscana")}
+
+    p.nome = "Linguiça Calabresa"
+    db.session.commit()
+    assert ("produto", "Linguiça Calabresa") in _titulos("calab")
+    assert ("produto", "Linguiça Calabresa") not in _titulos("toscana")
+
+    db.session.delete(c)
+    db.session.commit()
+    assert _titulos("jose") == set()
+
+    db.session.execute(db.text("DELETE FROM busca_global"))
+    db.session.commit()
+    assert _titulos("molho") == set()
+    assert reindexar() == 4
+    assert _titulos("molho") == {("receita", "Molho à Toscana")}
+    assert metricas.estatisticas()["por_backend"] == {"fts5": 8}
+
+    # Escrita pelo Core não passa pelos eventos do ORM; preencher() atualiza as linhas que toca
+    db.session.execute(update(Recipe).where(Recipe.id == r.id).values(nome="Molho Branco", busca=None))
+    assert busca_service.preencher() == 1
+    db.session.commit()
+    assert _titulos("branco") == {("receita", "Molho Branco")}
+    assert _titulos("molho toscana") == set()
+
+
+def test_fallback_sql_e_rota(app, monkeypatch):
+    _popular()
+    resultados_fts, _ = buscar("tosc")
+
+    chave = str(db.engine.url)
+    monkeypatch.setitem(busca_global_service._fts_por_banco, chave, False)
+    resultados_sql, _ = buscar("tosc")
+    assert {(i["type"], i["title"]) for i in resultados_sql} == {(i["type"], i["title"]) for i in resultados_fts}
+    assert buscar("   ") == ([], 0.0)
+    monkeypatch.undo()
+
+    user = User()
+    user.username = "dev"
+    user.name = "Dev"
+    user.password_hash = generate_password_hash("senha123")
+    user.nivel = "DEV"
+    db.session.add(user)
+    db.session.commit()
+    client = app.test_client()
+    client.post("/login", data={"username": "dev", "password": "senha123", "action": "login"})
+
+    resp = client.get("/api/v1/search?q=fria")
+    assert resp.headers["Server-Timing"].startswith("busca;dur=")
+    assert resp.get_json()["results"][0]["url"] == "/cronograma"
+
+    stats = client.get("/db/busca/metricas?reindexar=1").get_json()
+    assert stats["backend"] == "fts5" and stats["por_backend"] == {"fts5": 2, "sql": 1}
+    assert stats["p95_ms"] is not None and stats["indexados"] is None  # GET não altera nada
+    stats = client.post("/db/busca/metricas", data={"reindexar": "1", "reset": "1"}).get_json()
+    assert stats["indexados"] == 5 and stats["consultas"] == 0
+
+    resultado = app.test_cli_runner().invoke(args=["busca-reindexar"])
+    assert "5 registros indexados" in resultado.output
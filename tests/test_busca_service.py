@@ -0,0 +1,117 @@
+"""
+Testes para a busca sem acentos (coluna normalizada `busca`).
+"""
+
+import pytest
+from sqlalchemy import update
+
+from multimax import create_app, db
+from multimax.models import CicloSemana, Collaborator, Produto, Recipe, User
+from multimax.password_hash import generate_password_hash
+from multimax.services import busca_service
+
+
+@pytest.fixture
+def app():
+    """Cria uma instância da aplicação para testes."""
+    app = create_app()
+    app.config["TESTING"] = True
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+    app.config["SECRET_KEY"] = "test-secret-key"
+    app.config["WTF_CSRF_ENABLED"] = False
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def _produto(codigo, nome):
+    p = Produto()
+    p.codigo = codigo
+    p.nome = nome
+    p.quantidade = 1
+    db.session.add(p)
+    return p
+
+
+def _buscar_produtos(termo):
+    return [
+        p.nome
+        for p in Produto.query.filter(busca_service.filtro(Produto.busca, termo))
+        .order_by(busca_service.relevancia(Produto.busca, termo), Produto.nome)
+        .all()
+    ]
+
+
+def test_normalizacao_e_casamento_por_token():
+    assert busca_service.normalizar("  Linguiça   TOSCANA ") == "linguica toscana"
+    assert busca_service.casa("marco", "Semana 2 | Março")
+    assert busca_service.casa("sem MAR", "Semana 2 | Março")
+    assert not busca_service.casa("arco", "Semana 2 | Março")  # só prefixo de palavra
+    assert busca_service.casa("", "qualquer")
+
+
+def test_coluna_sincronizada_e_ranking(app):
+    _produto("AK0001", "Linguiça Toscana")
+    _produto("AK0002", "Toscana Especial")
+    _produto("CX0100", "Costela")
+    db.session.commit()
+
+    assert _buscar_produtos("LINGUICA") == ["Linguiça Toscana"]
+    assert _buscar_produtos("tosc") == ["Toscana Especial", "Linguiça Toscana"]
+    assert _buscar_produtos("ak0002") == ["Toscana Especial"]
+    assert _buscar_produtos("50%") == []  # curingas do LIKE são escapados
+
+    costela = Produto.query.filter_by(codigo="CX0100").one()
+    costela.nome = "Costela Suína"
+    db.session.commit()
+    assert costela.busca == "costela suina cx0100"
+
+
+def test_filtro_usa_indices(app):
+    _produto("AK0001", "Linguiça Toscana")
+    db.session.commit()
+
+    sql = str(busca_service.filtro(Produto.busca, "lingu tosc").compile(db.engine))
+    assert "MATCH" in sql and ">=" in sql and "LIKE" not in sql
+    stmt = Produto.query.filter(busca_service.filtro(Produto.busca, "tosc")).statement.compile(db.engine)
+    parametros = tuple(stmt.params[k] for k in stmt.positiontup)
+    linhas = db.session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {stmt}", parametros)
+    plano = " ".join(str(linha[-1]) for linha in linhas)
+    assert "ix_produto_busca" in plano and "busca_global" in plano and "SCAN produto" not in plano
+
+    # Modelos fora do índice FTS5 (semanas dos ciclos) casam palavras internas com LIKE
+    assert "LIKE" in str(busca_service.filtro(CicloSemana.busca, "marco").compile(db.engine))
+
+
+def test_preencher_linhas_pendentes(app):
+    r = Recipe()
+    r.nome = "Pão de Alho"
+    c = Collaborator()
+    c.name = "José Antônio"
+    db.session.add_all([r, c])
+    db.session.commit()
+    db.session.execute(update(Recipe).values(busca=None))
+    db.session.execute(update(Collaborator).values(busca=None))
+    db.session.commit()
+
+    assert busca_service.preencher() == 2
+    assert busca_service.preencher() == 0
+    db.session.commit()
+    assert db.session.get(Recipe, r.id).busca == "pao de alho"
+
+    user = User()
+    user.username = "admin"
+    user.name = "Admin"
+    user.password_hash = generate_password_hash("senha123")
+    user.nivel = "admin"
+    db.session.add(user)
+    db.session.commit()
+    client = app.test_client()
+    client.post("/login", data={"username": "admin", "password": "senha123", "action": "login"})
+    titulos = [r["title"] for r in client.get("/api/v1/search?q=jose").get_json()["results"]]
+    assert "José Antônio" in titulos
+    titulos = [r["title"] for r in client.get("/api/v1/search?q=pao alho").get_json()["results"]]
+    assert "Pão de Alho" in titulos
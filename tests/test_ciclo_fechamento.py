@@ -0,0 +1,121 @@
+"""
+Testes para o motor de fechamento mensal de ciclos (operações de conjunto).
+"""
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from multimax import create_app, db
+from multimax.models import Ciclo, CicloFechamento, CicloOcorrencia, CicloSaldo, Collaborator, Setor, User
+from multimax.password_hash import generate_password_hash
+from multimax.services.ciclo_fechamento_service import Cronometro, agrupar_totais, fechar_registros
+from multimax.services.ciclo_saldo_service import fechar_ciclo_mensal
+
+
+@pytest.fixture
+def app():
+    """Cria uma instância da aplicação para testes."""
+    app = create_app()
+    app.config["TESTING"] = True
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+    app.config["SECRET_KEY"] = "test-secret-key"
+    app.config["WTF_CSRF_ENABLED"] = False
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def _colaborador(nome, setor):
+    c = Collaborator()
+    c.name = nome
+    c.active = True
+    c.setor_id = setor.id
+    db.session.add(c)
+    db.session.flush()
+    return c
+
+
+def _lancar(colab, horas, setor_id=None):
+    c = Ciclo()
+    c.collaborator_id = colab.id
+    c.setor_id = setor_id or colab.setor_id
+    c.nome_colaborador = colab.name
+    c.data_lancamento = date(2026, 1, 4)
+    c.origem = "Domingo"
+    c.valor_horas = Decimal(horas)
+    c.status_ciclo = "ativo"
+    db.session.add(c)
+
+
+def test_fechamento_por_setor_agrupa_e_fecha_em_conjunto(app):
+    acougue, padaria = Setor(nome="Açougue"), Setor(nome="Padaria")
+    db.session.add_all([acougue, padaria])
+    db.session.flush()
+    ana, bia = _colaborador("Ana", acougue), _colaborador("Bia", acougue)
+    caio = _colaborador("Caio", padaria)
+    for colab, horas in ((ana, "8"), (ana, "4.5"), (bia, "3"), (caio, "16")):
+        _lancar(colab, horas)
+    db.session.commit()
+
+    assert fechar_registros(5, "admin", acougue.id) == 3
+    totais, gerais = agrupar_totais(5, valor_dia=100.0)
+    assert set(totais) == {ana.id, bia.id}  # Caio (outro setor) continua ativo
+    assert totais[ana.id]["total_horas"] == Decimal("12.5") and totais[ana.id]["horas_restantes"] == 4.5
+    assert totais[ana.id]["registros_count"] == 2 and totais[ana.id]["setor_id"] == acougue.id
+    assert (gerais["dias"], gerais["valor"], gerais["colaboradores"]) == (1, Decimal("100.0"), 2)
+    assert Ciclo.query.filter_by(status_ciclo="ativo").count() == 1
+
+    # CicloSaldo em lote: repetir o mês atualiza em vez de duplicar
+    fechar_ciclo_mensal(totais, "01-2026", "admin")
+    totais[bia.id]["total_horas"] = Decimal("10")
+    resultado = fechar_ciclo_mensal(totais, "01-2026", "admin")
+    assert resultado["resumo_saldos"][bia.id]["saldo"] == 2.0
+    saldos = {s.collaborator_id: s.saldo for s in CicloSaldo.query.populate_existing().all()}
+    assert saldos == {ana.id: Decimal("4.5"), bia.id: Decimal("2.0")}
+
+    cron = Cronometro()
+    cron.marcar("etapa")
+    assert "etapa" in cron.etapas and cron.resumo().endswith("ms")
+
+
+def test_rota_confirmar_fechamento(app):
+    setor = Setor(nome="Açougue")
+    db.session.add(setor)
+    db.session.flush()
+    ana = _colaborador("Ana", setor)
+    _lancar(ana, "11")
+    o = CicloOcorrencia()
+    o.collaborator_id = ana.id
+    o.setor_id = setor.id
+    o.nome_colaborador = ana.name
+    o.data_ocorrencia = date(2026, 1, 5)
+    o.tipo = "atraso"
+    user = User()
+    user.username = "admin"
+    user.name = "Admin"
+    user.password_hash = generate_password_hash("senha123")
+    user.nivel = "admin"
+    db.session.add_all([o, user])
+    db.session.commit()
+    client = app.test_client()
+    client.post("/login", data={"username": "admin", "password": "senha123", "action": "login"})
+
+    client.post("/ciclos/fechamento/confirmar", data={"setor_id": setor.id})
+    fechamento = CicloFechamento.query.one()
+    assert (fechamento.total_dias, fechamento.total_horas) == (1, Decimal("11.0"))
+    carry = Ciclo.query.filter_by(origem="Carryover").one()
+    assert (carry.status_ciclo, carry.valor_horas, carry.setor_id) == ("ativo", Decimal("3.0"), setor.id)
+    assert CicloOcorrencia.query.filter_by(status_ciclo="fechado", ciclo_id=fechamento.ciclo_id).count() == 1
+
+    # Setor sem registros ativos: nada é fechado
+    client.post("/ciclos/fechamento/confirmar", data={"setor_id": setor.id + 1})
+    assert CicloFechamento.query.count() == 1
+    # O carryover (3h < 8h) é fechado no mês seguinte e volta de novo como ativo
+    client.post("/ciclos/fechamento/confirmar", data={"setor_id": setor.id})
+    assert CicloFechamento.query.count() == 2
+    assert Ciclo.query.filter_by(status_ciclo="ativo", origem="Carryover").count() == 1
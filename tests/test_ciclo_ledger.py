@@ -0,0 +1,131 @@
+"""
+Testes para o ledger materializado de saldos dos Ciclos.
+"""
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from multimax import create_app, db
+from multimax.models import Ciclo, CicloFolga, CicloSaldoLedger, Collaborator, Setor, User
+from multimax.password_hash import generate_password_hash
+from multimax.services.ciclo_balance_service import calcular_saldos
+from multimax.services.ciclo_ledger_service import aplicar_delta, reconstruir, saldos_ledger, verificar
+
+
+@pytest.fixture
+def app():
+    """Cria uma instância da aplicação para testes."""
+    app = create_app()
+    app.config["TESTING"] = True
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+    app.config["SECRET_KEY"] = "test-secret-key"
+    app.config["WTF_CSRF_ENABLED"] = False
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    """Cliente autenticado como admin."""
+    user = User()
+    user.username = "admin"
+    user.name = "Admin"
+    user.password_hash = generate_password_hash("senha123")
+    user.nivel = "admin"
+    db.session.add(user)
+    db.session.commit()
+    client = app.test_client()
+    client.post("/login", data={"username": "admin", "password": "senha123", "action": "login"})
+    return client
+
+
+@pytest.fixture
+def colab(app):
+    setor = Setor()
+    setor.nome = "Açougue"
+    db.session.add(setor)
+    db.session.flush()
+    c = Collaborator()
+    c.name = "Ana"
+    c.active = True
+    c.setor_id = setor.id
+    db.session.add(c)
+    db.session.commit()
+    return c
+
+
+def _ledger(colab_id, status="ativo"):
+    # populate_existing: o ledger é atualizado por UPSERT (Core), fora do identity map da sessão
+    query = CicloSaldoLedger.query.filter_by(collaborator_id=colab_id, status_ciclo=status)
+    return query.populate_existing().first()
+
+
+def test_rotas_mantem_ledger(client, colab):
+    for horas in ("8", "4.5"):
+        client.post(
+            "/ciclos/lançar",
+            data={
+                "collaborator_id": colab.id,
+                "data_lancamento": "2026-01-04",
+                "origem": "Domingo",
+                "valor_horas": horas,
+            },
+        )
+    linha = _ledger(colab.id)
+    assert linha.total_horas == Decimal("12.5")
+    assert linha.registros_count == 2
+
+    ciclo = Ciclo.query.filter_by(collaborator_id=colab.id, valor_horas=Decimal("8")).first()
+    assert client.post(f"/ciclos/ajustar/{ciclo.id}", data={"valor_horas": "6"}).get_json()["ok"]
+    outro = Ciclo.query.filter_by(collaborator_id=colab.id, valor_horas=Decimal("4.5")).first()
+    assert client.post(f"/ciclos/excluir/{outro.id}").get_json()["ok"]
+
+    client.post(
+        "/ciclos/folgas/adicionar",
+        data={"collaborator_id": colab.id, "data_folga": "2026-01-06", "tipo": "adicional", "dias": "2"},
+    )
+
+    linha = _ledger(colab.id)
+    assert linha.total_horas == Decimal("6")
+    assert linha.registros_count == 1
+    assert linha.folgas_adicionais == 2
+    assert verificar() == []
+    assert saldos_ledger([colab.id])[colab.id] == calcular_saldos([colab.id])[colab.id]
+
+    # Fechamento: registros vão para 'fechado' e as 6h (< 8h) voltam como carryover ativo
+    client.post("/ciclos/fechamento/confirmar", data={})
+    assert Ciclo.query.filter_by(status_ciclo="ativo", origem="Carryover").count() == 1
+    assert CicloFolga.query.filter_by(status_ciclo="fechado").count() == 1
+    assert _ledger(colab.id, "fechado").total_horas == Decimal("6")
+    assert _ledger(colab.id).total_horas == Decimal("6")
+    assert _ledger(colab.id).folgas_adicionais == 0
+    assert verificar() == []
+
+
+def test_verificar_detecta_e_reconstroi(app, colab):
+    c = Ciclo()
+    c.collaborator_id = colab.id
+    c.setor_id = colab.setor_id
+    c.nome_colaborador = colab.name
+    c.data_lancamento = date(2026, 1, 4)
+    c.origem = "Domingo"
+    c.valor_horas = Decimal("3")
+    c.status_ciclo = "ativo"
+    db.session.add(c)  # Escrita sem passar pelo ledger
+    aplicar_delta(colab.id, colab.setor_id, "ativo", horas=1, registros=1)
+    db.session.commit()
+
+    divergencias = verificar()
+    assert {d["campo"] for d in divergencias} == {"total_horas"}
+    assert divergencias[0]["ledger"] == 1.0 and divergencias[0]["bruto"] == 3.0
+
+    assert reconstruir() == 1
+    db.session.commit()
+    assert verificar() == []
+    assert saldos_ledger(setor_id=colab.setor_id)[colab.id]["total_horas"] == 3.0
@@ -0,0 +1,275 @@
+"""
+Testes para os serviços do sistema de Ciclos (saldos e ciclos semanais).
+"""
+
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+from flask import template_rendered
+
+from multimax import create_app, db
+from multimax.models import AppSetting, Ciclo, Collaborator, Setor
+from multimax.services.ciclo_balance_service import calcular_saldos, saldo_a_partir_de_horas, saldo_vazio
+
+
+@pytest.fixture
+def app():
+    """Cria uma instância da aplicação para testes."""
+    app = create_app()
+    app.config["TESTING"] = True
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+    app.config["SECRET_KEY"] = "test-secret-key"
+    app.config["WTF_CSRF_ENABLED"] = False
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def _criar_setor(nome):
+    setor = Setor()
+    setor.nome = nome
+    db.session.add(setor)
+    db.session.flush()
+    return setor
+
+
+def _criar_colaborador(nome, setor):
+    colab = Collaborator()
+    colab.name = nome
+    colab.active = True
+    colab.setor_id = setor.id
+    db.session.add(colab)
+    db.session.flush()
+    return colab
+
+
+def _lancar(colab, horas, setor_id=None, data=date(2026, 1, 5), status="ativo", ciclo_id=None):
+    c = Ciclo()
+    c.collaborator_id = colab.id
+    c.setor_id = setor_id if setor_id is not None else colab.setor_id
+    c.nome_colaborador = colab.name
+    c.data_lancamento = data
+    c.origem = "Domingo"
+    c.valor_horas = Decimal(str(horas))
+    c.status_ciclo = status
+    c.ciclo_id = ciclo_id
+    db.session.add(c)
+    return c
+
+
+def _arquivar_semana(setor, ciclo_id, label, inicio):
+    from multimax.models import CicloSemana
+
+    return CicloSemana(
+        ciclo_id=ciclo_id, setor_id=setor.id, label=label, week_start=inicio, week_end=inicio + timedelta(days=6)
+    )
+
+
+class TestSaldoAPartirDeHoras:
+    """Testes para a conversão de horas em saldo."""
+
+    def test_dias_e_horas_restantes(self):
+        saldo = saldo_a_partir_de_horas(Decimal("17.5"), 65.0)
+        assert saldo["total_horas"] == 17.5
+        assert saldo["dias_completos"] == 2
+        assert saldo["horas_restantes"] == 1.5
+        assert saldo["valor_aproximado"] == 130.0
+
+    def test_saldo_negativo(self):
+        saldo = saldo_a_partir_de_horas(-8, 65.0)
+        assert saldo["total_horas"] == -8.0
+        assert saldo["dias_completos"] == 0
+        assert saldo["horas_restantes"] == 0.0
+        assert saldo["valor_aproximado"] == 0.0
+
+    def test_saldo_vazio(self):
+        saldo = saldo_vazio(70.0)
+        assert saldo["total_horas"] == 0.0
+        assert saldo["registros_count"] == 0
+
+
+class TestCalcularSaldos:
+    """Testes para o cálculo agrupado de saldos."""
+
+    def test_agrupa_por_colaborador(self, app):
+        with app.app_context():
+            setor = _criar_setor("Açougue")
+            ana = _criar_colaborador("Ana", setor)
+            bruno = _criar_colaborador("Bruno", setor)
+            _lancar(ana, 8)
+            _lancar(ana, 4.5)
+            _lancar(bruno, 16)
+            _lancar(bruno, 8, status="fechado", ciclo_id=1)
+            db.session.commit()
+
+            saldos = calcular_saldos(valor_dia=65.0)
+            assert saldos[ana.id]["total_horas"] == 12.5
+            assert saldos[ana.id]["dias_completos"] == 1
+            assert saldos[ana.id]["horas_restantes"] == 4.5
+            assert saldos[ana.id]["registros_count"] == 2
+            assert saldos[bruno.id]["total_horas"] == 16.0
+            assert saldos[bruno.id]["valor_aproximado"] == 130.0
+
+            fechados = calcular_saldos(status_ciclo="fechado", ciclo_id=1, valor_dia=65.0)
+            assert list(fechados) == [bruno.id]
+            assert fechados[bruno.id]["total_horas"] == 8.0
+
+    def test_filtro_por_setor_e_periodo(self, app):
+        with app.app_context():
+            acougue = _criar_setor("Açougue")
+            padaria = _criar_setor("Padaria")
+            ana = _criar_colaborador("Ana", acougue)
+            _lancar(ana, 8)
+            _lancar(ana, 3, setor_id=padaria.id)
+            _lancar(ana, 2, data=date(2026, 2, 1))
+            db.session.commit()
+
+            por_setor = calcular_saldos(setor_id=padaria.id, valor_dia=65.0)
+            assert por_setor[ana.id]["total_horas"] == 3.0
+
+            janeiro = calcular_saldos(data_inicio=date(2026, 1, 1), data_fim=date(2026, 1, 31), valor_dia=65.0)
+            assert janeiro[ana.id]["total_horas"] == 11.0
+
+            assert calcular_saldos(collaborator_ids=[], valor_dia=65.0) == {}
+
+    def test_valor_dia_configurado(self, app):
+        with app.app_context():
+            setting = AppSetting()
+            setting.key = "ciclo_valor_dia"
+            setting.value = "100"
+            db.session.add(setting)
+            setor = _criar_setor("Açougue")
+            ana = _criar_colaborador("Ana", setor)
+            _lancar(ana, 16)
+            db.session.commit()
+
+            saldos = calcular_saldos()
+            assert saldos[ana.id]["valor_aproximado"] == 200.0
+
+
+class TestCarregarSemanasPorColaborador:
+    """Testes para o carregamento em lote dos ciclos semanais."""
+
+    def test_distribui_registros_por_semana(self, app):
+        from multimax.models import CicloFolga, CicloOcorrencia
+        from multimax.services.ciclo_semanas_service import carregar_semanas_por_colaborador, semanas_tem_registros
+
+        with app.app_context():
+            setor = _criar_setor("Açougue")
+            ana = _criar_colaborador("Ana", setor)
+            bruno = _criar_colaborador("Bruno", setor)
+            _lancar(ana, 8, data=date(2026, 1, 5))
+            _lancar(ana, 4, data=date(2026, 1, 12))
+            uso = _lancar(ana, -8, data=date(2026, 1, 13))
+            uso.origem = "Folga utilizada"
+            folga = CicloFolga()
+            folga.collaborator_id = ana.id
+            folga.setor_id = setor.id
+            folga.nome_colaborador = ana.name
+            folga.data_folga = date(2026, 1, 14)
+            folga.tipo = "adicional"
+            db.session.add(folga)
+            oc = CicloOcorrencia()
+            oc.collaborator_id = ana.id
+            oc.setor_id = setor.id
+            oc.nome_colaborador = ana.name
+            oc.data_ocorrencia = date(2026, 1, 6)
+            oc.tipo = "atraso"
+            db.session.add(oc)
+            db.session.commit()
+
+            semanas = [
+                {"label": "Ciclo 1 | Janeiro", "week_start": date(2026, 1, 4), "week_end": date(2026, 1, 10)},
+                {"label": "Ciclo 2 | Janeiro", "week_start": date(2026, 1, 11), "week_end": date(2026, 1, 17)},
+            ]
+            resultado = carregar_semanas_por_colaborador([ana, bruno], semanas, incluir_valor_horas=True)
+
+            primeira, segunda = resultado[ana.id]
+            assert [float(h.valor_horas) for h in primeira["horas"]] == [8.0]
+            assert [o.tipo for o in primeira["ocorrencias"]] == ["atraso"]
+            assert [float(h.valor_horas) for h in segunda["horas"]] == [4.0]
+            assert [f.tipo for f in segunda["folgas"]] == ["uso", "adicional"]
+            assert float(segunda["folgas"][0].valor_horas) == -8.0
+            assert semanas_tem_registros(resultado[ana.id])
+            assert not semanas_tem_registros(resultado[bruno.id])
+
+
+class TestCarregarSemanasFechadas:
+    """Testes para o detalhamento em lote das semanas arquivadas da pesquisa."""
+
+    def test_atribui_por_ciclo_e_semana(self, app):
+        from multimax.models import CicloFolga
+        from multimax.services.ciclo_semanas_service import carregar_semanas_fechadas
+
+        with app.app_context():
+            setor = _criar_setor("Açougue")
+            ana = _criar_colaborador("Ana", setor)
+            bruno = _criar_colaborador("Bruno", setor)
+            _lancar(bruno, 2, data=date(2026, 1, 5), status="fechado", ciclo_id=1)
+            _lancar(ana, 8, data=date(2026, 1, 5), status="fechado", ciclo_id=1)
+            _lancar(ana, 3, data=date(2026, 1, 12), status="fechado", ciclo_id=1)
+            _lancar(ana, 5, data=date(2026, 1, 12), status="fechado", ciclo_id=2)  # mesmo período, outro ciclo
+            _lancar(ana, 1, data=date(2026, 1, 12), status="ativo")
+            uso = _lancar(ana, -8, data=date(2026, 1, 6), status="fechado", ciclo_id=1)
+            uso.origem = "Folga utilizada"
+            folga = CicloFolga()
+            folga.collaborator_id = ana.id
+            folga.setor_id = setor.id
+            folga.nome_colaborador = ana.name
+            folga.data_folga = date(2026, 1, 6)
+            folga.tipo = "adicional"
+            folga.status_ciclo = "fechado"
+            folga.ciclo_id = 1
+            db.session.add(folga)
+            semanas = [
+                _arquivar_semana(setor, 2, "Semana 2 | Janeiro", date(2026, 1, 11)),
+                _arquivar_semana(setor, 1, "Semana 1 | Janeiro", date(2026, 1, 4)),
+                _arquivar_semana(setor, 1, "Semana 2 | Janeiro", date(2026, 1, 11)),
+            ]
+            db.session.add_all(semanas)
+            db.session.commit()
+
+            c2, c1_s1, c1_s2 = carregar_semanas_fechadas(semanas)
+            assert [float(h.valor_horas) for h in c2["horas"]] == [5.0]
+            assert [(h.nome_colaborador, float(h.valor_horas)) for h in c1_s1["horas"]] == [
+                ("Ana", 8.0),
+                ("Bruno", 2.0),
+            ]
+            assert [f.tipo for f in c1_s1["folgas"]] == ["uso", "adicional"]
+            assert [float(h.valor_horas) for h in c1_s2["horas"]] == [3.0]
+            assert carregar_semanas_fechadas([]) == []
+
+    def test_rota_pesquisa_paginada(self, app):
+        from multimax.models import User
+        from multimax.password_hash import generate_password_hash
+
+        with app.app_context():
+            setor = _criar_setor("Açougue")
+            for i in range(25):
+                db.session.add(
+                    _arquivar_semana(setor, 1, f"Semana {i} | Janeiro", date(2026, 1, 1) + timedelta(days=7 * i))
+                )
+            user = User()
+            user.username = "admin"
+            user.name = "Admin"
+            user.password_hash = generate_password_hash("senha123")
+            user.nivel = "admin"
+            db.session.add(user)
+            db.session.commit()
+            client = app.test_client()
+            client.post("/login", data={"username": "admin", "password": "senha123", "action": "login"})
+
+            capturados = []
+
+            def capturar(sender, template, context, **extra):
+                capturados.append(context)
+
+            template_rendered.connect(capturar, app)
+            assert client.get("/ciclos/pesquisa?q=Janeiro&pagina=2").status_code == 200
+            contexto = capturados[-1]
+            assert len(contexto["semanas"]) == 5 and contexto["paginacao"].total == 25
+            assert contexto["ciclo_ids"] == [1]
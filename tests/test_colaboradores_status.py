@@ -0,0 +1,86 @@
+"""
+Testes para o mapa de status semanal da escala (Atestado > Férias > Folga).
+"""
+
+from datetime import date, timedelta
+
+import pytest
+
+from multimax import create_app, db
+from multimax.models import Collaborator, MedicalCertificate, TimeOffRecord, Vacation
+from multimax.routes.colaboradores import _build_dias_semana, _build_status_map
+
+SEGUNDA = date(2026, 3, 2)
+
+
+@pytest.fixture
+def app():
+    """Cria uma instância da aplicação para testes."""
+    app = create_app()
+    app.config["TESTING"] = True
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+    app.config["SECRET_KEY"] = "test-secret-key"
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def _colaborador(nome):
+    c = Collaborator()
+    c.name = nome
+    c.active = True
+    db.session.add(c)
+    db.session.flush()
+    return c
+
+
+def _folga(colab, inicio, dias):
+    r = TimeOffRecord()
+    r.collaborator_id = colab.id
+    r.date = inicio
+    r.record_type = "folga_usada"
+    r.days = dias
+    db.session.add(r)
+
+
+def test_prioridade_e_intervalos(app):
+    ana = _colaborador("Ana")
+    bia = _colaborador("Bia")
+
+    # Folga de 3 dias iniciada antes da semana cobre segunda
+    _folga(ana, SEGUNDA - timedelta(days=2), 3)
+    # Férias terça-quinta, atestado na quarta (sobrepõe as férias)
+    vac = Vacation()
+    vac.collaborator_id = ana.id
+    vac.data_inicio = SEGUNDA + timedelta(days=1)
+    vac.data_fim = SEGUNDA + timedelta(days=3)
+    db.session.add(vac)
+    mc = MedicalCertificate()
+    mc.collaborator_id = ana.id
+    mc.data_inicio = SEGUNDA + timedelta(days=2)
+    mc.data_fim = SEGUNDA + timedelta(days=2)
+    db.session.add(mc)
+    # Folga de um dia no domingo para outro colaborador
+    _folga(bia, SEGUNDA + timedelta(days=6), 1)
+    db.session.commit()
+
+    dias = _build_dias_semana(SEGUNDA, SEGUNDA)
+    status = _build_status_map([ana, bia], dias)
+
+    def st(colab, offset):
+        return status.get((colab.id, (SEGUNDA + timedelta(days=offset)).isoformat()))
+
+    assert st(ana, 0) == "Folga"
+    assert st(ana, 1) == "Férias"
+    assert st(ana, 2) == "Atestado"
+    assert st(ana, 3) == "Férias"
+    assert st(ana, 4) is None
+    assert st(bia, 6) == "Folga"
+    assert st(bia, 0) is None
+
+
+def test_sem_colaboradores(app):
+    assert _build_status_map([], _build_dias_semana(SEGUNDA, SEGUNDA)) == {}
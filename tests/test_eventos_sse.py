@@ -0,0 +1,76 @@
+"""
+Testes para o pub/sub em processo e o stream SSE de eventos.
+"""
+
+import pytest
+
+from multimax import create_app, db
+from multimax.models import Produto, User
+from multimax.password_hash import generate_password_hash
+from multimax.services.eventos_service import Barramento, barramento, formatar, transmitir
+
+
+@pytest.fixture
+def app():
+    """Cria uma instância da aplicação para testes."""
+    app = create_app()
+    app.config["TESTING"] = True
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+    app.config["SECRET_KEY"] = "test-secret-key"
+    app.config["WTF_CSRF_ENABLED"] = False
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def test_fila_limitada_e_resync(monkeypatch):
+    monkeypatch.setenv("SSE_FILA", "2")
+    bus = Barramento()
+    assinatura = bus.assinar(1, max_clientes=1)
+    assert bus.assinar(2, max_clientes=1) is None  # limite de clientes simultâneos
+
+    for i in range(4):
+        assert bus.publicar("estoque", {"n": i}) == 1
+    assert assinatura.descartados == 2
+
+    partes = list(transmitir(assinatura, heartbeat_s=0.01, duracao_max_s=0.05))
+    assert partes[0].startswith("retry: ")
+    assert partes[1].startswith("id: ") and "event: resync" in partes[1]
+    assert '"n": 2' in partes[2] and '"n": 3' in partes[3]
+    assert ": ping\n\n" in partes[4:]
+    assert bus.clientes() == 0  # o fim do stream cancela a assinatura
+    assert formatar({"id": 7, "tipo": "limpeza", "dados": {"nome": "Câmara"}}).endswith('data: {"nome": "Câmara"}\n\n')
+
+
+def test_stream_recebe_movimentacao_da_api(app, monkeypatch):
+    monkeypatch.setenv("SSE_HEARTBEAT", "0.01")
+    monkeypatch.setenv("SSE_DURACAO_MAX", "0.2")
+    user = User()
+    user.username = "admin"
+    user.name = "Admin"
+    user.password_hash = generate_password_hash("senha123")
+    user.nivel = "admin"
+    p = Produto()
+    p.codigo = "AV0001"
+    p.nome = "Picanha"
+    p.quantidade = 5
+    p.estoque_minimo = 4
+    db.session.add_all([user, p])
+    db.session.commit()
+    client = app.test_client()
+    client.post("/login", data={"username": "admin", "password": "senha123", "action": "login"})
+
+    resp = client.get("/api/v1/eventos", buffered=False)
+    assert resp.status_code == 200 and resp.mimetype == "text/event-stream"
+    assert barramento.clientes() == 1
+
+    saida = client.post(f"/api/v1/produtos/{p.id}/saida", json={"quantidade": 2})
+    assert saida.status_code == 200
+    corpo = "".join(part.decode("utf-8") for part in resp.response)
+    resp.close()
+    assert "event: estoque" in corpo
+    assert '"estoque": 3' in corpo and '"critico": true' in corpo
+    assert barramento.clientes() == 0
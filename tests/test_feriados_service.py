@@ -0,0 +1,96 @@
+"""
+Testes para o calendário de feriados pré-calculado.
+"""
+
+from datetime import date
+
+import pytest
+
+from multimax import create_app, db
+from multimax.models import Holiday, User
+from multimax.password_hash import generate_password_hash
+from multimax.services import feriados_service
+from multimax.services.feriados_service import (
+    calcular_ano,
+    feriados_do_ano,
+    feriados_periodo,
+    pascoa,
+    persistir_anos,
+    proximo_feriado,
+)
+
+
+@pytest.fixture
+def app():
+    """Cria uma instância da aplicação para testes."""
+    app = create_app()
+    app.config["TESTING"] = True
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+    app.config["SECRET_KEY"] = "test-secret-key"
+    app.config["WTF_CSRF_ENABLED"] = False
+
+    with app.app_context():
+        db.create_all()
+        Holiday.query.delete()  # create_app() já gravou o calendário do ano corrente
+        db.session.commit()
+        feriados_service.invalidar_cache()
+        yield app
+        feriados_service.invalidar_cache()
+        db.session.remove()
+        db.drop_all()
+
+
+def test_pascoa_e_moveis():
+    assert [pascoa(a) for a in (2000, 2024, 2025, 2026)] == [
+        date(2000, 4, 23),
+        date(2024, 3, 31),
+        date(2025, 4, 20),
+        date(2026, 4, 5),
+    ]
+    nomes = {d: nome for d, nome, _ in calcular_ano(2026)}
+    assert nomes[date(2026, 4, 3)] == "Sexta-Feira Santa"
+    assert nomes[date(2026, 6, 4)] == "Corpus Christi"
+    assert nomes[date(2026, 2, 2)] == "Padroeiro de Umbaúba"
+    assert len(nomes) == 13
+
+
+def test_persistir_idempotente_e_leitura(app):
+    manual = Holiday()
+    manual.date = date(2026, 11, 20)
+    manual.name = "Zumbi dos Palmares"
+    manual.kind = "municipal"
+    db.session.add(manual)
+    db.session.commit()
+
+    assert feriados_do_ano(2026)[0]["id"] is not None  # ano com linha manual: só o que está no banco
+    assert persistir_anos([2026]) == 12
+    assert persistir_anos([2026]) == 0
+    assert Holiday.query.count() == 13
+    assert db.session.get(Holiday, manual.id).name == "Zumbi dos Palmares"
+
+    assert len(feriados_do_ano(2026)) == 13
+    assert proximo_feriado(date(2026, 12, 26))["date"] == date(2027, 1, 1)
+
+    # Ano não gravado: datas calculadas, sem escrita
+    futuros = feriados_periodo(date(2030, 1, 1), date(2030, 12, 31))
+    assert len(futuros) == 13 and all(h["id"] is None for h in futuros)
+    assert Holiday.query.count() == 13
+
+
+def test_escala_le_sem_gravar(app):
+    user = User()
+    user.username = "admin"
+    user.name = "Admin"
+    user.password_hash = generate_password_hash("senha123")
+    user.nivel = "admin"
+    db.session.add(user)
+    db.session.commit()
+    client = app.test_client()
+    client.post("/login", data={"username": "admin", "password": "senha123", "action": "login"})
+
+    assert client.get("/escala").status_code == 200
+    assert Holiday.query.count() == 0
+
+    client.post("/escala/feriado/criar", data={"date": "2026-03-19", "name": "São José", "kind": "estadual"})
+    assert any(h["name"] == "São José" for h in feriados_do_ano(2026))
+    assert "São José" in client.get("/escala").get_data(as_text=True)
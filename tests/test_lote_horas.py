@@ -0,0 +1,160 @@
+"""
+Testes para o motor de lotes de horas (INSERT em blocos e correção por bulk_id).
+"""
+
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from multimax import create_app, db
+from multimax.models import BulkHourOperation, Collaborator, TimeOffRecord, User
+from multimax.password_hash import generate_password_hash
+from multimax.services.lote_horas_service import aplicar_lote, corrigir_lote, listar_lotes, validar_dados
+
+
+@pytest.fixture
+def app():
+    """Cria uma instância da aplicação para testes."""
+    app = create_app()
+    app.config["TESTING"] = True
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+    app.config["SECRET_KEY"] = "test-secret-key"
+    app.config["WTF_CSRF_ENABLED"] = False
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def colaboradores(app):
+    lista = []
+    for i in range(7):
+        c = Collaborator()
+        c.name = f"Colab {i}"
+        c.active = True
+        db.session.add(c)
+        lista.append(c)
+    db.session.commit()
+    return [c.id for c in lista]
+
+
+def _registros(bulk_id):
+    return TimeOffRecord.query.filter_by(bulk_id=bulk_id).order_by(TimeOffRecord.collaborator_id).all()
+
+
+def test_validar_dados():
+    assert validar_dados("Acrescimo", "2,5", "2026-02-01") == ("acrescimo", 2.5, date(2026, 2, 1))
+    for args in (("outro", "1", "2026-02-01"), ("desconto", "x", "2026-02-01"), ("desconto", "1", "01/02/2026")):
+        with pytest.raises(ValueError):
+            validar_dados(*args)
+
+
+def test_aplicar_lote_em_blocos(app, colaboradores):
+    bulk, stats = aplicar_lote("1", "acrescimo", 2.0, date(2026, 2, 1), "Inventário", colaboradores + ["x"], chunk=3)
+    assert stats["linhas"] == 7
+    assert stats["blocos"] == 3
+    assert stats["linhas_por_s"] is None or stats["linhas_por_s"] > 0
+    regs = _registros(bulk.id)
+    assert len(regs) == 7
+    assert {r.origin for r in regs} == {"lote"}
+    assert regs[0].date == date(2026, 2, 1) and regs[0].hours == 2.0 and regs[0].created_at is not None
+
+
+def test_corrigir_lote_set_based(app, colaboradores):
+    bulk, _ = aplicar_lote("1", "acrescimo", 2.0, date(2026, 2, 1), "", colaboradores[:4])
+    novos_ids = colaboradores[2:6]  # mantém 2, remove 2, adiciona 2
+    correcao, stats = corrigir_lote(bulk, "1", "desconto", 1.5, date(2026, 2, 2), "ajuste", novos_ids, chunk=1)
+
+    assert (stats["atualizados"], stats["removidos"], stats["inseridos"]) == (2, 2, 2)
+    assert _registros(bulk.id) == []
+    regs = _registros(correcao.id)
+    assert [r.collaborator_id for r in regs] == novos_ids
+    assert {(r.record_type, r.hours, r.date) for r in regs} == {("desconto", 1.5, date(2026, 2, 2))}
+    assert db.session.get(BulkHourOperation, correcao.id).correction_of_id == bulk.id
+
+
+def test_rotas_de_lote_exigem_admin(app):
+    resp = app.test_client().get("/ciclos/lote_horas/logs")
+    assert resp.status_code == 302 and "/login" in resp.headers["Location"]
+
+    user = User()
+    user.username = "operador"
+    user.name = "Operador"
+    user.password_hash = generate_password_hash("senha123")
+    user.nivel = "operador"
+    db.session.add(user)
+    db.session.commit()
+    client = app.test_client()
+    client.post("/login", data={"username": "operador", "password": "senha123", "action": "login"})
+    for url in ("/ciclos/lote_horas", "/ciclos/lote_horas/logs", "/ciclos/lote_horas/corrigir/1"):
+        resp = client.get(url)
+        assert resp.status_code == 302 and resp.headers["Location"].endswith("/ciclos/")
+
+
+def test_rota_preview_aplica_lote(app, colaboradores):
+    user = User()
+    user.username = "admin"
+    user.name = "Admin"
+    user.password_hash = generate_password_hash("senha123")
+    user.nivel = "admin"
+    db.session.add(user)
+    db.session.commit()
+    client = app.test_client()
+    client.post("/login", data={"username": "admin", "password": "senha123", "action": "login"})
+
+    dados = {"tipo": "acrescimo", "horas": "3", "data_personalizada": "2026-02-03", "colaboradores": colaboradores}
+    resp = client.post("/ciclos/lote_horas/preview", data=dados)
+    assert resp.status_code == 302
+    assert TimeOffRecord.query.filter_by(origin="lote").count() == 7
+
+    resp = client.post("/ciclos/lote_horas/preview", data={**dados, "data_personalizada": ""})
+    assert resp.status_code == 302
+    assert BulkHourOperation.query.count() == 1
+
+    resp = client.get("/ciclos/lote_horas/logs?tipo=acrescimo&criador=" + str(user.id))
+    assert resp.status_code == 200
+    assert "Admin" in resp.get_data(as_text=True)
+
+
+def test_listar_lotes_paginacao_por_chave(app, colaboradores):
+    base = datetime(2026, 3, 1, 8, 0)
+    lotes = []
+    for i in range(5):
+        bulk, _ = aplicar_lote(str(1 + i % 2), "acrescimo" if i % 2 else "desconto", 1.0, date(2026, 3, 1), "", [])
+        bulk.created_at = base + timedelta(days=i // 2)  # pares com o mesmo created_at: desempate pelo id
+        lotes.append(bulk)
+    db.session.commit()
+    antigo, _ = aplicar_lote("1", "acrescimo", 1.0, date(2026, 3, 1), "", colaboradores[:3])
+    antigo.created_at = base - timedelta(days=9)
+    correcao, _ = corrigir_lote(lotes[4], "1", "acrescimo", 2.0, date(2026, 3, 1), "", colaboradores[:2])
+    correcao.created_at = base - timedelta(days=10)
+    db.session.commit()
+
+    vistos = []
+    cursor = None
+    while True:
+        pagina = listar_lotes(cursor=cursor, limite=2)
+        vistos.extend(item["lote"].id for item in pagina["itens"])
+        cursor = pagina["proximo_cursor"]
+        if not cursor:
+            break
+    esperado = [
+        lote.id
+        for lote in BulkHourOperation.query.order_by(
+            BulkHourOperation.created_at.desc(), BulkHourOperation.id.desc()
+        ).all()
+    ]
+    assert vistos == esperado and len(vistos) == 7
+
+    contagens = {i["lote"].id: (i["registros"], i["correcoes"]) for i in listar_lotes(limite=50)["itens"]}
+    assert contagens[lotes[4].id] == (0, 1)
+    assert contagens[correcao.id] == (2, 0)
+
+    assert len(listar_lotes(tipo="desconto")["itens"]) == 3
+    assert len(listar_lotes(criador="2")["itens"]) == 2
+    periodo = listar_lotes(data_inicio=date(2026, 3, 2), data_fim=date(2026, 3, 2))["itens"]
+    assert {i["lote"].id for i in periodo} == {lotes[2].id, lotes[3].id}
+    assert listar_lotes(cursor="invalido!")["itens"]
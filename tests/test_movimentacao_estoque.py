@@ -0,0 +1,264 @@
+"""
+Testes para o motor de movimentações de estoque (UPDATE condicional + Historico).
+"""
+
+import sqlite3
+
+import pytest
+
+from multimax import create_app, db
+from multimax.models import Historico, Produto, User
+from multimax.password_hash import generate_password_hash
+from multimax.services.movimentacao_estoque_service import MovimentacaoInvalida, movimentar, movimentar_lote
+
+
+@pytest.fixture
+def app():
+    """Cria uma instância da aplicação para testes."""
+    app = create_app()
+    app.config["TESTING"] = True
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+    app.config["SECRET_KEY"] = "test-secret-key"
+    app.config["WTF_CSRF_ENABLED"] = False
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def app_arquivo(tmp_path, monkeypatch):
+    """Aplicação sobre um banco SQLite em arquivo (transações reais do pysqlite, sem StaticPool)."""
+    monkeypatch.setenv("SQLALCHEMY_DATABASE_URI", f"sqlite:///{tmp_path / 'estoque.db'}")
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    app = create_app()
+    app.config["TESTING"] = True
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+
+
+def _persistido(app, produto_id):
+    """(quantidade, linhas de Historico) vistos por outra conexão: só o que foi efetivado."""
+    with sqlite3.connect(app.config["DB_FILE_PATH"]) as conn:
+        quantidade = conn.execute("SELECT quantidade FROM produto WHERE id = ?", (produto_id,)).fetchone()[0]
+        historicos = conn.execute("SELECT COUNT(*) FROM historico WHERE product_id = ?", (produto_id,)).fetchone()[0]
+    return quantidade, historicos
+
+
+def _produto(codigo, nome, quantidade):
+    p = Produto()
+    p.codigo = codigo
+    p.nome = nome
+    p.quantidade = quantidade
+    p.estoque_minimo = 0
+    db.session.add(p)
+    db.session.commit()
+    return p
+
+
+def test_saida_condicional_e_historico(app):
+    p = _produto("MV0001", "Fraldinha", 5)
+
+    res = movimentar(p.id, "saida", "3", "op", "Venda balcão")
+    assert res["estoque"] == 2 and res["nome"] == "Fraldinha"
+    assert p.quantidade == 2  # instância do identity map atualizada sem novo SELECT
+
+    with pytest.raises(MovimentacaoInvalida) as exc:
+        movimentar(p.id, "saida", 3, "op")
+    assert exc.value.codigo == "estoque_insuficiente" and exc.value.disponivel == 2
+    with pytest.raises(MovimentacaoInvalida) as exc:
+        movimentar(999999, "entrada", 1, "op")
+    assert exc.value.codigo == "produto_nao_encontrado"
+    with pytest.raises(MovimentacaoInvalida):
+        movimentar(p.id, "saida", 0, "op")
+
+    atual = db.session.execute(db.select(Produto).filter_by(id=p.id).execution_options(populate_existing=True))
+    assert atual.scalar_one().quantidade == 2
+    hist = Historico.query.filter_by(product_id=p.id).all()
+    assert [(h.action, h.quantidade, h.details) for h in hist] == [("saida", 3, "Venda balcão")]
+
+
+def test_lote_atomico_e_parcial(app):
+    a = _produto("MV0002", "Alcatra", 10)
+    b = _produto("MV0003", "Maminha", 1)
+    linhas = [
+        {"produto_id": a.id, "op": "saida", "quantidade": 4},
+        {"produto_id": b.id, "op": "saida", "quantidade": 2},
+    ]
+
+    resultados, gravou = movimentar_lote(linhas, "op")
+    assert not gravou
+    assert [r["codigo"] for r in resultados] == ["lote_desfeito", "estoque_insuficiente"]
+    assert db.session.get(Produto, a.id).quantidade == 10
+    assert Historico.query.count() == 0
+
+    # commit=False: o lote recusado fica para o chamador desfazer
+    resultados, gravou = movimentar_lote(linhas, "op", commit=False)
+    assert not gravou and resultados[0]["codigo"] == "lote_desfeito"
+    db.session.rollback()
+    assert db.session.get(Produto, a.id).quantidade == 10
+
+    resultados, gravou = movimentar_lote(linhas + [{"produto_id": b.id, "op": "entrada", "quantidade": 1}], "op", False)
+    assert gravou
+    assert [r["ok"] for r in resultados] == [True, False, True]
+    assert resultados[2]["estoque"] == 2
+    assert db.session.get(Produto, a.id).quantidade == 6
+    assert Historico.query.count() == 2
+
+
+def test_lote_em_banco_arquivo_numa_unica_transacao(app_arquivo):
+    a = _produto("AR0001", "Alcatra", 10)
+    b = _produto("AR0002", "Maminha", 1)
+    saida_a = {"produto_id": a.id, "op": "saida", "quantidade": 3}
+    saida_b = {"produto_id": b.id, "op": "saida", "quantidade": 5}
+
+    # commit=False: nada é efetivado antes do chamador; o rollback dele desfaz estoque e Historico
+    for atomico in (True, False):
+        _, gravou = movimentar_lote([saida_a], "op", atomico=atomico, commit=False)
+        assert gravou
+        db.session.rollback()
+        assert _persistido(app_arquivo, a.id) == (10, 0)
+
+    # Falha no meio do lote atômico: nenhuma linha efetivada
+    resultados, gravou = movimentar_lote([saida_a, saida_b, {**saida_a, "op": "entrada"}], "op")
+    assert not gravou and [r["codigo"] for r in resultados] == ["lote_desfeito", "estoque_insuficiente"]
+    assert _persistido(app_arquivo, a.id) == (10, 0)
+
+    # Sucesso: estoque e Historico efetivados juntos
+    _, gravou = movimentar_lote([saida_a, saida_b], "op", atomico=False)
+    assert gravou and _persistido(app_arquivo, a.id) == (7, 1) and _persistido(app_arquivo, b.id) == (1, 0)
+
+
+def test_api_saida_codigos(app):
+    user = User()
+    user.username = "admin"
+    user.name = "Admin"
+    user.password_hash = generate_password_hash("senha123")
+    user.nivel = "admin"
+    db.session.add(user)
+    p = _produto("MV0004", "Cupim", 2)
+    client = app.test_client()
+    client.post("/login", data={"username": "admin", "password": "senha123", "action": "login"})
+
+    assert client.post(f"/api/v1/produtos/{p.id}/saida", json={"quantidade": 5}).status_code == 400
+    assert client.post("/api/v1/produtos/999999/saida", json={"quantidade": 1}).status_code == 404
+    assert client.post(f"/api/v1/produtos/{p.id}/saida", json={"quantidade": -1}).status_code == 400
+    ok = client.post(f"/api/v1/produtos/{p.id}/saida", json={"quantidade": 2})
+    assert ok.status_code == 200 and ok.get_json()["novo_estoque"] == 0
+
+
+def _login_admin(app):
+    user = User()
+    user.username = "integracao"
+    user.name = "Integração"
+    user.password_hash = generate_password_hash("senha123")
+    user.nivel = "admin"
+    db.session.add(user)
+    db.session.commit()
+    client = app.test_client()
+    client.post("/login", data={"username": "integracao", "password": "senha123", "action": "login"})
+    return client
+
+
+def test_api_lote_valida_antes_e_idempotencia(app):
+    a = _produto("LT0001", "Contrafilé", 10)
+    b = _produto("LT0002", "Acém", 1)
+    client = _login_admin(app)
+
+    invalido = client.post(
+        "/api/v1/movimentacoes/lote",
+        json={
+            "itens": [
+                {"codigo": "LT0001", "op": "saida", "quantidade": 2},
+                {"id": b.id, "op": "saida", "quantidade": 2},
+                {"codigo": "NAOEXISTE", "op": "entrada", "quantidade": 1},
+                {"id": a.id, "op": "transferir", "quantidade": 1},
+            ]
+        },
+    )
+    assert invalido.status_code == 400
+    codigos = [(r["linha"], r["code"]) for r in invalido.get_json()["resultados"]]
+    assert codigos == [(1, "estoque_insuficiente"), (2, "produto_nao_encontrado"), (3, "operacao_invalida")]
+    assert Historico.query.count() == 0
+
+    corpo = {
+        "itens": [
+            {"codigo": "LT0001", "op": "saida", "quantidade": 4, "detalhes": "Pedido 12"},
+            {"id": b.id, "op": "entrada", "quantidade": 5},
+            {"id": b.id, "op": "saida", "quantidade": 6},
+        ]
+    }
+    headers = {"Idempotency-Key": "recebimento-42"}
+    ok = client.post("/api/v1/movimentacoes/lote", json=corpo, headers=headers)
+    assert ok.status_code == 200
+    dados = ok.get_json()
+    assert dados["aplicadas"] == 3 and [r["estoque"] for r in dados["resultados"]] == [6, 6, 0]
+
+    repetido = client.post("/api/v1/movimentacoes/lote", json=corpo, headers=headers)
+    assert repetido.status_code == 200 and repetido.headers["Idempotent-Replayed"] == "true"
+    assert repetido.get_json() == dados
+    assert Historico.query.count() == 3
+    assert db.session.get(Produto, a.id).quantidade == 6
+
+    corpo["itens"][0]["quantidade"] = 1
+    assert client.post("/api/v1/movimentacoes/lote", json=corpo, headers=headers).status_code == 422
+
+
+def test_api_lote_retry_concorrente_nao_movimenta(app_arquivo, monkeypatch):
+    from multimax.routes import api
+
+    a = _produto("RC0001", "Patinho", 10)
+    client = _login_admin(app_arquivo)
+    corpo = {"itens": [{"id": a.id, "op": "saida", "quantidade": 3}]}
+    original = api.buscar_lote
+    chamadas = []
+
+    def _buscar_com_corrida(uid, chave):
+        chamadas.append(chave)
+        if len(chamadas) == 1:
+            # O outro retry grava a mesma chave entre a consulta e o commit desta requisição
+            with sqlite3.connect(app_arquivo.config["DB_FILE_PATH"]) as conn:
+                conn.execute(
+                    "INSERT INTO movimentacao_lote (user_id, chave, hash_corpo, status_code, resposta, created_at) "
+                    "VALUES (?, ?, ?, 200, ?, CURRENT_TIMESTAMP)",
+                    (uid, chave, api.hash_lote({"itens": corpo["itens"], "atomico": True}), '{"aplicadas": 1}'),
+                )
+            return None
+        return original(uid, chave)
+
+    monkeypatch.setattr(api, "buscar_lote", _buscar_com_corrida)
+    resp = client.post("/api/v1/movimentacoes/lote", json=corpo, headers={"Idempotency-Key": "retry-7"})
+
+    assert resp.status_code == 200 and resp.headers["Idempotent-Replayed"] == "true"
+    assert resp.get_json() == {"aplicadas": 1} and len(chamadas) == 2
+    assert _persistido(app_arquivo, a.id) == (10, 0)
+
+
+def test_api_lote_parcial(app):
+    a = _produto("LT0003", "Costela", 3)
+    client = _login_admin(app)
+
+    resp = client.post(
+        "/api/v1/movimentacoes/lote",
+        json={
+            "atomico": False,
+            "itens": [
+                {"id": a.id, "op": "saida", "quantidade": 1},
+                {"id": a.id, "op": "saida", "quantidade": 9},
+                {"op": "entrada", "quantidade": 1},
+            ],
+        },
+    )
+    assert resp.status_code == 200
+    dados = resp.get_json()
+    assert (dados["aplicadas"], dados["falhas"]) == (1, 2)
+    assert [r["ok"] for r in dados["resultados"]] == [True, False, False]
+    assert db.session.get(Produto, a.id).quantidade == 2
+    assert client.post("/api/v1/movimentacoes/lote", json={"itens": []}).status_code == 400
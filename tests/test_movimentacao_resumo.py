@@ -0,0 +1,117 @@
+"""
+Testes para as somas de movimentação por período (gráficos de produto).
+"""
+
+from datetime import date, datetime
+
+import pytest
+
+from multimax import create_app, db
+from multimax.models import Historico, Produto, User
+from multimax.password_hash import generate_password_hash
+from multimax.routes.estoque_producao import _get_produto_graficos
+from multimax.services.movimentacao_resumo_service import (
+    serie_anual,
+    serie_diaria,
+    serie_mensal,
+    serie_semanal,
+    somar_por_periodo,
+)
+
+HOJE = date(2026, 3, 18)  # quarta-feira
+
+
+@pytest.fixture
+def app():
+    """Cria uma instância da aplicação para testes."""
+    app = create_app()
+    app.config["TESTING"] = True
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+    app.config["SECRET_KEY"] = "test-secret-key"
+    app.config["WTF_CSRF_ENABLED"] = False
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def _produto(codigo):
+    p = Produto()
+    p.codigo = codigo
+    p.nome = f"Produto {codigo}"
+    p.quantidade = 0
+    db.session.add(p)
+    db.session.flush()
+    return p
+
+
+def _mov(produto, quando, action, quantidade):
+    h = Historico()
+    h.product_id = produto.id
+    h.product_name = produto.nome
+    h.data = quando
+    h.action = action
+    h.quantidade = quantidade
+    db.session.add(h)
+
+
+@pytest.fixture
+def produto(app):
+    p, outro = _produto("MR0001"), _produto("MR0002")
+    _mov(p, datetime(2026, 3, 16, 8, 0), "entrada", 5)  # segunda-feira
+    _mov(p, datetime(2026, 3, 22, 23, 30), "saida", 2)  # domingo da mesma semana
+    _mov(p, datetime(2026, 3, 9, 12, 0), "entrada", 1)
+    _mov(p, datetime(2026, 3, 9, 15, 0), "ajuste", 4)
+    _mov(p, datetime(2025, 12, 31, 23, 0), "saida", 3)
+    _mov(p, datetime(2021, 6, 1, 10, 0), "entrada", 100)
+    _mov(outro, datetime(2026, 3, 16, 9, 0), "entrada", 50)
+    db.session.commit()
+    return p
+
+
+def test_somas_por_periodo(produto):
+    assert somar_por_periodo(produto.id, "semana", date(2026, 3, 1)) == {
+        date(2026, 3, 9): {"entrada": 1, "ajuste": 4},
+        date(2026, 3, 16): {"entrada": 5, "saida": 2},
+    }
+    assert somar_por_periodo(produto.id, "mes", date(2025, 12, 1), date(2025, 12, 31)) == {
+        date(2025, 12, 1): {"saida": 3}
+    }
+
+    labels, entradas, saidas = serie_semanal(produto.id, hoje=HOJE)
+    assert (labels[-2:], entradas[-2:], saidas[-2:]) == (["Semana 09/03", "Semana 16/03"], [1, 5], [0, 2])
+    assert len(labels) == 9 and sum(entradas) == 6
+
+    labels, entradas, saidas = serie_mensal(produto.id, hoje=HOJE)
+    assert (labels[0], labels[-1], len(labels)) == ("04/2025", "03/2026", 12)
+    assert (entradas[-1], saidas[-1], saidas[labels.index("12/2025")]) == (6, 2, 3)
+
+    labels, entradas, saidas = serie_anual(produto.id, hoje=HOJE)
+    assert labels == ["2022", "2023", "2024", "2025", "2026"]
+    assert (entradas, saidas) == ([0, 0, 0, 0, 6], [0, 0, 0, 3, 2])
+
+    labels, entradas, saidas = serie_diaria(produto.id, date(2026, 3, 16), date(2026, 3, 22))
+    assert (labels[0], labels[-1]) == ("16/03", "22/03")
+    assert (entradas[0], saidas[-1], sum(entradas + saidas)) == (5, 2, 7)
+
+
+def test_graficos_do_estoque_e_pdf(app, produto):
+    graficos = _get_produto_graficos(produto, date(2026, 3, 1), date(2026, 3, 31))
+    assert graficos["labels"] == ["09/03/2026", "16/03/2026", "22/03/2026"]
+    assert graficos["entradas"] == [{"x": "09/03/2026", "y": 1}, {"x": "16/03/2026", "y": 5}]
+    assert [p["y"] for p in graficos["estoque"]] == [1, 6, 4]
+    assert _get_produto_graficos(produto, date(2024, 1, 1), date(2024, 1, 31)) == {}
+
+    user = User()
+    user.username = "admin"
+    user.name = "Admin"
+    user.password_hash = generate_password_hash("senha123")
+    user.nivel = "admin"
+    db.session.add(user)
+    db.session.commit()
+    client = app.test_client()
+    client.post("/login", data={"username": "admin", "password": "senha123", "action": "login"})
+    resp = client.get(f"/exportar/graficos/produto/{produto.id}.pdf?data_inicio=2026-03-16&data_fim=2026-03-22")
+    assert resp.status_code == 200 and resp.mimetype == "application/pdf"
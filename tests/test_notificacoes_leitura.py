@@ -0,0 +1,112 @@
+"""
+Testes para as notificações não lidas (anti-join único, cache por usuário e ETag).
+"""
+
+from datetime import date, timedelta
+
+import pytest
+
+from multimax import create_app, db
+from multimax.models import CleaningTask, NotificationRead, Produto, User
+from multimax.password_hash import generate_password_hash
+from multimax.services import notificacoes_leitura_service
+from multimax.services.notificacoes_leitura_service import carregar
+
+
+@pytest.fixture
+def app():
+    """Cria uma instância da aplicação para testes."""
+    app = create_app()
+    app.config["TESTING"] = True
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+    app.config["SECRET_KEY"] = "test-secret-key"
+    app.config["WTF_CSRF_ENABLED"] = False
+
+    with app.app_context():
+        db.create_all()
+        notificacoes_leitura_service.invalidar_cache()
+        yield app
+        notificacoes_leitura_service.invalidar_cache()
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def candidatos(app):
+    hoje = date.today()
+    for i in range(12):
+        p = Produto()
+        p.codigo = f"P{i:02d}"
+        p.nome = f"Produto {i:02d}"
+        p.quantidade = i
+        p.estoque_minimo = 20
+        db.session.add(p)
+    for i in range(3):
+        t = CleaningTask()
+        t.nome_limpeza = f"Limpeza {i}"
+        t.frequencia = "semanal"
+        t.tipo = "geral"
+        t.ultima_data = hoje - timedelta(days=7)
+        t.proxima_data = hoje + timedelta(days=i - 1)
+        db.session.add(t)
+    db.session.commit()
+
+
+def _marcar(user_id, tipo, ref_id):
+    nr = NotificationRead()
+    nr.user_id = user_id
+    nr.tipo = tipo
+    nr.ref_id = ref_id
+    db.session.add(nr)
+    db.session.commit()
+
+
+def test_anti_join_filtra_lidas(candidatos, monkeypatch):
+    monkeypatch.setenv("NOTIFICACOES_CACHE_TTL", "0")
+    hoje = date.today()
+    dados, etag = carregar(1, hoje)
+    assert [p["quantidade"] for p in dados["estoque"]] == list(range(10))
+    assert [t["nome"] for t in dados["limpeza"]] == ["Limpeza 0", "Limpeza 1", "Limpeza 2"]
+    assert isinstance(dados["limpeza"][0]["proxima_data"], date)
+
+    # Lidos saem do conjunto e os próximos candidatos entram no lugar (limite após o anti-join)
+    primeiro = Produto.query.filter_by(codigo="P00").first()
+    tarefa = CleaningTask.query.filter_by(nome_limpeza="Limpeza 1").first()
+    _marcar(1, "estoque", primeiro.id)
+    _marcar(1, "limpeza", tarefa.id)
+    _marcar(2, "estoque", primeiro.id + 1)
+    dados2, etag2 = carregar(1, hoje)
+    assert [p["quantidade"] for p in dados2["estoque"]] == list(range(1, 11))
+    assert [t["nome"] for t in dados2["limpeza"]] == ["Limpeza 0", "Limpeza 2"]
+    assert etag2 != etag
+
+    # Mesmos itens em outro dia: o texto "Vence em Nd" muda, então o ETag também
+    etag_amanha = notificacoes_leitura_service._etag(dados2, hoje + timedelta(days=1))
+    assert etag_amanha != etag2
+
+
+def test_api_etag_304_e_invalidacao(app, candidatos):
+    user = User()
+    user.username = "admin"
+    user.name = "Admin"
+    user.password_hash = generate_password_hash("senha123")
+    user.nivel = "admin"
+    db.session.add(user)
+    db.session.commit()
+    client = app.test_client()
+    client.post("/login", data={"username": "admin", "password": "senha123", "action": "login"})
+
+    resp = client.get("/api/v1/notifications")
+    assert resp.status_code == 200 and resp.headers.get("ETag")
+    assert resp.get_json()["count"] == 13
+    etag = resp.headers["ETag"]
+    assert client.get("/api/v1/notifications", headers={"If-None-Match": etag}).status_code == 304
+
+    alvo = resp.get_json()["notifications"][0]
+    assert client.post("/api/v1/notifications/read", json={"type": alvo["type"], "id": alvo["id"]}).status_code == 200
+    resp = client.get("/api/v1/notifications", headers={"If-None-Match": etag})
+    assert resp.status_code == 200  # cache invalidado: conteúdo e ETag novos
+    ids = [(n["type"], n["id"]) for n in resp.get_json()["notifications"]]
+    assert (alvo["type"], alvo["id"]) not in ids
+
+    assert client.get("/home/dashboard/full").status_code == 200
@@ -0,0 +1,50 @@
+"""
+Testes para o relógio em cache de multimax.optimizations.
+"""
+
+from datetime import datetime
+
+from multimax import optimizations
+from multimax.optimizations import TZ_SAO_PAULO, clear_date_cache, get_now_cached, get_today_cached
+
+
+def test_now_em_sao_paulo():
+    clear_date_cache()
+    now = get_now_cached()
+    assert now.tzinfo == TZ_SAO_PAULO
+    assert get_today_cached() == datetime.now(TZ_SAO_PAULO).date()
+
+
+def test_reaproveita_dentro_do_ttl():
+    clear_date_cache()
+    assert get_now_cached() is get_now_cached()
+
+
+def test_expira_apos_ttl(monkeypatch):
+    clear_date_cache()
+    instante = [1000.0]
+    monkeypatch.setattr(optimizations.time, "monotonic", lambda: instante[0])
+    primeiro = get_now_cached()
+
+    instante[0] += optimizations.NOW_CACHE_TTL + 0.01
+    assert get_now_cached() is not primeiro
+
+
+def test_virada_do_dia(monkeypatch):
+    clear_date_cache()
+    instante = [0.0]
+    agora = [datetime(2026, 1, 1, 23, 59, 59, tzinfo=TZ_SAO_PAULO)]
+
+    class _FakeDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return agora[0]
+
+    monkeypatch.setattr(optimizations.time, "monotonic", lambda: instante[0])
+    monkeypatch.setattr(optimizations, "datetime", _FakeDatetime)
+
+    assert get_today_cached().day == 1
+    agora[0] = datetime(2026, 1, 2, 0, 0, 1, tzinfo=TZ_SAO_PAULO)
+    instante[0] += 2
+    assert get_today_cached().day == 2
+    clear_date_cache()
@@ -0,0 +1,111 @@
+"""
+Testes para a instrumentação de tempo das queries (QueryLog e agregados por endpoint).
+"""
+
+import pytest
+from sqlalchemy import text
+
+from multimax import create_app, db
+from multimax.models import QueryLog, User
+from multimax.password_hash import generate_password_hash
+from multimax.services.query_monitor_service import (
+    ENDPOINT_SEM_REQUISICAO,
+    ENDPOINT_SEM_ROTA,
+    _percentil,
+    obter_monitor,
+)
+
+
+@pytest.fixture
+def app():
+    """Cria uma instância da aplicação para testes."""
+    app = create_app()
+    app.config["TESTING"] = True
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+    app.config["SECRET_KEY"] = "test-secret-key"
+
+    with app.app_context():
+        db.create_all()
+        db.session.query(QueryLog).delete()
+        db.session.commit()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def test_percentil():
+    assert _percentil([], 0.5) == 0.0
+    assert _percentil([1.0, 2.0, 3.0, 4.0], 0.5) == 2.5
+    assert _percentil([10.0], 0.95) == 10.0
+
+
+def test_agrega_por_endpoint(app):
+    monitor = obter_monitor(app)
+    monitor.limpar_estatisticas()
+
+    for caminho in ("/qualquer", "/outro-caminho"):
+        with app.test_request_context(caminho):
+            db.session.execute(text("select 1"))
+    db.session.execute(text("select 3"))
+
+    # Caminhos sem rota caem numa chave só (não cresce por URL)
+    stats = {s["endpoint"]: s for s in monitor.estatisticas()}
+    assert stats[ENDPOINT_SEM_ROTA]["count"] == 2 and "/qualquer" not in stats
+    assert stats[ENDPOINT_SEM_ROTA]["p95_ms"] >= stats[ENDPOINT_SEM_ROTA]["p50_ms"]
+    assert stats[ENDPOINT_SEM_REQUISICAO]["count"] >= 1
+
+
+def test_statement_com_erro_nao_deixa_inicio_pendente(app):
+    obter_monitor(app)
+    with pytest.raises(Exception):
+        db.session.execute(text("select * from tabela_inexistente"))
+    db.session.rollback()
+    db.session.execute(text("select 1"))
+    assert not db.session.connection().info.get("query_monitor_inicio")
+
+
+def test_queries_lentas_gravadas_em_lote(app, monkeypatch):
+    monitor = obter_monitor(app)
+    # Sem thread de escrita: o teste drena a fila de forma síncrona
+    monkeypatch.setattr(monitor, "_garantir_thread", lambda: None)
+    limite_original = monitor.limite_ms
+    monitor.limite_ms = 0
+    try:
+        with app.test_request_context("/lenta"):
+            db.session.execute(text("select 42"))
+    finally:
+        monitor.limite_ms = limite_original
+
+    # Nada é gravado na requisição; o escritor grava ao drenar a fila
+    assert monitor.flush() >= 1
+    log = db.session.query(QueryLog).filter(QueryLog.query.contains("select 42")).first()
+    assert log is not None
+    assert log.endpoint == ENDPOINT_SEM_ROTA
+
+
+def test_endpoint_estatisticas_exige_dev(app):
+    client = app.test_client()
+    resp = client.get("/db/queries/endpoints")
+    assert resp.status_code in (302, 401, 403)
+
+
+def test_reset_das_estatisticas_so_por_post(app):
+    monitor = obter_monitor(app)
+    monitor.limpar_estatisticas()
+    with app.test_request_context("/qualquer"):
+        db.session.execute(text("select 1"))
+    user = User()
+    user.username = "dev"
+    user.name = "Dev"
+    user.password_hash = generate_password_hash("senha123")
+    user.nivel = "DEV"
+    db.session.add(user)
+    db.session.commit()
+    client = app.test_client()
+    client.post("/login", data={"username": "dev", "password": "senha123", "action": "login"})
+
+    def _endpoints(resp):
+        return {s["endpoint"] for s in resp.get_json()["endpoints"]}
+
+    assert ENDPOINT_SEM_ROTA in _endpoints(client.get("/db/queries/endpoints?reset=1"))
+    assert ENDPOINT_SEM_ROTA not in _endpoints(client.post("/db/queries/endpoints", data={"reset": "1"}))
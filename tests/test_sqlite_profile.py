@@ -0,0 +1,47 @@
+"""
+Testes para o perfil de PRAGMAs SQLite aplicado no evento connect.
+"""
+
+from flask import Flask
+from sqlalchemy import create_engine
+
+from multimax.services.sqlite_profile_service import carregar_perfil, instalar_perfil_sqlite, perfil_ativo
+
+
+def test_perfil_padrao(monkeypatch):
+    for nome in ("SQLITE_JOURNAL_MODE", "SQLITE_BUSY_TIMEOUT", "SQLITE_SYNCHRONOUS", "SQLITE_FOREIGN_KEYS"):
+        monkeypatch.delenv(nome, raising=False)
+    perfil = carregar_perfil()
+    assert perfil["journal_mode"] == "WAL"
+    assert perfil["synchronous"] == "NORMAL"
+    assert perfil["busy_timeout"] == 5000
+    assert perfil["foreign_keys"] is False
+
+
+def test_perfil_por_ambiente(monkeypatch):
+    monkeypatch.setenv("SQLITE_JOURNAL_MODE", "delete")
+    monkeypatch.setenv("SQLITE_BUSY_TIMEOUT", "1234")
+    monkeypatch.setenv("SQLITE_SYNCHRONOUS", "invalido")
+    monkeypatch.setenv("SQLITE_FOREIGN_KEYS", "on")
+    perfil = carregar_perfil()
+    assert perfil["journal_mode"] == "DELETE"
+    assert perfil["busy_timeout"] == 1234
+    assert perfil["synchronous"] == "NORMAL"  # valor inválido volta ao padrão
+    assert perfil["foreign_keys"] is True
+
+
+def test_pragmas_aplicados_na_conexao(tmp_path, monkeypatch):
+    monkeypatch.delenv("SQLITE_JOURNAL_MODE", raising=False)
+    monkeypatch.setenv("SQLITE_BUSY_TIMEOUT", "2500")
+    app = Flask(__name__)
+    engine = create_engine(f"sqlite:///{tmp_path / 'perfil.db'}")
+    try:
+        assert instalar_perfil_sqlite(app, engine)["busy_timeout"] == 2500
+        ativo = perfil_ativo(engine)
+        assert ativo["journal_mode"] == "WAL"
+        assert ativo["busy_timeout"] == 2500
+        assert ativo["synchronous"] == "NORMAL"
+        assert ativo["temp_store"] == "MEMORY"
+        assert app.config["SQLITE_PRAGMA_PROFILE"]["journal_mode"] == "WAL"
+    finally:
+        engine.dispose()
@@ -0,0 +1,80 @@
+"""
+Testes para o snapshot de saldos de banco de horas e folgas.
+"""
+
+from datetime import date
+
+import pytest
+
+from multimax import create_app, db
+from multimax.models import Collaborator, TimeOffRecord
+from multimax.routes.usuarios import _calculate_folgas
+from multimax.services.timeoff_balance_service import calcular_snapshots
+
+
+@pytest.fixture
+def app():
+    """Cria uma instância da aplicação para testes."""
+    app = create_app()
+    app.config["TESTING"] = True
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+    app.config["SECRET_KEY"] = "test-secret-key"
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def _colaborador(nome):
+    c = Collaborator()
+    c.name = nome
+    c.active = True
+    db.session.add(c)
+    db.session.flush()
+    return c
+
+
+def _registro(colab, record_type, days=None, hours=None):
+    r = TimeOffRecord()
+    r.collaborator_id = colab.id
+    r.date = date(2026, 1, 10)
+    r.record_type = record_type
+    r.days = days
+    r.hours = hours
+    db.session.add(r)
+
+
+def test_snapshot_agrega_por_tipo(app):
+    ana = _colaborador("Ana")
+    bia = _colaborador("Bia")
+    _registro(ana, "folga_adicional", days=5)
+    _registro(ana, "folga_usada", days=2)
+    _registro(ana, "conversao", days=1)
+    _registro(ana, "horas", hours=3.5)
+    _registro(ana, "horas", hours=-1.0)
+    _registro(bia, "folga_usada", days=1)
+    db.session.commit()
+
+    snaps = calcular_snapshots()
+    assert snaps[ana.id] == {
+        "horas": 2.5,
+        "folgas_credito": 5,
+        "folgas_usadas": 2,
+        "folgas_convertidas": 1,
+        "folgas_saldo": 2,
+    }
+    assert snaps[bia.id]["folgas_saldo"] == -1
+    assert calcular_snapshots([]) == {}
+    assert calcular_snapshots([999]) == {}
+
+
+def test_calculate_folgas_usa_snapshot(app):
+    ana = _colaborador("Ana")
+    carla = _colaborador("Carla")
+    _registro(ana, "folga_adicional", days=3)
+    db.session.commit()
+
+    folgas = {f["collab"].id: f["balance"] for f in _calculate_folgas([ana, carla])}
+    assert folgas == {ana.id: 3, carla.id: 0}
@@ -0,0 +1,52 @@
+"""
+Testes para o cache de versão da aplicação.
+"""
+
+import pytest
+
+from multimax import create_app
+from multimax.services import version_service
+
+
+@pytest.fixture
+def app(monkeypatch):
+    """Cria uma instância da aplicação com versão fixa via ambiente."""
+    monkeypatch.setenv("APP_VERSION", "9.9.9")
+    app = create_app()
+    app.config["TESTING"] = True
+    return app
+
+
+def test_versao_resolvida_no_startup(app):
+    assert app.config[version_service.CONFIG_KEY] == "9.9.9"
+
+
+def test_render_nao_executa_git(app, monkeypatch):
+    chamadas = []
+    monkeypatch.setattr(version_service, "_versao_do_git", lambda *a, **k: chamadas.append(1) or "v1.0.0")
+
+    with app.test_request_context():
+        ctx = {}
+        for processor in app.template_context_processors[None]:
+            ctx.update(processor())
+
+    assert ctx["git_version"] == "9.9.9"
+    assert chamadas == []
+
+
+def test_atualizar_versao_recalcula(app, monkeypatch):
+    monkeypatch.delenv("APP_VERSION")
+    monkeypatch.setattr(version_service, "_versao_do_git", lambda *a, **k: "v2.0.0")
+
+    with app.app_context():
+        assert version_service.atualizar_versao(app) == "v2.0.0"
+        assert version_service.obter_versao(app) == "v2.0.0"
+
+
+def test_fallback_dev_sem_fontes(app, monkeypatch):
+    monkeypatch.delenv("APP_VERSION")
+    monkeypatch.setattr(version_service, "_versao_do_git", lambda *a, **k: "")
+    monkeypatch.setattr(version_service, "_versao_do_banco", lambda *a, **k: "")
+    app.config.pop(version_service.CONFIG_KEY, None)
+
+    assert version_service.obter_versao(app) == "dev"